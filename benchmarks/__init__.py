@@ -0,0 +1 @@
+# Offline benchmarks against local stand-ins for the portal, API and 2captcha
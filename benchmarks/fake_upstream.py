@@ -0,0 +1,302 @@
+# Local stand-ins for agencia/api-agencia.amazonasenergia.com and 2captcha
+import base64
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+SITE_KEY_FALSO = "site-key-falso"
+CPF_CNPJ_FALSO = "00000000000"
+SENHA_FALSA = "senha-falsa"
+
+# Portal mínimo com o que o login automatizado usa: formulário, widget de
+# reCAPTCHA (só o `data-sitekey` e os campos de resposta) e o login via XHR, que
+# grava token e usuário no localStorage como o portal real.
+PAGINA_LOGIN = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Agência Virtual (falsa)</title></head>
+<body>
+<form id="login">
+    <input name="CPF_CNPJ" type="text">
+    <input name="SENHA" type="password">
+    <div class="g-recaptcha" data-sitekey="%(site_key)s"></div>
+    <textarea id="g-recaptcha-response" style="display: none"></textarea>
+    <input name="g-recaptcha-response" type="hidden">
+    <button type="submit">Entrar</button>
+</form>
+<script>
+document.getElementById('login').addEventListener('submit', async (evento) => {
+    evento.preventDefault();
+    const form = evento.target;
+    const resposta = await fetch('%(api_url)s/api/auth/login', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            CPF_CNPJ: form.CPF_CNPJ.value,
+            SENHA: form.SENHA.value,
+            RECAPTCHA: document.getElementById('g-recaptcha-response').value,
+        }),
+    });
+    if (!resposta.ok) return;
+    const dados = await resposta.json();
+    localStorage.setItem('@AGENCIA-VIRTUAL:TOKEN-KEY', dados.token);
+    localStorage.setItem('@AGENCIA-VIRTUAL:USER-DATA', JSON.stringify(dados.usuario));
+    history.pushState({}, '', '/home');
+});
+</script>
+</body>
+</html>
+"""
+
+
+@dataclass
+class ConfiguracaoUpstream:
+    """Latências (em milissegundos) e tamanhos das respostas dos serviços falsos."""
+
+    latencia_portal_ms: float = 50
+    latencia_login_ms: float = 300
+    latencia_faturas_ms: float = 150
+    faturas_por_resposta: int = 3
+    # Bytes extras por fatura (simula respostas maiores da API)
+    tamanho_extra_fatura: int = 0
+    unidades_consumidoras: int = 3
+    tempo_solucao_captcha_segundos: float = 2
+    validade_token_segundos: int = 3600
+
+
+def gerar_jwt(claims: Dict) -> str:
+    """JWT sem assinatura válida: o scraper só lê o payload."""
+
+    def parte(dados: Dict) -> str:
+        bruto = json.dumps(dados, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(bruto).rstrip(b"=").decode()
+
+    return f"{parte({'alg': 'none', 'typ': 'JWT'})}.{parte(claims)}.assinatura"
+
+
+def unidades_falsas(quantidade: int) -> List[str]:
+    return [str(1000000 + indice) for indice in range(quantidade)]
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    # Keep-alive, como os serviços reais: o pool de conexões do cliente conta
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo num só envio: em dois, o Nagle segura o corpo até o ACK
+    # atrasado do cliente (~40 ms por resposta numa conexão reaproveitada)
+    wbufsize = -1
+    upstream: "UpstreamFalso"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_OPTIONS(self):
+        # Preflight CORS: o portal e a API ficam em portas (origens) diferentes
+        self._responder(204, b"", "text/plain")
+
+    def _responder(self, status: int, corpo: bytes, tipo: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Headers", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, status: int, dados) -> None:
+        self._responder(status, json.dumps(dados).encode(), "application/json")
+
+    def _ler_corpo(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    @staticmethod
+    def _esperar(milissegundos: float) -> None:
+        if milissegundos > 0:
+            time.sleep(milissegundos / 1000)
+
+
+class _ManipuladorPortal(_Manipulador):
+    def do_GET(self):
+        self._esperar(self.upstream.config.latencia_portal_ms)
+        pagina = PAGINA_LOGIN % {
+            "site_key": SITE_KEY_FALSO,
+            "api_url": self.upstream.url_api,
+        }
+        self._responder(200, pagina.encode(), "text/html; charset=utf-8")
+
+
+class _ManipuladorAPI(_Manipulador):
+    def do_POST(self):
+        if urlparse(self.path).path != "/api/auth/login":
+            return self._json(404, {"message": "Not found"})
+        self.upstream.contar("logins")
+        try:
+            dados = json.loads(self._ler_corpo() or b"{}")
+        except ValueError:
+            return self._json(400, {"message": "JSON inválido"})
+        self._esperar(self.upstream.config.latencia_login_ms)
+        if not dados.get("RECAPTCHA"):
+            return self._json(400, {"message": "reCAPTCHA não resolvido"})
+        if not dados.get("CPF_CNPJ") or dados.get("SENHA") != SENHA_FALSA:
+            return self._json(401, {"message": "Credenciais inválidas"})
+        self._json(200, self.upstream.resposta_login(dados["CPF_CNPJ"]))
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/api/faturas/abertas":
+            return self._json(404, {"message": "Not found"})
+        self.upstream.contar("consultas_faturas")
+        self._esperar(self.upstream.config.latencia_faturas_ms)
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._json(401, {"message": "Token ausente"})
+        unidade = self.headers.get("X-Consumer-Unit") or "0"
+        self._json(200, self.upstream.faturas(unidade))
+
+
+class _ManipuladorCaptcha(_Manipulador):
+    def do_POST(self):
+        if urlparse(self.path).path != "/in.php":
+            return self._json(404, {"status": 0, "request": "ERROR_NOT_FOUND"})
+        dados = parse_qs(self._ler_corpo().decode())
+        if not dados.get("googlekey"):
+            return self._json(200, {"status": 0, "request": "ERROR_GOOGLEKEY"})
+        self._json(200, {"status": 1, "request": self.upstream.enviar_captcha()})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/res.php":
+            return self._json(404, {"status": 0, "request": "ERROR_NOT_FOUND"})
+        parametros = parse_qs(url.query)
+        ids = (parametros.get("ids") or parametros.get("id") or [""])[0].split(",")
+        respostas = [self.upstream.consultar_captcha(captcha_id) for captcha_id in ids]
+        prontas = all(not r.startswith(("CAPCHA", "ERROR")) for r in respostas)
+        self._json(200, {"status": int(prontas), "request": "|".join(respostas)})
+
+
+class UpstreamFalso:
+    """
+    Sobe, em portas livres de 127.0.0.1, imitações do portal da agência virtual,
+    da API (`/api/auth/login` e `/api/faturas/abertas`) e do 2captcha
+    (`in.php`/`res.php`, inclusive consultas em lote).
+
+    Qualquer CPF/CNPJ com a senha `SENHA_FALSA` é aceito (logins distintos para
+    testes de carga), e o login exige um token de reCAPTCHA no corpo.
+    `variaveis_ambiente()` aponta a API Flask para estes servidores (ver
+    `config` em `scraper.presentation.dependencias`).
+    """
+
+    def __init__(self, config: Optional[ConfiguracaoUpstream] = None):
+        self.config = config or ConfiguracaoUpstream()
+        self._servidores: List[ThreadingHTTPServer] = []
+        self._lock = threading.Lock()
+        self._captchas: Dict[str, float] = {}
+        self._contadores = {
+            "logins": 0,
+            "consultas_faturas": 0,
+            "captchas_enviados": 0,
+            "captchas_consultados": 0,
+        }
+        self.url_portal = ""
+        self.url_api = ""
+        self.url_captcha = ""
+
+    def iniciar(self) -> "UpstreamFalso":
+        self.url_portal = self._subir(_ManipuladorPortal) + "/"
+        self.url_api = self._subir(_ManipuladorAPI)
+        self.url_captcha = self._subir(_ManipuladorCaptcha)
+        return self
+
+    def encerrar(self) -> None:
+        for servidor in self._servidores:
+            servidor.shutdown()
+            servidor.server_close()
+        self._servidores = []
+
+    def __enter__(self) -> "UpstreamFalso":
+        return self.iniciar()
+
+    def __exit__(self, *excecao) -> None:
+        self.encerrar()
+
+    def variaveis_ambiente(self) -> Dict[str, str]:
+        return {
+            "PORTAL_URL": self.url_portal,
+            "API_URL": self.url_api,
+            "CAPTCHA_SERVICE_URL": self.url_captcha,
+            "CAPTCHA_API_KEY": "chave-falsa",
+        }
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return dict(self._contadores)
+
+    def contar(self, contador: str) -> None:
+        with self._lock:
+            self._contadores[contador] += 1
+
+    def resposta_login(self, cpf_cnpj: str = CPF_CNPJ_FALSO) -> Dict:
+        agora = int(time.time())
+        token = gerar_jwt(
+            {
+                "sub": cpf_cnpj,
+                "iat": agora,
+                "exp": agora + self.config.validade_token_segundos,
+                "jti": uuid.uuid4().hex,
+            }
+        )
+        return {
+            "token": token,
+            "usuario": {
+                "ID": "1",
+                "NOME": "Cliente Falso",
+                "UNIDADES_CONSUMIDORAS": unidades_falsas(
+                    self.config.unidades_consumidoras
+                ),
+            },
+        }
+
+    def faturas(self, unidade: str) -> List[Dict]:
+        extra = "0" * self.config.tamanho_extra_fatura
+        return [
+            {
+                "UC": int(unidade) if unidade.isdigit() else 0,
+                "MES_ANO_REFERENCIA": f"{indice + 1:02d}/2024",
+                "DATA_VENCIMENTO": f"2024-{indice + 1:02d}-10",
+                "VALOR_TOTAL": 100.0 + indice,
+                "CODIGO_BARRAS": "8" * 48 + extra,
+                "PIX": None,
+            }
+            for indice in range(self.config.faturas_por_resposta)
+        ]
+
+    def enviar_captcha(self) -> str:
+        captcha_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._captchas[captcha_id] = time.monotonic()
+            self._contadores["captchas_enviados"] += 1
+        return captcha_id
+
+    def consultar_captcha(self, captcha_id: str) -> str:
+        with self._lock:
+            self._contadores["captchas_consultados"] += 1
+            enviado_em = self._captchas.get(captcha_id)
+        if enviado_em is None:
+            return "ERROR_WRONG_CAPTCHA_ID"
+        decorrido = time.monotonic() - enviado_em
+        if decorrido < self.config.tempo_solucao_captcha_segundos:
+            return "CAPCHA_NOT_READY"
+        return f"03A{captcha_id}" + "x" * 200
+
+    def _subir(self, manipulador: type) -> str:
+        classe = type(manipulador.__name__, (manipulador,), {"upstream": self})
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), classe)
+        servidor.daemon_threads = True
+        threading.Thread(
+            target=servidor.serve_forever, name="upstream-falso", daemon=True
+        ).start()
+        self._servidores.append(servidor)
+        host, porta = servidor.server_address[:2]
+        return f"http://{host}:{porta}"
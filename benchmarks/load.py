@@ -0,0 +1,566 @@
+# Load testing with concurrency sweeps: python -m benchmarks.load
+"""
+Gera carga na API Flask servida de verdade (HTTP, threads do werkzeug) com os
+serviços de fora substituídos pelos falsos de `fake_upstream`. Para cada nível
+de concorrência, `N` clientes em laço fechado disparam uma mistura de /login,
+/faturas, /faturas_auto e /status durante um tempo fixo; o resultado traz
+vazão, p50/p95/p99, taxa de erro e o pico de memória (RSS) do processo da API
+e dos processos do Chrome abaixo dele, além do nível a partir do qual a vazão
+para de crescer (ponto de saturação).
+
+A API roda em um subprocesso, para que o RSS medido seja só dela. A conta
+falsa já entra no token store; logins no navegador só acontecem com
+`login_novo` na mistura (um CPF inédito por requisição, exige Chrome).
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.fake_upstream import (
+    CPF_CNPJ_FALSO,
+    SENHA_FALSA,
+    ConfiguracaoUpstream,
+    UpstreamFalso,
+    unidades_falsas,
+)
+from benchmarks.run import DIRETORIO_RESULTADOS, commit_atual
+from scraper.application.metrics import MedidorLatencia
+from scraper.domain.models import Credenciais, InformacoesUsuario, TokenAcesso
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada operação na mistura padrão
+MISTURA_PADRAO = {
+    "status": 1,
+    "faturas": 6,
+    "faturas_auto": 2,
+    "login": 1,
+    "login_novo": 0,
+}
+CLIENT_ID_FALSO = "client-id-falso"
+# Ganho mínimo de vazão para um nível de concorrência não contar como saturado
+GANHO_MINIMO_VAZAO = 0.10
+TAXA_ERRO_SATURACAO = 0.01
+
+
+def ler_rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def descendentes(pid: int) -> List[int]:
+    """Todos os processos abaixo de `pid` (filhos, netos...), via /proc."""
+    filhos: Dict[int, List[int]] = {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as arquivo:
+                # O nome (2º campo) pode ter espaços: o ppid vem depois do ")"
+                ppid = int(arquivo.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        filhos.setdefault(ppid, []).append(int(entrada))
+    encontrados, pendentes = [], [pid]
+    while pendentes:
+        for filho in filhos.get(pendentes.pop(), []):
+            encontrados.append(filho)
+            pendentes.append(filho)
+    return encontrados
+
+
+def _nome_processo(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/comm") as arquivo:
+            return arquivo.read().strip()
+    except OSError:
+        return ""
+
+
+class MonitorMemoria:
+    """
+    Amostra, a cada `intervalo` segundos, o RSS do processo `pid` e a soma do
+    RSS dos processos do Chrome (e do chromedriver) descendentes dele. Guarda
+    os picos de cada nível de carga.
+    """
+
+    def __init__(self, pid: int, intervalo: float = 0.2):
+        self.pid = pid
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._picos = {"python_kb": 0, "chrome_kb": 0, "chrome_processos": 0}
+
+    def iniciar(self) -> None:
+        self._parar.clear()
+        self._picos = {"python_kb": 0, "chrome_kb": 0, "chrome_processos": 0}
+        self._thread = threading.Thread(
+            target=self._amostrar_continuamente, name="monitor-memoria", daemon=True
+        )
+        self._thread.start()
+
+    def parar(self) -> Dict:
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
+        return {
+            "python_pico_mb": round(self._picos["python_kb"] / 1024, 1),
+            "chrome_pico_mb": round(self._picos["chrome_kb"] / 1024, 1),
+            "chrome_processos_pico": self._picos["chrome_processos"],
+        }
+
+    def _amostrar_continuamente(self) -> None:
+        while not self._parar.is_set():
+            self._amostrar()
+            self._parar.wait(self.intervalo)
+
+    def _amostrar(self) -> None:
+        python = ler_rss_kb(self.pid) or 0
+        chrome = [p for p in descendentes(self.pid) if "chrom" in _nome_processo(p)]
+        chrome_kb = sum(ler_rss_kb(p) or 0 for p in chrome)
+        self._picos["python_kb"] = max(self._picos["python_kb"], python)
+        self._picos["chrome_kb"] = max(self._picos["chrome_kb"], chrome_kb)
+        self._picos["chrome_processos"] = max(
+            self._picos["chrome_processos"], len(chrome)
+        )
+
+
+class _Nivel:
+    """Latências e status por operação em um nível de concorrência."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.geral = MedidorLatencia("geral", janela=1_000_000)
+        self.operacoes: Dict[str, MedidorLatencia] = {}
+        self.status: Dict[str, Dict[str, int]] = {}
+
+    def registrar(self, operacao: str, duracao: float, status: str) -> None:
+        sucesso = status.isdigit() and int(status) < 400
+        with self._lock:
+            medidor = self.operacoes.setdefault(
+                operacao, MedidorLatencia(operacao, janela=1_000_000)
+            )
+            contagem = self.status.setdefault(operacao, {})
+            contagem[status] = contagem.get(status, 0) + 1
+        medidor.registrar(duracao, sucesso)
+        self.geral.registrar(duracao, sucesso)
+
+
+class GeradorCarga:
+    """Clientes em laço fechado contra a API em `url_base`."""
+
+    def __init__(
+        self,
+        url_base: str,
+        mistura: Dict[str, float],
+        taxa_acerto_cache: float = 0.8,
+        timeout: float = 120,
+    ):
+        self.url_base = url_base.rstrip("/")
+        self.mistura = {nome: peso for nome, peso in mistura.items() if peso > 0}
+        self.taxa_acerto_cache = taxa_acerto_cache
+        self.timeout = timeout
+        self._token: Optional[str] = None
+        self._unidades: List[str] = []
+        self._sequencia = itertools.count(1)
+
+    def preparar(self) -> None:
+        """Obtém o token da conta falsa (do token store ou de um login real)."""
+        resposta = requests.post(
+            f"{self.url_base}/login",
+            json={"cpf_cnpj": CPF_CNPJ_FALSO, "senha": SENHA_FALSA},
+            timeout=self.timeout,
+        )
+        resposta.raise_for_status()
+        dados = resposta.json()
+        self._token = dados["token"]
+        self._unidades = dados["user_info"].get("unidades_consumidoras") or [
+            unidades_falsas(1)[0]
+        ]
+
+    def executar_nivel(self, concorrencia: int, duracao_segundos: float) -> _Nivel:
+        nivel = _Nivel()
+        prazo = time.monotonic() + duracao_segundos
+        operacoes = self._operacoes()
+        nomes = list(self.mistura)
+        pesos = [self.mistura[nome] for nome in nomes]
+
+        def cliente(semente: int) -> None:
+            aleatorio = random.Random(semente)
+            with requests.Session() as http:
+                while time.monotonic() < prazo:
+                    nome = aleatorio.choices(nomes, pesos)[0]
+                    inicio = time.perf_counter()
+                    try:
+                        status = str(operacoes[nome](http, aleatorio))
+                    except requests.RequestException as e:
+                        status = type(e).__name__
+                    nivel.registrar(nome, time.perf_counter() - inicio, status)
+
+        threads = [
+            threading.Thread(target=cliente, args=(indice,), name=f"carga-{indice}")
+            for indice in range(concorrencia)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return nivel
+
+    def _operacoes(self) -> Dict[str, Callable[[requests.Session, random.Random], int]]:
+        cabecalhos = {
+            "Authorization": f"Bearer {self._token}",
+            "X-Client-Id": CLIENT_ID_FALSO,
+        }
+
+        def unidade(aleatorio: random.Random) -> str:
+            if aleatorio.random() < self.taxa_acerto_cache:
+                return aleatorio.choice(self._unidades)
+            # UC inédita: a consulta passa pelo cache sem acerto
+            return str(3000000 + next(self._sequencia))
+
+        def status(http, aleatorio) -> int:
+            return self._get(http, "/status", cabecalhos)
+
+        def faturas(http, aleatorio) -> int:
+            return self._get(
+                http, "/faturas", {**cabecalhos, "X-Consumer-Unit": unidade(aleatorio)}
+            )
+
+        def faturas_auto(http, aleatorio) -> int:
+            return self._post(
+                http,
+                "/faturas_auto",
+                {
+                    "cpf_cnpj": CPF_CNPJ_FALSO,
+                    "senha": SENHA_FALSA,
+                    "consumer_unit": unidade(aleatorio),
+                    "client_id": CLIENT_ID_FALSO,
+                },
+            )
+
+        def login(http, aleatorio) -> int:
+            return self._post(
+                http, "/login", {"cpf_cnpj": CPF_CNPJ_FALSO, "senha": SENHA_FALSA}
+            )
+
+        def login_novo(http, aleatorio) -> int:
+            cpf_cnpj = f"{next(self._sequencia):011d}"
+            return self._post(
+                http, "/login", {"cpf_cnpj": cpf_cnpj, "senha": SENHA_FALSA}
+            )
+
+        return {
+            "status": status,
+            "faturas": faturas,
+            "faturas_auto": faturas_auto,
+            "login": login,
+            "login_novo": login_novo,
+        }
+
+    def _get(self, http: requests.Session, rota: str, cabecalhos: Dict) -> int:
+        return http.get(
+            self.url_base + rota, headers=cabecalhos, timeout=self.timeout
+        ).status_code
+
+    def _post(self, http: requests.Session, rota: str, corpo: Dict) -> int:
+        return http.post(
+            self.url_base + rota, json=corpo, timeout=self.timeout
+        ).status_code
+
+
+def resumir_nivel(
+    concorrencia: int, duracao: float, nivel: _Nivel, memoria: Optional[Dict]
+) -> Dict:
+    geral = nivel.geral.resumo()
+    total = geral["total"]
+    resultado = {
+        "concorrencia": concorrencia,
+        "duracao_segundos": round(duracao, 2),
+        "requisicoes": total,
+        "vazao_por_segundo": round(total / duracao, 2) if duracao else None,
+        "erros": geral["falhas"],
+        "taxa_erro": round(geral["falhas"] / total, 4) if total else None,
+        "latencia": _latencias(geral),
+        "por_operacao": {},
+        "memoria": memoria,
+    }
+    for nome, medidor in sorted(nivel.operacoes.items()):
+        resumo = medidor.resumo()
+        resultado["por_operacao"][nome] = {
+            "requisicoes": resumo["total"],
+            "erros": resumo["falhas"],
+            "latencia": _latencias(resumo),
+            "status": nivel.status.get(nome, {}),
+        }
+    return resultado
+
+
+def _latencias(resumo: Dict) -> Dict:
+    return {
+        campo: resumo[campo]
+        for campo in ("media_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    }
+
+
+def ponto_saturacao(niveis: List[Dict]) -> Optional[Dict]:
+    """
+    Último nível antes de a vazão parar de crescer (ganho menor que
+    `GANHO_MINIMO_VAZAO`) ou de a taxa de erro passar de `TAXA_ERRO_SATURACAO`.
+    """
+    anterior = None
+    for nivel in niveis:
+        if (nivel["taxa_erro"] or 0) > TAXA_ERRO_SATURACAO:
+            motivo = f"taxa de erro {nivel['taxa_erro']:.1%}"
+        elif anterior and nivel["vazao_por_segundo"] < anterior["vazao_por_segundo"] * (
+            1 + GANHO_MINIMO_VAZAO
+        ):
+            motivo = "vazão parou de crescer"
+        else:
+            anterior = nivel
+            continue
+        return {
+            "concorrencia": anterior["concorrencia"] if anterior else None,
+            "vazao_por_segundo": anterior["vazao_por_segundo"] if anterior else None,
+            "detectado_em": nivel["concorrencia"],
+            "motivo": motivo,
+        }
+    return None
+
+
+def servir(porta: int) -> None:
+    """
+    Modo subprocesso: sobe a API em `porta` com a conta falsa já no token
+    store. O ambiente (URLs dos serviços falsos) vem do processo pai.
+    """
+    api = importlib.import_module("scraper.presentation.api")
+    if os.environ.get("CARGA_LOG_SERVIDOR") != "true":
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    # Login direto na API falsa: sem navegador, mas com um token que ela aceita
+    resposta = requests.post(
+        os.environ["API_URL"] + "/api/auth/login",
+        json={"CPF_CNPJ": CPF_CNPJ_FALSO, "SENHA": SENHA_FALSA, "RECAPTCHA": "carga"},
+        timeout=30,
+    ).json()
+    api.token_store.salvar(
+        Credenciais(cpf_cnpj=CPF_CNPJ_FALSO, senha=SENHA_FALSA),
+        TokenAcesso.de_jwt(resposta["token"]),
+        InformacoesUsuario(
+            id=resposta["usuario"]["ID"],
+            nome=resposta["usuario"]["NOME"],
+            unidades_consumidoras=resposta["usuario"]["UNIDADES_CONSUMIDORAS"],
+        ),
+    )
+    if "login_novo" in os.environ.get("CARGA_OPERACOES", ""):
+        api.browser_pool.aquecer()
+    make_server("127.0.0.1", porta, api.app, threaded=True).serve_forever()
+
+
+def _iniciar_servidor(
+    upstream: UpstreamFalso, mistura: Dict[str, float], log: bool
+) -> Tuple[subprocess.Popen, str]:
+    porta = _porta_livre()
+    ambiente = {
+        **os.environ,
+        **upstream.variaveis_ambiente(),
+        "BROWSER_HEADLESS": "true",
+        "RECAPTCHA_SITE_KEY": "",
+        "TOKEN_STORE_PATH": "",
+        "CARGA_OPERACOES": ",".join(n for n, peso in mistura.items() if peso > 0),
+        "CARGA_LOG_SERVIDOR": "true" if log else "false",
+    }
+    saida = None if log else subprocess.DEVNULL
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load", "--servir", str(porta)],
+        env=ambiente,
+        stdout=saida,
+        stderr=saida,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    prazo = time.monotonic() + 60
+    while time.monotonic() < prazo:
+        if processo.poll() is not None:
+            raise RuntimeError(
+                "A API encerrou ao iniciar (use --log-servidor para ver o erro)"
+            )
+        try:
+            if requests.get(f"{url}/pool", timeout=1).ok:
+                return processo, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("A API não respondeu em 60s")
+
+
+def _porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def executar(args) -> Dict:
+    mistura = {**MISTURA_PADRAO, **args.mistura}
+    config = ConfiguracaoUpstream(
+        latencia_login_ms=args.latencia_login_ms,
+        latencia_faturas_ms=args.latencia_faturas_ms,
+        tempo_solucao_captcha_segundos=args.tempo_captcha_segundos,
+    )
+    niveis = []
+    with UpstreamFalso(config) as upstream:
+        processo = None
+        url, pid = args.url, args.pid
+        if not url:
+            processo, url = _iniciar_servidor(upstream, mistura, args.log_servidor)
+            pid = processo.pid
+        try:
+            gerador = GeradorCarga(url, mistura, args.taxa_acerto_cache)
+            gerador.preparar()
+            for concorrencia in args.concorrencias:
+                monitor = MonitorMemoria(pid) if pid else None
+                if monitor:
+                    monitor.iniciar()
+                inicio = time.perf_counter()
+                nivel = gerador.executar_nivel(concorrencia, args.duracao_segundos)
+                duracao = time.perf_counter() - inicio
+                memoria = monitor.parar() if monitor else None
+                resumo = resumir_nivel(concorrencia, duracao, nivel, memoria)
+                niveis.append(resumo)
+                print(_linha_tabela(resumo), flush=True)
+        finally:
+            if processo:
+                processo.terminate()
+                processo.wait(timeout=30)
+        chamadas_upstream = upstream.estatisticas()
+
+    return {
+        "versao": 1,
+        "commit": commit_atual(),
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parametros": {
+            "url": args.url,
+            "concorrencias": args.concorrencias,
+            "duracao_segundos": args.duracao_segundos,
+            "mistura": mistura,
+            "taxa_acerto_cache": args.taxa_acerto_cache,
+            "upstream": config.__dict__,
+        },
+        "chamadas_upstream": chamadas_upstream,
+        "niveis": niveis,
+        "saturacao": ponto_saturacao(niveis),
+    }
+
+
+def _linha_tabela(nivel: Dict) -> str:
+    latencia = nivel["latencia"]
+    memoria = nivel["memoria"] or {}
+    return (
+        f"c={nivel['concorrencia']:<4} "
+        f"{nivel['vazao_por_segundo'] or 0:>8.1f} req/s  "
+        f"p50={latencia['p50_ms'] or 0:>8.1f}ms  "
+        f"p95={latencia['p95_ms'] or 0:>8.1f}ms  "
+        f"p99={latencia['p99_ms'] or 0:>8.1f}ms  "
+        f"erros={nivel['taxa_erro'] or 0:>6.1%}  "
+        f"rss={memoria.get('python_pico_mb', '-')}MB "
+        f"chrome={memoria.get('chrome_pico_mb', '-')}MB"
+    )
+
+
+def _mistura(valor: str) -> Tuple[str, float]:
+    nome, _, peso = valor.partition("=")
+    if nome not in MISTURA_PADRAO:
+        raise argparse.ArgumentTypeError(
+            f"operação desconhecida: {nome} (use {', '.join(MISTURA_PADRAO)})"
+        )
+    try:
+        return nome, float(peso)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"peso inválido: {valor}")
+
+
+def _argumentos(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--concorrencias", nargs="+", type=int, default=[1, 2, 4, 8, 16, 32]
+    )
+    parser.add_argument("--duracao-segundos", type=float, default=10)
+    parser.add_argument(
+        "--mistura",
+        nargs="+",
+        type=_mistura,
+        default=[],
+        help="Pesos das operações, ex.: faturas=10 login_novo=1",
+    )
+    parser.add_argument(
+        "--taxa-acerto-cache",
+        type=float,
+        default=0.8,
+        help="Fração das consultas de faturas em UCs já consultadas",
+    )
+    parser.add_argument("--latencia-login-ms", type=float, default=300)
+    parser.add_argument("--latencia-faturas-ms", type=float, default=150)
+    parser.add_argument("--tempo-captcha-segundos", type=float, default=2)
+    parser.add_argument(
+        "--url", help="API já em execução (não sobe o subprocesso nem os falsos)"
+    )
+    parser.add_argument("--pid", type=int, help="PID da API em --url, para o RSS")
+    parser.add_argument("--log-servidor", action="store_true")
+    parser.add_argument("--saida")
+    parser.add_argument("--servir", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.mistura = dict(args.mistura)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    if args.servir:
+        servir(args.servir)
+        return 0
+    logging.basicConfig(
+        level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    resultado = executar(args)
+
+    saturacao = resultado["saturacao"]
+    if saturacao:
+        print(
+            f"📈 Saturação em c={saturacao['concorrencia']} "
+            f"({saturacao['vazao_por_segundo']} req/s): {saturacao['motivo']} "
+            f"em c={saturacao['detectado_em']}"
+        )
+    saida = args.saida or os.path.join(
+        DIRETORIO_RESULTADOS,
+        f"carga-{resultado['commit'] or 'sem-commit'}-{int(time.time())}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"📊 Resultado gravado em {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
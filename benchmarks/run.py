@@ -0,0 +1,411 @@
+# Offline end-to-end benchmarks: python -m benchmarks.run
+"""
+Mede latência e vazão do login (SessaoAplicacao, no navegador), da consulta de
+faturas e das rotas Flask contra os serviços falsos de `fake_upstream`, sem
+tocar na produção. O resultado é um JSON com o commit, os parâmetros e, por
+cenário e medição, percentis, vazão e a duração de cada etapa (spans de
+`scraper.application.tracing`), para comparar entre commits com `--comparar`.
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fake_upstream import (
+    CPF_CNPJ_FALSO,
+    SENHA_FALSA,
+    ConfiguracaoUpstream,
+    UpstreamFalso,
+    unidades_falsas,
+)
+from scraper.application.metrics import MedidorLatencia
+from scraper.domain.models import (
+    LOCALIZACAO_PADRAO,
+    Credenciais,
+    InformacoesUsuario,
+    TokenAcesso,
+)
+from scraper.infrastructure.services.amazon_energy_fatura_service import (
+    CAMINHO_FATURAS_ABERTAS,
+    AmazonasEnergyFaturaService,
+)
+
+logger = logging.getLogger(__name__)
+
+CENARIOS = ("api_faturas", "rotas_flask", "login_sessao")
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+# Fora do controle de versão (.gitignore): cassetes guardam tokens do portal
+CASSETE_PADRAO = os.path.join(os.path.dirname(__file__), "cassetes", "gravacao.json.gz")
+CLIENT_ID_FALSO = "client-id-falso"
+
+
+class Medicao:
+    """Latência, falhas e vazão de uma série de chamadas, e os spans delas."""
+
+    def __init__(self, nome: str, janela: int):
+        self._latencia = MedidorLatencia(nome, janela=janela)
+        self._etapas: Dict[str, MedidorLatencia] = {}
+        self._erros: List[str] = []
+        self._lock = threading.Lock()
+        self.duracao_total = 0.0
+
+    def registrar(self, duracao: float, sucesso: bool, erro: Optional[str]) -> None:
+        self._latencia.registrar(duracao, sucesso)
+        if erro:
+            with self._lock:
+                if erro not in self._erros and len(self._erros) < 5:
+                    self._erros.append(erro)
+
+    def registrar_trace(self, trace) -> None:
+        if trace is None:
+            return
+        for span in trace.spans:
+            with self._lock:
+                medidor = self._etapas.setdefault(
+                    span.nome, MedidorLatencia(span.nome, janela=100000)
+                )
+            medidor.registrar((span.duracao_ms or 0) / 1000, span.erro is None)
+
+    def resumo(self) -> Dict:
+        resumo = self._latencia.resumo()
+        del resumo["nome"], resumo["janela"]
+        resumo["duracao_total_segundos"] = round(self.duracao_total, 3)
+        resumo["vazao_por_segundo"] = (
+            round(resumo["total"] / self.duracao_total, 2)
+            if self.duracao_total
+            else None
+        )
+        if self._etapas:
+            resumo["etapas"] = {}
+            for nome, medidor in sorted(self._etapas.items()):
+                etapa = medidor.resumo()
+                del etapa["nome"], etapa["janela"]
+                resumo["etapas"][nome] = etapa
+        if self._erros:
+            resumo["erros"] = self._erros
+        return resumo
+
+
+def medir(
+    nome: str,
+    chamada: Callable[[], bool],
+    iteracoes: int,
+    concorrencia: int = 1,
+    rastreador=None,
+) -> Dict:
+    """
+    Executa `chamada` `iteracoes` vezes em `concorrencia` threads. A chamada
+    retorna se teve sucesso; exceções contam como falha. Com `rastreador`,
+    cada chamada roda dentro de um trace forçado e seus spans viram etapas.
+    """
+    medicao = Medicao(nome, janela=iteracoes)
+
+    def executar_uma(_: int) -> None:
+        inicio = time.perf_counter()
+        sucesso, erro, trace = False, None, None
+        try:
+            if rastreador is None:
+                sucesso = bool(chamada())
+            else:
+                with rastreador.trace(f"benchmark:{nome}", forcar=True) as trace:
+                    sucesso = bool(chamada())
+            if not sucesso:
+                erro = "chamada sem sucesso"
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        medicao.registrar(time.perf_counter() - inicio, sucesso, erro)
+        medicao.registrar_trace(trace)
+
+    inicio = time.perf_counter()
+    if concorrencia <= 1:
+        for indice in range(iteracoes):
+            executar_uma(indice)
+    else:
+        with ThreadPoolExecutor(
+            max_workers=concorrencia, thread_name_prefix="benchmark"
+        ) as executor:
+            list(executor.map(executar_uma, range(iteracoes)))
+    medicao.duracao_total = time.perf_counter() - inicio
+    return medicao.resumo()
+
+
+def cenario_api_faturas(api, upstream: UpstreamFalso, args) -> Dict:
+    """`AmazonasEnergyFaturaService` direto na API falsa (sem cache)."""
+    servico = AmazonasEnergyFaturaService(
+        url=upstream.url_api + CAMINHO_FATURAS_ABERTAS, http=api.cliente_http
+    )
+    token = TokenAcesso.de_jwt(upstream.resposta_login()["token"])
+    unidade = unidades_falsas(1)[0]
+
+    def consultar() -> bool:
+        faturas = servico.obter_faturas_abertas(
+            token, unidade, CLIENT_ID_FALSO, LOCALIZACAO_PADRAO
+        )
+        return faturas is not None
+
+    return {
+        "sequencial": medir("sequencial", consultar, args.iteracoes),
+        "concorrente": medir(
+            "concorrente", consultar, args.iteracoes, args.concorrencia
+        ),
+    }
+
+
+def cenario_rotas_flask(api, upstream: UpstreamFalso, args) -> Dict:
+    """
+    Rotas Flask pelo cliente de teste, com um token já no token store (o login
+    no navegador é medido em `login_sessao`).
+    """
+    resposta = upstream.resposta_login()
+    usuario = resposta["usuario"]
+    api.token_store.salvar(
+        Credenciais(cpf_cnpj=CPF_CNPJ_FALSO, senha=SENHA_FALSA),
+        TokenAcesso.de_jwt(resposta["token"]),
+        InformacoesUsuario(
+            id=usuario["ID"],
+            nome=usuario["NOME"],
+            unidades_consumidoras=usuario["UNIDADES_CONSUMIDORAS"],
+        ),
+    )
+    cabecalhos = {
+        "Authorization": f"Bearer {resposta['token']}",
+        "X-Client-Id": CLIENT_ID_FALSO,
+    }
+    clientes = threading.local()
+    # UCs nunca repetidas: cada consulta passa pelo cache sem acerto
+    unidades_novas = itertools.count(2000000)
+
+    def requisitar(metodo: str, rota: str, unidade: str = "", **kwargs) -> bool:
+        if not hasattr(clientes, "cliente"):
+            clientes.cliente = api.app.test_client()
+        resposta = clientes.cliente.open(
+            rota,
+            method=metodo,
+            headers={**cabecalhos, "X-Consumer-Unit": unidade},
+            **kwargs,
+        )
+        return resposta.status_code == 200
+
+    credenciais = {"cpf_cnpj": CPF_CNPJ_FALSO, "senha": SENHA_FALSA}
+    rotas = {
+        "POST /login (token em cache)": lambda: requisitar(
+            "POST", "/login", json=credenciais
+        ),
+        "GET /faturas (sem cache)": lambda: requisitar(
+            "GET", "/faturas", str(next(unidades_novas))
+        ),
+        "GET /faturas (cache)": lambda: requisitar(
+            "GET", "/faturas", unidades_falsas(1)[0]
+        ),
+        "GET /faturas/todas": lambda: requisitar("GET", "/faturas/todas"),
+        "GET /status": lambda: requisitar("GET", "/status"),
+    }
+    # O cliente de teste atende na mesma thread e no mesmo contexto: o trace
+    # aberto por `medir` é o da requisição e recebe os spans da rota.
+    resultado = {}
+    for nome, chamada in rotas.items():
+        # Uma chamada fora da medição (primeiro acesso ao cache, imports tardios)
+        chamada()
+        resultado[nome] = medir(
+            nome,
+            chamada,
+            args.iteracoes,
+            args.concorrencia,
+            rastreador=api.rastreador,
+        )
+    return resultado
+
+
+def cenario_login_sessao(api, upstream: UpstreamFalso, args) -> Dict:
+    """Login completo no navegador (Chrome headless) via `SessaoAplicacao`."""
+
+    def autenticar() -> bool:
+        session = api.create_scraper_session(esperar_navegador=True)
+        try:
+            return session.autenticar(CPF_CNPJ_FALSO, SENHA_FALSA)
+        finally:
+            session.finalizar()
+
+    try:
+        return {
+            "login": medir(
+                "login",
+                autenticar,
+                args.iteracoes_login,
+                rastreador=api.rastreador,
+            ),
+            "esperas": api.metricas.resumo("esperas_login"),
+        }
+    finally:
+        api.browser_pool.encerrar()
+
+
+_FUNCOES_CENARIOS = {
+    "api_faturas": cenario_api_faturas,
+    "rotas_flask": cenario_rotas_flask,
+    "login_sessao": cenario_login_sessao,
+}
+
+
+def executar(args) -> Dict:
+    config = ConfiguracaoUpstream(
+        latencia_portal_ms=args.latencia_portal_ms,
+        latencia_login_ms=args.latencia_login_ms,
+        latencia_faturas_ms=args.latencia_faturas_ms,
+        faturas_por_resposta=args.faturas_por_resposta,
+        tamanho_extra_fatura=args.tamanho_extra_fatura,
+        unidades_consumidoras=args.unidades_consumidoras,
+        tempo_solucao_captcha_segundos=args.tempo_captcha_segundos,
+    )
+    with UpstreamFalso(config) as upstream:
+        # A configuração da API é lida na importação: o ambiente vem antes.
+        os.environ.update(upstream.variaveis_ambiente())
+        os.environ["BROWSER_HEADLESS"] = "true"
+        # Sem reservatório de tokens nem token store em disco: cada login mede
+        # o captcha inteiro e nada de fora interfere no resultado.
+        os.environ["RECAPTCHA_SITE_KEY"] = ""
+        os.environ["TOKEN_STORE_PATH"] = ""
+        # Uma cassete gravada num ambiente com Chrome (--gravar-cassete) permite
+        # repetir o login e as consultas aqui sem navegador (--cassete).
+        if args.gravar_cassete:
+            os.environ["CASSETTE_RECORD_PATH"] = args.gravar_cassete
+        if args.cassete:
+            os.environ["CASSETTE_REPLAY_PATH"] = args.cassete
+            os.environ["CASSETTE_REPLAY_SPEED"] = str(args.velocidade_cassete)
+        api = importlib.import_module("scraper.presentation.api")
+
+        cenarios = {}
+        for nome in args.cenarios:
+            logger.info(f"⏱️ Cenário {nome}")
+            try:
+                cenarios[nome] = _FUNCOES_CENARIOS[nome](api, upstream, args)
+            except Exception as e:
+                logger.error(f"Cenário {nome} falhou: {e}")
+                cenarios[nome] = {"erro": f"{type(e).__name__}: {e}"}
+        chamadas_upstream = upstream.estatisticas()
+
+    return {
+        "versao": 1,
+        "commit": commit_atual(),
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            "iteracoes": args.iteracoes,
+            "iteracoes_login": args.iteracoes_login,
+            "concorrencia": args.concorrencia,
+            "cassete": args.cassete,
+            "velocidade_cassete": args.velocidade_cassete if args.cassete else None,
+            "upstream": config.__dict__,
+        },
+        "chamadas_upstream": chamadas_upstream,
+        "cenarios": cenarios,
+    }
+
+
+def comparar(anterior: Dict, atual: Dict) -> List[str]:
+    """Linhas com p50/p95 de cada medição presente nos dois resultados."""
+    linhas = [f"{anterior.get('commit')} -> {atual.get('commit')}"]
+    for cenario, medicoes in atual["cenarios"].items():
+        for nome, medicao in medicoes.items():
+            antes = anterior.get("cenarios", {}).get(cenario, {}).get(nome)
+            if not isinstance(antes, dict) or "p50_ms" not in medicao:
+                continue
+            colunas = []
+            for campo in ("p50_ms", "p95_ms", "vazao_por_segundo"):
+                de, para = antes.get(campo), medicao.get(campo)
+                if de and para is not None:
+                    colunas.append(f"{campo}={de}->{para} ({(para - de) / de:+.0%})")
+            linhas.append(f"{cenario} / {nome}: " + ", ".join(colunas))
+    return linhas
+
+
+def commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _argumentos(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--cenarios", nargs="+", choices=CENARIOS, default=list(CENARIOS)
+    )
+    parser.add_argument("--iteracoes", type=int, default=200)
+    parser.add_argument("--iteracoes-login", type=int, default=5)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--latencia-portal-ms", type=float, default=50)
+    parser.add_argument("--latencia-login-ms", type=float, default=300)
+    parser.add_argument("--latencia-faturas-ms", type=float, default=150)
+    parser.add_argument("--faturas-por-resposta", type=int, default=3)
+    parser.add_argument("--tamanho-extra-fatura", type=int, default=0)
+    parser.add_argument("--unidades-consumidoras", type=int, default=3)
+    parser.add_argument("--tempo-captcha-segundos", type=float, default=2)
+    parser.add_argument(
+        "--gravar-cassete",
+        nargs="?",
+        const=CASSETE_PADRAO,
+        help=(
+            "Grava as interações com o upstream neste arquivo "
+            "(padrão: benchmarks/cassetes/gravacao.json.gz)"
+        ),
+    )
+    parser.add_argument(
+        "--cassete", help="Reproduz uma cassete gravada em vez de usar o upstream"
+    )
+    parser.add_argument(
+        "--velocidade-cassete",
+        type=float,
+        default=1,
+        help="Divide as esperas gravadas por este fator (0: sem esperas)",
+    )
+    parser.add_argument(
+        "--saida",
+        help="Arquivo JSON de resultado (padrão: benchmarks/resultados/<commit>.json)",
+    )
+    parser.add_argument("--comparar", help="Resultado anterior para comparar com este")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(
+        level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    logger.setLevel(logging.INFO)
+    args = _argumentos(argv)
+    resultado = executar(args)
+
+    saida = args.saida or os.path.join(
+        DIRETORIO_RESULTADOS,
+        f"{resultado['commit'] or 'sem-commit'}-{int(time.time())}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"📊 Resultado gravado em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)
+        print("\n".join(comparar(anterior, resultado)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,14 @@
 # Service interfaces
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional, Tuple
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
 
 from scraper.domain.models import (
     Credenciais,
     FaturaDTO,
     InformacoesUsuario,
     LocalizacaoUsuario,
+    SessaoAutenticada,
     TokenAcesso,
 )
 
@@ -24,6 +26,17 @@ class ILoginService(ABC):
     ) -> Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]:
         pass
 
+    @property
+    def autenticacao(
+        self,
+    ) -> "Optional[Future[Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]]]":
+        """
+        Future do login atual (ou do próximo, se nenhum começou), resolvido com
+        o mesmo resultado de `autenticar` assim que ele é conhecido. None se o
+        serviço não o oferece.
+        """
+        return None
+
 
 class IFaturaService(ABC):
     @abstractmethod
@@ -37,6 +50,18 @@ class IFaturaService(ABC):
         pass
 
 
+class IAsyncFaturaService(ABC):
+    @abstractmethod
+    async def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        pass
+
+
 class IWebDriverManager(ABC):
     @abstractmethod
     def inicializar(self) -> bool:
@@ -65,3 +90,55 @@ class IWebDriverManager(ABC):
     @abstractmethod
     def aguardar_elemento(self, seletor: str, timeout: int = 10) -> bool:
         pass
+
+    @abstractmethod
+    def aguardar_condicao(self, script: str, timeout: float = 10) -> Any:
+        """Retorna o primeiro valor verdadeiro de `script`, ou None no timeout."""
+        pass
+
+    @abstractmethod
+    def executar_script_assincrono(self, script: str, timeout: float = 10) -> Any:
+        """
+        Executa `script` esperando que ele chame o callback recebido como último
+        argumento; retorna o valor passado ao callback, ou None no timeout.
+        """
+        pass
+
+    @abstractmethod
+    def aguardar_resposta_rede(
+        self, padrao_url: str, timeout: float = 10
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Espera a próxima resposta XHR/fetch cuja URL casa com a regex
+        `padrao_url` e retorna {"url", "status", "corpo"}, ou None no timeout.
+        """
+        pass
+
+
+class ITokenStore(ABC):
+    @abstractmethod
+    def obter_por_credenciais(
+        self, credenciais: Credenciais
+    ) -> Optional[SessaoAutenticada]:
+        pass
+
+    @abstractmethod
+    def obter_por_token(self, valor_token: str) -> Optional[SessaoAutenticada]:
+        pass
+
+    @abstractmethod
+    def salvar(
+        self,
+        credenciais: Credenciais,
+        token: TokenAcesso,
+        user_info: InformacoesUsuario,
+    ) -> SessaoAutenticada:
+        pass
+
+    @abstractmethod
+    def remover_por_token(self, valor_token: str) -> bool:
+        pass
+
+    @abstractmethod
+    def estatisticas(self) -> Dict:
+        pass
@@ -0,0 +1,199 @@
+# Bulk invoice jobs
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional
+
+from scraper.domain.models import FaturaDTO
+
+logger = logging.getLogger(__name__)
+
+PENDENTE = "pending"
+EXECUTANDO = "running"
+SUCESSO = "success"
+PARCIAL = "partial"
+ERRO = "error"
+
+
+@dataclass
+class ItemJob:
+    cpf_cnpj: str
+    senha: str = field(repr=False)
+    consumer_unit: str
+    client_id: str
+    status: str = PENDENTE
+    faturas: Optional[List[FaturaDTO]] = None
+    erro: Optional[str] = None
+    duracao_segundos: Optional[float] = None
+
+    def esquecer_senha(self) -> None:
+        """Descarta a senha assim que o login do item termina."""
+        self.senha = ""
+
+    def para_dict(self) -> Dict:
+        # A senha nunca sai do servidor.
+        return {
+            "cpf_cnpj": self.cpf_cnpj,
+            "consumer_unit": self.consumer_unit,
+            "client_id": self.client_id,
+            "status": self.status,
+            "faturas": (
+                [f.model_dump(by_alias=True) for f in self.faturas]
+                if self.faturas is not None
+                else None
+            ),
+            "error": self.erro,
+            "duracao_segundos": self.duracao_segundos,
+        }
+
+
+@dataclass
+class Job:
+    id: str
+    itens: List[ItemJob]
+    paralelismo: int
+    criado_em: float = field(default_factory=time.time)
+    finalizado_em: Optional[float] = None
+    # Índice do próximo item a ser enviado ao executor
+    proximo: int = 0
+    concluidos: int = 0
+
+    @property
+    def status(self) -> str:
+        if self.concluidos == len(self.itens):
+            sucessos = sum(1 for item in self.itens if item.status == SUCESSO)
+            if sucessos == len(self.itens):
+                return SUCESSO
+            return PARCIAL if sucessos else ERRO
+        return EXECUTANDO if self.proximo else PENDENTE
+
+    def para_dict(self, incluir_itens: bool = True) -> Dict:
+        contagem = {PENDENTE: 0, EXECUTANDO: 0, SUCESSO: 0, ERRO: 0}
+        for item in self.itens:
+            contagem[item.status] += 1
+        resultado = {
+            "job_id": self.id,
+            "status": self.status,
+            "paralelismo": self.paralelismo,
+            "total": len(self.itens),
+            "concluidos": self.concluidos,
+            "progresso": round(self.concluidos / len(self.itens), 4),
+            "contagem": contagem,
+            "criado_em": self.criado_em,
+            "finalizado_em": self.finalizado_em,
+        }
+        if incluir_itens:
+            resultado["itens"] = [item.para_dict() for item in self.itens]
+        return resultado
+
+
+class GerenciadorJobs:
+    """
+    Executa lotes de contas (login + faturas) em um executor compartilhado.
+
+    Cada job mantém no máximo `paralelismo` itens no executor ao mesmo tempo;
+    o número total de itens em execução é limitado pelo tamanho do executor, e
+    o de navegadores pelo pool de onde `processar_item` os empresta.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        processar_item: Callable[[ItemJob], List[FaturaDTO]],
+        max_paralelismo: int = 4,
+        max_jobs_retidos: int = 100,
+    ):
+        self._executor = executor
+        self._processar_item = processar_item
+        self.max_paralelismo = max_paralelismo
+        self.max_jobs_retidos = max_jobs_retidos
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def criar(self, itens: List[ItemJob], paralelismo: Optional[int] = None) -> Job:
+        if not itens:
+            raise ValueError("O job precisa de pelo menos um item.")
+        paralelismo = max(
+            1, min(paralelismo or self.max_paralelismo, self.max_paralelismo)
+        )
+        job = Job(id=uuid.uuid4().hex, itens=itens, paralelismo=paralelismo)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._descartar_antigos()
+            for _ in range(min(paralelismo, len(itens))):
+                self._submeter_proximo(job)
+        logger.info(f"📦 Job {job.id} criado com {len(itens)} item(ns)")
+        return job
+
+    def obter(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def descrever(self, job: Job, incluir_itens: bool = True) -> Dict:
+        """`job.para_dict()` de uma cópia feita sob o lock, com estado coerente."""
+        with self._lock:
+            copia = replace(job, itens=[replace(item) for item in job.itens])
+        return copia.para_dict(incluir_itens)
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            ativos = [job for job in self._jobs.values() if job.finalizado_em is None]
+            return {
+                "jobs_retidos": len(self._jobs),
+                "jobs_ativos": len(ativos),
+                "itens_em_execucao": sum(
+                    1
+                    for job in ativos
+                    for item in job.itens
+                    if item.status == EXECUTANDO
+                ),
+            }
+
+    def _submeter_proximo(self, job: Job) -> None:
+        """Envia o próximo item pendente do job. Chamado com `_lock` adquirido."""
+        if job.proximo >= len(job.itens):
+            return
+        item = job.itens[job.proximo]
+        job.proximo += 1
+        self._executor.submit(self._executar_item, job, item)
+
+    def _executar_item(self, job: Job, item: ItemJob) -> None:
+        inicio = time.perf_counter()
+        with self._lock:
+            item.status = EXECUTANDO
+        faturas = None
+        erro = None
+        try:
+            faturas = self._processar_item(item)
+        except Exception as e:
+            logger.error(f"Erro no item {item.consumer_unit} do job {job.id}: {e}")
+            erro = str(e)
+        finally:
+            # `processar_item` descarta a senha após o login; aqui, para os
+            # itens que falharam antes dele
+            item.esquecer_senha()
+            with self._lock:
+                item.faturas = faturas
+                item.erro = erro
+                item.status = ERRO if erro is not None else SUCESSO
+                item.duracao_segundos = round(time.perf_counter() - inicio, 3)
+                job.concluidos += 1
+                if job.concluidos == len(job.itens):
+                    job.finalizado_em = time.time()
+                    logger.info(f"📦 Job {job.id} finalizado: {job.status}")
+                else:
+                    self._submeter_proximo(job)
+
+    def _descartar_antigos(self) -> None:
+        """Mantém só os `max_jobs_retidos` jobs mais recentes (exceto os ativos)."""
+        excedente = len(self._jobs) - self.max_jobs_retidos
+        for job_id in list(self._jobs):
+            if excedente <= 0:
+                break
+            if self._jobs[job_id].finalizado_em is not None:
+                del self._jobs[job_id]
+                excedente -= 1
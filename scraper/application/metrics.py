@@ -0,0 +1,282 @@
+# Latency metrics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Resultados de uma etapa medida por `MetricasPrometheus`
+SUCESSO = "sucesso"
+FALHA = "falha"
+TIMEOUT = "timeout"
+
+# Limites (em segundos) dos buckets dos histogramas: de um clique a um captcha
+BUCKETS_PADRAO = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class MedidorLatencia:
+    """
+    Acumula durações (em segundos) de uma operação e calcula percentis exatos
+    sobre as últimas `janela` medições. Seguro para uso entre threads. É o
+    medidor dos clientes de benchmark; no serviço, as latências ficam só em
+    `MetricasPrometheus`.
+    """
+
+    def __init__(self, nome: str, janela: int = 1000):
+        self.nome = nome
+        self._duracoes: Deque[float] = deque(maxlen=janela)
+        self._lock = threading.Lock()
+        self._sucessos = 0
+        self._falhas = 0
+
+    def registrar(self, duracao: float, sucesso: bool = True) -> None:
+        with self._lock:
+            self._duracoes.append(duracao)
+            if sucesso:
+                self._sucessos += 1
+            else:
+                self._falhas += 1
+
+    @contextmanager
+    def medir(self) -> Iterator[Dict]:
+        """
+        Mede o bloco. O resultado pode ser marcado como falha alterando
+        `resultado["sucesso"]`; exceções contam como falha.
+        """
+        resultado = {"sucesso": True, "duracao": None}
+        inicio = time.perf_counter()
+        try:
+            yield resultado
+        except Exception:
+            resultado["sucesso"] = False
+            raise
+        finally:
+            resultado["duracao"] = time.perf_counter() - inicio
+            self.registrar(resultado["duracao"], resultado["sucesso"])
+
+    def resumo(self) -> Dict:
+        with self._lock:
+            duracoes = sorted(self._duracoes)
+            sucessos, falhas = self._sucessos, self._falhas
+        return {
+            "nome": self.nome,
+            "total": sucessos + falhas,
+            "sucessos": sucessos,
+            "falhas": falhas,
+            "janela": len(duracoes),
+            "media_ms": _ms(sum(duracoes) / len(duracoes)) if duracoes else None,
+            "p50_ms": _ms(_percentil(duracoes, 50)),
+            "p95_ms": _ms(_percentil(duracoes, 95)),
+            "p99_ms": _ms(_percentil(duracoes, 99)),
+            "max_ms": _ms(duracoes[-1]) if duracoes else None,
+        }
+
+
+class MetricasPrometheus:
+    """
+    Histogramas de duração e contadores de resultado por componente e etapa,
+    mais medidores instantâneos, exportados no formato texto do Prometheus.
+
+    `scraper_etapa_duracao_segundos` é um histograma com rótulos `componente`
+    e `etapa`; `scraper_etapa_total` conta as execuções por `resultado`
+    (sucesso, falha ou timeout).
+
+    É a única fonte das latências do serviço: os relatórios em JSON (esperas
+    do login, consulta de faturas, solvers de captcha) saem de `resumo`.
+    """
+
+    def __init__(
+        self, prefixo: str = "scraper", buckets: Sequence[float] = BUCKETS_PADRAO
+    ):
+        self.prefixo = prefixo
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # (componente, etapa) -> [contagem por bucket..., soma, contagem]
+        self._histogramas: Dict[Tuple[str, str], List[float]] = {}
+        self._contadores: Dict[Tuple[str, str, str], int] = {}
+        self._medidores: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def registrar(
+        self, componente: str, etapa: str, duracao: float, resultado: str = SUCESSO
+    ) -> None:
+        with self._lock:
+            valores = self._histogramas.setdefault(
+                (componente, etapa), [0.0] * (len(self.buckets) + 2)
+            )
+            for indice, limite in enumerate(self.buckets):
+                if duracao <= limite:
+                    valores[indice] += 1
+            valores[-2] += duracao
+            valores[-1] += 1
+            chave = (componente, etapa, resultado)
+            self._contadores[chave] = self._contadores.get(chave, 0) + 1
+
+    @contextmanager
+    def medir(self, componente: str, etapa: str) -> Iterator[Dict]:
+        """
+        Mede o bloco. O resultado pode ser alterado em `medicao["resultado"]`;
+        exceções contam como timeout ou falha (ver `resultado_da_excecao`).
+        """
+        medicao = {"resultado": SUCESSO}
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        except Exception as e:
+            medicao["resultado"] = resultado_da_excecao(e)
+            raise
+        finally:
+            self.registrar(
+                componente, etapa, time.perf_counter() - inicio, medicao["resultado"]
+            )
+
+    def resumo(self, componente: str) -> Dict[str, Dict]:
+        """
+        Contadores e latências (em ms) de cada etapa de `componente`. Como no
+        `histogram_quantile` do Prometheus, os percentis são interpolados
+        dentro do bucket em que caem.
+        """
+        with self._lock:
+            histogramas = {
+                etapa: list(valores)
+                for (nome, etapa), valores in self._histogramas.items()
+                if nome == componente
+            }
+            contadores = {
+                (etapa, resultado): total
+                for (nome, etapa, resultado), total in self._contadores.items()
+                if nome == componente
+            }
+        resumos = {}
+        for etapa, valores in sorted(histogramas.items()):
+            total = int(valores[-1])
+            sucessos = contadores.get((etapa, SUCESSO), 0)
+            resumos[etapa] = {
+                "nome": f"{componente}.{etapa}",
+                "total": total,
+                "sucessos": sucessos,
+                "falhas": total - sucessos,
+                "timeouts": contadores.get((etapa, TIMEOUT), 0),
+                "media_ms": _ms(valores[-2] / total) if total else None,
+                "p50_ms": _ms(self._quantil(valores, 0.5)),
+                "p95_ms": _ms(self._quantil(valores, 0.95)),
+                "p99_ms": _ms(self._quantil(valores, 0.99)),
+            }
+        return resumos
+
+    def medidor(self, nome: str, descricao: str, funcao: Callable[[], float]) -> None:
+        """Medidor instantâneo (gauge): `funcao()` é lida a cada exportação."""
+        with self._lock:
+            self._medidores[nome] = (descricao, funcao)
+
+    def exportar(self) -> str:
+        with self._lock:
+            histogramas = {chave: list(v) for chave, v in self._histogramas.items()}
+            contadores = dict(self._contadores)
+            medidores = dict(self._medidores)
+
+        nome_hist = f"{self.prefixo}_etapa_duracao_segundos"
+        nome_total = f"{self.prefixo}_etapa_total"
+        linhas = [
+            f"# HELP {nome_hist} Duração de cada etapa em segundos.",
+            f"# TYPE {nome_hist} histogram",
+        ]
+        for (componente, etapa), valores in sorted(histogramas.items()):
+            rotulos = f'componente="{_escapar(componente)}",etapa="{_escapar(etapa)}"'
+            for limite, contagem in zip(self.buckets, valores):
+                linhas.append(
+                    f'{nome_hist}_bucket{{{rotulos},le="{limite:g}"}} {contagem:g}'
+                )
+            linhas.append(f'{nome_hist}_bucket{{{rotulos},le="+Inf"}} {valores[-1]:g}')
+            linhas.append(f"{nome_hist}_sum{{{rotulos}}} {valores[-2]:.6f}")
+            linhas.append(f"{nome_hist}_count{{{rotulos}}} {valores[-1]:g}")
+
+        linhas += [
+            f"# HELP {nome_total} Execuções de cada etapa por resultado.",
+            f"# TYPE {nome_total} counter",
+        ]
+        for (componente, etapa, resultado), total in sorted(contadores.items()):
+            linhas.append(
+                f'{nome_total}{{componente="{_escapar(componente)}",'
+                f'etapa="{_escapar(etapa)}",resultado="{_escapar(resultado)}"}} {total}'
+            )
+
+        for nome, (descricao, funcao) in sorted(medidores.items()):
+            try:
+                valor = float(funcao())
+            except Exception:
+                continue
+            nome_completo = f"{self.prefixo}_{nome}"
+            linhas += [
+                f"# HELP {nome_completo} {descricao}",
+                f"# TYPE {nome_completo} gauge",
+                f"{nome_completo} {valor:g}",
+            ]
+        return "\n".join(linhas) + "\n"
+
+    def _quantil(self, valores: List[float], quantil: float) -> Optional[float]:
+        """Quantil estimado pelos buckets cumulativos de um histograma."""
+        total = valores[-1]
+        if not total:
+            return None
+        posicao = quantil * total
+        limite_anterior, contagem_anterior = 0.0, 0.0
+        for limite, contagem in zip(self.buckets, valores):
+            if contagem >= posicao:
+                no_bucket = contagem - contagem_anterior
+                fracao = (posicao - contagem_anterior) / no_bucket if no_bucket else 1
+                return limite_anterior + (limite - limite_anterior) * fracao
+            limite_anterior, contagem_anterior = limite, contagem
+        # Acima do maior bucket finito: o limite dele é o melhor que se sabe
+        return self.buckets[-1]
+
+
+def medir_etapa(
+    metricas: Optional[MetricasPrometheus], componente: str, etapa: str
+) -> ContextManager[Dict]:
+    """`metricas.medir(...)`, ou um bloco que não registra nada sem `metricas`."""
+    if metricas is None:
+        return _sem_medicao()
+    return metricas.medir(componente, etapa)
+
+
+def resultado_da_excecao(erro: BaseException) -> str:
+    """Timeouts do Selenium, do requests e do Python contam à parte de falhas."""
+    if isinstance(erro, TimeoutError) or "Timeout" in type(erro).__name__:
+        return TIMEOUT
+    return FALHA
+
+
+def resultado_do_status_http(status: int) -> str:
+    if status in (408, 504):
+        return TIMEOUT
+    return FALHA if status >= 400 else SUCESSO
+
+
+@contextmanager
+def _sem_medicao() -> Iterator[Dict]:
+    yield {"resultado": SUCESSO}
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _percentil(valores_ordenados: List[float], percentil: float) -> Optional[float]:
+    if not valores_ordenados:
+        return None
+    indice = round(percentil / 100 * (len(valores_ordenados) - 1))
+    return valores_ordenados[indice]
+
+
+def _ms(segundos: Optional[float]) -> Optional[float]:
+    return None if segundos is None else round(segundos * 1000, 2)
@@ -0,0 +1,241 @@
+# Long-running operations (async login)
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from scraper.application.prazos import prazo as prazo_das_chamadas
+
+logger = logging.getLogger(__name__)
+
+PENDENTE = "pending"
+EXECUTANDO = "running"
+SUCESSO = "success"
+ERRO = "error"
+TIMEOUT = "timeout"
+
+_FINALIZADOS = {SUCESSO, ERRO, TIMEOUT}
+
+# Tempo além do prazo que uma operação em execução tem para devolver o
+# controle (as chamadas feitas por ela já respeitam o prazo); passado esse
+# tempo, quem espera recebe `timeout` mesmo que ela ainda não tenha terminado.
+TOLERANCIA_EXECUCAO_SEGUNDOS = 15
+
+# Operação cujo trabalho está rodando no contexto atual
+_operacao_atual: "ContextVar[Optional[Operacao]]" = ContextVar(
+    "operacao_atual", default=None
+)
+
+
+@dataclass
+class Operacao:
+    id: str
+    # Instante (time.monotonic) a partir do qual a operação é dada como timeout
+    prazo: float
+    status: str = PENDENTE
+    resultado: Any = None
+    erro: Optional[str] = None
+    excecao: Optional[Exception] = field(default=None, repr=False)
+    criado_em: float = field(default_factory=time.time)
+    finalizado_em: Optional[float] = None
+    _concluida: threading.Event = field(default_factory=threading.Event, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def finalizada(self) -> bool:
+        return self.status in _FINALIZADOS
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a operação terminar por até `timeout` segundos, sem passar do
+        prazo dela (mais a tolerância). Retorna True se ela estiver finalizada.
+        """
+        limite = self.prazo + TOLERANCIA_EXECUCAO_SEGUNDOS
+        espera = max(0.0, limite - time.monotonic())
+        if timeout is not None:
+            espera = min(espera, max(0.0, timeout))
+        self._concluida.wait(espera)
+        self.expirar_se_atrasada()
+        return self.finalizada
+
+    def expirar_se_atrasada(self) -> None:
+        """
+        Marca como `timeout` a operação que passou do prazo ainda na fila, ou
+        que segue em execução depois da tolerância.
+        """
+        agora = time.monotonic()
+        if self.status == PENDENTE and agora >= self.prazo:
+            self.finalizar(TIMEOUT, erro="Tempo limite da operação excedido.")
+        elif agora >= self.prazo + TOLERANCIA_EXECUCAO_SEGUNDOS:
+            self.finalizar(TIMEOUT, erro="Tempo limite da operação excedido.")
+
+    def marcar_em_execucao(self) -> bool:
+        """Retorna False se a operação já terminou (por exemplo, expirou na fila)."""
+        self.expirar_se_atrasada()
+        with self._lock:
+            if self.finalizada:
+                return False
+            self.status = EXECUTANDO
+            return True
+
+    def finalizar(
+        self,
+        status: str,
+        resultado: Any = None,
+        erro: Optional[str] = None,
+        excecao: Optional[Exception] = None,
+    ) -> bool:
+        """
+        Registra o desfecho; retorna False se a operação já tinha terminado. Um
+        sucesso tardio substitui o `timeout` dado a quem esperava.
+        """
+        with self._lock:
+            if self.finalizada and not (self.status == TIMEOUT and status == SUCESSO):
+                return False
+            self.status = status
+            self.resultado = resultado
+            self.erro = erro
+            self.excecao = excecao
+            self.finalizado_em = time.time()
+        self._concluida.set()
+        return True
+
+    def para_dict(self) -> Dict:
+        return {
+            "operation_id": self.id,
+            "status": self.status,
+            "error": self.erro,
+            "criado_em": self.criado_em,
+            "finalizado_em": self.finalizado_em,
+        }
+
+
+def operacao_atual() -> Optional[Operacao]:
+    """
+    Operação em execução no contexto atual. O trabalho pode finalizá-la antes
+    de retornar (quando o resultado fica pronto antes da limpeza, por exemplo);
+    o desfecho registrado ao fim dele é então ignorado.
+    """
+    return _operacao_atual.get()
+
+
+class GerenciadorOperacoes:
+    """
+    Executa operações demoradas (como o login no navegador) em um executor e
+    guarda o desfecho para ser consultado depois pelo id.
+
+    Cada operação tem `timeout_segundos` para terminar. O prazo vale para o
+    próprio trabalho (ver `scraper.application.prazos`): as esperas feitas por
+    ele (navegador, pool, captcha) são limitadas ao que resta, e uma falha
+    depois do prazo é registrada como `timeout`. Operações que expiram ainda na
+    fila nem chegam a ser executadas. Se o trabalho terminar com sucesso depois
+    do prazo, o resultado é registrado assim mesmo.
+
+    Operações iniciadas com a mesma `chave` enquanto outra ainda não terminou
+    recebem essa mesma operação: quem chega depois acompanha o mesmo id, sem
+    ocupar outra thread do executor.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        timeout_segundos: float,
+        max_retidas: int = 1000,
+    ):
+        self._executor = executor
+        self.timeout_segundos = timeout_segundos
+        self.max_retidas = max_retidas
+        self._lock = threading.Lock()
+        self._operacoes: "OrderedDict[str, Operacao]" = OrderedDict()
+        self._por_chave: Dict[str, Operacao] = {}
+        self._contadores = {"iniciadas": 0, "compartilhadas": 0}
+
+    def iniciar(
+        self, funcao: Callable[..., Any], *args: Any, chave: Optional[str] = None
+    ) -> Operacao:
+        with self._lock:
+            existente = self._por_chave.get(chave) if chave is not None else None
+            if existente is not None:
+                existente.expirar_se_atrasada()
+                if not existente.finalizada:
+                    self._contadores["compartilhadas"] += 1
+                    return existente
+            operacao = Operacao(
+                id=uuid.uuid4().hex, prazo=time.monotonic() + self.timeout_segundos
+            )
+            self._operacoes[operacao.id] = operacao
+            if chave is not None:
+                self._por_chave[chave] = operacao
+            self._contadores["iniciadas"] += 1
+            self._descartar_antigas()
+        # O contexto vai junto (trace da requisição que iniciou a operação)
+        self._executor.submit(
+            copy_context().run, self._executar, operacao, chave, funcao, *args
+        )
+        return operacao
+
+    def obter(self, operacao_id: str) -> Optional[Operacao]:
+        with self._lock:
+            operacao = self._operacoes.get(operacao_id)
+        if operacao:
+            operacao.expirar_se_atrasada()
+        return operacao
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {"chaves_em_andamento": len(self._por_chave), **self._contadores}
+
+    def _executar(
+        self,
+        operacao: Operacao,
+        chave: Optional[str],
+        funcao: Callable,
+        *args: Any,
+    ) -> None:
+        marca = _operacao_atual.set(operacao)
+        try:
+            self._executar_trabalho(operacao, funcao, *args)
+        finally:
+            _operacao_atual.reset(marca)
+            if chave is not None:
+                with self._lock:
+                    if self._por_chave.get(chave) is operacao:
+                        del self._por_chave[chave]
+
+    def _executar_trabalho(
+        self, operacao: Operacao, funcao: Callable, *args: Any
+    ) -> None:
+        if not operacao.marcar_em_execucao():
+            logger.warning(f"⏱️ Operação {operacao.id} expirou antes de começar")
+            return
+        try:
+            with prazo_das_chamadas(operacao.prazo):
+                resultado = funcao(*args)
+        except Exception as e:
+            if time.monotonic() >= operacao.prazo:
+                logger.warning(f"⏱️ Operação {operacao.id} esgotou o prazo: {e}")
+                operacao.finalizar(
+                    TIMEOUT, erro="Tempo limite da operação excedido.", excecao=e
+                )
+                return
+            logger.error(f"Erro na operação {operacao.id}: {e}")
+            operacao.finalizar(ERRO, erro=str(e), excecao=e)
+            return
+        if time.monotonic() >= operacao.prazo:
+            logger.warning(f"⏱️ Operação {operacao.id} terminou depois do prazo")
+        operacao.finalizar(SUCESSO, resultado=resultado)
+
+    def _descartar_antigas(self) -> None:
+        """Mantém só as `max_retidas` operações mais recentes (exceto as ativas)."""
+        excedente = len(self._operacoes) - self.max_retidas
+        for operacao_id in list(self._operacoes):
+            if excedente <= 0:
+                break
+            if self._operacoes[operacao_id].finalizada:
+                del self._operacoes[operacao_id]
+                excedente -= 1
@@ -0,0 +1,43 @@
+# Deadline of the current operation, seen by every blocking call made for it
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Instante (time.monotonic) até o qual a operação em curso pode rodar. Viaja
+# com o contexto, inclusive para as threads que recebem `copy_context().run`.
+_prazo: ContextVar[Optional[float]] = ContextVar("prazo", default=None)
+
+
+@contextmanager
+def prazo(instante: Optional[float]) -> Iterator[None]:
+    """
+    Define o prazo das chamadas feitas dentro do bloco. Um prazo mais curto já
+    em vigor continua valendo.
+    """
+    atual = _prazo.get()
+    if instante is None or (atual is not None and atual <= instante):
+        yield
+        return
+    marca = _prazo.set(instante)
+    try:
+        yield
+    finally:
+        _prazo.reset(marca)
+
+
+def tempo_restante(timeout: Optional[float] = None) -> Optional[float]:
+    """
+    `timeout` limitado ao que resta do prazo atual (nunca negativo). Sem prazo,
+    devolve `timeout` como veio; None significa sem limite.
+    """
+    instante = _prazo.get()
+    if instante is None:
+        return timeout
+    restante = max(0.0, instante - time.monotonic())
+    return restante if timeout is None else min(timeout, restante)
+
+
+def prazo_esgotado() -> bool:
+    instante = _prazo.get()
+    return instante is not None and time.monotonic() >= instante
@@ -0,0 +1,192 @@
+# Outcome tracking and adaptive routing between reCAPTCHA solvers
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from scraper.application.interfaces import IRecaptchaSolver
+from scraper.application.metrics import FALHA, SUCESSO, MetricasPrometheus
+
+logger = logging.getLogger(__name__)
+
+# (instante, sucesso, duração em segundos)
+_Amostra = Tuple[float, bool, float]
+
+
+class DesempenhoSolvers:
+    """
+    Resultado e duração das invocações de cada solver, por nome.
+
+    Os percentis de latência de `resumo` saem de `metricas` (componente
+    "recaptcha", uma etapa por solver). Para o roteamento, guarda as últimas
+    `janela` invocações de até `janela_segundos` atrás e calcula o custo
+    esperado de um captcha resolvido: a duração média ponderada dividida pela
+    taxa de sucesso. Cada amostra pesa metade a cada `meia_vida_segundos`, de
+    modo que um provedor que ficou lento ou instável perde posição rápido.
+    """
+
+    def __init__(
+        self,
+        janela: int = 100,
+        janela_segundos: float = 3600,
+        meia_vida_segundos: float = 600,
+        metricas: Optional[MetricasPrometheus] = None,
+    ):
+        self.janela = janela
+        self.janela_segundos = janela_segundos
+        self.meia_vida_segundos = meia_vida_segundos
+        self.metricas = metricas
+        self._amostras: Dict[str, Deque[_Amostra]] = {}
+        self._escolhas: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, sucesso: bool, duracao: float) -> None:
+        if self.metricas is not None:
+            self.metricas.registrar(
+                "recaptcha", nome, duracao, SUCESSO if sucesso else FALHA
+            )
+        with self._lock:
+            amostras = self._amostras.setdefault(nome, deque(maxlen=self.janela))
+            amostras.append((time.monotonic(), sucesso, duracao))
+
+    def registrar_escolha(self, nome: str, exploracao: bool) -> None:
+        with self._lock:
+            escolhas = self._escolhas.setdefault(
+                nome, {"escolhas": 0, "exploracoes": 0}
+            )
+            escolhas["escolhas"] += 1
+            if exploracao:
+                escolhas["exploracoes"] += 1
+
+    def custo_esperado(self, nome: str) -> Optional[float]:
+        """Segundos esperados por captcha resolvido; None sem amostras recentes."""
+        with self._lock:
+            return self._avaliar(nome)["custo_esperado_segundos"]
+
+    def resumo(self) -> Dict[str, Dict]:
+        latencias = self.metricas.resumo("recaptcha") if self.metricas else {}
+        with self._lock:
+            nomes = set(self._amostras) | set(self._escolhas)
+            return {
+                nome: {
+                    **self._avaliar(nome),
+                    **self._escolhas.get(nome, {"escolhas": 0, "exploracoes": 0}),
+                    "latencia": latencias.get(nome),
+                }
+                for nome in sorted(nomes)
+            }
+
+    def _avaliar(self, nome: str) -> Dict:
+        """Chamado com `_lock` adquirido."""
+        agora = time.monotonic()
+        amostras = self._amostras.get(nome, deque())
+        while amostras and agora - amostras[0][0] > self.janela_segundos:
+            amostras.popleft()
+
+        peso_total = peso_sucesso = tempo_sucesso = tempo_falha = 0.0
+        for instante, sucesso, duracao in amostras:
+            peso = 0.5 ** ((agora - instante) / self.meia_vida_segundos)
+            peso_total += peso
+            if sucesso:
+                peso_sucesso += peso
+                tempo_sucesso += peso * duracao
+            else:
+                tempo_falha += peso * duracao
+
+        custo = None
+        taxa = None
+        if amostras:
+            # Estimativa de Laplace: uma só falha não zera a taxa de ninguém
+            taxa = (peso_sucesso + 1) / (peso_total + 2)
+            peso_falha = peso_total - peso_sucesso
+            media_falha = tempo_falha / peso_falha if peso_falha else 0.0
+            media_sucesso = (
+                tempo_sucesso / peso_sucesso if peso_sucesso else media_falha
+            )
+            custo = (taxa * media_sucesso + (1 - taxa) * media_falha) / taxa
+        return {
+            "amostras": len(amostras),
+            "taxa_sucesso": None if taxa is None else round(taxa, 4),
+            "custo_esperado_segundos": None if custo is None else round(custo, 3),
+        }
+
+
+class RecaptchaSolverMonitorado(IRecaptchaSolver):
+    """Registra resultado e duração de cada `resolver()` do solver decorado."""
+
+    def __init__(
+        self, nome: str, solver: IRecaptchaSolver, desempenho: DesempenhoSolvers
+    ):
+        self.nome = nome
+        self._solver = solver
+        self._desempenho = desempenho
+
+    def resolver(self) -> bool:
+        inicio = time.perf_counter()
+        sucesso = False
+        try:
+            sucesso = bool(self._solver.resolver())
+            return sucesso
+        finally:
+            # Exceções contam como falha
+            self._desempenho.registrar(self.nome, sucesso, time.perf_counter() - inicio)
+
+
+class RecaptchaSolverRoteado(IRecaptchaSolver):
+    """
+    Usa o solver com o menor custo esperado recente (ver `DesempenhoSolvers`).
+
+    Solvers ainda sem amostras são tentados primeiro. Com probabilidade
+    `exploracao`, outro candidato vai à frente, para que as estatísticas dos
+    demais não fiquem paradas. Se o escolhido falhar, os outros são tentados
+    na ordem do custo.
+    """
+
+    def __init__(
+        self,
+        solvers: Dict[str, IRecaptchaSolver],
+        desempenho: DesempenhoSolvers,
+        exploracao: float = 0.05,
+        aleatorio: Optional[random.Random] = None,
+    ):
+        if not solvers:
+            raise ValueError("Informe ao menos um solver")
+        self._solvers = {
+            nome: RecaptchaSolverMonitorado(nome, solver, desempenho)
+            for nome, solver in solvers.items()
+        }
+        self._desempenho = desempenho
+        self.exploracao = exploracao
+        self._aleatorio = aleatorio or random.Random()
+
+    def ordem(self) -> Tuple[List[str], bool]:
+        """Candidatos na ordem de tentativa e se a escolha foi uma exploração."""
+        custos = {nome: self._desempenho.custo_esperado(nome) for nome in self._solvers}
+        ordem = sorted(
+            self._solvers,
+            key=lambda nome: (custos[nome] is not None, custos[nome] or 0.0),
+        )
+        explorando = (
+            len(ordem) > 1
+            and custos[ordem[0]] is not None
+            and self._aleatorio.random() < self.exploracao
+        )
+        if explorando:
+            escolhido = self._aleatorio.choice(ordem[1:])
+            ordem.remove(escolhido)
+            ordem.insert(0, escolhido)
+        return ordem, explorando
+
+    def resolver(self) -> bool:
+        ordem, explorando = self.ordem()
+        self._desempenho.registrar_escolha(ordem[0], explorando)
+        for nome in ordem:
+            logger.info(f"Trying reCAPTCHA solver {nome}")
+            try:
+                if self._solvers[nome].resolver():
+                    return True
+            except Exception as e:
+                logger.error(f"reCAPTCHA solver {nome} failed: {e}")
+        return False
@@ -1,21 +1,22 @@
 import logging
-from typing import List, Optional
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
 
 from scraper.application.interfaces import (
     IFaturaService,
     ILoginService,
     IWebDriverManager,
 )
+from scraper.application.use_cases import ObterFaturasAbertas
+from scraper.domain.exceptions import WebDriverError
 from scraper.domain.models import (
+    LOCALIZACAO_PADRAO,
     Credenciais,
     FaturaDTO,
     InformacoesUsuario,
-    LocalizacaoUsuario,
+    ResultadoFaturasUnidade,
     TokenAcesso,
 )
-from scraper.infrastructure.services.amazon_energy_fatura_service import (
-    AmazonasEnergyFaturaService,
-)
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +27,13 @@ class SessaoAplicacao:
         web_driver_manager: IWebDriverManager,
         login_service: ILoginService,
         fatura_service: IFaturaService,
+        consulta_faturas: Optional[ObterFaturasAbertas] = None,
     ):
         self._web_driver_manager = web_driver_manager
         self._login_service = login_service
         self._fatura_service = fatura_service
+        # Compartilhe uma consulta entre sessões para reaproveitar as threads
+        self._consulta_faturas = consulta_faturas or ObterFaturasAbertas(fatura_service)
 
         # O token e user_info serão populados APENAS após um login bem-sucedido.
         # Inicializamos como None para indicar que não estamos autenticados.
@@ -37,11 +41,14 @@ class SessaoAplicacao:
         self._user_info: Optional[InformacoesUsuario] = None
 
     def inicializar(self) -> bool:
-        """Inicializa o gerenciador do driver."""
+        """
+        Inicializa o gerenciador do driver. Não é obrigatório: `autenticar`
+        provisiona o navegador quando necessário.
+        """
         return self._web_driver_manager.inicializar()
 
     def finalizar(self) -> bool:
-        """Finaliza o driver."""
+        """Finaliza (ou devolve, se vier de um pool) o driver."""
         if self._web_driver_manager:
             return self._web_driver_manager.finalizar()
         return True
@@ -52,6 +59,10 @@ class SessaoAplicacao:
         Retorna True se a autenticação foi bem-sucedida e as informações
         foram armazenadas.
         """
+        # O navegador só é provisionado aqui, no primeiro passo que precisa dele.
+        if not self._web_driver_manager.inicializar():
+            raise WebDriverError("Falha ao inicializar o navegador.")
+
         credenciais = Credenciais(cpf_cnpj=cpf_cnpj, senha=senha)
         token_obtido, user_info_obtido = self._login_service.autenticar(credenciais)
 
@@ -91,17 +102,41 @@ class SessaoAplicacao:
             )
             return None
 
-        # Usar localização padrão se não houver informação específica
-        localizacao = LocalizacaoUsuario(latitude=-3.0542864, longitude=-59.9934416)
+        # A consulta de faturas é HTTP puro: não usa (nem provisiona) o navegador.
+        return self._fatura_service.obter_faturas_abertas(
+            self._token, unidade_consumidora, client_id, LOCALIZACAO_PADRAO
+        )
 
-        # Aqui, a instância de FaturaService é criada. Se você quiser um cache para
-        # instâncias de serviço também, pode passá-la no __init__ da SessaoAplicacao.
-        fatura_service = AmazonasEnergyFaturaService()
+    def obter_faturas_todas_unidades(
+        self, client_id: str, max_concorrencia: int = 4
+    ) -> Optional[List[ResultadoFaturasUnidade]]:
+        """
+        Obtém, em paralelo, as faturas de todas as UCs do usuário autenticado.
+        Cada UC traz seu próprio resultado ou erro.
+        """
+        if not self._token or not self._user_info:
+            logger.error("Não é possível obter faturas: Usuário não autenticado.")
+            return None
 
-        return fatura_service.obter_faturas_abertas(
-            self._token, unidade_consumidora, client_id, localizacao
+        return self._consulta_faturas.executar_para_unidades(
+            self._token,
+            self._user_info.unidades_consumidoras,
+            client_id,
+            max_concorrencia=max_concorrencia,
         )
 
+    @property
+    def autenticacao(
+        self,
+    ) -> "Optional[Future[Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]]]":
+        """
+        Future do login desta sessão, resolvido com (token, user_info) assim
+        que a resposta de autenticação é lida, enquanto `autenticar` ainda
+        termina os passos no navegador. None se o serviço de login não o
+        oferece.
+        """
+        return self._login_service.autenticacao
+
     @property
     def token(self) -> Optional[TokenAcesso]:
         return self._token
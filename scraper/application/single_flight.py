@@ -0,0 +1,69 @@
+# Coalescing of concurrent identical calls
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Garante no máximo uma execução em andamento por chave.
+
+    A primeira chamada para uma chave (a "líder") executa a função; as que
+    chegam enquanto ela roda esperam e recebem o mesmo resultado, ou a mesma
+    exceção. Assim que a líder termina, a chave fica livre de novo: o
+    resultado não é guardado aqui.
+
+    Com `timeout`, quem espera desiste depois desse tempo com `TimeoutError`;
+    a líder continua e seu resultado vale para as próximas chamadas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento: Dict[str, Future] = {}
+        self._contadores = {"lideres": 0, "seguidores": 0, "desistencias": 0}
+
+    def executar(
+        self, chave: str, funcao: Callable[[], T], timeout: Optional[float] = None
+    ) -> T:
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._em_andamento[chave] = futuro
+                self._contadores["lideres"] += 1
+            else:
+                self._contadores["seguidores"] += 1
+
+        if not lider:
+            logger.info("🔗 Aguardando execução já em andamento para a mesma chave")
+            try:
+                return futuro.result(timeout)
+            except FuturesTimeoutError:
+                with self._lock:
+                    self._contadores["desistencias"] += 1
+                raise TimeoutError(
+                    "Tempo esgotado aguardando a execução em andamento"
+                ) from None
+
+        try:
+            resultado = funcao()
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {"em_andamento": len(self._em_andamento), **self._contadores}
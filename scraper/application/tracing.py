@@ -0,0 +1,394 @@
+# Request tracing: nested spans per trace, kept in a ring buffer
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from scraper.application.interfaces import (
+    IAsyncFaturaService,
+    IFaturaService,
+    ILoginService,
+    IRecaptchaSolver,
+    IWebDriverManager,
+)
+from scraper.domain.models import (
+    Credenciais,
+    FaturaDTO,
+    InformacoesUsuario,
+    LocalizacaoUsuario,
+    TokenAcesso,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo de scripts e URLs guardados como atributo de um span
+MAX_ATRIBUTO = 200
+
+
+@dataclass
+class Span:
+    id: str
+    pai_id: Optional[str]
+    nome: str
+    inicio: float
+    atributos: Dict[str, Any] = field(default_factory=dict)
+    duracao_ms: Optional[float] = None
+    erro: Optional[str] = None
+
+    def para_dict(self) -> Dict:
+        return {
+            "span_id": self.id,
+            "pai_id": self.pai_id,
+            "nome": self.nome,
+            "inicio": self.inicio,
+            "duracao_ms": self.duracao_ms,
+            "atributos": self.atributos,
+            "erro": self.erro,
+        }
+
+
+@dataclass
+class Trace:
+    id: str
+    nome: str
+    inicio: float = field(default_factory=time.time)
+    duracao_ms: Optional[float] = None
+    spans: List[Span] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def adicionar(self, span: Span) -> None:
+        # Spans podem vir de outras threads (login em segundo plano, captcha)
+        with self._lock:
+            self.spans.append(span)
+
+    def para_dict(self, incluir_spans: bool = True) -> Dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.inicio)
+        resultado = {
+            "trace_id": self.id,
+            "nome": self.nome,
+            "inicio": self.inicio,
+            "duracao_ms": self.duracao_ms,
+            "total_spans": len(spans),
+        }
+        if incluir_spans:
+            resultado["spans"] = [span.para_dict() for span in spans]
+        return resultado
+
+
+_trace_atual: ContextVar[Optional[Trace]] = ContextVar("trace_atual", default=None)
+_span_atual: ContextVar[Optional[str]] = ContextVar("span_atual", default=None)
+
+
+class Rastreador:
+    """
+    Guarda traces amostrados: cada trace reúne os spans de uma requisição (ou
+    de um item de job), aninhados pelo contexto (`contextvars`).
+
+    Só uma fração `taxa_amostragem` dos traces é registrada; nos demais, `span`
+    não faz nada além de ler uma variável de contexto. Traces concluídos vão
+    para um buffer circular de `capacidade` itens e, se `arquivo` for
+    informado, também para um arquivo JSON lines.
+
+    Threads não herdam o contexto: quem envia trabalho a um executor deve usar
+    `contextvars.copy_context().run` para que os spans caiam no mesmo trace.
+    """
+
+    def __init__(
+        self,
+        taxa_amostragem: float = 0.05,
+        capacidade: int = 200,
+        arquivo: Optional[str] = None,
+        aleatorio: Optional[random.Random] = None,
+    ):
+        self.taxa_amostragem = taxa_amostragem
+        self.arquivo = arquivo
+        self._aleatorio = aleatorio or random.Random()
+        self._traces: Deque[Trace] = deque(maxlen=capacidade)
+        self._lock = threading.Lock()
+        self._contadores = {"iniciados": 0, "amostrados": 0}
+
+    @contextmanager
+    def trace(self, nome: str, forcar: bool = False) -> Iterator[Optional[Trace]]:
+        """Abre um trace para o bloco, se amostrado (ou se `forcar`)."""
+        with self._lock:
+            self._contadores["iniciados"] += 1
+            amostrado = forcar or self._aleatorio.random() < self.taxa_amostragem
+            if amostrado:
+                self._contadores["amostrados"] += 1
+        if not amostrado or _trace_atual.get() is not None:
+            yield _trace_atual.get()
+            return
+
+        trace = Trace(id=uuid.uuid4().hex, nome=nome)
+        token_trace = _trace_atual.set(trace)
+        token_span = _span_atual.set(None)
+        inicio = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace.duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+            _span_atual.reset(token_span)
+            _trace_atual.reset(token_trace)
+            self._concluir(trace)
+
+    @contextmanager
+    def span(self, nome: str, **atributos: Any) -> Iterator[Optional[Span]]:
+        """
+        Registra o bloco como filho do span atual. Exceções são anotadas e
+        propagadas; o bloco pode acrescentar atributos ao span retornado.
+        """
+        trace = _trace_atual.get()
+        if trace is None:
+            yield None
+            return
+
+        span = Span(
+            id=uuid.uuid4().hex[:16],
+            pai_id=_span_atual.get(),
+            nome=nome,
+            inicio=time.time(),
+            atributos=atributos,
+        )
+        token = _span_atual.set(span.id)
+        inicio = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.erro = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+            _span_atual.reset(token)
+            trace.adicionar(span)
+
+    def trace_atual(self) -> Optional[Trace]:
+        return _trace_atual.get()
+
+    def listar(self, limite: int = 50, duracao_minima_ms: float = 0) -> List[Dict]:
+        """Resumo dos traces mais recentes primeiro."""
+        with self._lock:
+            traces = list(self._traces)
+        resultado = []
+        for trace in reversed(traces):
+            if (trace.duracao_ms or 0) < duracao_minima_ms:
+                continue
+            resultado.append(trace.para_dict(incluir_spans=False))
+            if len(resultado) >= limite:
+                break
+        return resultado
+
+    def obter(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            for trace in self._traces:
+                if trace.id == trace_id:
+                    return trace
+        return None
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "taxa_amostragem": self.taxa_amostragem,
+                "retidos": len(self._traces),
+                "capacidade": self._traces.maxlen,
+                **self._contadores,
+            }
+
+    def _concluir(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+            if not self.arquivo:
+                return
+            try:
+                with open(self.arquivo, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(trace.para_dict(), default=str) + "\n")
+            except OSError as e:
+                logger.error(f"Erro ao gravar trace em {self.arquivo}: {e}")
+
+
+def _resumir(texto: Any) -> Any:
+    if isinstance(texto, str) and len(texto) > MAX_ATRIBUTO:
+        return texto[:MAX_ATRIBUTO] + "…"
+    return texto
+
+
+class WebDriverManagerRastreado(IWebDriverManager):
+    """Um span por chamada ao navegador, com o seletor, a URL ou o script."""
+
+    def __init__(self, manager: IWebDriverManager, rastreador: Rastreador):
+        self._manager = manager
+        self._rastreador = rastreador
+
+    def _span(self, metodo: str, **atributos: Any):
+        atributos = {chave: _resumir(valor) for chave, valor in atributos.items()}
+        return self._rastreador.span(f"navegador.{metodo}", **atributos)
+
+    def inicializar(self) -> bool:
+        with self._span("inicializar"):
+            return self._manager.inicializar()
+
+    def finalizar(self) -> bool:
+        with self._span("finalizar"):
+            return self._manager.finalizar()
+
+    def executar_script(self, script: str) -> Any:
+        with self._span("executar_script", script=script):
+            return self._manager.executar_script(script)
+
+    def executar_script_assincrono(self, script: str, timeout: float = 10) -> Any:
+        with self._span("executar_script_assincrono", script=script, timeout=timeout):
+            return self._manager.executar_script_assincrono(script, timeout)
+
+    def navegar_para(self, url: str) -> bool:
+        with self._span("navegar_para", url=url) as span:
+            resultado = self._manager.navegar_para(url)
+            _anotar(span, resultado)
+            return resultado
+
+    def preencher_campo(self, seletor: str, valor: str) -> bool:
+        # O valor (CPF, senha) nunca entra no trace
+        with self._span("preencher_campo", seletor=seletor) as span:
+            resultado = self._manager.preencher_campo(seletor, valor)
+            _anotar(span, resultado)
+            return resultado
+
+    def clicar_elemento(self, seletor: str) -> bool:
+        with self._span("clicar_elemento", seletor=seletor) as span:
+            resultado = self._manager.clicar_elemento(seletor)
+            _anotar(span, resultado)
+            return resultado
+
+    def aguardar_elemento(self, seletor: str, timeout: int = 10) -> bool:
+        with self._span("aguardar_elemento", seletor=seletor, timeout=timeout) as span:
+            resultado = self._manager.aguardar_elemento(seletor, timeout)
+            _anotar(span, resultado)
+            return resultado
+
+    def aguardar_condicao(self, script: str, timeout: float = 10) -> Any:
+        with self._span("aguardar_condicao", script=script, timeout=timeout) as span:
+            resultado = self._manager.aguardar_condicao(script, timeout)
+            _anotar(span, resultado is not None)
+            return resultado
+
+    def aguardar_resposta_rede(
+        self, padrao_url: str, timeout: float = 10
+    ) -> Optional[Dict[str, Any]]:
+        with self._span(
+            "aguardar_resposta_rede", padrao_url=padrao_url, timeout=timeout
+        ) as span:
+            resposta = self._manager.aguardar_resposta_rede(padrao_url, timeout)
+            if span is not None:
+                span.atributos["status"] = resposta["status"] if resposta else None
+            return resposta
+
+
+class LoginServiceRastreado(ILoginService):
+    def __init__(self, login_service: ILoginService, rastreador: Rastreador):
+        self._login_service = login_service
+        self._rastreador = rastreador
+
+    def autenticar(
+        self, credenciais: Credenciais
+    ) -> Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]:
+        with self._rastreador.span("login.autenticar") as span:
+            token, user_info = self._login_service.autenticar(credenciais)
+            _anotar(span, token is not None)
+            return token, user_info
+
+    @property
+    def autenticacao(
+        self,
+    ) -> "Optional[Future[Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]]]":
+        return self._login_service.autenticacao
+
+
+class FaturaServiceRastreado(IFaturaService):
+    def __init__(
+        self,
+        fatura_service: IFaturaService,
+        rastreador: Rastreador,
+        nome: str = "faturas",
+    ):
+        self._fatura_service = fatura_service
+        self._rastreador = rastreador
+        self.nome = nome
+
+    def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        with self._rastreador.span(
+            f"{self.nome}.obter_faturas_abertas",
+            unidade_consumidora=unidade_consumidora,
+        ) as span:
+            faturas = self._fatura_service.obter_faturas_abertas(
+                token, unidade_consumidora, client_id, localizacao
+            )
+            if span is not None:
+                span.atributos["faturas"] = None if faturas is None else len(faturas)
+            return faturas
+
+
+class FaturaServiceAsyncRastreado(IAsyncFaturaService):
+    """Spans de `FaturaServiceRastreado` para IAsyncFaturaService."""
+
+    def __init__(
+        self,
+        fatura_service: IAsyncFaturaService,
+        rastreador: Rastreador,
+        nome: str = "faturas",
+    ):
+        self._fatura_service = fatura_service
+        self._rastreador = rastreador
+        self.nome = nome
+
+    async def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        # Cada tarefa do event loop tem sua cópia do contexto: spans de
+        # consultas simultâneas não se misturam
+        with self._rastreador.span(
+            f"{self.nome}.obter_faturas_abertas",
+            unidade_consumidora=unidade_consumidora,
+        ) as span:
+            faturas = await self._fatura_service.obter_faturas_abertas(
+                token, unidade_consumidora, client_id, localizacao
+            )
+            if span is not None:
+                span.atributos["faturas"] = None if faturas is None else len(faturas)
+            return faturas
+
+
+class RecaptchaSolverRastreado(IRecaptchaSolver):
+    def __init__(
+        self, solver: IRecaptchaSolver, rastreador: Rastreador, nome: str = "captcha"
+    ):
+        self._solver = solver
+        self._rastreador = rastreador
+        self.nome = nome
+
+    def resolver(self) -> bool:
+        with self._rastreador.span(f"{self.nome}.resolver") as span:
+            resultado = self._solver.resolver()
+            _anotar(span, resultado)
+            return resultado
+
+
+def _anotar(span: Optional[Span], sucesso: Any) -> None:
+    if span is not None:
+        span.atributos["sucesso"] = bool(sucesso)
@@ -1 +1,173 @@
 # Use cases
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, List, Optional
+
+from scraper.application.interfaces import IAsyncFaturaService, IFaturaService
+from scraper.application.metrics import (
+    FALHA,
+    MetricasPrometheus,
+    medir_etapa,
+)
+from scraper.domain.models import (
+    LOCALIZACAO_PADRAO,
+    FaturaDTO,
+    LocalizacaoUsuario,
+    ResultadoFaturasUnidade,
+    TokenAcesso,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ObterFaturasAbertas:
+    """
+    Consulta as faturas abertas apenas via HTTP, a partir de um token já obtido.
+
+    Não depende de SessaoAplicacao nem de IWebDriverManager: é o caminho rápido
+    para clientes que já possuem um bearer token válido.
+
+    As consultas em paralelo de `executar_para_unidades` rodam em `executor`,
+    reaproveitado entre chamadas; sem ele, a instância cria o seu, com até
+    `max_trabalhadores` threads.
+
+    A duração de cada consulta, acertos do cache inclusive, vai para
+    `metricas` (componente "consulta_faturas").
+    """
+
+    def __init__(
+        self,
+        fatura_service: IFaturaService,
+        metricas: Optional[MetricasPrometheus] = None,
+        executor: Optional[Executor] = None,
+        max_trabalhadores: int = 16,
+    ):
+        self._fatura_service = fatura_service
+        self._metricas = metricas
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max_trabalhadores, thread_name_prefix="faturas-uc"
+        )
+
+    def executar(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario = LOCALIZACAO_PADRAO,
+    ) -> Optional[List[FaturaDTO]]:
+        inicio = time.perf_counter()
+        with medir_etapa(
+            self._metricas, "consulta_faturas", "faturas_abertas"
+        ) as medicao:
+            faturas = self._fatura_service.obter_faturas_abertas(
+                token, unidade_consumidora, client_id, localizacao
+            )
+            if faturas is None:
+                medicao["resultado"] = FALHA
+        _informar_duracao(unidade_consumidora, inicio)
+        return faturas
+
+    def executar_para_unidades(
+        self,
+        token: TokenAcesso,
+        unidades_consumidoras: List[str],
+        client_id: str,
+        max_concorrencia: int = 4,
+        localizacao: LocalizacaoUsuario = LOCALIZACAO_PADRAO,
+    ) -> List[ResultadoFaturasUnidade]:
+        """
+        Consulta várias UCs em paralelo (no máximo `max_concorrencia` ao mesmo
+        tempo). A falha de uma UC é informada no resultado dela, sem derrubar
+        as demais. Os resultados seguem a ordem de `unidades_consumidoras`.
+        """
+        if not unidades_consumidoras:
+            return []
+
+        def consultar(unidade: str) -> ResultadoFaturasUnidade:
+            try:
+                faturas = self.executar(token, unidade, client_id, localizacao)
+            except Exception as e:
+                logger.error(f"Erro ao consultar faturas da UC {unidade}: {e}")
+                return ResultadoFaturasUnidade(unidade, erro=str(e))
+            if faturas is None:
+                return ResultadoFaturasUnidade(
+                    unidade, erro="Não foi possível obter as faturas."
+                )
+            return ResultadoFaturasUnidade(unidade, faturas=faturas)
+
+        # No máximo `max_concorrencia` tarefas no executor compartilhado, cada
+        # uma consultando UCs da fila até ela esvaziar
+        pendentes = deque(enumerate(unidades_consumidoras))
+        resultados: List[Optional[ResultadoFaturasUnidade]] = [None] * len(pendentes)
+
+        def trabalhar() -> None:
+            while True:
+                try:
+                    indice, unidade = pendentes.popleft()
+                except IndexError:
+                    return
+                resultados[indice] = consultar(unidade)
+
+        trabalhadores = max(1, min(max_concorrencia, len(unidades_consumidoras)))
+        # Cada tarefa leva o contexto de quem chamou (trace da requisição)
+        futuros = [
+            self._executor.submit(copy_context().run, trabalhar)
+            for _ in range(trabalhadores)
+        ]
+        for futuro in futuros:
+            futuro.result()
+        return resultados
+
+    def metricas(self) -> Dict:
+        return _resumo_consulta(self._metricas)
+
+
+class ObterFaturasAbertasAsync:
+    """Equivalente de `ObterFaturasAbertas.executar` para IAsyncFaturaService."""
+
+    def __init__(
+        self,
+        fatura_service: IAsyncFaturaService,
+        metricas: Optional[MetricasPrometheus] = None,
+    ):
+        self._fatura_service = fatura_service
+        self._metricas = metricas
+
+    async def executar(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario = LOCALIZACAO_PADRAO,
+    ) -> Optional[List[FaturaDTO]]:
+        inicio = time.perf_counter()
+        with medir_etapa(
+            self._metricas, "consulta_faturas", "faturas_abertas"
+        ) as medicao:
+            faturas = await self._fatura_service.obter_faturas_abertas(
+                token, unidade_consumidora, client_id, localizacao
+            )
+            if faturas is None:
+                medicao["resultado"] = FALHA
+        _informar_duracao(unidade_consumidora, inicio)
+        return faturas
+
+    def metricas(self) -> Dict:
+        return _resumo_consulta(self._metricas)
+
+
+def _informar_duracao(unidade_consumidora: str, inicio: float) -> None:
+    logger.info(
+        f"⚡ Faturas da UC {unidade_consumidora} consultadas em "
+        f"{(time.perf_counter() - inicio) * 1000:.0f} ms"
+    )
+
+
+def _resumo_consulta(metricas: Optional[MetricasPrometheus]) -> Dict:
+    """Latência das consultas, derivada do histograma em `metricas`."""
+    if metricas is None:
+        return {}
+    return metricas.resumo("consulta_faturas").get("faturas_abertas", {})
@@ -1,6 +1,9 @@
 # Domain models for scraper
+import base64
+import json
+import time
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -14,8 +17,39 @@ class Credenciais:
 @dataclass
 class TokenAcesso:
     valor: str
+    # Instante de expiração em segundos desde a época (claim `exp` do JWT)
     expiracao: Optional[int] = None
 
+    @classmethod
+    def de_jwt(cls, valor: str) -> "TokenAcesso":
+        """Cria o token preenchendo `expiracao` a partir do claim `exp`, se houver."""
+        exp = decodificar_claims_jwt(valor).get("exp")
+        return cls(valor=valor, expiracao=int(exp) if exp is not None else None)
+
+    @property
+    def claims(self) -> Dict:
+        return decodificar_claims_jwt(self.valor)
+
+    def expirado(self, margem_segundos: int = 0) -> bool:
+        """Indica se o token expira dentro de `margem_segundos`."""
+        if self.expiracao is None:
+            return False
+        return time.time() + margem_segundos >= self.expiracao
+
+
+def decodificar_claims_jwt(valor: str) -> Dict:
+    """
+    Lê o payload de um JWT sem validar a assinatura (a validação é feita pela
+    API da Amazonas Energia). Retorna {} se o valor não for um JWT.
+    """
+    try:
+        payload = valor.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return claims if isinstance(claims, dict) else {}
+    except (IndexError, ValueError, AttributeError):
+        return {}
+
 
 @dataclass
 class InformacoesUsuario:
@@ -28,6 +62,15 @@ class InformacoesUsuario:
             self.unidades_consumidoras = []
 
 
+@dataclass
+class SessaoAutenticada:
+    """Resultado de um login guardado no token store."""
+
+    cpf_cnpj: str
+    token: TokenAcesso
+    user_info: InformacoesUsuario
+
+
 @dataclass
 class LocalizacaoUsuario:
     latitude: float
@@ -37,6 +80,10 @@ class LocalizacaoUsuario:
         return f"latitude={self.latitude}&longitude={self.longitude}"
 
 
+# Localização usada quando o cliente não informa uma específica (Manaus)
+LOCALIZACAO_PADRAO = LocalizacaoUsuario(latitude=-3.0542864, longitude=-59.9934416)
+
+
 class FaturaDTO(BaseModel):
     uc: int = Field(alias="UC")
     mes_ano_referencia: str = Field(alias="MES_ANO_REFERENCIA")
@@ -47,3 +94,16 @@ class FaturaDTO(BaseModel):
 
     class Config:
         populate_by_name = True
+
+
+@dataclass
+class ResultadoFaturasUnidade:
+    """Faturas de uma unidade consumidora em uma consulta de várias UCs."""
+
+    unidade_consumidora: str
+    faturas: Optional[List[FaturaDTO]] = None
+    erro: Optional[str] = None
+
+    @property
+    def sucesso(self) -> bool:
+        return self.erro is None
@@ -0,0 +1,269 @@
+# TTL cache for open invoices
+import asyncio
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from scraper.application.interfaces import IAsyncFaturaService, IFaturaService
+from scraper.domain.models import FaturaDTO, LocalizacaoUsuario, TokenAcesso
+
+logger = logging.getLogger(__name__)
+
+_Chave = Tuple[str, str, str]
+
+
+@dataclass
+class _EntradaFaturas:
+    faturas: List[FaturaDTO]
+    obtido_em: float
+
+
+class CachedFaturaService(IFaturaService):
+    """
+    Decorador de IFaturaService que guarda as faturas abertas por
+    (unidade consumidora, client_id, titular do token).
+
+    Até `ttl_segundos` a resposta vem direto do cache. Depois disso, e por mais
+    `stale_segundos`, a resposta antiga continua sendo entregue enquanto uma
+    revalidação roda em segundo plano (stale-while-revalidate). Passado esse
+    prazo, a consulta volta a esperar pela API. O cache guarda no máximo
+    `capacidade` entradas, descartando as menos usadas recentemente.
+    """
+
+    def __init__(
+        self,
+        fatura_service: IFaturaService,
+        ttl_segundos: float = 300,
+        stale_segundos: float = 900,
+        capacidade: int = 5000,
+        executor: Optional[Executor] = None,
+    ):
+        self._fatura_service = fatura_service
+        self.ttl_segundos = ttl_segundos
+        self.stale_segundos = stale_segundos
+        self.capacidade = capacidade
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="faturas-revalidacao"
+        )
+
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[_Chave, _EntradaFaturas]" = OrderedDict()
+        self._revalidando: Set[_Chave] = set()
+        self._contadores = {
+            "acertos": 0,
+            "acertos_obsoletos": 0,
+            "falhas": 0,
+            "revalidacoes": 0,
+            "erros_revalidacao": 0,
+            "evicoes": 0,
+        }
+
+    def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        chave = self._chave(token, unidade_consumidora, client_id)
+        faturas, revalidar = self._consultar_cache(chave)
+        if faturas is not None:
+            if revalidar:
+                self._executor.submit(
+                    self._revalidar,
+                    chave,
+                    token,
+                    unidade_consumidora,
+                    client_id,
+                    localizacao,
+                )
+            return faturas
+
+        faturas = self._fatura_service.obter_faturas_abertas(
+            token, unidade_consumidora, client_id, localizacao
+        )
+        if faturas is not None:
+            self._guardar(chave, faturas)
+        return faturas
+
+    def _consultar_cache(self, chave: _Chave) -> Tuple[Optional[List[FaturaDTO]], bool]:
+        """
+        Faturas guardadas (None se não houver resposta utilizável) e se quem
+        consultou deve disparar a revalidação de uma entrada obsoleta.
+        """
+        agora = time.monotonic()
+        revalidar = False
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            idade = agora - entrada.obtido_em if entrada else None
+            if entrada and idade <= self.ttl_segundos + self.stale_segundos:
+                self._entradas.move_to_end(chave)
+                if idade <= self.ttl_segundos:
+                    self._contadores["acertos"] += 1
+                else:
+                    self._contadores["acertos_obsoletos"] += 1
+                    revalidar = chave not in self._revalidando
+                    self._revalidando.add(chave)
+                faturas = list(entrada.faturas)
+            else:
+                self._contadores["falhas"] += 1
+                faturas = None
+        return faturas, revalidar
+
+    def invalidar(self, unidade_consumidora: Optional[str] = None) -> None:
+        """Descarta o cache de uma unidade consumidora (ou de todas)."""
+        with self._lock:
+            if unidade_consumidora is None:
+                self._entradas.clear()
+                return
+            for chave in [c for c in self._entradas if c[0] == unidade_consumidora]:
+                del self._entradas[chave]
+
+    def invalidar_titular(self, token: TokenAcesso) -> None:
+        """Descarta o cache de todas as unidades consumidoras do titular do token."""
+        titular = self._titular(token)
+        with self._lock:
+            for chave in [c for c in self._entradas if c[2] == titular]:
+                del self._entradas[chave]
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            consultas = (
+                self._contadores["acertos"]
+                + self._contadores["acertos_obsoletos"]
+                + self._contadores["falhas"]
+            )
+            acertos = (
+                self._contadores["acertos"] + self._contadores["acertos_obsoletos"]
+            )
+            return {
+                "tamanho": len(self._entradas),
+                "capacidade": self.capacidade,
+                "ttl_segundos": self.ttl_segundos,
+                "stale_segundos": self.stale_segundos,
+                "taxa_acerto": round(acertos / consultas, 4) if consultas else None,
+                **self._contadores,
+            }
+
+    def _revalidar(
+        self,
+        chave: _Chave,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> None:
+        faturas = None
+        try:
+            faturas = self._fatura_service.obter_faturas_abertas(
+                token, unidade_consumidora, client_id, localizacao
+            )
+        except Exception as e:
+            logger.error(f"Erro ao revalidar faturas da UC {unidade_consumidora}: {e}")
+        finally:
+            self._concluir_revalidacao(chave, faturas)
+
+    def _concluir_revalidacao(
+        self, chave: _Chave, faturas: Optional[List[FaturaDTO]]
+    ) -> None:
+        if faturas is not None:
+            self._guardar(chave, faturas)
+        with self._lock:
+            if faturas is not None:
+                self._contadores["revalidacoes"] += 1
+            else:
+                self._contadores["erros_revalidacao"] += 1
+            self._revalidando.discard(chave)
+
+    def _guardar(self, chave: _Chave, faturas: List[FaturaDTO]) -> None:
+        with self._lock:
+            self._entradas[chave] = _EntradaFaturas(
+                faturas=list(faturas), obtido_em=time.monotonic()
+            )
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.capacidade:
+                self._entradas.popitem(last=False)
+                self._contadores["evicoes"] += 1
+
+    @classmethod
+    def _chave(
+        cls, token: TokenAcesso, unidade_consumidora: str, client_id: str
+    ) -> _Chave:
+        return (str(unidade_consumidora), str(client_id), cls._titular(token))
+
+    @staticmethod
+    def _titular(token: TokenAcesso) -> str:
+        """Identifica o dono do token (claim `sub`), para não misturar contas."""
+        sub = token.claims.get("sub")
+        if sub is not None:
+            return str(sub)
+        return hashlib.sha256(token.valor.encode()).hexdigest()[:16]
+
+
+class CachedFaturaServiceAsync(IAsyncFaturaService):
+    """
+    Versão asyncio de `CachedFaturaService` sobre as mesmas entradas de `cache`
+    (TTL, stale-while-revalidate, capacidade, contadores e invalidações): a API
+    Flask e o entry point ASGI compartilham as respostas guardadas. A consulta
+    à API e a revalidação em segundo plano rodam no event loop, sem threads.
+    """
+
+    def __init__(self, fatura_service: IAsyncFaturaService, cache: CachedFaturaService):
+        self._fatura_service = fatura_service
+        self._cache = cache
+        # Referências às revalidações em andamento, para o loop não descartá-las
+        self._revalidacoes: Set[asyncio.Task] = set()
+
+    async def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        chave = self._cache._chave(token, unidade_consumidora, client_id)
+        faturas, revalidar = self._cache._consultar_cache(chave)
+        if faturas is not None:
+            if revalidar:
+                # Contexto vazio: a revalidação não entra no trace da requisição,
+                # como na versão com threads
+                tarefa = contextvars.Context().run(
+                    asyncio.create_task,
+                    self._revalidar(
+                        chave, token, unidade_consumidora, client_id, localizacao
+                    ),
+                )
+                self._revalidacoes.add(tarefa)
+                tarefa.add_done_callback(self._revalidacoes.discard)
+            return faturas
+
+        faturas = await self._fatura_service.obter_faturas_abertas(
+            token, unidade_consumidora, client_id, localizacao
+        )
+        if faturas is not None:
+            self._cache._guardar(chave, faturas)
+        return faturas
+
+    async def _revalidar(
+        self,
+        chave: _Chave,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> None:
+        faturas = None
+        try:
+            faturas = await self._fatura_service.obter_faturas_abertas(
+                token, unidade_consumidora, client_id, localizacao
+            )
+        except Exception as e:
+            logger.error(f"Erro ao revalidar faturas da UC {unidade_consumidora}: {e}")
+        finally:
+            self._cache._concluir_revalidacao(chave, faturas)
@@ -0,0 +1,147 @@
+# Persistent (SQLite) token store
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Union
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from scraper.domain.models import InformacoesUsuario, SessaoAutenticada, TokenAcesso
+from scraper.infrastructure.cache.token_store import InMemoryTokenStore
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteTokenStore(InMemoryTokenStore):
+    """
+    Token store em memória com cópia cifrada em SQLite.
+
+    Cada login salvo é gravado (em uma transação) no arquivo; ao iniciar, as
+    sessões ainda válidas são carregadas de volta para a memória, de modo que
+    um restart da API não obriga os clientes a passar pelo login no navegador
+    outra vez. Token e dados do usuário são cifrados com Fernet usando
+    `chave_criptografia` (gerada com `Fernet.generate_key()`).
+    """
+
+    def __init__(
+        self,
+        caminho: str,
+        chave_criptografia: Union[str, bytes],
+        capacidade: int = 1000,
+        ttl_padrao_segundos: int = 3600,
+        margem_expiracao_segundos: int = 60,
+        ao_remover_sessao: Optional[Callable[[SessaoAutenticada], None]] = None,
+    ):
+        chave = (
+            chave_criptografia.encode()
+            if isinstance(chave_criptografia, str)
+            else chave_criptografia
+        )
+        self._fernet = Fernet(chave)
+        # A impressão das credenciais precisa ser estável entre restarts.
+        super().__init__(
+            capacidade=capacidade,
+            ttl_padrao_segundos=ttl_padrao_segundos,
+            margem_expiracao_segundos=margem_expiracao_segundos,
+            segredo=hashlib.sha256(b"token-store:" + chave).digest(),
+            ao_remover_sessao=ao_remover_sessao,
+        )
+
+        self._db_lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        with self._db_lock, self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS sessoes (
+                    cpf_cnpj TEXT PRIMARY KEY,
+                    impressao BLOB NOT NULL,
+                    expiracao INTEGER NOT NULL,
+                    dados BLOB NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )
+                """)
+        self._aquecer()
+
+    def fechar(self) -> None:
+        with self._db_lock:
+            self._conexao.close()
+
+    def _aquecer(self) -> None:
+        """Carrega para a memória as sessões persistidas que ainda não expiraram."""
+        agora = int(time.time()) + self.margem_expiracao_segundos
+        with self._db_lock, self._conexao:
+            self._conexao.execute("DELETE FROM sessoes WHERE expiracao <= ?", (agora,))
+            linhas = self._conexao.execute(
+                "SELECT cpf_cnpj, impressao, dados FROM sessoes "
+                "ORDER BY atualizado_em DESC LIMIT ?",
+                (self.capacidade,),
+            ).fetchall()
+
+        carregadas = 0
+        # Da mais antiga para a mais recente, preservando a ordem do LRU.
+        for cpf_cnpj, impressao, dados in reversed(linhas):
+            sessao = self._decifrar(cpf_cnpj, dados)
+            if sessao is None:
+                self._ao_remover(cpf_cnpj, time.time())
+                continue
+            self._inserir(sessao, impressao)
+            carregadas += 1
+        self._notificar_remocoes()
+        logger.info(f"🔑 {carregadas} sessão(ões) restaurada(s) do token store")
+
+    def _ao_salvar(self, sessao: SessaoAutenticada, impressao: bytes) -> None:
+        dados = self._fernet.encrypt(
+            json.dumps(
+                {
+                    "token": sessao.token.valor,
+                    "expiracao": sessao.token.expiracao,
+                    "user_info": sessao.user_info.__dict__,
+                }
+            ).encode()
+        )
+        try:
+            with self._db_lock, self._conexao:
+                self._conexao.execute(
+                    "INSERT OR REPLACE INTO sessoes "
+                    "(cpf_cnpj, impressao, expiracao, dados, atualizado_em) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        sessao.cpf_cnpj,
+                        impressao,
+                        sessao.token.expiracao,
+                        dados,
+                        time.time(),
+                    ),
+                )
+        except sqlite3.Error as e:
+            # A sessão continua válida em memória; só não sobreviverá a um restart.
+            logger.error(f"Erro ao persistir sessão no token store: {e}")
+
+    def _ao_remover(self, chave: str, removida_em: float) -> None:
+        try:
+            # Uma gravação posterior da mesma chave (novo login) é preservada
+            with self._db_lock, self._conexao:
+                self._conexao.execute(
+                    "DELETE FROM sessoes WHERE cpf_cnpj = ? AND atualizado_em <= ?",
+                    (chave, removida_em),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao remover sessão do token store: {e}")
+
+    def _decifrar(self, cpf_cnpj: str, dados: bytes) -> Optional[SessaoAutenticada]:
+        try:
+            conteudo = json.loads(self._fernet.decrypt(dados))
+            return SessaoAutenticada(
+                cpf_cnpj=cpf_cnpj,
+                token=TokenAcesso(
+                    valor=conteudo["token"], expiracao=conteudo["expiracao"]
+                ),
+                user_info=InformacoesUsuario(**conteudo["user_info"]),
+            )
+        except (InvalidToken, ValueError, KeyError, TypeError):
+            # Cifrada com outra chave ou gravada em outro formato
+            logger.warning("Sessão persistida não pôde ser decifrada; descartando.")
+            return None
@@ -0,0 +1,221 @@
+# In-memory token store
+import hashlib
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scraper.application.interfaces import ITokenStore
+from scraper.domain.models import (
+    Credenciais,
+    InformacoesUsuario,
+    SessaoAutenticada,
+    TokenAcesso,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_cpf_cnpj(cpf_cnpj: str) -> str:
+    """Remove a pontuação: '123.456.789-01' e '12345678901' são a mesma chave."""
+    return re.sub(r"\D", "", cpf_cnpj or "")
+
+
+@dataclass
+class _Entrada:
+    sessao: SessaoAutenticada
+    # HMAC de CPF/CNPJ + senha: a senha nunca é guardada, mas uma senha
+    # diferente não reaproveita o token de outra pessoa.
+    impressao: bytes
+
+
+class InMemoryTokenStore(ITokenStore):
+    """
+    Guarda tokens de várias contas, indexados por CPF/CNPJ e pelo valor do token.
+
+    A expiração vem de `TokenAcesso.expiracao` (claim `exp` do JWT); tokens sem
+    expiração recebem `ttl_padrao_segundos`. Quando a capacidade é atingida, as
+    entradas expiradas saem primeiro e depois as menos usadas recentemente (LRU).
+
+    `ao_remover_sessao` é chamado (fora do lock) com cada sessão que deixa o
+    store: removida, expirada, descartada por capacidade ou substituída por um
+    novo login com outro token.
+    """
+
+    def __init__(
+        self,
+        capacidade: int = 1000,
+        ttl_padrao_segundos: int = 3600,
+        margem_expiracao_segundos: int = 60,
+        segredo: Optional[bytes] = None,
+        ao_remover_sessao: Optional[Callable[[SessaoAutenticada], None]] = None,
+    ):
+        if capacidade < 1:
+            raise ValueError("capacidade deve ser maior que zero")
+        self.capacidade = capacidade
+        self.ttl_padrao_segundos = ttl_padrao_segundos
+        self.margem_expiracao_segundos = margem_expiracao_segundos
+        self._segredo = segredo or os.urandom(32)
+        self._ao_remover_sessao = ao_remover_sessao
+
+        self._lock = threading.RLock()
+        self._por_credencial: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._por_token: Dict[str, str] = {}
+        # Remoções feitas sob o lock; `_ao_remover` só é chamado depois de
+        # liberá-lo, para que o I/O das subclasses não segure as leituras
+        self._remocoes_pendentes: List[Tuple[str, float]] = []
+        self._sessoes_removidas: List[SessaoAutenticada] = []
+
+        self._contadores = {
+            "acertos": 0,
+            "falhas": 0,
+            "expirados": 0,
+            "evicoes_lru": 0,
+        }
+
+    def obter_por_credenciais(
+        self, credenciais: Credenciais
+    ) -> Optional[SessaoAutenticada]:
+        chave = normalizar_cpf_cnpj(credenciais.cpf_cnpj)
+        with self._lock:
+            entrada = self._obter_valida(chave)
+            if entrada is None or not hmac.compare_digest(
+                entrada.impressao, self._impressao(credenciais)
+            ):
+                self._contadores["falhas"] += 1
+                entrada = None
+            else:
+                self._contadores["acertos"] += 1
+        self._notificar_remocoes()
+        return entrada.sessao if entrada else None
+
+    def obter_por_token(self, valor_token: str) -> Optional[SessaoAutenticada]:
+        with self._lock:
+            chave = self._por_token.get(valor_token)
+            entrada = self._obter_valida(chave) if chave else None
+            if entrada is None:
+                self._contadores["falhas"] += 1
+            else:
+                self._contadores["acertos"] += 1
+        self._notificar_remocoes()
+        return entrada.sessao if entrada else None
+
+    def salvar(
+        self,
+        credenciais: Credenciais,
+        token: TokenAcesso,
+        user_info: InformacoesUsuario,
+    ) -> SessaoAutenticada:
+        if token.expiracao is None:
+            token.expiracao = int(time.time()) + self.ttl_padrao_segundos
+        chave = normalizar_cpf_cnpj(credenciais.cpf_cnpj)
+        sessao = SessaoAutenticada(cpf_cnpj=chave, token=token, user_info=user_info)
+        impressao = self._impressao(credenciais)
+        self._inserir(sessao, impressao)
+        self._notificar_remocoes()
+        self._ao_salvar(sessao, impressao)
+        return sessao
+
+    def remover_por_token(self, valor_token: str) -> bool:
+        with self._lock:
+            chave = self._por_token.get(valor_token)
+            removida = self._descartar(chave) if chave else False
+        self._notificar_remocoes()
+        return removida
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "tamanho": len(self._por_credencial),
+                "capacidade": self.capacidade,
+                **self._contadores,
+            }
+
+    def _impressao(self, credenciais: Credenciais) -> bytes:
+        mensagem = f"{normalizar_cpf_cnpj(credenciais.cpf_cnpj)}\0{credenciais.senha}"
+        return hmac.new(self._segredo, mensagem.encode(), hashlib.sha256).digest()
+
+    def _inserir(self, sessao: SessaoAutenticada, impressao: bytes) -> None:
+        with self._lock:
+            anterior = self._remover(sessao.cpf_cnpj)
+            if anterior and anterior.sessao.token.valor != sessao.token.valor:
+                self._sessoes_removidas.append(anterior.sessao)
+            self._por_credencial[sessao.cpf_cnpj] = _Entrada(
+                sessao=sessao, impressao=impressao
+            )
+            self._por_token[sessao.token.valor] = sessao.cpf_cnpj
+            self._aplicar_capacidade()
+
+    def _obter_valida(self, chave: str) -> Optional[_Entrada]:
+        """Retorna a entrada se ainda for válida e a marca como usada recentemente."""
+        entrada = self._por_credencial.get(chave)
+        if entrada is None:
+            return None
+        if entrada.sessao.token.expirado(self.margem_expiracao_segundos):
+            self._descartar(chave)
+            self._contadores["expirados"] += 1
+            return None
+        self._por_credencial.move_to_end(chave)
+        return entrada
+
+    def _remover(self, chave: str) -> Optional[_Entrada]:
+        entrada = self._por_credencial.pop(chave, None)
+        if entrada is not None:
+            self._por_token.pop(entrada.sessao.token.valor, None)
+        return entrada
+
+    def _descartar(self, chave: str) -> bool:
+        """Remove a entrada de vez (não apenas para substituí-la)."""
+        entrada = self._remover(chave)
+        if entrada is None:
+            return False
+        self._remocoes_pendentes.append((chave, time.time()))
+        self._sessoes_removidas.append(entrada.sessao)
+        return True
+
+    def _notificar_remocoes(self) -> None:
+        """
+        Chama `_ao_remover` e `ao_remover_sessao` para as remoções pendentes,
+        fora do lock.
+        """
+        with self._lock:
+            if not self._remocoes_pendentes and not self._sessoes_removidas:
+                return
+            remocoes, self._remocoes_pendentes = self._remocoes_pendentes, []
+            sessoes, self._sessoes_removidas = self._sessoes_removidas, []
+        for chave, removida_em in remocoes:
+            self._ao_remover(chave, removida_em)
+        if self._ao_remover_sessao is None:
+            return
+        for sessao in sessoes:
+            try:
+                self._ao_remover_sessao(sessao)
+            except Exception as e:
+                logger.error(f"Erro ao notificar remoção de sessão: {e}")
+
+    def _ao_salvar(self, sessao: SessaoAutenticada, impressao: bytes) -> None:
+        """Gancho para subclasses persistirem a sessão salva."""
+
+    def _ao_remover(self, chave: str, removida_em: float) -> None:
+        """
+        Gancho para subclasses apagarem a sessão removida ou expirada. Roda fora
+        do lock: a mesma chave pode ter sido salva de novo depois de
+        `removida_em` (timestamp de `time.time()`).
+        """
+
+    def _aplicar_capacidade(self) -> None:
+        if len(self._por_credencial) <= self.capacidade:
+            return
+        for chave, entrada in list(self._por_credencial.items()):
+            if entrada.sessao.token.expirado(self.margem_expiracao_segundos):
+                self._descartar(chave)
+                self._contadores["expirados"] += 1
+        while len(self._por_credencial) > self.capacidade:
+            self._descartar(next(iter(self._por_credencial)))
+            self._contadores["evicoes_lru"] += 1
+            logger.info("Token menos usado removido do store por capacidade.")
@@ -0,0 +1,148 @@
+# Shared asyncio HTTP client: keep-alive pools and per-host limits
+import asyncio
+import logging
+import threading
+from typing import Any, Dict
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class RespostaGrandeDemais(httpx.HTTPError):
+    """Corpo da resposta maior que `max_bytes_resposta`."""
+
+    pass
+
+
+class LimiteConcorrenciaExcedido(httpx.HTTPError):
+    """Nenhuma vaga para o host dentro de `timeout_fila_segundos`."""
+
+    pass
+
+
+class ClienteHTTPAssincrono:
+    """
+    Equivalente asyncio de `ClienteHTTP`, sobre um `httpx.AsyncClient`: cada
+    requisição em andamento ocupa uma corrotina, não uma thread.
+
+    - Conexões keep-alive reaproveitadas (até `max_conexoes_por_host` por host).
+    - Timeouts de conexão e de leitura em toda requisição.
+    - Corpo lido por inteiro, até `max_bytes_resposta`; acima disso a requisição
+      falha com `RespostaGrandeDemais`.
+    - No máximo `max_conexoes_por_host` requisições simultâneas por host; quem
+      não consegue vaga em `timeout_fila_segundos` recebe
+      `LimiteConcorrenciaExcedido`.
+
+    As duas exceções derivam de `httpx.HTTPError`, que os serviços já tratam.
+    Deve ser usado sempre no mesmo event loop e fechado com `encerrar()`.
+    """
+
+    def __init__(
+        self,
+        max_conexoes_por_host: int = 100,
+        timeout_conexao: float = 5,
+        timeout_leitura: float = 15,
+        timeout_fila_segundos: float = 30,
+        max_bytes_resposta: int = 5 * 1024 * 1024,
+    ):
+        self.max_conexoes_por_host = max_conexoes_por_host
+        self.timeout_fila_segundos = timeout_fila_segundos
+        self.max_bytes_resposta = max_bytes_resposta
+
+        # Lidos por `estatisticas()` de outras threads
+        self._lock = threading.Lock()
+        self._vagas: Dict[str, asyncio.Semaphore] = {}
+        self._hosts: Dict[str, Dict[str, int]] = {}
+
+        # O limite por host é o das vagas: o pool só não pode ser menor que ele
+        self._cliente = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=max_conexoes_por_host,
+            ),
+            timeout=httpx.Timeout(timeout_leitura, connect=timeout_conexao),
+        )
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.requisitar("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.requisitar("POST", url, **kwargs)
+
+    async def requisitar(self, metodo: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Como `httpx.AsyncClient.request`, com os limites e timeouts do cliente."""
+        host = urlparse(url).netloc
+        vagas = self._vagas_do_host(host)
+        try:
+            await asyncio.wait_for(vagas.acquire(), self.timeout_fila_segundos)
+        except asyncio.TimeoutError:
+            self._contar(host, "recusadas")
+            raise LimiteConcorrenciaExcedido(
+                f"Limite de {self.max_conexoes_por_host} requisições "
+                f"simultâneas para {host} atingido"
+            ) from None
+        self._contar(host, "em_andamento")
+        try:
+            requisicao = self._cliente.build_request(metodo, url, **kwargs)
+            resposta = await self._cliente.send(requisicao, stream=True)
+            try:
+                await self._ler_corpo(resposta)
+            finally:
+                # Corpo lido por inteiro: a conexão volta ao pool
+                await resposta.aclose()
+            self._contar(host, "requisicoes")
+            return resposta
+        except httpx.HTTPError:
+            self._contar(host, "falhas")
+            raise
+        finally:
+            self._contar(host, "em_andamento", -1)
+            vagas.release()
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            hosts = {host: dict(contadores) for host, contadores in self._hosts.items()}
+        return {
+            "max_conexoes_por_host": self.max_conexoes_por_host,
+            "max_bytes_resposta": self.max_bytes_resposta,
+            "hosts": hosts,
+        }
+
+    async def encerrar(self) -> None:
+        await self._cliente.aclose()
+
+    async def _ler_corpo(self, resposta: httpx.Response) -> None:
+        tamanho_declarado = resposta.headers.get("Content-Length")
+        if tamanho_declarado and tamanho_declarado.isdigit():
+            if int(tamanho_declarado) > self.max_bytes_resposta:
+                raise self._resposta_grande_demais(resposta)
+        partes = []
+        total = 0
+        async for parte in resposta.aiter_bytes():
+            total += len(parte)
+            if total > self.max_bytes_resposta:
+                raise self._resposta_grande_demais(resposta)
+            partes.append(parte)
+        # Mesmo estado de uma resposta lida sem stream: .json(), .text etc.
+        resposta._content = b"".join(partes)
+
+    def _resposta_grande_demais(self, resposta: httpx.Response) -> RespostaGrandeDemais:
+        return RespostaGrandeDemais(
+            f"Resposta de {resposta.url} excede {self.max_bytes_resposta} bytes"
+        )
+
+    def _vagas_do_host(self, host: str) -> asyncio.Semaphore:
+        vagas = self._vagas.get(host)
+        if vagas is None:
+            vagas = self._vagas[host] = asyncio.Semaphore(self.max_conexoes_por_host)
+        return vagas
+
+    def _contar(self, host: str, contador: str, quantidade: int = 1) -> None:
+        with self._lock:
+            contadores = self._hosts.setdefault(
+                host,
+                {"requisicoes": 0, "falhas": 0, "recusadas": 0, "em_andamento": 0},
+            )
+            contadores[contador] += quantidade
@@ -0,0 +1,300 @@
+# Shared HTTP client: keep-alive pools, DNS cache and per-host limits
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO_LEITURA = 64 * 1024
+
+
+class RespostaGrandeDemais(requests.RequestException):
+    """Corpo da resposta maior que `max_bytes_resposta`."""
+
+    pass
+
+
+class LimiteConcorrenciaExcedido(requests.RequestException):
+    """Nenhuma vaga para o host dentro de `timeout_fila_segundos`."""
+
+    pass
+
+
+class CacheDNS:
+    """
+    Endereços resolvidos por host, reaproveitados por `ttl_segundos`. Uma
+    conexão que falha com o endereço em cache o invalida, e a próxima tentativa
+    resolve de novo.
+    """
+
+    def __init__(self, ttl_segundos: float = 300):
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._enderecos: Dict[str, Tuple[str, float]] = {}
+        self._contadores = {"acertos": 0, "resolucoes": 0, "invalidacoes": 0}
+
+    def resolver(self, host: str) -> str:
+        if self.ttl_segundos <= 0 or _eh_ip(host):
+            return host
+        agora = time.monotonic()
+        with self._lock:
+            endereco = self._enderecos.get(host)
+            if endereco and endereco[1] > agora:
+                self._contadores["acertos"] += 1
+                return endereco[0]
+        # Erros de resolução sobem como socket.gaierror, igual à conexão normal
+        ip = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0][4][0]
+        with self._lock:
+            self._enderecos[host] = (ip, agora + self.ttl_segundos)
+            self._contadores["resolucoes"] += 1
+        return ip
+
+    def invalidar(self, host: str) -> None:
+        with self._lock:
+            if self._enderecos.pop(host, None):
+                self._contadores["invalidacoes"] += 1
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {"hosts": len(self._enderecos), **self._contadores}
+
+
+class _ConexaoComCacheDNS:
+    # Definidos por ClienteHTTP em subclasses criadas para cada cliente
+    cliente_http: "ClienteHTTP"
+
+    def _new_conn(self) -> socket.socket:
+        # Só o endereço do socket muda: Host, SNI e verificação do certificado
+        # continuam usando o nome do host
+        host = self._dns_host
+        self._dns_host = self.cliente_http.cache_dns.resolver(host)
+        try:
+            sock = super()._new_conn()
+        except Exception:
+            self.cliente_http.cache_dns.invalidar(host)
+            raise
+        finally:
+            self._dns_host = host
+        self.cliente_http._contar(f"{host}:{self.port}", "conexoes_abertas")
+        return sock
+
+
+class _Adaptador(HTTPAdapter):
+    def __init__(self, classes_pool: Dict[str, type], **kwargs: Any):
+        self._classes_pool = classes_pool
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._classes_pool
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP síncrono compartilhado por todos os serviços que falam com o
+    upstream (API de faturas, serviços de captcha).
+
+    - Uma `requests.Session` com pool keep-alive por host (`max_hosts` pools de
+      até `max_conexoes_por_host` conexões), para não pagar TCP e TLS a cada
+      chamada.
+    - Timeouts de conexão e de leitura em toda requisição (sobrescrevíveis por
+      chamada com `timeout=`).
+    - Cache de DNS com `ttl_dns_segundos` (0 desliga).
+    - Corpo lido por inteiro, até `max_bytes_resposta`; acima disso a requisição
+      falha com `RespostaGrandeDemais`.
+    - No máximo `max_concorrencia_por_host` requisições simultâneas por host;
+      quem não consegue vaga em `timeout_fila_segundos` recebe
+      `LimiteConcorrenciaExcedido`.
+
+    As duas exceções derivam de `requests.RequestException`, que os serviços já
+    tratam.
+    """
+
+    def __init__(
+        self,
+        max_conexoes_por_host: int = 10,
+        max_concorrencia_por_host: Optional[int] = None,
+        timeout_conexao: float = 5,
+        timeout_leitura: float = 15,
+        timeout_fila_segundos: float = 30,
+        max_bytes_resposta: int = 5 * 1024 * 1024,
+        ttl_dns_segundos: float = 300,
+        max_hosts: int = 10,
+    ):
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.timeout_fila_segundos = timeout_fila_segundos
+        self.max_bytes_resposta = max_bytes_resposta
+        # Mais requisições simultâneas que conexões no pool abririam conexões
+        # descartadas na devolução
+        self.max_concorrencia_por_host = (
+            max_concorrencia_por_host or max_conexoes_por_host
+        )
+        self.cache_dns = CacheDNS(ttl_dns_segundos)
+
+        self._lock = threading.Lock()
+        self._vagas: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts: Dict[str, Dict[str, int]] = {}
+
+        self._sessao = requests.Session()
+        adaptador = _Adaptador(
+            self._criar_classes_pool(),
+            pool_connections=max_hosts,
+            pool_maxsize=max_conexoes_por_host,
+        )
+        self._sessao.mount("http://", adaptador)
+        self._sessao.mount("https://", adaptador)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.requisitar("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.requisitar("POST", url, **kwargs)
+
+    def requisitar(self, metodo: str, url: str, **kwargs: Any) -> requests.Response:
+        """Como `requests.Session.request`, com os limites e timeouts do cliente."""
+        url_parseada = urlparse(url)
+        porta = url_parseada.port or _porta_padrao(url_parseada.scheme)
+        host = f"{url_parseada.hostname}:{porta}"
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs["stream"] = True
+
+        vagas = self._vagas_do_host(host)
+        if not vagas.acquire(timeout=self.timeout_fila_segundos):
+            self._contar(host, "recusadas")
+            raise LimiteConcorrenciaExcedido(
+                f"Limite de {self.max_concorrencia_por_host} requisições "
+                f"simultâneas para {host} atingido"
+            )
+        self._contar(host, "em_andamento")
+        try:
+            resposta = self._sessao.request(metodo, url, **kwargs)
+            try:
+                self._ler_corpo(resposta)
+            finally:
+                # Corpo lido por inteiro: a conexão volta ao pool
+                resposta.close()
+            self._contar(host, "requisicoes")
+            return resposta
+        except requests.RequestException:
+            self._contar(host, "falhas")
+            raise
+        finally:
+            self._contar(host, "em_andamento", -1)
+            vagas.release()
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            hosts = {host: dict(contadores) for host, contadores in self._hosts.items()}
+        return {
+            "timeout_conexao": self.timeout[0],
+            "timeout_leitura": self.timeout[1],
+            "max_concorrencia_por_host": self.max_concorrencia_por_host,
+            "max_bytes_resposta": self.max_bytes_resposta,
+            "dns": self.cache_dns.estatisticas(),
+            "hosts": hosts,
+        }
+
+    def encerrar(self) -> None:
+        self._sessao.close()
+
+    def _ler_corpo(self, resposta: requests.Response) -> None:
+        tamanho_declarado = resposta.headers.get("Content-Length")
+        if tamanho_declarado and tamanho_declarado.isdigit():
+            if int(tamanho_declarado) > self.max_bytes_resposta:
+                raise self._resposta_grande_demais(resposta)
+        partes = []
+        total = 0
+        for parte in resposta.iter_content(TAMANHO_BLOCO_LEITURA):
+            total += len(parte)
+            if total > self.max_bytes_resposta:
+                raise self._resposta_grande_demais(resposta)
+            partes.append(parte)
+        # Mesmo estado de uma resposta lida sem stream: .json(), .text etc.
+        resposta._content = b"".join(partes)
+
+    def _resposta_grande_demais(
+        self, resposta: requests.Response
+    ) -> RespostaGrandeDemais:
+        return RespostaGrandeDemais(
+            f"Resposta de {resposta.url} excede {self.max_bytes_resposta} bytes",
+            response=resposta,
+        )
+
+    def _vagas_do_host(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            vagas = self._vagas.get(host)
+            if vagas is None:
+                vagas = self._vagas[host] = threading.BoundedSemaphore(
+                    self.max_concorrencia_por_host
+                )
+            return vagas
+
+    def _contar(self, host: str, contador: str, quantidade: int = 1) -> None:
+        with self._lock:
+            contadores = self._hosts.setdefault(
+                host,
+                {
+                    "requisicoes": 0,
+                    "falhas": 0,
+                    "recusadas": 0,
+                    "em_andamento": 0,
+                    "conexoes_abertas": 0,
+                },
+            )
+            contadores[contador] += quantidade
+
+    def _criar_classes_pool(self) -> Dict[str, type]:
+        # As conexões precisam do cache de DNS e dos contadores deste cliente;
+        # o urllib3 só aceita a classe da conexão, então uma subclasse por cliente
+        atributos = {"cliente_http": self}
+        conexao_http = type(
+            "ConexaoHTTP", (_ConexaoComCacheDNS, HTTPConnection), atributos
+        )
+        conexao_https = type(
+            "ConexaoHTTPS", (_ConexaoComCacheDNS, HTTPSConnection), atributos
+        )
+        return {
+            "http": type(
+                "PoolHTTP", (HTTPConnectionPool,), {"ConnectionCls": conexao_http}
+            ),
+            "https": type(
+                "PoolHTTPS", (HTTPSConnectionPool,), {"ConnectionCls": conexao_https}
+            ),
+        }
+
+
+_cliente_compartilhado: Optional[ClienteHTTP] = None
+_lock_cliente_compartilhado = threading.Lock()
+
+
+def cliente_compartilhado() -> ClienteHTTP:
+    """
+    Cliente com os limites padrão, criado no primeiro uso e compartilhado pelos
+    serviços construídos sem um `http` injetado.
+    """
+    global _cliente_compartilhado
+    with _lock_cliente_compartilhado:
+        if _cliente_compartilhado is None:
+            _cliente_compartilhado = ClienteHTTP()
+        return _cliente_compartilhado
+
+
+def _eh_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+def _porta_padrao(esquema: str) -> int:
+    return 443 if esquema == "https" else 80
@@ -0,0 +1,133 @@
+# Async client for the 2captcha-style reCAPTCHA API
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from scraper.infrastructure.http.async_client import ClienteHTTPAssincrono
+from scraper.infrastructure.recaptcha_solvers.captcha_api_client import NAO_PRONTO
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCaptchaAPIClient:
+    """
+    Versão asyncio do protocolo de `CaptchaAPIClient` (`in.php` para enviar,
+    `res.php` para consultar). Cada tarefa aguardando a solução ocupa apenas
+    uma corrotina, não uma thread, e cada uma consulta o próprio id: quem usa
+    este cliente (o abastecimento do reservatório no entry point ASGI) tem
+    poucas tarefas em andamento. As esperas seguem as de `CaptchaAPIClient`:
+    `espera_inicial_segundos` antes da primeira consulta e intervalos que
+    encurtam de `intervalo_inicial_segundos` até `intervalo_minimo_segundos`.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        http: ClienteHTTPAssincrono,
+        service_url: str = "http://2captcha.com",
+        espera_inicial_segundos: float = 15,
+        intervalo_inicial_segundos: float = 5,
+        intervalo_minimo_segundos: float = 2,
+    ):
+        self.api_key = api_key
+        self.service_url = service_url
+        self.espera_inicial_segundos = espera_inicial_segundos
+        self.intervalo_inicial_segundos = intervalo_inicial_segundos
+        self.intervalo_minimo_segundos = intervalo_minimo_segundos
+        # Um cliente injetado é compartilhado: quem o criou o encerra
+        self._http = http
+
+        self._lock = threading.Lock()
+        self._contadores = {
+            "enviados": 0,
+            "resolvidos": 0,
+            "falhas": 0,
+            "consultas": 0,
+        }
+
+    async def solicitar_token(
+        self, site_key: str, page_url: str, timeout: float = 120
+    ) -> Optional[str]:
+        """Envia o desafio e espera o token de resposta (None em erro ou timeout)."""
+        captcha_id = await self.enviar(site_key, page_url)
+        if not captcha_id:
+            return None
+        return await self.aguardar(captcha_id, timeout)
+
+    async def enviar(self, site_key: str, page_url: str) -> Optional[str]:
+        try:
+            response = await self._http.post(
+                f"{self.service_url}/in.php",
+                data={
+                    "key": self.api_key,
+                    "method": "userrecaptcha",
+                    "googlekey": site_key,
+                    "pageurl": page_url,
+                    "json": 1,
+                },
+            )
+            result = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error sending captcha to service: {e}")
+            return None
+
+        if result.get("status") == 1:
+            self._contar("enviados")
+            return result.get("request")
+        logger.error(f"API error: {result.get('error_text')}")
+        return None
+
+    async def aguardar(self, captcha_id: str, timeout: float = 120) -> Optional[str]:
+        limite = time.monotonic() + timeout
+        espera = self.espera_inicial_segundos
+        consultas = 0
+        while time.monotonic() + espera < limite:
+            await asyncio.sleep(espera)
+            consultas += 1
+            espera = max(
+                self.intervalo_minimo_segundos,
+                self.intervalo_inicial_segundos * 0.8 ** (consultas - 1),
+            )
+            resposta = await self._consultar(captcha_id)
+            if resposta is None or resposta == NAO_PRONTO:
+                continue
+            if not resposta or resposta.startswith("ERROR"):
+                logger.error(f"Captcha solving failed: {resposta}")
+                self._contar("falhas")
+                return None
+            self._contar("resolvidos")
+            return resposta
+
+        logger.warning("Timeout waiting for captcha solution")
+        return None
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return dict(self._contadores)
+
+    async def _consultar(self, captcha_id: str) -> Optional[str]:
+        """Resposta de `res.php` para o id; None se a consulta em si falhar."""
+        self._contar("consultas")
+        try:
+            response = await self._http.get(
+                f"{self.service_url}/res.php",
+                params={
+                    "key": self.api_key,
+                    "action": "get",
+                    "id": captcha_id,
+                    "json": 1,
+                },
+            )
+            result = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error checking captcha solution: {e}")
+            return None
+        return str(result.get("request", ""))
+
+    def _contar(self, contador: str) -> None:
+        with self._lock:
+            self._contadores[contador] += 1
@@ -0,0 +1,285 @@
+# Pooled client and shared poller for the 2captcha-style reCAPTCHA API
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+import requests
+
+from scraper.infrastructure.http.pooled_client import ClienteHTTP
+
+logger = logging.getLogger(__name__)
+
+NAO_PRONTO = "CAPCHA_NOT_READY"
+
+
+@dataclass
+class _Tarefa:
+    captcha_id: str
+    enviada_em: float
+    proxima_consulta: float
+    consultas: int = 0
+    futuro: Future = field(default_factory=Future)
+
+
+class CaptchaAPIClient:
+    """
+    Cliente síncrono do protocolo `in.php`/`res.php`, compartilhado entre logins.
+
+    As requisições usam o `ClienteHTTP` recebido (em geral o compartilhado com
+    os outros serviços) ou, sem ele, um próprio com `max_conexoes` conexões.
+    Em vez de um loop de consulta por login, uma única thread consulta todas as
+    tarefas pendentes de uma vez (`res.php` com `ids=`) e resolve o `Future` de
+    cada uma.
+
+    A consulta segue a distribuição do tempo de solução: a primeira espera é
+    longa (um quantil baixo dos tempos observados, `espera_inicial_segundos`
+    até haver amostras suficientes) e depois os intervalos encurtam de
+    `intervalo_inicial_segundos` até `intervalo_minimo_segundos`.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        service_url: str = "http://2captcha.com",
+        max_conexoes: int = 10,
+        timeout_conexao: float = 5,
+        timeout_leitura: float = 15,
+        espera_inicial_segundos: float = 15,
+        intervalo_inicial_segundos: float = 5,
+        intervalo_minimo_segundos: float = 2,
+        max_ids_por_consulta: int = 100,
+        amostras_tempo_solucao: int = 50,
+        http: Optional[ClienteHTTP] = None,
+    ):
+        self.api_key = api_key
+        self.service_url = service_url
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.espera_inicial_segundos = espera_inicial_segundos
+        self.intervalo_inicial_segundos = intervalo_inicial_segundos
+        self.intervalo_minimo_segundos = intervalo_minimo_segundos
+        self.max_ids_por_consulta = max_ids_por_consulta
+
+        # Um cliente injetado é compartilhado: quem o criou o encerra
+        self._http_proprio = http is None
+        self._http = http or ClienteHTTP(
+            max_conexoes_por_host=max_conexoes,
+            timeout_conexao=timeout_conexao,
+            timeout_leitura=timeout_leitura,
+        )
+
+        self._condicao = threading.Condition()
+        self._tarefas: Dict[str, _Tarefa] = {}
+        self._tempos_solucao: Deque[float] = deque(maxlen=amostras_tempo_solucao)
+        self._thread: Optional[threading.Thread] = None
+        self._encerrado = False
+
+        self._contadores = {
+            "enviados": 0,
+            "resolvidos": 0,
+            "falhas": 0,
+            "cancelados": 0,
+            "consultas": 0,
+        }
+
+    def solicitar_token(
+        self, site_key: str, page_url: str, timeout: float = 120
+    ) -> Optional[str]:
+        """Envia o desafio e espera o token de resposta (None em erro ou timeout)."""
+        captcha_id = self.enviar(site_key, page_url)
+        if not captcha_id:
+            return None
+        return self.aguardar(captcha_id, timeout)
+
+    def enviar(self, site_key: str, page_url: str) -> Optional[str]:
+        try:
+            response = self._http.post(
+                f"{self.service_url}/in.php",
+                data={
+                    "key": self.api_key,
+                    "method": "userrecaptcha",
+                    "googlekey": site_key,
+                    "pageurl": page_url,
+                    "json": 1,
+                },
+                timeout=self.timeout,
+            )
+            result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Error sending captcha to service: {e}")
+            return None
+
+        if result.get("status") == 1:
+            with self._condicao:
+                self._contadores["enviados"] += 1
+            return result.get("request")
+        logger.error(f"API error: {result.get('error_text')}")
+        return None
+
+    def acompanhar(self, captcha_id: str) -> Future:
+        """
+        Inscreve a tarefa na consulta compartilhada. O `Future` recebe o token,
+        ou None se o serviço não conseguir resolvê-la; cancelá-lo tira a tarefa
+        da consulta.
+        """
+        agora = time.monotonic()
+        tarefa = _Tarefa(captcha_id, agora, agora + self._espera_inicial())
+        tarefa.futuro.add_done_callback(lambda f: self._ao_concluir(tarefa, f))
+        with self._condicao:
+            if self._encerrado:
+                raise RuntimeError("Cliente da API de captcha encerrado")
+            self._tarefas[captcha_id] = tarefa
+            self._garantir_thread()
+            self._condicao.notify()
+        return tarefa.futuro
+
+    def aguardar(self, captcha_id: str, timeout: float = 120) -> Optional[str]:
+        futuro = self.acompanhar(captcha_id)
+        try:
+            return futuro.result(timeout)
+        except FutureTimeoutError:
+            futuro.cancel()
+            logger.warning("Timeout waiting for captcha solution")
+            return None
+        except CancelledError:
+            return None
+
+    def encerrar(self) -> None:
+        with self._condicao:
+            self._encerrado = True
+            tarefas = list(self._tarefas.values())
+            self._condicao.notify_all()
+        for tarefa in tarefas:
+            tarefa.futuro.cancel()
+        if self._http_proprio:
+            self._http.encerrar()
+
+    def estatisticas(self) -> Dict:
+        with self._condicao:
+            tempos = sorted(self._tempos_solucao)
+            return {
+                "pendentes": len(self._tarefas),
+                "espera_inicial_segundos": round(self._espera_inicial_locked(), 2),
+                "tempo_mediano_solucao_segundos": (
+                    round(tempos[len(tempos) // 2], 2) if tempos else None
+                ),
+                **self._contadores,
+            }
+
+    def _espera_inicial(self) -> float:
+        with self._condicao:
+            return self._espera_inicial_locked()
+
+    def _espera_inicial_locked(self) -> float:
+        # Com poucas amostras, vale o padrão; depois, o quantil de 20%: a
+        # maioria das soluções ainda não está pronta antes disso.
+        if len(self._tempos_solucao) < 5:
+            return self.espera_inicial_segundos
+        tempos = sorted(self._tempos_solucao)
+        return max(self.intervalo_minimo_segundos, tempos[len(tempos) // 5])
+
+    def _proximo_intervalo(self, tarefa: _Tarefa) -> float:
+        # 5s, 4s, 3.2s, ... até o mínimo: quanto mais tempo a tarefa leva,
+        # mais provável que esteja perto de ficar pronta.
+        return max(
+            self.intervalo_minimo_segundos,
+            self.intervalo_inicial_segundos * 0.8 ** (tarefa.consultas - 1),
+        )
+
+    def _ao_concluir(self, tarefa: _Tarefa, futuro: Future) -> None:
+        with self._condicao:
+            if self._tarefas.get(tarefa.captcha_id) is tarefa:
+                del self._tarefas[tarefa.captcha_id]
+            if futuro.cancelled():
+                self._contadores["cancelados"] += 1
+
+    def _garantir_thread(self) -> None:
+        """Chamado com `_condicao` adquirida."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._consultar_continuamente,
+            name="captcha-consulta",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _consultar_continuamente(self) -> None:
+        while True:
+            with self._condicao:
+                while not self._encerrado:
+                    agora = time.monotonic()
+                    vencidas = [
+                        t for t in self._tarefas.values() if t.proxima_consulta <= agora
+                    ]
+                    if vencidas:
+                        break
+                    proxima = min(
+                        (t.proxima_consulta for t in self._tarefas.values()),
+                        default=None,
+                    )
+                    self._condicao.wait(None if proxima is None else proxima - agora)
+                if self._encerrado:
+                    return
+                vencidas.sort(key=lambda t: t.proxima_consulta)
+                lote = vencidas[: self.max_ids_por_consulta]
+            self._consultar(lote)
+
+    def _consultar(self, lote: List[_Tarefa]) -> None:
+        respostas = self._obter_respostas([t.captcha_id for t in lote])
+        agora = time.monotonic()
+        for tarefa in lote:
+            resposta = respostas.get(tarefa.captcha_id) if respostas else NAO_PRONTO
+            with self._condicao:
+                tarefa.consultas += 1
+                if resposta == NAO_PRONTO:
+                    # Lido pela thread de consulta sob `_condicao`
+                    tarefa.proxima_consulta = agora + self._proximo_intervalo(tarefa)
+                    continue
+            if not resposta or resposta.startswith("ERROR"):
+                logger.error(f"Captcha solving failed: {resposta}")
+                with self._condicao:
+                    self._contadores["falhas"] += 1
+                self._definir_resultado(tarefa, None)
+                continue
+            with self._condicao:
+                self._contadores["resolvidos"] += 1
+                self._tempos_solucao.append(agora - tarefa.enviada_em)
+            self._definir_resultado(tarefa, resposta)
+
+    def _obter_respostas(self, ids: List[str]) -> Optional[Dict[str, str]]:
+        """Uma consulta para todo o lote; None se a consulta em si falhar."""
+        with self._condicao:
+            self._contadores["consultas"] += 1
+        try:
+            response = self._http.get(
+                f"{self.service_url}/res.php",
+                params={
+                    "key": self.api_key,
+                    "action": "get",
+                    "ids": ",".join(ids),
+                    "json": 1,
+                },
+                timeout=self.timeout,
+            )
+            result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Error checking captcha solution: {e}")
+            return None
+
+        resposta = str(result.get("request", ""))
+        # Lotes respondem "token1|CAPCHA_NOT_READY|..."; erros gerais (chave
+        # inválida, por exemplo) valem para todos os ids.
+        partes = resposta.split("|")
+        if len(partes) != len(ids):
+            partes = [resposta] * len(ids)
+        return dict(zip(ids, partes))
+
+    @staticmethod
+    def _definir_resultado(tarefa: _Tarefa, resultado: Optional[str]) -> None:
+        if tarefa.futuro.set_running_or_notify_cancel():
+            tarefa.futuro.set_result(resultado)
@@ -1,55 +1,182 @@
 # Manual Recaptcha solver
+import json
 import logging
+import threading
 import time
+from typing import Optional
 
 from scraper.application.interfaces import IRecaptchaSolver, IWebDriverManager
+from scraper.application.prazos import tempo_restante
 
 logger = logging.getLogger(__name__)
 
+# Observa a página e chama o callback do WebDriver assim que surge um token de
+# reCAPTCHA ou a URL deixa a que estava aberta quando a espera começou (o login
+# concluído pelo próprio usuário). A URL do portal não contém "login", então
+# ela não serve de sinal por si só. Mudanças no DOM, eventos de
+# input/change e de navegação disparam a verificação na hora; um intervalo curto
+# dentro da página cobre valores atribuídos via `.value`, que não geram eventos.
+SCRIPT_AGUARDAR_RESOLUCAO = """
+const concluir = arguments[arguments.length - 1];
+const limiteMs = %(timeout_ms)d;
+const urlInicial = %(url_inicial)s;
+let terminado = false;
+let observador = null;
+let intervalo = null;
+let prazo = null;
+
+function tokenPresente() {
+    const campos = document.querySelectorAll(
+        'textarea#g-recaptcha-response, [name*="recaptcha"]'
+    );
+    for (const campo of campos) {
+        if (campo.value && campo.value.length > 100) return true;
+    }
+    return false;
+}
+
+function finalizar(motivo) {
+    if (terminado) return;
+    terminado = true;
+    if (observador) observador.disconnect();
+    clearInterval(intervalo);
+    clearTimeout(prazo);
+    document.removeEventListener('input', verificar, true);
+    document.removeEventListener('change', verificar, true);
+    window.removeEventListener('popstate', verificar);
+    window.removeEventListener('hashchange', verificar);
+    window.removeEventListener('locationchange', verificar);
+    concluir(motivo);
+}
+
+function verificar() {
+    if (tokenPresente()) return finalizar('token');
+    if (urlInicial !== null && window.location.href !== urlInicial) finalizar('url');
+}
+
+observador = new MutationObserver(verificar);
+observador.observe(document.documentElement, {
+    childList: true, subtree: true, attributes: true, characterData: true
+});
+document.addEventListener('input', verificar, true);
+document.addEventListener('change', verificar, true);
+window.addEventListener('popstate', verificar);
+window.addEventListener('hashchange', verificar);
+window.addEventListener('locationchange', verificar);
+if (!window.__historicoObservado) {
+    // Instalado uma vez por página, mesmo com várias esperas seguidas
+    window.__historicoObservado = true;
+    for (const metodo of ['pushState', 'replaceState']) {
+        const original = history[metodo];
+        history[metodo] = function () {
+            const retorno = original.apply(this, arguments);
+            window.dispatchEvent(new Event('locationchange'));
+            return retorno;
+        };
+    }
+}
+intervalo = setInterval(verificar, 100);
+prazo = setTimeout(() => finalizar(null), limiteMs);
+verificar();
+"""
+
+# Duração de cada espera dentro da página quando a resolução pode ser cancelada
+FATIA_CANCELAVEL_SEGUNDOS = 1
+
 
 class RecaptchaManualSolver(IRecaptchaSolver):
-    def __init__(self, web_driver: IWebDriverManager):
+    def __init__(self, web_driver: IWebDriverManager, timeout: float = 120):
         self._web_driver = web_driver
+        self.timeout = timeout
 
     def resolver(self) -> bool:
         logger.info("Starting manual reCAPTCHA solving process.")
         logger.info(
             "Please solve the reCAPTCHA manually in the browser window that appears."
         )
-        logger.info("You have 120 seconds to complete the challenge.")
+        logger.info(f"You have {self.timeout:.0f} seconds to complete the challenge.")
+        return self.aguardar_resolucao()
 
-        start_time = time.time()
-        timeout = 120
+    def aguardar_resolucao(
+        self,
+        cancelamento: Optional[threading.Event] = None,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Espera a resolução manual por até `timeout` (padrão: `self.timeout`),
+        sem passar do prazo da operação em curso.
 
+        Com `cancelamento`, a espera dentro da página é feita em fatias de
+        `FATIA_CANCELAVEL_SEGUNDOS`: enquanto o script assíncrono roda, o
+        WebDriver não atende outros comandos da mesma sessão, então quem
+        cancelar (por exemplo, para inserir um token obtido por outra via)
+        espera no máximo uma fatia.
+        """
+        limite = time.monotonic() + tempo_restante(
+            self.timeout if timeout is None else timeout
+        )
         try:
-            while time.time() - start_time < timeout:
-                if self._check_if_resolved():
+            url_inicial = self._url_atual()
+            # O script fica esperando dentro da página; ele só retorna sem
+            # resultado se o prazo acabar ou se a página for trocada (um
+            # redirecionamento completo após o login), caso em que se confere o
+            # estado e, se preciso, volta-se a observar a nova página.
+            while not (cancelamento and cancelamento.is_set()):
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    logger.warning("⏰ Timeout waiting for manual reCAPTCHA solution.")
+                    return False
+                fatia = (
+                    min(restante, FATIA_CANCELAVEL_SEGUNDOS)
+                    if cancelamento
+                    else restante
+                )
+                inicio = time.monotonic()
+                motivo = self._web_driver.executar_script_assincrono(
+                    SCRIPT_AGUARDAR_RESOLUCAO
+                    % {
+                        "timeout_ms": int(fatia * 1000),
+                        "url_inicial": json.dumps(url_inicial),
+                    },
+                    timeout=fatia + 5,
+                )
+                if motivo:
                     logger.info("✅ reCAPTCHA seems to be resolved.")
                     return True
-
-                time.sleep(2)
-
-            logger.warning("⏰ Timeout waiting for manual reCAPTCHA solution.")
+                if time.monotonic() - inicio < fatia * 0.9:
+                    # Retorno antecipado: página trocada ou falha do driver
+                    if self._check_if_resolved(url_inicial):
+                        logger.info("✅ reCAPTCHA seems to be resolved.")
+                        return True
+                    # Evita repetir em ritmo acelerado se o driver falhar de imediato
+                    time.sleep(min(0.5, max(0, limite - time.monotonic())))
             return False
         except Exception as e:
             logger.error(f"An error occurred during manual solving: {e}")
             return False
 
-    def _check_if_resolved(self) -> bool:
-        # Check for reCAPTCHA token, or if the URL has changed, indicating
-        # successful login
-        token = self._web_driver.executar_script(
-            """
+    def _url_atual(self) -> Optional[str]:
+        try:
+            return self._web_driver.executar_script("return window.location.href;")
+        except Exception as e:
+            logger.warning(f"Could not read the current URL: {e}")
+            return None
+
+    def _check_if_resolved(self, url_inicial: Optional[str]) -> bool:
+        # Check for reCAPTCHA token, or if the URL has changed since the wait
+        # started, indicating successful login
+        token = self._web_driver.executar_script("""
             return document.querySelector('textarea#g-recaptcha-response')?.value ||
             document.querySelector('input[name=\"g-recaptcha-response\"]')?.value ||
                    document.querySelector('[name*=\"recaptcha\"]')?.value;
-        """
-        )
-        current_url = (
-            self._web_driver.executar_script("return window.location.href;") or ""
-        )
+        """)
+        current_url = self._url_atual()
 
         is_token_present = token and len(token) > 100
-        is_redirected = "login" not in current_url.lower()
+        is_redirected = (
+            url_inicial is not None
+            and current_url is not None
+            and current_url != url_inicial
+        )
 
-        return is_token_present or is_redirected
+        return bool(is_token_present or is_redirected)
@@ -1,26 +1,81 @@
 import logging
+import threading
 import time
-from abc import ABC, abstractmethod
-from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from contextvars import copy_context
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 
-import requests
+from scraper.application.interfaces import IRecaptchaSolver, IWebDriverManager
+from scraper.application.prazos import tempo_restante
+from scraper.infrastructure.recaptcha_solvers.captcha_api_client import (
+    CaptchaAPIClient,
+)
+from scraper.infrastructure.recaptcha_solvers.manual_solver import (
+    RecaptchaManualSolver,
+)
+from scraper.infrastructure.recaptcha_solvers.token_reservoir import (
+    ReservatorioTokensRecaptcha,
+)
 
 logger = logging.getLogger(__name__)
 
+# Com que frequência uma solicitação em disputa confere se já perdeu
+INTERVALO_CANCELAMENTO_SEGUNDOS = 0.25
 
-class IRecaptchaSolver(ABC):
-    @abstractmethod
-    def resolver(self) -> bool:
-        pass
+SCRIPT_SITE_KEY = """
+    return document.querySelector('.g-recaptcha')?.dataset?.sitekey ||
+           document.querySelector('[data-sitekey]')?.dataset?.sitekey ||
+           document.querySelector('iframe[src*=\"recaptcha\"]')?.src?.match(/k=([^&]+)/)?.[1];
+"""
+
+
+def inserir_token(web_driver: IWebDriverManager, solution: str) -> bool:
+    """Preenche os campos de resposta do reCAPTCHA com `solution`."""
+    try:
+        # Inserir token no textarea oculto
+        web_driver.executar_script(f"""
+            var token = '{solution}';
+            document.querySelector('textarea#g-recaptcha-response').value = token;
+            document.querySelector('input[name="g-recaptcha-response"]').value = token;
+        """)
+
+        # Disparar evento change
+        web_driver.executar_script("""
+            var event = new Event('change', { bubbles: true });
+            document.querySelector('textarea#g-recaptcha-response').dispatchEvent(event);
+            document.querySelector('input[name=\"g-recaptcha-response\"]').dispatchEvent(event);
+        """)
+
+        return True
+
+    except Exception as e:
+        logger.error(f"Error submitting solution: {e}")
+        return False
 
 
 class RecaptchaAPISolver(IRecaptchaSolver):
     def __init__(
-        self, web_driver, api_key: str, service_url: str = "http://2captcha.com"
+        self,
+        web_driver,
+        api_key: str,
+        service_url: str = "http://2captcha.com",
+        reservatorio: Optional[ReservatorioTokensRecaptcha] = None,
+        cliente: Optional[CaptchaAPIClient] = None,
+        timeout: float = 120,
     ):
         self._web_driver = web_driver
         self.api_key = api_key
         self.service_url = service_url
+        # Espera máxima pela solução (também limitada pelo prazo da operação)
+        self.timeout = timeout
+        # Compartilhe um cliente entre solvers para que todas as tarefas usem o
+        # mesmo pool de conexões e a mesma consulta em lote.
+        self._cliente = cliente or CaptchaAPIClient(api_key, service_url)
+        # Tokens resolvidos de antemão; sem eles, a solução é pedida na hora.
+        self._reservatorio = reservatorio
 
     def resolver(self) -> bool:
         logger.info("Starting automatic reCAPTCHA solving via API")
@@ -30,106 +85,223 @@ class RecaptchaAPISolver(IRecaptchaSolver):
         if not site_key:
             logger.error("Could not find reCAPTCHA site key")
             return False
+        page_url = self._web_driver.executar_script("return window.location.href;")
 
-        # Resolver via API
-        captcha_id = self._send_captcha_to_service(site_key)
-        if not captcha_id:
-            return False
-
-        # Aguardar solução
-        solution = self._wait_for_solution(captcha_id)
+        solution = None
+        if self._reservatorio and self._reservatorio.atende(site_key, page_url):
+            solution = self._reservatorio.retirar()
+        if not solution:
+            solution = self.solicitar_token(site_key, page_url)
         if not solution:
             return False
 
         # Inserir solução
         return self._submit_solution(solution)
 
-    def _get_recaptcha_site_key(self) -> str:
-        return self._web_driver.executar_script(
-            """
-            return document.querySelector('.g-recaptcha')?.dataset?.sitekey ||
-                   document.querySelector('[data-sitekey]')?.dataset?.sitekey ||
-                   document.querySelector('iframe[src*=\"recaptcha\"]')?.src?.match(/k=([^&]+)/)?.[1];
+    def solicitar_token(self, site_key: str, page_url: str) -> Optional[str]:
         """
-        )
+        Pede ao serviço uma solução para o site key e a página e espera por
+        ela. Não usa o navegador, então pode abastecer um reservatório.
+        """
+        captcha_id = self._send_captcha_to_service(site_key, page_url)
+        if not captcha_id:
+            return None
+        return self._wait_for_solution(captcha_id, self.timeout)
 
-    def _send_captcha_to_service(self, site_key: str) -> Optional[str]:
-        try:
-            page_url = self._web_driver.executar_script("return window.location.href;")
-            data = {
-                "key": self.api_key,
-                "method": "userrecaptcha",
-                "googlekey": site_key,
-                "pageurl": page_url,
-                "json": 1,
-            }
-
-            response = requests.post(f"{self.service_url}/in.php", data=data)
-            result = response.json()
-
-            if result.get("status") == 1:
-                return result.get("request")
-            else:
-                logger.error(f"API error: {result.get('error_text')}")
-                return None
-
-        except Exception as e:
-            logger.error(f"Error sending captcha to service: {e}")
+    def solicitar_token_cancelavel(
+        self,
+        site_key: str,
+        page_url: str,
+        cancelamento: threading.Event,
+        timeout: float = 120,
+    ) -> Optional[str]:
+        """
+        Como `solicitar_token`, mas desiste assim que `cancelamento` for
+        sinalizado, tirando a tarefa da consulta ao serviço.
+        """
+        limite = time.monotonic() + tempo_restante(timeout)
+        captcha_id = self._send_captcha_to_service(site_key, page_url)
+        if not captcha_id or cancelamento.is_set():
             return None
+        futuro = self._cliente.acompanhar(captcha_id)
+        while not cancelamento.is_set():
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                return futuro.result(min(restante, INTERVALO_CANCELAMENTO_SEGUNDOS))
+            except FutureTimeoutError:
+                continue
+        futuro.cancel()
+        return None
 
-    def _wait_for_solution(self, captcha_id: str, timeout: int = 120) -> str:
-        start_time = time.time()
+    def _get_recaptcha_site_key(self) -> str:
+        return self._web_driver.executar_script(SCRIPT_SITE_KEY)
 
-        while time.time() - start_time < timeout:
-            try:
-                response = requests.get(
-                    f"{self.service_url}/res.php",
-                    params={
-                        "key": self.api_key,
-                        "action": "get",
-                        "id": captcha_id,
-                        "json": 1,
-                    },
-                )
+    def _send_captcha_to_service(self, site_key: str, page_url: str) -> Optional[str]:
+        return self._cliente.enviar(site_key, page_url)
 
-                result = response.json()
+    def _wait_for_solution(self, captcha_id: str, timeout: int = 120) -> Optional[str]:
+        # Bounded by the deadline of the current operation, if any
+        return self._cliente.aguardar(captcha_id, tempo_restante(timeout))
 
-                if result.get("status") == 1:
-                    return result.get("request")
-                elif result.get("request") == "CAPCHA_NOT_READY":
-                    time.sleep(5)
-                else:
-                    logger.error(f"Captcha solving failed: {result.get('request')}")
-                    return None
+    def _submit_solution(self, solution: str) -> bool:
+        return inserir_token(self._web_driver, solution)
 
-            except Exception as e:
-                logger.error(f"Error checking captcha solution: {e}")
-                time.sleep(5)
 
-        logger.warning("Timeout waiting for captcha solution")
-        return None
+class RecaptchaHybridSolver(IRecaptchaSolver):
+    """
+    Disputa entre estratégias de resolução, com um prazo único para todas.
 
-    def _submit_solution(self, solution: str) -> bool:
-        try:
-            # Inserir token no textarea oculto
-            self._web_driver.executar_script(
-                f"""
-                document.querySelector('textarea#g-recaptcha-response').value = '{solution}';
-                document.querySelector('input[name=\"g-recaptcha-response\"]').value = '{solution}';
-            """
-            )
+    Um token do reservatório, se houver, é usado na hora. Senão, todos os
+    `provedores` (APIs no protocolo do 2captcha) e, opcionalmente, o
+    `solver_manual` começam ao mesmo tempo; vale o primeiro token válido, e os
+    demais são cancelados. A latência do login passa a ser a do provedor mais
+    rápido naquele momento.
+    """
 
-            # Disparar evento change
-            self._web_driver.executar_script(
-                """
-                var event = new Event('change', {{ bubbles: true }});
-                document.querySelector('textarea#g-recaptcha-response').dispatchEvent(event);
-                document.querySelector('input[name=\"g-recaptcha-response\"]').dispatchEvent(event);
-            """
+    def __init__(
+        self,
+        web_driver: IWebDriverManager,
+        provedores: List[RecaptchaAPISolver],
+        solver_manual: Optional[RecaptchaManualSolver] = None,
+        reservatorio: Optional[ReservatorioTokensRecaptcha] = None,
+        prazo_segundos: float = 120,
+        executor: Optional[Executor] = None,
+    ):
+        self._web_driver = web_driver
+        self._provedores = provedores
+        self._solver_manual = solver_manual
+        self._reservatorio = reservatorio
+        self.prazo_segundos = prazo_segundos
+        # Sem executor compartilhado, cada resolução usa threads próprias
+        self._executor = executor
+
+    def resolver(self) -> bool:
+        inicio = time.monotonic()
+        limite = inicio + tempo_restante(self.prazo_segundos)
+
+        site_key = None
+        page_url = None
+        if self._provedores or self._reservatorio:
+            site_key = self._web_driver.executar_script(SCRIPT_SITE_KEY)
+            page_url = self._web_driver.executar_script("return window.location.href;")
+            if not site_key:
+                logger.error("Could not find reCAPTCHA site key")
+                if not self._solver_manual:
+                    return False
+
+        if site_key and self._reservatorio:
+            if self._reservatorio.atende(site_key, page_url):
+                token = self._reservatorio.retirar()
+                if token:
+                    return inserir_token(self._web_driver, token)
+
+        vencedor, token = self._disputar(site_key, page_url, limite)
+        if vencedor is None:
+            logger.warning(
+                f"No reCAPTCHA strategy succeeded within {self.prazo_segundos:.0f}s"
             )
+            return False
 
+        logger.info(
+            f"reCAPTCHA solved by {vencedor} in {time.monotonic() - inicio:.1f}s"
+        )
+        if token is True:
+            # O solver manual venceu: a resposta já está na página
             return True
+        return inserir_token(self._web_driver, token)
 
-        except Exception as e:
-            logger.error(f"Error submitting solution: {e}")
-            return False
+    def _disputar(
+        self, site_key: Optional[str], page_url: Optional[str], limite: float
+    ) -> Tuple[Optional[str], Optional[object]]:
+        cancelamento = threading.Event()
+        executor = self._executor or ThreadPoolExecutor(
+            max_workers=len(self._provedores) + 1,
+            thread_name_prefix="recaptcha-disputa",
+        )
+        restante = limite - time.monotonic()
+        corrida: Dict[Future, str] = {}
+        if site_key:
+            for provedor in self._provedores:
+                futuro = executor.submit(
+                    copy_context().run,
+                    provedor.solicitar_token_cancelavel,
+                    site_key,
+                    page_url,
+                    cancelamento,
+                    restante,
+                )
+                corrida[futuro] = urlparse(provedor.service_url).netloc
+        if self._solver_manual:
+            futuro = executor.submit(
+                copy_context().run,
+                self._solver_manual.aguardar_resolucao,
+                cancelamento,
+                restante,
+            )
+            corrida[futuro] = "manual"
+
+        try:
+            return self._primeiro_valido(corrida, limite)
+        finally:
+            # Perdedores: os que não começaram nem chegam a rodar, os demais
+            # param na próxima verificação do cancelamento.
+            cancelamento.set()
+            for futuro in corrida:
+                futuro.cancel()
+            if executor is not self._executor:
+                executor.shutdown(wait=False)
+
+    @staticmethod
+    def _primeiro_valido(
+        corrida: Dict[Future, str], limite: float
+    ) -> Tuple[Optional[str], Optional[object]]:
+        pendentes = set(corrida)
+        while pendentes:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            concluidos, pendentes = wait(
+                pendentes, timeout=restante, return_when=FIRST_COMPLETED
+            )
+            for futuro in concluidos:
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    logger.warning(f"reCAPTCHA strategy {corrida[futuro]} failed: {e}")
+                    continue
+                if resultado:
+                    return corrida[futuro], resultado
+                logger.info(f"reCAPTCHA strategy {corrida[futuro]} gave up")
+        return None, None
+
+
+class RecaptchaReservatorioSolver(IRecaptchaSolver):
+    """
+    Usa um token do reservatório quando há um válido para a página; senão,
+    delega a `solver` (por exemplo, o roteamento entre provedores). Assim o
+    reservatório vale para qualquer estratégia, e os tokens tirados dele não
+    entram nas estatísticas dos provedores.
+    """
+
+    def __init__(
+        self,
+        web_driver: IWebDriverManager,
+        solver: IRecaptchaSolver,
+        reservatorio: ReservatorioTokensRecaptcha,
+    ):
+        self._web_driver = web_driver
+        self._solver = solver
+        self._reservatorio = reservatorio
+
+    def resolver(self) -> bool:
+        site_key = self._web_driver.executar_script(SCRIPT_SITE_KEY)
+        if site_key:
+            page_url = self._web_driver.executar_script("return window.location.href;")
+            if self._reservatorio.atende(site_key, page_url):
+                token = self._reservatorio.retirar()
+                if token:
+                    logger.info("reCAPTCHA solved with a reserved token")
+                    return inserir_token(self._web_driver, token)
+        return self._solver.resolver()
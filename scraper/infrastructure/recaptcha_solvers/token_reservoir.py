@@ -0,0 +1,271 @@
+# Reservoir of pre-solved reCAPTCHA tokens
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _TokenPronto:
+    valor: str
+    expira_em: float
+
+
+class ReservatorioTokensRecaptcha:
+    """
+    Mantém tokens de reCAPTCHA já resolvidos para um site key e uma página.
+
+    Tokens do reCAPTCHA valem cerca de dois minutos; cada um é descartado
+    `validade_segundos` após ficar pronto, antes de o Google recusá-lo. A
+    quantidade mantida (pronta + em resolução) acompanha a demanda: é a taxa de
+    retiradas na última `janela_demanda_segundos` vezes o tempo médio de
+    solução (Lei de Little), entre `minimo` e `capacidade`. Assim, sem logins
+    o reservatório encolhe até `minimo` e não gasta créditos à toa.
+
+    O abastecimento roda em threads (`iniciar`) ou, com `manter_assincrono`, em
+    corrotinas do event loop, cada token em resolução sem ocupar uma thread.
+    """
+
+    def __init__(
+        self,
+        solicitar_token: Callable[[str, str], Optional[str]],
+        site_key: str,
+        page_url: str,
+        minimo: int = 1,
+        capacidade: int = 5,
+        validade_segundos: float = 100,
+        janela_demanda_segundos: float = 300,
+        tempo_solucao_inicial_segundos: float = 30,
+        intervalo_manutencao_segundos: float = 1,
+        executor: Optional[Executor] = None,
+    ):
+        if capacidade < 1:
+            raise ValueError("capacidade deve ser maior que zero")
+        self._solicitar_token = solicitar_token
+        self.site_key = site_key
+        self.page_url = page_url
+        self.minimo = max(0, min(minimo, capacidade))
+        self.capacidade = capacidade
+        self.validade_segundos = validade_segundos
+        self.janela_demanda_segundos = janela_demanda_segundos
+        self.intervalo_manutencao_segundos = intervalo_manutencao_segundos
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=capacidade, thread_name_prefix="recaptcha-reservatorio"
+        )
+
+        self._lock = threading.Lock()
+        self._prontos: Deque[_TokenPronto] = deque()
+        self._em_andamento = 0
+        self._retiradas_recentes: Deque[float] = deque()
+        # Média móvel exponencial do tempo de solução
+        self._tempo_solucao = tempo_solucao_inicial_segundos
+        # Após falhas seguidas do provedor, o abastecimento espera (backoff)
+        self._falhas_seguidas = 0
+        self._pausado_ate = 0.0
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Com o abastecimento no event loop, acorda o loop de manutenção
+        self._acordar: Optional[Callable[[], None]] = None
+
+        self._contadores = {
+            "retiradas": 0,
+            "secos": 0,
+            "desperdicados": 0,
+            "solicitados": 0,
+            "resolvidos": 0,
+            "falhas_solicitacao": 0,
+        }
+
+    def iniciar(self) -> None:
+        """Começa a abastecer o reservatório em segundo plano."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(
+            target=self._manter, name="recaptcha-reservatorio", daemon=True
+        )
+        self._thread.start()
+
+    async def manter_assincrono(
+        self, solicitar_token: Callable[[str, str], Awaitable[Optional[str]]]
+    ) -> None:
+        """
+        Abastece o reservatório no event loop atual, com `solicitar_token`
+        assíncrono no lugar do recebido no construtor, até `encerrar()` ou até
+        ser cancelada. Retiradas feitas por outras threads acordam o loop.
+        """
+        loop = asyncio.get_running_loop()
+        acordado = asyncio.Event()
+        tarefas: Set[asyncio.Task] = set()
+        self._parar.clear()
+        self._acordar = lambda: loop.call_soon_threadsafe(acordado.set)
+        try:
+            while not self._parar.is_set():
+                with self._lock:
+                    self._descartar_expirados(time.monotonic())
+                for _ in range(self._reservar()):
+                    tarefa = asyncio.create_task(
+                        self._resolver_um_assincrono(solicitar_token)
+                    )
+                    tarefas.add(tarefa)
+                    tarefa.add_done_callback(tarefas.discard)
+                acordado.clear()
+                try:
+                    await asyncio.wait_for(
+                        acordado.wait(), self.intervalo_manutencao_segundos
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._acordar = None
+            for tarefa in tarefas:
+                tarefa.cancel()
+
+    def encerrar(self) -> None:
+        self._parar.set()
+        if self._acordar:
+            self._acordar()
+
+    def atende(self, site_key: str, page_url: str) -> bool:
+        """Tokens só valem para o mesmo site key e o mesmo domínio da página."""
+        return (
+            site_key == self.site_key
+            and urlparse(page_url).netloc == urlparse(self.page_url).netloc
+        )
+
+    def retirar(self) -> Optional[str]:
+        """Entrega na hora um token válido, ou None se o reservatório estiver seco."""
+        agora = time.monotonic()
+        with self._lock:
+            self._descartar_expirados(agora)
+            self._retiradas_recentes.append(agora)
+            if self._prontos:
+                # O mais antigo primeiro: é o que venceria antes.
+                token = self._prontos.popleft()
+                self._contadores["retiradas"] += 1
+            else:
+                token = None
+                self._contadores["secos"] += 1
+        self._abastecer()
+        if token is None:
+            logger.warning("🫙 Reservatório de reCAPTCHA vazio")
+            return None
+        logger.info("🎟️ Token de reCAPTCHA retirado do reservatório")
+        return token.valor
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            self._descartar_expirados(time.monotonic())
+            pedidos = self._contadores["retiradas"] + self._contadores["secos"]
+            produzidos = self._contadores["resolvidos"]
+            return {
+                "prontos": len(self._prontos),
+                "em_andamento": self._em_andamento,
+                "alvo": self._alvo(time.monotonic()),
+                "minimo": self.minimo,
+                "capacidade": self.capacidade,
+                "tempo_medio_solucao_segundos": round(self._tempo_solucao, 2),
+                "taxa_seco": (
+                    round(self._contadores["secos"] / pedidos, 4) if pedidos else None
+                ),
+                "taxa_desperdicio": (
+                    round(self._contadores["desperdicados"] / produzidos, 4)
+                    if produzidos
+                    else None
+                ),
+                **self._contadores,
+            }
+
+    def _manter(self) -> None:
+        while not self._parar.is_set():
+            with self._lock:
+                self._descartar_expirados(time.monotonic())
+            self._abastecer()
+            self._parar.wait(self.intervalo_manutencao_segundos)
+
+    def _alvo(self, agora: float) -> int:
+        """Tokens que devem existir (prontos + em resolução). Chamado com `_lock`."""
+        while (
+            self._retiradas_recentes
+            and agora - self._retiradas_recentes[0] > self.janela_demanda_segundos
+        ):
+            self._retiradas_recentes.popleft()
+        taxa = len(self._retiradas_recentes) / self.janela_demanda_segundos
+        necessarios = math.ceil(taxa * self._tempo_solucao)
+        return max(self.minimo, min(self.capacidade, necessarios))
+
+    def _abastecer(self) -> None:
+        acordar = self._acordar
+        if acordar is not None:
+            # Abastecido pelo event loop (`manter_assincrono`)
+            acordar()
+            return
+        for _ in range(self._reservar()):
+            self._executor.submit(self._resolver_um)
+
+    def _reservar(self) -> int:
+        """Quantos tokens solicitar agora, já contados como em andamento."""
+        if self._parar.is_set():
+            return 0
+        with self._lock:
+            if time.monotonic() < self._pausado_ate:
+                return 0
+            faltam = self._alvo(time.monotonic()) - (
+                len(self._prontos) + self._em_andamento
+            )
+            faltam = max(0, faltam)
+            self._em_andamento += faltam
+            self._contadores["solicitados"] += faltam
+        return faltam
+
+    def _resolver_um(self) -> None:
+        inicio = time.monotonic()
+        token = None
+        try:
+            token = self._solicitar_token(self.site_key, self.page_url)
+        except Exception as e:
+            logger.error(f"Erro ao abastecer reservatório de reCAPTCHA: {e}")
+        finally:
+            self._registrar_solucao(token, inicio)
+
+    async def _resolver_um_assincrono(
+        self, solicitar_token: Callable[[str, str], Awaitable[Optional[str]]]
+    ) -> None:
+        inicio = time.monotonic()
+        token = None
+        try:
+            token = await solicitar_token(self.site_key, self.page_url)
+        except Exception as e:
+            logger.error(f"Erro ao abastecer reservatório de reCAPTCHA: {e}")
+        finally:
+            self._registrar_solucao(token, inicio)
+
+    def _registrar_solucao(self, token: Optional[str], inicio: float) -> None:
+        agora = time.monotonic()
+        with self._lock:
+            self._em_andamento -= 1
+            if token:
+                self._tempo_solucao = 0.8 * self._tempo_solucao + 0.2 * (agora - inicio)
+                self._prontos.append(
+                    _TokenPronto(token, agora + self.validade_segundos)
+                )
+                self._contadores["resolvidos"] += 1
+                self._falhas_seguidas = 0
+            else:
+                self._contadores["falhas_solicitacao"] += 1
+                self._falhas_seguidas += 1
+                self._pausado_ate = agora + min(60, 2**self._falhas_seguidas)
+
+    def _descartar_expirados(self, agora: float) -> None:
+        """Chamado com `_lock` adquirido."""
+        while self._prontos and self._prontos[0].expira_em <= agora:
+            self._prontos.popleft()
+            self._contadores["desperdicados"] += 1
@@ -0,0 +1,147 @@
+# Cassette of recorded upstream interactions
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+VERSAO_CASSETE = 1
+
+NAVEGADOR = "navegador"
+FATURAS = "faturas"
+CAPTCHA = "captcha"
+
+_Fila = Tuple[str, str, Optional[str], bool]
+
+
+def chave_script(script: str) -> str:
+    """Scripts inteiros não cabem numa chave compacta: usa-se um hash."""
+    return hashlib.sha1(script.encode()).hexdigest()[:16]
+
+
+@dataclass
+class Interacao:
+    tipo: str
+    metodo: str
+    # Argumento que identifica a chamada (seletor, URL, hash do script, UC)
+    chave: str
+    duracao: float
+    resultado: Any = None
+    erro: Optional[str] = None
+    # Chamada ao navegador feita durante a resolução do captcha
+    no_captcha: bool = False
+
+
+class Cassete:
+    """
+    Interações com o navegador, o solver de captcha e a API de faturas, na
+    ordem em que aconteceram, gravadas em JSON compactado com gzip.
+
+    Na reprodução, cada (tipo, método, chave) tem sua própria fila: chamadas de
+    threads diferentes podem se intercalar de outro jeito sem desalinhar as
+    respostas. Com `ciclica`, uma fila esgotada recomeça do início, para que a
+    mesma gravação sirva a quantos logins e consultas forem necessários.
+
+    Cassetes contêm as respostas do portal, inclusive o token de autenticação:
+    trate o arquivo como uma credencial.
+    """
+
+    def __init__(self, interacoes: Optional[List[Interacao]] = None, ciclica=True):
+        self.interacoes: List[Interacao] = list(interacoes or [])
+        self.ciclica = ciclica
+        self._lock = threading.Lock()
+        # Uma gravação em disco por vez (a periódica e a do atexit)
+        self._lock_arquivo = threading.Lock()
+        self._filas: Dict[_Fila, List[Interacao]] = {}
+        self._posicoes: Dict[_Fila, int] = {}
+        self._salvas = len(self.interacoes)
+
+    def registrar(self, interacao: Interacao) -> None:
+        with self._lock:
+            self.interacoes.append(interacao)
+
+    def proxima(
+        self,
+        tipo: str,
+        metodo: str,
+        chave: Optional[str],
+        incluir_captcha: bool = True,
+    ) -> Optional[Interacao]:
+        """
+        Próxima interação gravada para a chamada, ou None se não houver (ou se
+        a fila acabou e a cassete não é cíclica). `chave` None aceita qualquer
+        chave do método.
+        """
+        fila_id = (tipo, metodo, chave, incluir_captcha)
+        with self._lock:
+            fila = self._filas.get(fila_id)
+            if fila is None:
+                fila = self._filas[fila_id] = [
+                    interacao
+                    for interacao in self.interacoes
+                    if interacao.tipo == tipo
+                    and interacao.metodo == metodo
+                    and (chave is None or interacao.chave == chave)
+                    and (incluir_captcha or not interacao.no_captcha)
+                ]
+            if not fila:
+                return None
+            posicao = self._posicoes.get(fila_id, 0)
+            if posicao >= len(fila):
+                if not self.ciclica:
+                    return None
+                posicao = 0
+            self._posicoes[fila_id] = posicao + 1
+            return fila[posicao]
+
+    def salvar(self, caminho: str) -> None:
+        """
+        Grava num arquivo temporário e o renomeia: uma gravação interrompida
+        nunca deixa a cassete anterior truncada.
+        """
+        with self._lock:
+            dados = {
+                "versao": VERSAO_CASSETE,
+                "interacoes": [asdict(interacao) for interacao in self.interacoes],
+            }
+            total = len(self.interacoes)
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        temporario = f"{caminho}.tmp"
+        with self._lock_arquivo:
+            with gzip.open(temporario, "wt", encoding="utf-8") as arquivo:
+                json.dump(dados, arquivo, separators=(",", ":"), ensure_ascii=False)
+            os.replace(temporario, caminho)
+        with self._lock:
+            self._salvas = max(self._salvas, total)
+
+    def salvar_periodicamente(self, caminho: str, intervalo_segundos: float) -> None:
+        """
+        Salva a cassete em `caminho` a cada `intervalo_segundos`, quando há
+        interações novas. Um processo encerrado sem passar pelo `atexit`
+        (SIGTERM, SIGKILL) perde no máximo o último intervalo de gravação.
+        """
+
+        def salvar_continuamente() -> None:
+            while True:
+                time.sleep(intervalo_segundos)
+                with self._lock:
+                    pendentes = len(self.interacoes) > self._salvas
+                if pendentes:
+                    self.salvar(caminho)
+
+        threading.Thread(
+            target=salvar_continuamente, name="cassete-gravacao", daemon=True
+        ).start()
+
+    @classmethod
+    def carregar(cls, caminho: str, ciclica: bool = True) -> "Cassete":
+        with gzip.open(caminho, "rt", encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        if dados.get("versao") != VERSAO_CASSETE:
+            raise ValueError(f"Versão de cassete não suportada: {dados.get('versao')}")
+        return cls(
+            [Interacao(**interacao) for interacao in dados["interacoes"]], ciclica
+        )
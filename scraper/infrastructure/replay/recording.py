@@ -0,0 +1,203 @@
+# Recorders that capture upstream interactions into a cassette
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from scraper.application.interfaces import (
+    IFaturaService,
+    IRecaptchaSolver,
+    IWebDriverManager,
+)
+from scraper.domain.models import FaturaDTO, LocalizacaoUsuario, TokenAcesso
+from scraper.infrastructure.replay.cassette import (
+    CAPTCHA,
+    FATURAS,
+    NAVEGADOR,
+    Cassete,
+    Interacao,
+    chave_script,
+)
+
+logger = logging.getLogger(__name__)
+
+# Verdadeiro enquanto um solver gravado resolve o captcha: as chamadas ao
+# navegador feitas por ele são marcadas, para que a reprodução possa pulá-las
+_no_captcha: ContextVar[bool] = ContextVar("gravando_captcha", default=False)
+
+
+def _serializavel(valor: Any) -> Any:
+    # Elementos do Selenium e afins viram texto; o resto é JSON tal como veio
+    try:
+        json.dumps(valor)
+        return valor
+    except (TypeError, ValueError):
+        return str(valor)
+
+
+class _Gravador:
+    def __init__(self, cassete: Cassete, tipo: str):
+        self._cassete = cassete
+        self._tipo = tipo
+
+    def _gravar(
+        self,
+        metodo: str,
+        chave: str,
+        chamada: Callable[[], Any],
+        serializar: Callable[[Any], Any] = _serializavel,
+    ) -> Any:
+        inicio = time.perf_counter()
+        try:
+            resultado = chamada()
+        except Exception as e:
+            self._registrar(metodo, chave, inicio, erro=str(e) or type(e).__name__)
+            raise
+        self._registrar(metodo, chave, inicio, resultado=serializar(resultado))
+        return resultado
+
+    def _registrar(
+        self,
+        metodo: str,
+        chave: str,
+        inicio: float,
+        resultado: Any = None,
+        erro: Optional[str] = None,
+    ) -> None:
+        self._cassete.registrar(
+            Interacao(
+                tipo=self._tipo,
+                metodo=metodo,
+                chave=chave,
+                duracao=round(time.perf_counter() - inicio, 4),
+                resultado=resultado,
+                erro=erro,
+                no_captcha=_no_captcha.get(),
+            )
+        )
+
+
+class WebDriverManagerGravador(_Gravador, IWebDriverManager):
+    """
+    Grava cada comando ao navegador e sua resposta. Os valores digitados em
+    campos (CPF, senha) nunca são gravados, só o seletor.
+    """
+
+    def __init__(self, manager: IWebDriverManager, cassete: Cassete):
+        super().__init__(cassete, NAVEGADOR)
+        self._manager = manager
+
+    def inicializar(self) -> bool:
+        return self._gravar("inicializar", "", self._manager.inicializar)
+
+    def finalizar(self) -> bool:
+        return self._gravar("finalizar", "", self._manager.finalizar)
+
+    def executar_script(self, script: str) -> Any:
+        return self._gravar(
+            "executar_script",
+            chave_script(script),
+            lambda: self._manager.executar_script(script),
+        )
+
+    def executar_script_assincrono(self, script: str, timeout: float = 10) -> Any:
+        return self._gravar(
+            "executar_script_assincrono",
+            chave_script(script),
+            lambda: self._manager.executar_script_assincrono(script, timeout),
+        )
+
+    def navegar_para(self, url: str) -> bool:
+        return self._gravar(
+            "navegar_para", url, lambda: self._manager.navegar_para(url)
+        )
+
+    def preencher_campo(self, seletor: str, valor: str) -> bool:
+        return self._gravar(
+            "preencher_campo",
+            seletor,
+            lambda: self._manager.preencher_campo(seletor, valor),
+        )
+
+    def clicar_elemento(self, seletor: str) -> bool:
+        return self._gravar(
+            "clicar_elemento", seletor, lambda: self._manager.clicar_elemento(seletor)
+        )
+
+    def aguardar_elemento(self, seletor: str, timeout: int = 10) -> bool:
+        return self._gravar(
+            "aguardar_elemento",
+            seletor,
+            lambda: self._manager.aguardar_elemento(seletor, timeout),
+        )
+
+    def aguardar_condicao(self, script: str, timeout: float = 10) -> Any:
+        return self._gravar(
+            "aguardar_condicao",
+            chave_script(script),
+            lambda: self._manager.aguardar_condicao(script, timeout),
+        )
+
+    def aguardar_resposta_rede(
+        self, padrao_url: str, timeout: float = 10
+    ) -> Optional[Dict[str, Any]]:
+        return self._gravar(
+            "aguardar_resposta_rede",
+            padrao_url,
+            lambda: self._manager.aguardar_resposta_rede(padrao_url, timeout),
+        )
+
+
+class FaturaServiceGravador(_Gravador, IFaturaService):
+    """Grava as faturas devolvidas por UC; o token da consulta não é gravado."""
+
+    def __init__(self, fatura_service: IFaturaService, cassete: Cassete):
+        super().__init__(cassete, FATURAS)
+        self._fatura_service = fatura_service
+
+    def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        return self._gravar(
+            "obter_faturas_abertas",
+            unidade_consumidora,
+            lambda: self._fatura_service.obter_faturas_abertas(
+                token, unidade_consumidora, client_id, localizacao
+            ),
+            _serializar_faturas,
+        )
+
+
+class RecaptchaSolverGravador(_Gravador, IRecaptchaSolver):
+    """
+    Grava o resultado de cada resolução e marca as chamadas ao navegador feitas
+    durante ela (inclusive nas threads do solver híbrido, que herdam o contexto).
+    """
+
+    def __init__(self, solver: IRecaptchaSolver, cassete: Cassete):
+        super().__init__(cassete, CAPTCHA)
+        self._solver = solver
+
+    def resolver(self) -> bool:
+        inicio = time.perf_counter()
+        marca = _no_captcha.set(True)
+        try:
+            resultado = self._solver.resolver()
+        except Exception as e:
+            _no_captcha.reset(marca)
+            self._registrar("resolver", "", inicio, erro=str(e) or type(e).__name__)
+            raise
+        _no_captcha.reset(marca)
+        self._registrar("resolver", "", inicio, resultado=bool(resultado))
+        return resultado
+
+
+def _serializar_faturas(faturas: Optional[List[FaturaDTO]]) -> Optional[List[Dict]]:
+    if faturas is None:
+        return None
+    return [fatura.model_dump(by_alias=True) for fatura in faturas]
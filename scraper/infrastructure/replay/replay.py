@@ -0,0 +1,140 @@
+# Replay backends that serve recorded interactions back from a cassette
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from scraper.application.interfaces import (
+    IFaturaService,
+    IRecaptchaSolver,
+    IWebDriverManager,
+)
+from scraper.domain.exceptions import WebDriverError
+from scraper.domain.models import FaturaDTO, LocalizacaoUsuario, TokenAcesso
+from scraper.infrastructure.replay.cassette import (
+    CAPTCHA,
+    FATURAS,
+    NAVEGADOR,
+    Cassete,
+    Interacao,
+    chave_script,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Reprodutor:
+    def __init__(self, cassete: Cassete, fator_velocidade: float = 1.0):
+        # 1: velocidade gravada; 10: dez vezes mais rápido; 0: sem esperas
+        self._cassete = cassete
+        self.fator_velocidade = fator_velocidade
+
+    def _esperar(self, interacao: Interacao) -> None:
+        if self.fator_velocidade > 0 and interacao.duracao > 0:
+            time.sleep(interacao.duracao / self.fator_velocidade)
+
+
+class WebDriverManagerReproducao(_Reprodutor, IWebDriverManager):
+    """
+    Responde aos comandos do navegador com as respostas gravadas para o mesmo
+    método e seletor/URL/script, sem abrir o Chrome.
+
+    Um comando sem gravação correspondente levanta WebDriverError (o fluxo
+    divergiu da gravação), assim como um comando que falhou ao ser gravado.
+    Com `incluir_captcha` falso (padrão), os comandos feitos pelo solver de
+    captcha ficam de fora: quem responde por ele é `RecaptchaSolverReproducao`.
+    """
+
+    def __init__(
+        self,
+        cassete: Cassete,
+        fator_velocidade: float = 1.0,
+        incluir_captcha: bool = False,
+    ):
+        super().__init__(cassete, fator_velocidade)
+        self.incluir_captcha = incluir_captcha
+
+    def _reproduzir(self, metodo: str, chave: str) -> Any:
+        interacao = self._cassete.proxima(
+            NAVEGADOR, metodo, chave, self.incluir_captcha
+        )
+        if interacao is None:
+            raise WebDriverError(f"Cassete sem gravação de {metodo}({chave!r})")
+        self._esperar(interacao)
+        if interacao.erro is not None:
+            raise WebDriverError(interacao.erro)
+        return interacao.resultado
+
+    def inicializar(self) -> bool:
+        return True
+
+    def finalizar(self) -> bool:
+        return True
+
+    def executar_script(self, script: str) -> Any:
+        return self._reproduzir("executar_script", chave_script(script))
+
+    def executar_script_assincrono(self, script: str, timeout: float = 10) -> Any:
+        return self._reproduzir("executar_script_assincrono", chave_script(script))
+
+    def navegar_para(self, url: str) -> bool:
+        return self._reproduzir("navegar_para", url)
+
+    def preencher_campo(self, seletor: str, valor: str) -> bool:
+        return self._reproduzir("preencher_campo", seletor)
+
+    def clicar_elemento(self, seletor: str) -> bool:
+        return self._reproduzir("clicar_elemento", seletor)
+
+    def aguardar_elemento(self, seletor: str, timeout: int = 10) -> bool:
+        return self._reproduzir("aguardar_elemento", seletor)
+
+    def aguardar_condicao(self, script: str, timeout: float = 10) -> Any:
+        return self._reproduzir("aguardar_condicao", chave_script(script))
+
+    def aguardar_resposta_rede(
+        self, padrao_url: str, timeout: float = 10
+    ) -> Optional[Dict[str, Any]]:
+        return self._reproduzir("aguardar_resposta_rede", padrao_url)
+
+
+class FaturaServiceReproducao(_Reprodutor, IFaturaService):
+    """
+    Devolve as faturas gravadas para a UC consultada. UCs que não estão na
+    cassete recebem, em ordem, as respostas gravadas para outras UCs, com o
+    número da UC trocado (útil em testes de carga com muitas UCs).
+    """
+
+    def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        metodo = "obter_faturas_abertas"
+        interacao = self._cassete.proxima(
+            FATURAS, metodo, unidade_consumidora
+        ) or self._cassete.proxima(FATURAS, metodo, None)
+        if interacao is None:
+            logger.error("❌ Cassete sem consultas de faturas gravadas")
+            return None
+        self._esperar(interacao)
+        if interacao.erro is not None or interacao.resultado is None:
+            return None
+        faturas = [FaturaDTO.model_validate(dados) for dados in interacao.resultado]
+        if interacao.chave != unidade_consumidora and unidade_consumidora.isdigit():
+            for fatura in faturas:
+                fatura.uc = int(unidade_consumidora)
+        return faturas
+
+
+class RecaptchaSolverReproducao(_Reprodutor, IRecaptchaSolver):
+    """Repete o resultado (e o tempo) das resoluções de captcha gravadas."""
+
+    def resolver(self) -> bool:
+        interacao = self._cassete.proxima(CAPTCHA, "resolver", "")
+        if interacao is None:
+            logger.error("❌ Cassete sem resoluções de captcha gravadas")
+            return False
+        self._esperar(interacao)
+        return interacao.erro is None and bool(interacao.resultado)
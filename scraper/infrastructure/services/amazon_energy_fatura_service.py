@@ -5,12 +5,39 @@ from typing import Dict, List, Optional
 import requests
 
 from scraper.application.interfaces import IFaturaService
+from scraper.application.metrics import (
+    FALHA,
+    MetricasPrometheus,
+    medir_etapa,
+    resultado_da_excecao,
+)
 from scraper.domain.models import FaturaDTO, LocalizacaoUsuario, TokenAcesso
+from scraper.infrastructure.http.pooled_client import (
+    ClienteHTTP,
+    cliente_compartilhado,
+)
 
 logger = logging.getLogger(__name__)
 
+URL_API = "https://api-agencia.amazonasenergia.com"
+CAMINHO_FATURAS_ABERTAS = "/api/faturas/abertas"
+URL_FATURAS_ABERTAS = URL_API + CAMINHO_FATURAS_ABERTAS
+
 
 class AmazonasEnergyFaturaService(IFaturaService):
+    def __init__(
+        self,
+        metricas: Optional[MetricasPrometheus] = None,
+        url: str = URL_FATURAS_ABERTAS,
+        http: Optional[ClienteHTTP] = None,
+    ):
+        # Duração e resultado de cada consulta (componente "api_faturas")
+        self.metricas = metricas
+        self.url = url
+        # Conexões keep-alive, timeouts e limite por host; sem injeção, o
+        # cliente compartilhado do processo
+        self.http = http or cliente_compartilhado()
+
     def obter_faturas_abertas(
         self,
         token: TokenAcesso,
@@ -18,24 +45,27 @@ class AmazonasEnergyFaturaService(IFaturaService):
         client_id: str,
         localizacao: LocalizacaoUsuario,
     ) -> Optional[List[FaturaDTO]]:
-        url = "https://api-agencia.amazonasenergia.com/api/faturas/abertas"
+        url = self.url
         headers = self._construir_headers(
             token, unidade_consumidora, client_id, localizacao
         )
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            if "application/json" in response.headers.get("Content-Type", ""):
-                faturas_data = response.json()
-                return self._converter_para_faturas_dto(faturas_data)
-            else:
+        with medir_etapa(self.metricas, "api_faturas", "faturas_abertas") as medicao:
+            try:
+                response = self.http.get(url, headers=headers)
+                response.raise_for_status()
+                if "application/json" in response.headers.get("Content-Type", ""):
+                    faturas_data = response.json()
+                    return self._converter_para_faturas_dto(faturas_data)
+                else:
+                    medicao["resultado"] = FALHA
+                    return None
+            except requests.exceptions.RequestException as e:
+                medicao["resultado"] = resultado_da_excecao(e)
+                logger.error(f"Erro na requisição das faturas: {e}")
                 return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro na requisição das faturas: {e}")
-            return None
 
+    @staticmethod
     def _construir_headers(
-        self,
         token: TokenAcesso,
         unidade_consumidora: str,
         client_id: str,
@@ -53,5 +83,6 @@ class AmazonasEnergyFaturaService(IFaturaService):
             "Referer": "https://agencia.amazonasenergia.com/",
         }
 
-    def _converter_para_faturas_dto(self, faturas_data: List[Dict]) -> List[FaturaDTO]:
+    @staticmethod
+    def _converter_para_faturas_dto(faturas_data: List[Dict]) -> List[FaturaDTO]:
         return [FaturaDTO.model_validate(fatura) for fatura in faturas_data]
@@ -0,0 +1,104 @@
+# Amazon Energy Fatura Service (asyncio) implementation
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import List, Optional
+
+import httpx
+
+from scraper.application.interfaces import IAsyncFaturaService, IFaturaService
+from scraper.application.metrics import (
+    FALHA,
+    MetricasPrometheus,
+    medir_etapa,
+    resultado_da_excecao,
+)
+from scraper.domain.models import FaturaDTO, LocalizacaoUsuario, TokenAcesso
+from scraper.infrastructure.http.async_client import ClienteHTTPAssincrono
+from scraper.infrastructure.services.amazon_energy_fatura_service import (
+    URL_FATURAS_ABERTAS,
+    AmazonasEnergyFaturaService,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAmazonasEnergyFaturaService(IAsyncFaturaService):
+    """
+    Mesma consulta de `AmazonasEnergyFaturaService`, sem bloquear threads: as
+    requisições compartilham um `ClienteHTTPAssincrono`, de modo que milhares
+    de consultas simultâneas cabem em um só event loop. Quem cria o cliente é
+    responsável por fechá-lo.
+    """
+
+    def __init__(
+        self,
+        http: ClienteHTTPAssincrono,
+        metricas: Optional[MetricasPrometheus] = None,
+        url: str = URL_FATURAS_ABERTAS,
+    ):
+        self.http = http
+        # Duração e resultado de cada consulta (componente "api_faturas")
+        self.metricas = metricas
+        self.url = url
+
+    async def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        headers = AmazonasEnergyFaturaService._construir_headers(
+            token, unidade_consumidora, client_id, localizacao
+        )
+        with medir_etapa(self.metricas, "api_faturas", "faturas_abertas") as medicao:
+            try:
+                response = await self.http.get(self.url, headers=headers)
+                response.raise_for_status()
+                if "application/json" in response.headers.get("Content-Type", ""):
+                    return AmazonasEnergyFaturaService._converter_para_faturas_dto(
+                        response.json()
+                    )
+                medicao["resultado"] = FALHA
+                return None
+            except httpx.HTTPError as e:
+                medicao["resultado"] = resultado_da_excecao(e)
+                logger.error(f"Erro na requisição das faturas: {e}")
+                return None
+
+
+class FaturaServiceEmThreads(IAsyncFaturaService):
+    """
+    Adapta um IFaturaService síncrono (como a gravação ou a reprodução de uma
+    cassete) rodando cada consulta em `executor`, com o contexto de quem chamou.
+    """
+
+    def __init__(
+        self,
+        fatura_service: IFaturaService,
+        executor: Optional[Executor] = None,
+        max_trabalhadores: int = 16,
+    ):
+        self._fatura_service = fatura_service
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max_trabalhadores, thread_name_prefix="faturas-sincronas"
+        )
+
+    async def obter_faturas_abertas(
+        self,
+        token: TokenAcesso,
+        unidade_consumidora: str,
+        client_id: str,
+        localizacao: LocalizacaoUsuario,
+    ) -> Optional[List[FaturaDTO]]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            copy_context().run,
+            self._fatura_service.obter_faturas_abertas,
+            token,
+            unidade_consumidora,
+            client_id,
+            localizacao,
+        )
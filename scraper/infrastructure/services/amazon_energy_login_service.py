@@ -1,61 +1,185 @@
 # Amazon Energy Login Service implementation
+import json
 import logging
+import re
 import time
-from typing import Optional, Tuple
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
 
 from scraper.application.interfaces import (
     ILoginService,
     IRecaptchaSolver,
     IWebDriverManager,
 )
-from scraper.domain.models import Credenciais, InformacoesUsuario, TokenAcesso
+from scraper.application.metrics import (
+    FALHA,
+    MetricasPrometheus,
+    medir_etapa,
+)
+from scraper.domain.models import (
+    Credenciais,
+    InformacoesUsuario,
+    TokenAcesso,
+    decodificar_claims_jwt,
+)
 
 logger = logging.getLogger(__name__)
 
+URL_PORTAL = "https://agencia.amazonasenergia.com/"
+SELETOR_CPF_CNPJ = "input[name='CPF_CNPJ']"
+SCRIPT_TOKEN = "return localStorage.getItem('@AGENCIA-VIRTUAL:TOKEN-KEY');"
+# Caminho da chamada XHR de autenticação: o último segmento é login, auth ou
+# token (como em /api/auth/login), sem casar com /api/tokens/... ou /authors
+_CAMINHO_AUTENTICACAO = r"/(?:[^?#]*/)?(?:login|auth|token)/?(?:[?#]|$)"
+PADRAO_URL_AUTENTICACAO = r"api-agencia\.amazonasenergia\.com" + _CAMINHO_AUTENTICACAO
+
+
+def padrao_url_autenticacao(url_api: str) -> str:
+    """Padrão da chamada de autenticação para a API em `url_api`."""
+    return re.escape(urlparse(url_api).netloc) + _CAMINHO_AUTENTICACAO
+
+
+_Autenticacao = Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]
+
 
 class AmazonasEnergyLoginService(ILoginService):
+    """
+    Login na agência virtual. Em vez de pausas fixas, cada passo espera por uma
+    condição de prontidão (página carregada, formulário presente, resposta da
+    API de autenticação) por no máximo o timeout configurado para ela. O tempo
+    gasto em cada espera fica em `tempos_espera` e em `metricas`
+    (componente "esperas_login").
+
+    Token e dados do usuário são lidos da resposta XHR de autenticação assim
+    que ela chega (eventos de rede do DevTools); o localStorage só é consultado
+    se a resposta não trouxer o token.
+
+    `autenticacao` é um Future resolvido com (token, user_info) assim que a
+    resposta de autenticação é lida, antes dos passos que ainda seguem no
+    navegador; em caso de falha, com (None, None) ao fim do login. Quem
+    acompanha o login de outra thread (ou registra um callback) não precisa
+    esperar `autenticar` retornar.
+    """
+
     def __init__(
-        self, web_driver_manager: IWebDriverManager, recaptcha_solver: IRecaptchaSolver
+        self,
+        web_driver_manager: IWebDriverManager,
+        recaptcha_solver: IRecaptchaSolver,
+        timeout_formulario: float = 10,
+        timeout_token: float = 15,
+        padrao_url_autenticacao: str = PADRAO_URL_AUTENTICACAO,
+        metricas: Optional[MetricasPrometheus] = None,
+        url_portal: str = URL_PORTAL,
     ):
         self._web_driver_manager = web_driver_manager
         self._recaptcha_solver = recaptcha_solver
+        self.timeout_formulario = timeout_formulario
+        self.timeout_token = timeout_token
+        self.padrao_url_autenticacao = padrao_url_autenticacao
+        self.url_portal = url_portal
+        # Duração e resultado de cada etapa do login (componente "login") e de
+        # cada espera (componente "esperas_login")
+        self.metricas = metricas
+        # Segundos gastos em cada espera do último login
+        self.tempos_espera: Dict[str, float] = {}
+        self._autenticacao: "Future[_Autenticacao]" = Future()
 
-    def autenticar(
-        self, credenciais: Credenciais
-    ) -> Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]:
+    @property
+    def autenticacao(self) -> "Future[_Autenticacao]":
+        return self._autenticacao
+
+    def autenticar(self, credenciais: Credenciais) -> _Autenticacao:
+        # O Future criado antes do primeiro login é o dele; os seguintes ganham
+        # um novo
+        if self._autenticacao.done():
+            self._autenticacao = Future()
+        self.tempos_espera = {}
+        with medir_etapa(self.metricas, "login", "autenticar") as medicao:
+            token, user_info = self._executar_login(credenciais)
+            if not token:
+                medicao["resultado"] = FALHA
+        return token, user_info
+
+    def _executar_login(self, credenciais: Credenciais) -> _Autenticacao:
         try:
-            if not self._inicializar_navegador():
+            if not self._etapa("navegacao", self._inicializar_navegador):
                 return None, None
-            if not self._preencher_credenciais(credenciais):
+            if not self._etapa(
+                "credenciais", lambda: self._preencher_credenciais(credenciais)
+            ):
                 return None, None
-            if not self._recaptcha_solver.resolver():
+            if not self._etapa("captcha", self._recaptcha_solver.resolver):
                 return None, None
-            if not self._clicar_botao_login():
+            if not self._etapa("clique_login", self._clicar_botao_login):
                 return None, None
 
-            time.sleep(5)
-
-            token = self._obter_token_acesso()
+            token, user_info = self._etapa(
+                "token", self._capturar_autenticacao, sucesso=lambda r: bool(r[0])
+            )
             if not token:
                 return None, None
 
-            user_info = self._extrair_informacoes_usuario()
             logger.info("✅ Login realizado com sucesso!")
             return token, user_info
         except Exception as e:
             logger.error(f"💥 Erro no processo de login: {e}")
             return None, None
+        finally:
+            if not self._autenticacao.done():
+                self._autenticacao.set_result((None, None))
+            self._registrar_relatorio_esperas()
+
+    def _etapa(
+        self,
+        etapa: str,
+        funcao: Callable[[], Any],
+        sucesso: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """Executa uma etapa do login registrando duração e resultado."""
+        with medir_etapa(self.metricas, "login", etapa) as medicao:
+            resultado = funcao()
+            if not sucesso(resultado):
+                medicao["resultado"] = FALHA
+        return resultado
+
+    def _esperar(self, etapa: str, condicao: Callable[[], Any]) -> Any:
+        """Executa a espera `condicao()` e registra quanto tempo ela levou."""
+        inicio = time.perf_counter()
+        with medir_etapa(self.metricas, "esperas_login", etapa) as medicao:
+            resultado = condicao()
+            if not resultado:
+                medicao["resultado"] = FALHA
+        self.tempos_espera[etapa] = round(time.perf_counter() - inicio, 3)
+        return resultado
+
+    def _registrar_relatorio_esperas(self) -> None:
+        if self.tempos_espera:
+            relatorio = ", ".join(
+                f"{etapa}={segundos:.2f}s"
+                for etapa, segundos in self.tempos_espera.items()
+            )
+            logger.info(f"⏱️ Esperas do login: {relatorio}")
 
     def _inicializar_navegador(self) -> bool:
         logger.info("🌐 Acessando Amazonas Energia")
-        return self._web_driver_manager.navegar_para(
-            "https://agencia.amazonasenergia.com/"
+        # `navegar_para` espera o document.readyState ficar "complete"
+        if not self._esperar(
+            "carregamento",
+            lambda: self._web_driver_manager.navegar_para(self.url_portal),
+        ):
+            return False
+        return self._esperar(
+            "formulario",
+            lambda: self._web_driver_manager.aguardar_elemento(
+                SELETOR_CPF_CNPJ, self.timeout_formulario
+            ),
         )
 
     def _preencher_credenciais(self, credenciais: Credenciais) -> bool:
         logger.info("📝 Preenchendo credenciais")
         sucesso_cpf = self._web_driver_manager.preencher_campo(
-            "input[name='CPF_CNPJ']", credenciais.cpf_cnpj
+            SELETOR_CPF_CNPJ, credenciais.cpf_cnpj
         )
         sucesso_senha = self._web_driver_manager.preencher_campo(
             "input[name='SENHA']", credenciais.senha
@@ -66,34 +190,99 @@ class AmazonasEnergyLoginService(ILoginService):
         logger.info("🚀 Clicando no botão de login")
         return self._web_driver_manager.clicar_elemento("button[type='submit']")
 
-    def _obter_token_acesso(self) -> Optional[TokenAcesso]:
-        token_valor = self._web_driver_manager.executar_script(
-            """
-            return localStorage.getItem('@AGENCIA-VIRTUAL:TOKEN-KEY');
-        """
+    def _capturar_autenticacao(self) -> _Autenticacao:
+        resposta = self._esperar(
+            "resposta_autenticacao",
+            lambda: self._web_driver_manager.aguardar_resposta_rede(
+                self.padrao_url_autenticacao, self.timeout_token
+            ),
+        )
+        token, user_info = None, None
+        if resposta:
+            if resposta["status"] and resposta["status"] >= 400:
+                logger.warning(f"⚠️ Login recusado pela API ({resposta['status']})")
+                return None, None
+            token, user_info = self._interpretar_resposta(resposta["corpo"])
+
+        if token:
+            logger.info("🔑 Token capturado na resposta do login")
+        else:
+            # Sem resposta capturada, o prazo já foi gasto esperando por ela:
+            # o localStorage é conferido só uma vez.
+            token = self._obter_token_acesso(self.timeout_token if resposta else 0.5)
+            if not token:
+                return None, None
+        if user_info is None:
+            user_info = self._extrair_informacoes_usuario()
+        self._autenticacao.set_result((token, user_info))
+        return token, user_info
+
+    def _interpretar_resposta(self, corpo: str) -> _Autenticacao:
+        """Procura um JWT e os dados do usuário no JSON da resposta de login."""
+        try:
+            dados = json.loads(corpo)
+        except (TypeError, ValueError):
+            return None, None
+        token_valor = _procurar(dados, _eh_jwt)
+        user_data = _procurar(
+            dados,
+            lambda valor: isinstance(valor, dict)
+            and ("UNIDADES_CONSUMIDORAS" in valor or "NOME" in valor),
+        )
+        token = TokenAcesso.de_jwt(token_valor) if token_valor else None
+        user_info = self._converter_usuario(user_data) if user_data else None
+        return token, user_info
+
+    def _obter_token_acesso(self, timeout: float) -> Optional[TokenAcesso]:
+        # O portal grava o token no localStorage assim que o login é aceito.
+        token_valor = self._esperar(
+            "token",
+            lambda: self._web_driver_manager.aguardar_condicao(SCRIPT_TOKEN, timeout),
         )
         if token_valor:
             logger.info("🔑 Token recuperado com sucesso")
-            return TokenAcesso(valor=token_valor)
+            return TokenAcesso.de_jwt(token_valor)
         logger.warning("⚠️ Token não encontrado no localStorage")
         return None
 
     def _extrair_informacoes_usuario(self) -> InformacoesUsuario:
         user_info = InformacoesUsuario()
         try:
-            user_data = self._web_driver_manager.executar_script(
-                """
+            user_data = self._web_driver_manager.executar_script("""
                 const userData = localStorage.getItem('@AGENCIA-VIRTUAL:USER-DATA');
                 return userData ? JSON.parse(userData) : {};
-            """
-            )
+            """)
             if user_data:
-                user_info.id = user_data.get("ID")
-                user_info.nome = user_data.get("NOME")
-                user_info.unidades_consumidoras = user_data.get(
-                    "UNIDADES_CONSUMIDORAS", []
-                )
+                user_info = self._converter_usuario(user_data)
             logger.info(f"📋 Informações do usuário extraídas: {user_info.__dict__}")
         except Exception as e:
             logger.error(f"Erro ao extrair informações do usuário: {e}")
         return user_info
+
+    @staticmethod
+    def _converter_usuario(user_data: Dict) -> InformacoesUsuario:
+        return InformacoesUsuario(
+            id=user_data.get("ID"),
+            nome=user_data.get("NOME"),
+            unidades_consumidoras=user_data.get("UNIDADES_CONSUMIDORAS", []),
+        )
+
+
+def _eh_jwt(valor: Any) -> bool:
+    return isinstance(valor, str) and bool(decodificar_claims_jwt(valor))
+
+
+def _procurar(dados: Any, criterio: Callable[[Any], bool]) -> Any:
+    """Busca em profundidade o primeiro valor do JSON que satisfaz `criterio`."""
+    if criterio(dados):
+        return dados
+    filhos = (
+        dados.values()
+        if isinstance(dados, dict)
+        else dados if isinstance(dados, list) else []
+    )
+    for filho in filhos:
+        encontrado = _procurar(filho, criterio)
+        if encontrado is not None:
+            return encontrado
+    return None
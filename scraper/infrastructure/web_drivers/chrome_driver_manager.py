@@ -1,8 +1,13 @@
 # Chrome WebDriver manager
+import base64
+import json
 import logging
+import re
 import time
+from typing import Any, Dict, Optional
 
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -11,55 +16,160 @@ from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
 from scraper.application.interfaces import IWebDriverManager
+from scraper.application.metrics import (
+    MetricasPrometheus,
+    medir_etapa,
+    resultado_da_excecao,
+)
+from scraper.application.prazos import tempo_restante
+from scraper.infrastructure.web_drivers.resource_filter import FiltroRecursos
 
 logger = logging.getLogger(__name__)
 
+# Intervalo entre leituras do log de rede em `aguardar_resposta_rede`: começa
+# curto e dobra a cada leitura sem eventos, até o máximo
+INTERVALO_REDE_MINIMO_SEGUNDOS = 0.05
+INTERVALO_REDE_MAXIMO_SEGUNDOS = 0.4
+
 
 class ChromeWebDriverManager(IWebDriverManager):
-    def __init__(self, headless: bool = False):
+    def __init__(
+        self,
+        headless: bool = False,
+        timeout_carregamento: float = 15,
+        filtro_recursos: Optional[FiltroRecursos] = None,
+        metricas: Optional[MetricasPrometheus] = None,
+        capturar_rede: bool = False,
+    ):
         self.headless = headless
+        # Espera máxima por `document.readyState == "complete"` em `navegar_para`
+        self.timeout_carregamento = timeout_carregamento
+        # Quando informado, imagens, fontes e rastreadores deixam de ser baixados
+        self.filtro_recursos = filtro_recursos
+        # Duração e resultado de cada etapa no navegador (componente "navegador")
+        self.metricas = metricas
+        # Registra os eventos de rede lidos por `aguardar_resposta_rede`. Só
+        # para navegadores do fluxo de login: o log custa em toda requisição
+        self.capturar_rede = capturar_rede
         self.driver = None
 
     def inicializar(self) -> bool:
-        try:
-            chrome_options = Options()
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--window-size=1200,800")
-            chrome_options.add_argument("--disable-gpu")
-            if self.headless:
-                chrome_options.add_argument("--headless=new")
-            chrome_options.add_experimental_option(
-                "excludeSwitches", ["enable-automation"]
-            )
-            chrome_options.add_experimental_option("useAutomationExtension", False)
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_argument(
-                "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            )
+        if self.driver:
+            return True
+        with medir_etapa(self.metricas, "navegador", "inicializar") as medicao:
+            try:
+                chrome_options = Options()
+                chrome_options.add_argument("--no-sandbox")
+                chrome_options.add_argument("--disable-dev-shm-usage")
+                chrome_options.add_argument("--window-size=1200,800")
+                chrome_options.add_argument("--disable-gpu")
+                if self.headless:
+                    chrome_options.add_argument("--headless=new")
+                chrome_options.add_experimental_option(
+                    "excludeSwitches", ["enable-automation"]
+                )
+                chrome_options.add_experimental_option("useAutomationExtension", False)
+                chrome_options.add_argument(
+                    "--disable-blink-features=AutomationControlled"
+                )
+                chrome_options.add_argument(
+                    "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                    "AppleWebKit/537.36"
+                )
+                if self.capturar_rede:
+                    # Apenas os eventos Network.* (sem Page.* nem tracing)
+                    chrome_options.set_capability(
+                        "goog:loggingPrefs", {"performance": "ALL"}
+                    )
+                    chrome_options.add_experimental_option(
+                        "perfLoggingPrefs",
+                        {"enableNetwork": True, "enablePage": False},
+                    )
 
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.driver.execute_script(
-                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            )
+                service = Service(ChromeDriverManager().install())
+                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+                self.driver.execute_script(
+                    "Object.defineProperty(navigator, 'webdriver', "
+                    "{get: () => undefined})"
+                )
+                if self.filtro_recursos:
+                    self._aplicar_filtro_recursos()
 
-            logger.info("Driver configurado com sucesso")
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao inicializar driver: {e}")
-            return False
+                logger.info("Driver configurado com sucesso")
+                return True
+            except Exception as e:
+                medicao["resultado"] = resultado_da_excecao(e)
+                logger.error(f"Erro ao inicializar driver: {e}")
+                return False
+
+    def _aplicar_filtro_recursos(self) -> None:
+        """
+        Bloqueia via DevTools os padrões de URL do filtro, para toda a sessão.
+
+        Bloquear por `resourceType` exigiria `Fetch.enable` com padrões por tipo,
+        mas aí cada requisição fica pausada até alguém responder o evento
+        `Fetch.requestPaused` (com `Fetch.failRequest` ou `continueRequest`). O
+        Selenium só envia comandos (`execute_cdp_cmd`); eventos só chegam pelo
+        log `performance`, lido por polling, o que atrasaria toda requisição
+        da página. Por isso fica `Network.setBlockedURLs`, que o próprio Chrome
+        aplica, com as limitações de `FiltroRecursos`.
+        """
+        padroes = self.filtro_recursos.padroes()
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+        logger.info(f"🚫 Bloqueio de recursos ativo ({len(padroes)} padrões)")
 
     def finalizar(self) -> bool:
         try:
             if self.driver:
                 self.driver.quit()
+                self.driver = None
                 logger.info("Driver finalizado com sucesso")
                 return True
         except Exception as e:
             logger.error(f"Erro ao finalizar driver: {e}")
         return False
 
+    def esta_ativo(self) -> bool:
+        """Verifica se o navegador ainda responde a comandos."""
+        if not self.driver:
+            return False
+        try:
+            self.driver.current_window_handle
+            return True
+        except Exception:
+            return False
+
+    def resetar_estado(self) -> bool:
+        """
+        Limpa o estado deixado por um uso anterior (abas extras, cookies,
+        localStorage e sessionStorage) para que o navegador possa ser reutilizado.
+        """
+        try:
+            handles = self.driver.window_handles
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+
+            # O storage só pode ser limpo a partir da origem que o criou.
+            try:
+                self.driver.execute_script(
+                    "window.localStorage.clear(); window.sessionStorage.clear();"
+                )
+            except Exception:
+                pass
+
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            self.driver.get("about:blank")
+            if self.capturar_rede:
+                # Descarta eventos de rede do uso anterior
+                self.driver.get_log("performance")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao resetar estado do driver: {e}")
+            return False
+
     def executar_script(self, script: str) -> any:
         try:
             return self.driver.execute_script(script)
@@ -68,43 +178,146 @@ class ChromeWebDriverManager(IWebDriverManager):
             return None
 
     def navegar_para(self, url: str) -> bool:
-        try:
-            self.driver.get(url)
-            time.sleep(3)
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao navegar para URL: {e}")
-            return False
+        with medir_etapa(self.metricas, "navegador", "navegar_para") as medicao:
+            try:
+                # Limitado também pelo prazo da operação em curso, se houver
+                timeout = tempo_restante(self.timeout_carregamento)
+                self.driver.set_page_load_timeout(timeout)
+                self.driver.get(url)
+                WebDriverWait(self.driver, tempo_restante(timeout)).until(
+                    lambda driver: driver.execute_script("return document.readyState")
+                    == "complete"
+                )
+                return True
+            except Exception as e:
+                medicao["resultado"] = resultado_da_excecao(e)
+                logger.error(f"Erro ao navegar para URL: {e}")
+                return False
 
     def preencher_campo(self, seletor: str, valor: str) -> bool:
+        with medir_etapa(self.metricas, "navegador", "preencher_campo") as medicao:
+            try:
+                elemento = WebDriverWait(self.driver, tempo_restante(10)).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, seletor))
+                )
+                elemento.clear()
+                elemento.send_keys(valor)
+                return True
+            except Exception as e:
+                medicao["resultado"] = resultado_da_excecao(e)
+                logger.error(f"Erro ao preencher campo {seletor}: {e}")
+                return False
+
+    def clicar_elemento(self, seletor: str) -> bool:
+        with medir_etapa(self.metricas, "navegador", "clicar_elemento") as medicao:
+            try:
+                elemento = WebDriverWait(self.driver, tempo_restante(10)).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, seletor))
+                )
+                elemento.click()
+                return True
+            except Exception as e:
+                medicao["resultado"] = resultado_da_excecao(e)
+                logger.error(f"Erro ao clicar elemento {seletor}: {e}")
+                return False
+
+    def aguardar_elemento(self, seletor: str, timeout: int = 10) -> bool:
+        with medir_etapa(self.metricas, "navegador", "aguardar_elemento") as medicao:
+            try:
+                WebDriverWait(self.driver, tempo_restante(timeout)).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, seletor))
+                )
+                return True
+            except Exception as e:
+                medicao["resultado"] = resultado_da_excecao(e)
+                logger.error(f"Elemento {seletor} não encontrado: {e}")
+                return False
+
+    def aguardar_condicao(self, script: str, timeout: float = 10) -> any:
+        timeout = tempo_restante(timeout)
         try:
-            elemento = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, seletor))
+            return WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda driver: driver.execute_script(script)
             )
-            elemento.clear()
-            elemento.send_keys(valor)
-            return True
+        except TimeoutException:
+            logger.warning(f"Condição não satisfeita em {timeout}s")
+            return None
         except Exception as e:
-            logger.error(f"Erro ao preencher campo {seletor}: {e}")
-            return False
+            logger.error(f"Erro ao aguardar condição: {e}")
+            return None
 
-    def clicar_elemento(self, seletor: str) -> bool:
+    def executar_script_assincrono(self, script: str, timeout: float = 10) -> any:
+        timeout = tempo_restante(timeout)
         try:
-            elemento = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, seletor))
-            )
-            elemento.click()
-            return True
+            self.driver.set_script_timeout(timeout)
+            return self.driver.execute_async_script(script)
+        except TimeoutException:
+            logger.warning(f"Script assíncrono sem resposta em {timeout}s")
+            return None
         except Exception as e:
-            logger.error(f"Erro ao clicar elemento {seletor}: {e}")
-            return False
+            logger.error(f"Erro ao executar script assíncrono: {e}")
+            return None
 
-    def aguardar_elemento(self, seletor: str, timeout: int = 10) -> bool:
+    def aguardar_resposta_rede(
+        self, padrao_url: str, timeout: float = 10
+    ) -> Optional[Dict[str, Any]]:
+        """
+        O Selenium não entrega eventos do DevTools por assinatura: os eventos
+        de rede são lidos do log `performance` (`get_log`) em intervalos de
+        `INTERVALO_REDE_MINIMO_SEGUNDOS` a `INTERVALO_REDE_MAXIMO_SEGUNDOS`.
+        """
+        if not self.capturar_rede:
+            logger.error("Captura de rede desativada neste navegador")
+            return None
+        regex = re.compile(padrao_url)
+        timeout = tempo_restante(timeout)
+        limite = time.monotonic() + timeout
+        # requestId -> resposta (url, status) de requisições que casam com o padrão
+        candidatas: Dict[str, Dict] = {}
+        intervalo = INTERVALO_REDE_MINIMO_SEGUNDOS
         try:
-            WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, seletor))
-            )
-            return True
+            while time.monotonic() < limite:
+                entradas = self.driver.get_log("performance")
+                for entrada in entradas:
+                    mensagem = json.loads(entrada["message"])["message"]
+                    metodo = mensagem.get("method")
+                    params = mensagem.get("params", {})
+                    if metodo == "Network.responseReceived":
+                        resposta = params.get("response", {})
+                        if params.get("type") in ("XHR", "Fetch") and regex.search(
+                            resposta.get("url", "")
+                        ):
+                            candidatas[params["requestId"]] = resposta
+                    elif (
+                        metodo == "Network.loadingFinished"
+                        and params.get("requestId") in candidatas
+                    ):
+                        return self._ler_resposta(
+                            params["requestId"], candidatas[params["requestId"]]
+                        )
+                # Com tráfego, a resposta esperada deve estar perto: volta ao
+                # intervalo curto
+                intervalo = (
+                    INTERVALO_REDE_MINIMO_SEGUNDOS
+                    if entradas
+                    else min(intervalo * 2, INTERVALO_REDE_MAXIMO_SEGUNDOS)
+                )
+                time.sleep(max(0.0, min(intervalo, limite - time.monotonic())))
         except Exception as e:
-            logger.error(f"Elemento {seletor} não encontrado: {e}")
-            return False
+            logger.error(f"Erro ao aguardar resposta de rede: {e}")
+            return None
+        logger.warning(f"Nenhuma resposta para {padrao_url} em {timeout}s")
+        return None
+
+    def _ler_resposta(self, request_id: str, resposta: Dict) -> Dict[str, Any]:
+        corpo = self.driver.execute_cdp_cmd(
+            "Network.getResponseBody", {"requestId": request_id}
+        )
+        conteudo = corpo.get("body", "")
+        if corpo.get("base64Encoded"):
+            conteudo = base64.b64decode(conteudo).decode("utf-8", errors="replace")
+        return {
+            "url": resposta.get("url"),
+            "status": resposta.get("status"),
+            "corpo": conteudo,
+        }
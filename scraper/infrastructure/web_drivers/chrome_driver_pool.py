@@ -0,0 +1,242 @@
+# Pool of pre-started Chrome WebDriver managers
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Optional, Set
+
+from scraper.domain.exceptions import WebDriverError
+from scraper.infrastructure.web_drivers.chrome_driver_manager import (
+    ChromeWebDriverManager,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ChromeWebDriverPool:
+    """
+    Mantém um conjunto limitado de navegadores já inicializados.
+
+    `adquirir` entrega um navegador ocioso (ou inicia um novo, se ainda houver
+    espaço no pool) e `devolver` limpa o estado dele antes de deixá-lo disponível
+    para a próxima requisição. Em segundo plano, o pool tenta manter pelo menos
+    `minimo_ocioso` navegadores prontos.
+    """
+
+    def __init__(
+        self,
+        tamanho_maximo: int = 2,
+        minimo_ocioso: int = 1,
+        headless: bool = False,
+        fabrica: Optional[Callable[[], ChromeWebDriverManager]] = None,
+    ):
+        if tamanho_maximo < 1:
+            raise ValueError("tamanho_maximo deve ser maior que zero")
+        self.tamanho_maximo = tamanho_maximo
+        self.minimo_ocioso = max(0, min(minimo_ocioso, tamanho_maximo))
+        self.headless = headless
+        self._fabrica = fabrica or (lambda: ChromeWebDriverManager(headless=headless))
+
+        self._condicao = threading.Condition()
+        self._ociosos: Deque[ChromeWebDriverManager] = deque()
+        self._em_uso: Set[ChromeWebDriverManager] = set()
+        # Navegadores existentes + navegadores sendo iniciados neste momento.
+        self._total = 0
+        self._repondo = False
+        self._encerrado = False
+
+        self._contadores = {
+            "checkouts": 0,
+            "checkins": 0,
+            "reaproveitados": 0,
+            "inicializacoes": 0,
+            "falhas_inicializacao": 0,
+            "descartados": 0,
+            "esperas": 0,
+            "timeouts": 0,
+        }
+        self._tempo_inicializacao_total = 0.0
+
+    def aquecer(self) -> None:
+        """Inicia em segundo plano os navegadores até atingir `minimo_ocioso`."""
+        self._agendar_reposicao()
+
+    def adquirir(self, timeout: Optional[float] = None) -> ChromeWebDriverManager:
+        """
+        Retira um navegador do pool. Bloqueia até `timeout` segundos se todos
+        estiverem em uso; levanta WebDriverError se nenhum ficar disponível.
+        """
+        prazo = None if timeout is None else time.monotonic() + timeout
+        while True:
+            manager = None
+            with self._condicao:
+                if self._encerrado:
+                    raise WebDriverError("Pool de navegadores encerrado.")
+                while not self._ociosos and self._total >= self.tamanho_maximo:
+                    restante = None if prazo is None else prazo - time.monotonic()
+                    if restante is not None and restante <= 0:
+                        self._contadores["timeouts"] += 1
+                        raise WebDriverError(
+                            "Nenhum navegador disponível no pool a tempo."
+                        )
+                    self._contadores["esperas"] += 1
+                    self._condicao.wait(restante)
+                if self._ociosos:
+                    manager = self._ociosos.popleft()
+                else:
+                    self._total += 1
+
+            if manager is None:
+                manager = self._criar()
+                if manager is None:
+                    raise WebDriverError("Falha ao inicializar o navegador.")
+                reaproveitado = False
+            elif not manager.esta_ativo():
+                logger.warning("Navegador ocioso não responde, descartando.")
+                self._descartar(manager)
+                continue
+            else:
+                reaproveitado = True
+
+            with self._condicao:
+                self._em_uso.add(manager)
+                self._contadores["checkouts"] += 1
+                if reaproveitado:
+                    self._contadores["reaproveitados"] += 1
+            self._agendar_reposicao()
+            return manager
+
+    def devolver(
+        self, manager: ChromeWebDriverManager, descartar: bool = False
+    ) -> None:
+        """Devolve um navegador ao pool, limpando cookies, storage e abas extras."""
+        with self._condicao:
+            if manager not in self._em_uso:
+                logger.warning("Tentativa de devolver um navegador que não é do pool.")
+                return
+            self._em_uso.discard(manager)
+            self._contadores["checkins"] += 1
+
+        if descartar or self._encerrado or not manager.resetar_estado():
+            self._descartar(manager)
+            self._agendar_reposicao()
+            return
+
+        with self._condicao:
+            self._ociosos.append(manager)
+            self._condicao.notify()
+
+    @contextmanager
+    def emprestar(
+        self, timeout: Optional[float] = None
+    ) -> Iterator[ChromeWebDriverManager]:
+        manager = self.adquirir(timeout)
+        try:
+            yield manager
+        finally:
+            self.devolver(manager)
+
+    def encerrar(self) -> None:
+        """
+        Finaliza os navegadores ociosos. Os que estão em uso são finalizados
+        quando forem devolvidos.
+        """
+        with self._condicao:
+            self._encerrado = True
+            ociosos = list(self._ociosos)
+            self._ociosos.clear()
+            self._condicao.notify_all()
+        for manager in ociosos:
+            self._descartar(manager)
+
+    def estatisticas(self) -> Dict:
+        with self._condicao:
+            inicializacoes = self._contadores["inicializacoes"]
+            return {
+                "tamanho_maximo": self.tamanho_maximo,
+                "minimo_ocioso": self.minimo_ocioso,
+                "total": self._total,
+                "ociosos": len(self._ociosos),
+                "em_uso": len(self._em_uso),
+                "tempo_medio_inicializacao_segundos": (
+                    round(self._tempo_inicializacao_total / inicializacoes, 3)
+                    if inicializacoes
+                    else None
+                ),
+                **self._contadores,
+            }
+
+    def _criar(self) -> Optional[ChromeWebDriverManager]:
+        """Inicia um navegador. O chamador já reservou a vaga em `_total`."""
+        inicio = time.monotonic()
+        manager = None
+        sucesso = False
+        try:
+            manager = self._fabrica()
+            sucesso = manager.inicializar()
+        except Exception as e:
+            logger.error(f"Erro ao iniciar navegador do pool: {e}")
+        finally:
+            with self._condicao:
+                if sucesso:
+                    self._contadores["inicializacoes"] += 1
+                    self._tempo_inicializacao_total += time.monotonic() - inicio
+                else:
+                    self._total -= 1
+                    self._contadores["falhas_inicializacao"] += 1
+                    self._condicao.notify()
+        if not sucesso:
+            if manager is not None:
+                manager.finalizar()
+            return None
+        return manager
+
+    def _descartar(self, manager: ChromeWebDriverManager) -> None:
+        try:
+            manager.finalizar()
+        finally:
+            with self._condicao:
+                self._total -= 1
+                self._contadores["descartados"] += 1
+                self._condicao.notify()
+
+    def _agendar_reposicao(self) -> None:
+        with self._condicao:
+            if self._repondo or self._encerrado or not self._precisa_repor():
+                return
+            self._repondo = True
+        threading.Thread(
+            target=self._repor_ociosos, name="chrome-pool-warmup", daemon=True
+        ).start()
+
+    def _precisa_repor(self) -> bool:
+        return (
+            len(self._ociosos) < self.minimo_ocioso
+            and self._total < self.tamanho_maximo
+        )
+
+    def _repor_ociosos(self) -> None:
+        try:
+            while True:
+                with self._condicao:
+                    if self._encerrado or not self._precisa_repor():
+                        return
+                    self._total += 1
+                manager = self._criar()
+                if manager is None:
+                    # Evita um laço de tentativas quando o Chrome não sobe.
+                    return
+                with self._condicao:
+                    if self._encerrado:
+                        descartar = True
+                    else:
+                        descartar = False
+                        self._ociosos.append(manager)
+                        self._condicao.notify()
+                if descartar:
+                    self._descartar(manager)
+                    return
+        finally:
+            with self._condicao:
+                self._repondo = False
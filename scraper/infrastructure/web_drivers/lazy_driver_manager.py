@@ -0,0 +1,90 @@
+# Lazy WebDriver manager
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from scraper.application.interfaces import IWebDriverManager
+from scraper.domain.exceptions import WebDriverError
+
+logger = logging.getLogger(__name__)
+
+
+class LazyWebDriverManager(IWebDriverManager):
+    """
+    Adia a obtenção de um navegador até o primeiro comando que precisa dele.
+
+    `adquirir` é chamado uma única vez, na primeira operação de navegador, e
+    `liberar` devolve o navegador em `finalizar`. Rotas que nunca executam um
+    passo no navegador não pagam o custo de iniciar o Chrome.
+    """
+
+    def __init__(
+        self,
+        adquirir: Callable[[], IWebDriverManager],
+        liberar: Callable[[IWebDriverManager], None],
+    ):
+        self._adquirir = adquirir
+        self._liberar = liberar
+        self._manager: Optional[IWebDriverManager] = None
+        self._lock = threading.Lock()
+
+    @property
+    def provisionado(self) -> bool:
+        """Indica se um navegador já foi obtido para esta sessão."""
+        return self._manager is not None
+
+    def _obter_manager(self) -> IWebDriverManager:
+        with self._lock:
+            if self._manager is None:
+                logger.info("🌐 Provisionando navegador sob demanda")
+                manager = self._adquirir()
+                if manager is None:
+                    raise WebDriverError("Nenhum navegador disponível.")
+                self._manager = manager
+            return self._manager
+
+    def inicializar(self) -> bool:
+        try:
+            self._obter_manager()
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao provisionar navegador: {e}")
+            return False
+
+    def finalizar(self) -> bool:
+        with self._lock:
+            manager, self._manager = self._manager, None
+        if manager is None:
+            return True
+        try:
+            self._liberar(manager)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao liberar navegador: {e}")
+            return False
+
+    def executar_script(self, script: str) -> Any:
+        return self._obter_manager().executar_script(script)
+
+    def navegar_para(self, url: str) -> bool:
+        return self._obter_manager().navegar_para(url)
+
+    def preencher_campo(self, seletor: str, valor: str) -> bool:
+        return self._obter_manager().preencher_campo(seletor, valor)
+
+    def clicar_elemento(self, seletor: str) -> bool:
+        return self._obter_manager().clicar_elemento(seletor)
+
+    def aguardar_elemento(self, seletor: str, timeout: int = 10) -> bool:
+        return self._obter_manager().aguardar_elemento(seletor, timeout)
+
+    def aguardar_condicao(self, script: str, timeout: float = 10) -> Any:
+        return self._obter_manager().aguardar_condicao(script, timeout)
+
+    def executar_script_assincrono(self, script: str, timeout: float = 10) -> Any:
+        return self._obter_manager().executar_script_assincrono(script, timeout)
+
+    def aguardar_resposta_rede(
+        self, padrao_url: str, timeout: float = 10
+    ) -> Optional[Dict[str, Any]]:
+        return self._obter_manager().aguardar_resposta_rede(padrao_url, timeout)
@@ -0,0 +1,121 @@
+# Resource filtering for Chrome (DevTools Network.setBlockedURLs)
+import logging
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES_IMAGEM = ["png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp"]
+EXTENSOES_FONTE = ["woff", "woff2", "ttf", "otf", "eot"]
+EXTENSOES_MIDIA = ["mp4", "webm", "mp3", "ogg"]
+
+DOMINIOS_RASTREADORES = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+]
+
+# Tudo o que o widget do reCAPTCHA carrega (scripts, imagens do desafio,
+# fontes). Estes domínios nunca são bloqueados, qualquer que seja a configuração.
+DOMINIOS_RECAPTCHA = [
+    "www.google.com/recaptcha",
+    "www.gstatic.com/recaptcha",
+    "fonts.gstatic.com",
+    "www.recaptcha.net",
+    "recaptcha.net",
+]
+
+# Hosts de que o reCAPTCHA depende: padrões cujo host poderia casar com algum
+# deles são descartados, mesmo que não atinjam os caminhos acima
+HOSTS_RECAPTCHA = [
+    "google.com",
+    "www.google.com",
+    "gstatic.com",
+    "www.gstatic.com",
+    "fonts.gstatic.com",
+    "recaptcha.net",
+    "www.recaptcha.net",
+]
+
+
+@dataclass
+class FiltroRecursos:
+    """
+    Padrões de URL que o Chrome deve deixar de baixar.
+
+    Imagens, fontes e mídia só são bloqueadas nos `hosts_filtrados` (o host do
+    portal, vindo da configuração), rastreadores em qualquer página. Padrões
+    cujo host poderia ser um dos `HOSTS_RECAPTCHA`, ou que atingiriam um domínio
+    em `DOMINIOS_RECAPTCHA` ou em `dominios_permitidos`, são descartados.
+
+    Limitação: os padrões casam com a URL, não com o tipo do recurso. Imagens
+    e fontes servidas sem extensão (`/imagem?id=1`, `/fonte/abc`) continuam
+    sendo baixadas, e um caminho que só contenha `.png` no meio é bloqueado.
+    """
+
+    hosts_filtrados: List[str] = field(default_factory=list)
+    extensoes_bloqueadas: List[str] = field(
+        default_factory=lambda: EXTENSOES_IMAGEM + EXTENSOES_FONTE + EXTENSOES_MIDIA
+    )
+    dominios_rastreadores: List[str] = field(
+        default_factory=lambda: list(DOMINIOS_RASTREADORES)
+    )
+    padroes_extras: List[str] = field(default_factory=list)
+    dominios_permitidos: List[str] = field(default_factory=list)
+
+    def padroes(self) -> List[str]:
+        """Padrões no formato de `Network.setBlockedURLs` (curinga `*`)."""
+        candidatos = [
+            f"*://{host}/*.{extensao}*"
+            for host in self.hosts_filtrados
+            for extensao in self.extensoes_bloqueadas
+        ]
+        candidatos += [f"*://*{dominio}/*" for dominio in self.dominios_rastreadores]
+        candidatos += self.padroes_extras
+
+        padroes = []
+        for padrao in dict.fromkeys(candidatos):
+            if self._atinge_dominio_permitido(padrao):
+                logger.warning(
+                    f"Padrão de bloqueio ignorado (domínio permitido): {padrao}"
+                )
+                continue
+            padroes.append(padrao)
+        return padroes
+
+    def _atinge_dominio_permitido(self, padrao: str) -> bool:
+        host = _host_do_padrao(padrao)
+        hosts_protegidos = HOSTS_RECAPTCHA + [
+            dominio.split("/", 1)[0] for dominio in self.dominios_permitidos
+        ]
+        if host is None or any(fnmatchcase(h, host) for h in hosts_protegidos):
+            return True
+        for dominio in DOMINIOS_RECAPTCHA + self.dominios_permitidos:
+            urls_teste = [f"https://{dominio}/"]
+            urls_teste += [
+                f"https://{dominio}/x.{extensao}"
+                for extensao in EXTENSOES_IMAGEM + EXTENSOES_FONTE + ["js", "css"]
+            ]
+            if any(fnmatchcase(url, padrao) for url in urls_teste):
+                return True
+        return False
+
+
+def _host_do_padrao(padrao: str) -> Optional[str]:
+    """
+    Parte do padrão que corresponde ao host (sem a porta), ou None quando o
+    esquema tem curinga além do `*://` usual e pode engolir qualquer host.
+    """
+    esquema, separador, resto = padrao.partition("://")
+    if not separador:
+        resto = padrao
+    elif "*" in esquema and esquema != "*":
+        return None
+    host = resto.split("/", 1)[0]
+    if ":" in host:
+        host = host.rsplit(":", 1)[0]
+    return host.lower()
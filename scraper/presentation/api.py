@@ -1,71 +1,118 @@
 import logging
-from concurrent.futures.thread import ThreadPoolExecutor
-from datetime import datetime, timedelta
+import time
+from typing import Optional
 
 from flasgger import Swagger, swag_from
-from flask import Flask, g, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 
-from scraper.application.interfaces import (
-    IFaturaService,
-    ILoginService,
-    IWebDriverManager,
-)
-from scraper.application.services import SessaoAplicacao
-from scraper.domain.models import FaturaDTO
-from scraper.infrastructure.recaptcha_solvers.manual_solver import RecaptchaManualSolver
-from scraper.infrastructure.services.amazon_energy_fatura_service import (
-    AmazonasEnergyFaturaService,
-)
-from scraper.infrastructure.services.amazon_energy_login_service import (
-    AmazonasEnergyLoginService,
-)
-from scraper.infrastructure.web_drivers.chrome_driver_manager import (
-    ChromeWebDriverManager,
+from scraper.application.jobs import ItemJob
+from scraper.application.metrics import resultado_do_status_http
+from scraper.application.operacoes import Operacao
+from scraper.domain.models import Credenciais, SessaoAutenticada
+from scraper.presentation.dependencias import (
+    ROTAS_SEM_TRACE,
+    browser_pool,
+    cliente_http,
+    config,
+    consulta_faturas,
+    create_scraper_session,
+    descrever_operacao_login,
+    desempenho_captcha,
+    fatura_service,
+    gerenciador_jobs,
+    gerenciador_logins,
+    iniciar_login,
+    iniciar_recursos,
+    logins_em_andamento,
+    metricas,
+    rastreador,
+    recursos_iniciados,
+    reservatorio_recaptcha,
+    sessao_do_bearer,
+    token_store,
 )
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 # Flask App
 app = Flask(__name__)
-app.config["LOGIN_TIMEOUT_SECONDS"] = 60
-_executor = ThreadPoolExecutor(max_workers=4)
+# Configuração em `scraper.presentation.dependencias`, compartilhada com o ASGI
+app.config.update(config)
+
+# Rotas que não usam o navegador nem a sessão do scraper
+_ROTAS_SEM_SESSAO = {
+    "login_endpoint",
+    "login_operacao_endpoint",
+    "login_esperas_endpoint",
+    "faturas_endpoint",
+    "faturas_metricas_endpoint",
+    "faturas_cache_endpoint",
+    "faturas_todas_endpoint",
+    "faturas_auto_endpoint",
+    "criar_job_endpoint",
+    "job_endpoint",
+    "pool_endpoint",
+    "http_endpoint",
+    "tokens_endpoint",
+    "captcha_reservatorio_endpoint",
+    "captcha_solvers_endpoint",
+    "metrics_endpoint",
+    "debug_traces_endpoint",
+    "debug_trace_endpoint",
+}
 
 # Initialize Swagger UI
 swagger = Swagger(app)
 
-cache = {"token": None, "user_info": None, "expiry": None}
 
+@app.before_request
+def iniciar_recursos_na_primeira_requisicao():
+    if not recursos_iniciados.is_set():
+        iniciar_recursos()
 
-# --- Factory and Request Context Management ---
 
+@app.before_request
+def iniciar_trace_requisicao():
+    """Abre o trace da requisição (se amostrada); fechado no teardown."""
+    if request.endpoint in ROTAS_SEM_TRACE:
+        return
+    rota = request.url_rule.rule if request.url_rule else request.path
+    contexto = rastreador.trace(
+        f"{request.method} {rota}", forcar=request.headers.get("X-Trace") == "1"
+    )
+    g.trace = contexto.__enter__()
+    g.trace_contexto = contexto
 
-def create_scraper_session(headless: bool = False) -> SessaoAplicacao:
-    """Factory para criar uma nova instância de SessaoAplicacao com suas dependências."""
-    try:
-        web_driver_manager = ChromeWebDriverManager(headless=headless)
-        recaptcha_solver = RecaptchaManualSolver(web_driver_manager)
-        login_service = AmazonasEnergyLoginService(web_driver_manager, recaptcha_solver)
-        fatura_service = AmazonasEnergyFaturaService()
-        session = SessaoAplicacao(web_driver_manager, login_service, fatura_service)
-
-        # Tenta inicializar o driver aqui. Se falhar, a exceção será tratada pelos hooks.
-        if not session.inicializar():
-            raise Exception("Falha ao inicializar o navegador.")
-        return session
-    except Exception as e:
-        logger.error(f"Erro na criação e inicialização da sessão: {e}")
-        # Se a inicialização falhar, tenta fechar o driver caso algo tenha sido iniciado
-        if (
-            "web_driver_manager" in locals()
-            and web_driver_manager
-            and web_driver_manager.driver
-        ):
-            web_driver_manager.finalizar()
-        raise  # Re-lança a exceção para ser tratada pelo hook ou pelo Flask
+
+@app.teardown_request
+def encerrar_trace_requisicao(exception=None):
+    # Registrado antes do teardown da sessão, roda depois dele: a devolução do
+    # navegador ainda entra no trace.
+    contexto = g.pop("trace_contexto", None)
+    if contexto is not None:
+        contexto.__exit__(None, None, None)
+
+
+@app.before_request
+def iniciar_medicao_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+
+
+@app.after_request
+def registrar_medicao_requisicao(response):
+    """Duração e resultado de cada rota (componente "api"), exceto /metrics."""
+    inicio = g.pop("inicio_requisicao", None)
+    if inicio is not None and request.endpoint != "metrics_endpoint":
+        metricas.registrar(
+            "api",
+            request.endpoint or "desconhecida",
+            time.perf_counter() - inicio,
+            resultado_do_status_http(response.status_code),
+        )
+    trace = g.get("trace")
+    if trace is not None:
+        response.headers["X-Trace-Id"] = trace.id
+    return response
 
 
 @app.before_request
@@ -74,9 +121,10 @@ def before_request_hook():
     Executa ANTES de cada requisição. Cria uma nova sessão e a armazena em `g.session`.
     `g` é um objeto especial do Flask para dados de requisição únicos.
     """
+    if request.endpoint in _ROTAS_SEM_SESSAO:
+        return
     try:
-        # Para rodar em modo headless, mude `headless=False` para `True`
-        g.session = create_scraper_session(headless=False)
+        g.session = create_scraper_session()
     except Exception as e:
         # Se a criação da sessão falhar, armazena o erro em g para ser tratado nos endpoints.
         g.session_error = e
@@ -87,7 +135,7 @@ def before_request_hook():
 def teardown_request_hook(exception=None):
     """
     Executa APÓS cada requisição, mesmo que ocorra um erro.
-    Garante que a sessão e o driver sejam finalizados.
+    Se a requisição usou um navegador, devolve-o ao pool (que limpa o estado dele).
     """
     session = g.pop("session", None)  # Pega a sessão de g e a remove
     if session:
@@ -98,6 +146,16 @@ def teardown_request_hook(exception=None):
             logger.error(f"Erro ao finalizar a sessão do scraper: {e}")
 
 
+def _resposta_login(operacao: Operacao, espera_esgotada: bool = False):
+    corpo, status, headers = descrever_operacao_login(operacao, espera_esgotada)
+    return jsonify(corpo), status, headers
+
+
+def _sessao_do_bearer() -> Optional[SessaoAutenticada]:
+    """Busca no token store a sessão do token enviado em `Authorization: Bearer`."""
+    return sessao_do_bearer(request.headers.get("Authorization"))
+
+
 # --- API Endpoint Definitions with Swagger Docstrings ---
 
 
@@ -106,7 +164,11 @@ def teardown_request_hook(exception=None):
     {
         "tags": ["Authentication"],
         "summary": "Realiza o login na plataforma Amazonas Energia.",
-        "description": "Autentica o usuário com suas credenciais (CPF/CNPJ e senha) e retorna informações do usuário.",
+        "description": (
+            "Autentica o usuário com suas credenciais (CPF/CNPJ e senha) e retorna "
+            "informações do usuário. Com `async`, responde 202 imediatamente com o id "
+            "da operação, cujo resultado é consultado em GET /login/{operation_id}."
+        ),
         "parameters": [
             {
                 "name": "body",
@@ -120,10 +182,23 @@ def teardown_request_hook(exception=None):
                             "description": "CPF ou CNPJ do usuário.",
                         },
                         "senha": {"type": "string", "description": "Senha do usuário."},
+                        "async": {
+                            "type": "boolean",
+                            "description": (
+                                "Não espera o login terminar (padrão: false)."
+                            ),
+                        },
                     },
                     "example": {"cpf_cnpj": "12345678901", "senha": "sua_senha_aqui"},
                 },
-            }
+            },
+            {
+                "name": "async",
+                "in": "query",
+                "type": "boolean",
+                "required": False,
+                "description": "Equivalente ao campo `async` do corpo.",
+            },
         ],
         "responses": {
             "200": {
@@ -147,6 +222,20 @@ def teardown_request_hook(exception=None):
                     },
                 },
             },
+            "202": {
+                "description": (
+                    "Login em andamento. Consulte `status_url` (também no header "
+                    "Location)."
+                ),
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "status": {"type": "string", "enum": ["pending", "running"]},
+                        "operation_id": {"type": "string"},
+                        "status_url": {"type": "string"},
+                    },
+                },
+            },
             "400": {
                 "description": "Requisição inválida. Faltam parâmetros.",
                 "schema": {
@@ -171,6 +260,22 @@ def teardown_request_hook(exception=None):
                     "properties": {"error": {"type": "string"}},
                 },
             },
+            "504": {
+                "description": (
+                    "O login não terminou em `LOGIN_TIMEOUT_SECONDS` (`timeout`) ou "
+                    "ainda não terminou após `LOGIN_SYNC_WAIT_SECONDS` (`running`, "
+                    "com `status_url` para acompanhar)."
+                ),
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "status": {"type": "string"},
+                        "message": {"type": "string"},
+                        "operation_id": {"type": "string"},
+                        "status_url": {"type": "string"},
+                    },
+                },
+            },
         },
     }
 )
@@ -179,63 +284,117 @@ def login_endpoint():
     if not data or "cpf_cnpj" not in data or "senha" not in data:
         return jsonify({"error": "CPF/CNPJ e senha são obrigatórios"}), 400
 
-    # 1. Checar o cache
-    if cache["token"] and cache["expiry"] > datetime.now():
+    # 1. Checar o token store
+    credenciais = Credenciais(cpf_cnpj=data["cpf_cnpj"], senha=data["senha"])
+    sessao_armazenada = token_store.obter_por_credenciais(credenciais)
+    if sessao_armazenada:
         logger.info("🔑 Login realizado via cache, evitando reprocessamento.")
         return (
             jsonify(
                 {
                     "status": "success",
                     "message": "Login realizado via cache",
-                    "token": cache["token"],
-                    "user_info": (
-                        cache["user_info"].__dict__ if cache["user_info"] else {}
-                    ),
+                    "token": sessao_armazenada.token.valor,
+                    "user_info": sessao_armazenada.user_info.__dict__,
                 }
             ),
             200,
         )
 
-    # Se o cache não for válido, prossegue com a lógica de login
-    try:
-        # A sessão é criada e inicializada pelo before_request hook
-        if "session_error" in g:
-            return (
-                jsonify(
-                    {
-                        "error": f"Falha interna ao preparar o serviço: {str(g.session_error)}"
-                    }
-                ),
-                500,
-            )
-
-        session = g.session
+    # 2. Login no navegador, em uma thread de login; o resultado vai para o
+    # token store. Esta rota não cria sessão (ver `_ROTAS_SEM_SESSAO`).
+    operacao = iniciar_login(credenciais)
+    assincrono = data.get("async") is True or (
+        request.args.get("async", "false").lower() == "true"
+    )
+    if assincrono:
+        return _resposta_login(operacao)
+    operacao.aguardar(config["LOGIN_SYNC_WAIT_SECONDS"])
+    return _resposta_login(operacao, espera_esgotada=True)
 
-        if session.autenticar(data["cpf_cnpj"], data["senha"]):
-            # 2. Login bem-sucedido, armazenar no cache
-            cache["token"] = session.token.valor
-            cache["user_info"] = session.user_info
-            cache["expiry"] = datetime.now() + timedelta(hours=1)  # Expira em 1 hora
 
-            return (
-                jsonify(
-                    {
-                        "status": "success",
-                        "message": "Login realizado com sucesso",
-                        "token": session.token.valor,
-                        "user_info": (
-                            session.user_info.__dict__ if session.user_info else {}
-                        ),
-                    }
+@app.route("/login/esperas", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Authentication"],
+        "summary": "Tempo gasto nas esperas do login no navegador.",
+        "description": (
+            "Para cada condição esperada no login (carregamento da página, formulário, "
+            "resposta da API de autenticação e, se preciso, token no localStorage), "
+            "retorna contadores e percentis (em ms) do tempo realmente gasto, "
+            "derivados do histograma `esperas_login` de GET /metrics. `falhas` conta "
+            "as esperas que estouraram o limite."
+        ),
+        "responses": {
+            "200": {
+                "description": (
+                    "Métricas por espera, no mesmo formato de GET /faturas/metricas."
                 ),
-                200,
-            )
-        else:
-            return jsonify({"status": "error", "message": "Falha no login"}), 401
+                "schema": {
+                    "type": "object",
+                    "additionalProperties": {"type": "object"},
+                },
+            }
+        },
+    }
+)
+def login_esperas_endpoint():
+    """Endpoint com o relatório de tempo das esperas do login."""
+    return jsonify(metricas.resumo("esperas_login")), 200
 
-    except Exception as e:
-        logger.error(f"Erro no endpoint de login: {e}")
-        return jsonify({"error": f"Erro interno do servidor: {str(e)}"}), 500
+
+@app.route("/login/<operation_id>", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Authentication"],
+        "summary": "Consulta o resultado de um login assíncrono.",
+        "description": (
+            "Retorna o resultado do login iniciado com `async`. Com `wait`, a resposta "
+            "espera (long-poll) até o login terminar ou o tempo acabar."
+        ),
+        "parameters": [
+            {
+                "name": "operation_id",
+                "in": "path",
+                "type": "string",
+                "required": True,
+            },
+            {
+                "name": "wait",
+                "in": "query",
+                "type": "number",
+                "required": False,
+                "description": (
+                    "Segundos a esperar pelo resultado (limitado pela configuração do "
+                    "servidor; padrão: 0)."
+                ),
+            },
+        ],
+        "responses": {
+            "200": {"description": "Login concluído. Mesmo formato de POST /login."},
+            "202": {"description": "Login ainda em andamento."},
+            "401": {"description": "Falha na autenticação."},
+            "404": {
+                "description": "Operação não encontrada.",
+                "schema": {
+                    "type": "object",
+                    "properties": {"error": {"type": "string"}},
+                },
+            },
+            "500": {"description": "Erro interno durante o login."},
+            "504": {"description": "O login não terminou no prazo."},
+        },
+    }
+)
+def login_operacao_endpoint(operation_id):
+    """Endpoint de acompanhamento (polling ou long-poll) de um login assíncrono."""
+    operacao = gerenciador_logins.obter(operation_id)
+    if not operacao:
+        return jsonify({"error": "Operação não encontrada."}), 404
+    espera = request.args.get("wait", 0, type=float)
+    if espera > 0:
+        operacao.aguardar(min(espera, config["LOGIN_POLL_MAX_WAIT_SECONDS"]))
+    return _resposta_login(operacao)
 
 
 @app.route("/faturas", methods=["GET"])
@@ -317,16 +476,11 @@ def login_endpoint():
     }
 )
 def faturas_endpoint():
-    """Endpoint para obter faturas. Verifica se a sessão está autenticada."""
-
-    # Verifica se a sessão foi inicializada com sucesso e se temos um token
-    # Se houver um erro na inicialização da sessão, ele já teria retornado 500 no before_request_hook.
-    # Aqui, verificamos se a sessão está autenticada (tem token).
-    token = request.headers.get("Authorization")
-    if token and token.lower().startswith("bearer "):
-        token = token[7:]
+    """Endpoint para obter faturas. Verifica se o token informado é válido."""
 
-    if not token or token != cache["token"]:
+    # Esta rota não cria sessão do scraper (ver `_ROTAS_SEM_SESSAO`): basta o token.
+    sessao_armazenada = _sessao_do_bearer()
+    if not sessao_armazenada:
         logger.warning("Token ausente ou inválido no endpoint /faturas.")
         return (
             jsonify({"error": "Token ausente ou inválido. Faça login novamente."}),
@@ -347,11 +501,12 @@ def faturas_endpoint():
             400,
         )
 
-    # Cria uma sessão temporária para buscar as faturas
-    session = create_scraper_session(headless=True)
-    session._token = cache["token"]
-    session._user_info = cache["user_info"]
-    faturas = session.obter_faturas(consumer_unit, client_id)
+    # Caminho rápido: HTTP puro com o token do cliente, sem sessão nem navegador
+    inicio = time.perf_counter()
+    faturas = consulta_faturas.executar(
+        sessao_armazenada.token, consumer_unit, client_id
+    )
+    duracao_ms = (time.perf_counter() - inicio) * 1000
 
     if faturas is not None:
         try:
@@ -359,6 +514,7 @@ def faturas_endpoint():
             return (
                 jsonify([fatura.model_dump(by_alias=True) for fatura in faturas]),
                 200,
+                {"Server-Timing": f"upstream;dur={duracao_ms:.1f}"},
             )
         except Exception as e:
             logger.error(f"Erro ao serializar faturas: {e}")
@@ -381,6 +537,222 @@ def faturas_endpoint():
         )
 
 
+@app.route("/faturas/todas", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Invoices"],
+        "summary": "Obtém as faturas abertas de todas as UCs do usuário.",
+        "description": (
+            "Consulta em paralelo todas as unidades consumidoras da conta do token "
+            "informado. A falha de uma UC é reportada no resultado dela, sem falhar as "
+            "demais."
+        ),
+        "parameters": [
+            {
+                "name": "Authorization",
+                "in": "header",
+                "type": "string",
+                "required": True,
+                "description": "Bearer token obtido no login.",
+            },
+            {
+                "name": "X-Client-Id",
+                "in": "header",
+                "type": "string",
+                "required": True,
+                "description": "Identificador do cliente.",
+            },
+            {
+                "name": "max_concorrencia",
+                "in": "query",
+                "type": "integer",
+                "required": False,
+                "description": (
+                    "Máximo de UCs consultadas ao mesmo tempo (limitado pela "
+                    "configuração do servidor)."
+                ),
+            },
+        ],
+        "responses": {
+            "200": {
+                "description": (
+                    "Resultado por UC. `status` é `partial` se alguma UC falhou."
+                ),
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "status": {"type": "string", "enum": ["success", "partial"]},
+                        "unidades": {
+                            "type": "object",
+                            "additionalProperties": {
+                                "type": "object",
+                                "properties": {
+                                    "status": {
+                                        "type": "string",
+                                        "enum": ["success", "error"],
+                                    },
+                                    "faturas": {
+                                        "type": "array",
+                                        "items": {"$ref": "#/definitions/FaturaDTO"},
+                                    },
+                                    "message": {"type": "string"},
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+            "400": {
+                "description": "Requisição inválida. Headers ausentes.",
+                "schema": {
+                    "type": "object",
+                    "properties": {"error": {"type": "string"}},
+                },
+            },
+            "401": {
+                "description": "Token ausente ou inválido.",
+                "schema": {
+                    "type": "object",
+                    "properties": {"error": {"type": "string"}},
+                },
+            },
+            "500": {
+                "description": "Nenhuma UC pôde ser consultada.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "status": {"type": "string", "enum": ["error"]},
+                        "unidades": {"type": "object"},
+                    },
+                },
+            },
+        },
+    }
+)
+def faturas_todas_endpoint():
+    """Endpoint que consulta as faturas de todas as UCs da conta em paralelo."""
+    sessao_armazenada = _sessao_do_bearer()
+    if not sessao_armazenada:
+        return (
+            jsonify({"error": "Token ausente ou inválido. Faça login novamente."}),
+            401,
+        )
+
+    client_id = request.headers.get("X-Client-Id")
+    if not client_id:
+        return (
+            jsonify(
+                {
+                    "error": "Headers necessários ausentes.",
+                    "required_headers": ["X-Client-Id"],
+                }
+            ),
+            400,
+        )
+
+    limite = config["FATURAS_MAX_CONCURRENCY"]
+    max_concorrencia = request.args.get("max_concorrencia", limite, type=int)
+    resultados = consulta_faturas.executar_para_unidades(
+        sessao_armazenada.token,
+        sessao_armazenada.user_info.unidades_consumidoras,
+        client_id,
+        max_concorrencia=max(1, min(max_concorrencia, limite)),
+    )
+
+    unidades = {}
+    for resultado in resultados:
+        if resultado.sucesso:
+            unidades[resultado.unidade_consumidora] = {
+                "status": "success",
+                "faturas": [f.model_dump(by_alias=True) for f in resultado.faturas],
+            }
+        else:
+            unidades[resultado.unidade_consumidora] = {
+                "status": "error",
+                "message": resultado.erro,
+            }
+
+    falhas = sum(1 for resultado in resultados if not resultado.sucesso)
+    if resultados and falhas == len(resultados):
+        return jsonify({"status": "error", "unidades": unidades}), 500
+    status = "partial" if falhas else "success"
+    return jsonify({"status": status, "unidades": unidades}), 200
+
+
+@app.route("/faturas/metricas", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Invoices"],
+        "summary": "Métricas de latência da consulta de faturas.",
+        "description": (
+            "Retorna contadores e percentis de latência (em ms) das consultas HTTP de "
+            "faturas feitas por GET /faturas. Os valores saem do histograma "
+            "`consulta_faturas` de GET /metrics; os percentis são interpolados nos "
+            "buckets, como no Prometheus. Vazio antes da primeira consulta."
+        ),
+        "responses": {
+            "200": {
+                "description": "Métricas da consulta de faturas.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "nome": {"type": "string"},
+                        "total": {"type": "integer"},
+                        "sucessos": {"type": "integer"},
+                        "falhas": {"type": "integer"},
+                        "timeouts": {"type": "integer"},
+                        "media_ms": {"type": ["number", "null"]},
+                        "p50_ms": {"type": ["number", "null"]},
+                        "p95_ms": {"type": ["number", "null"]},
+                        "p99_ms": {"type": ["number", "null"]},
+                    },
+                },
+            }
+        },
+    }
+)
+def faturas_metricas_endpoint():
+    """Endpoint com as métricas de latência do caminho rápido de faturas."""
+    return jsonify(consulta_faturas.metricas()), 200
+
+
+@app.route("/faturas/cache", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Invoices"],
+        "summary": "Estatísticas do cache de faturas.",
+        "description": (
+            "Retorna ocupação, TTL e contadores de acertos, falhas e revalidações do "
+            "cache de faturas abertas."
+        ),
+        "responses": {
+            "200": {
+                "description": "Estatísticas do cache de faturas.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "tamanho": {"type": "integer"},
+                        "capacidade": {"type": "integer"},
+                        "ttl_segundos": {"type": "number"},
+                        "stale_segundos": {"type": "number"},
+                        "taxa_acerto": {"type": ["number", "null"]},
+                        "acertos": {"type": "integer"},
+                        "acertos_obsoletos": {"type": "integer"},
+                        "falhas": {"type": "integer"},
+                        "revalidacoes": {"type": "integer"},
+                        "erros_revalidacao": {"type": "integer"},
+                        "evicoes": {"type": "integer"},
+                    },
+                },
+            }
+        },
+    }
+)
+def faturas_cache_endpoint():
+    """Endpoint com as estatísticas do cache de faturas."""
+    return jsonify(fatura_service.estatisticas()), 200
+
+
 @app.route("/logout", methods=["POST"])
 @swag_from(
     {
@@ -403,6 +775,11 @@ def faturas_endpoint():
 )
 def logout_endpoint():
     """Endpoint de logout. Limpa o cache e finaliza a sessão."""
+    sessao_armazenada = _sessao_do_bearer()
+    if sessao_armazenada:
+        # A remoção também descarta as faturas em cache do titular do token
+        token_store.remover_por_token(sessao_armazenada.token.valor)
+
     session = g.get("session", None)  # Pega a sessão de g, se existir
     if session:
         session.logout()  # Limpa o cache interno da sessão
@@ -457,6 +834,19 @@ def logout_endpoint():
 )
 def status_endpoint():
     """Endpoint para verificar o status da sessão."""
+    sessao_armazenada = _sessao_do_bearer()
+    if sessao_armazenada:
+        return (
+            jsonify(
+                {
+                    "status": "authenticated",
+                    "has_token": True,
+                    "user_info": sessao_armazenada.user_info.__dict__,
+                }
+            ),
+            200,
+        )
+
     session = g.get("session", None)  # Pega a sessão de g, se existir
 
     if not session:
@@ -493,6 +883,341 @@ def status_endpoint():
     )
 
 
+@app.route("/pool", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Estatísticas do pool de navegadores.",
+        "description": (
+            "Retorna a ocupação do pool de navegadores pré-inicializados e contadores "
+            "de uso."
+        ),
+        "responses": {
+            "200": {
+                "description": "Estatísticas do pool.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "tamanho_maximo": {"type": "integer"},
+                        "minimo_ocioso": {"type": "integer"},
+                        "total": {"type": "integer"},
+                        "ociosos": {"type": "integer"},
+                        "em_uso": {"type": "integer"},
+                        "checkouts": {"type": "integer"},
+                        "reaproveitados": {"type": "integer"},
+                        "inicializacoes": {"type": "integer"},
+                        "tempo_medio_inicializacao_segundos": {
+                            "type": ["number", "null"]
+                        },
+                    },
+                },
+            }
+        },
+    }
+)
+def pool_endpoint():
+    """Endpoint com as estatísticas do pool de navegadores."""
+    return jsonify(browser_pool.estatisticas()), 200
+
+
+@app.route("/http", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Estatísticas do cliente HTTP compartilhado.",
+        "description": (
+            "Retorna os limites do cliente HTTP usado pela API de faturas e pelos "
+            "serviços de captcha, o cache de DNS e contadores por host (conexões "
+            "abertas, requisições, falhas e recusas por limite de concorrência)."
+        ),
+        "responses": {
+            "200": {
+                "description": "Estatísticas do cliente HTTP.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "timeout_conexao": {"type": "number"},
+                        "timeout_leitura": {"type": "number"},
+                        "max_concorrencia_por_host": {"type": "integer"},
+                        "max_bytes_resposta": {"type": "integer"},
+                        "dns": {"type": "object"},
+                        "hosts": {"type": "object"},
+                    },
+                },
+            }
+        },
+    }
+)
+def http_endpoint():
+    """Endpoint com as estatísticas do cliente HTTP compartilhado."""
+    return jsonify(cliente_http.estatisticas()), 200
+
+
+@app.route("/tokens", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Estatísticas do token store.",
+        "description": (
+            "Retorna ocupação, capacidade e contadores de acerto, expiração e evicção "
+            "do token store."
+        ),
+        "responses": {
+            "200": {
+                "description": "Estatísticas do token store.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "tamanho": {"type": "integer"},
+                        "capacidade": {"type": "integer"},
+                        "acertos": {"type": "integer"},
+                        "falhas": {"type": "integer"},
+                        "expirados": {"type": "integer"},
+                        "evicoes_lru": {"type": "integer"},
+                        "logins": {
+                            "type": "object",
+                            "description": (
+                                "Logins no navegador: `lideres` abriram o navegador, "
+                                "`seguidores` aproveitaram um login igual em andamento."
+                            ),
+                            "properties": {
+                                "em_andamento": {"type": "integer"},
+                                "lideres": {"type": "integer"},
+                                "seguidores": {"type": "integer"},
+                                "desistencias": {"type": "integer"},
+                            },
+                        },
+                        "operacoes": {
+                            "type": "object",
+                            "description": (
+                                "Operações de login: `compartilhadas` receberam a "
+                                "operação em andamento das mesmas credenciais."
+                            ),
+                            "properties": {
+                                "chaves_em_andamento": {"type": "integer"},
+                                "iniciadas": {"type": "integer"},
+                                "compartilhadas": {"type": "integer"},
+                            },
+                        },
+                    },
+                },
+            }
+        },
+    }
+)
+def tokens_endpoint():
+    """Endpoint com as estatísticas do token store e dos logins em andamento."""
+    estatisticas = token_store.estatisticas()
+    estatisticas["logins"] = logins_em_andamento.estatisticas()
+    estatisticas["operacoes"] = gerenciador_logins.estatisticas()
+    return jsonify(estatisticas), 200
+
+
+@app.route("/captcha/reservatorio", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Estatísticas do reservatório de tokens do reCAPTCHA.",
+        "description": (
+            "Retorna tokens prontos e em resolução, o alvo calculado pela demanda e com"
+            " que frequência o reservatório ficou vazio (`taxa_seco`) ou deixou tokens "
+            "vencerem (`taxa_desperdicio`)."
+        ),
+        "responses": {
+            "200": {
+                "description": "Estatísticas do reservatório.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "prontos": {"type": "integer"},
+                        "em_andamento": {"type": "integer"},
+                        "alvo": {"type": "integer"},
+                        "minimo": {"type": "integer"},
+                        "capacidade": {"type": "integer"},
+                        "tempo_medio_solucao_segundos": {"type": "number"},
+                        "taxa_seco": {"type": ["number", "null"]},
+                        "taxa_desperdicio": {"type": ["number", "null"]},
+                        "retiradas": {"type": "integer"},
+                        "secos": {"type": "integer"},
+                        "desperdicados": {"type": "integer"},
+                        "solicitados": {"type": "integer"},
+                        "resolvidos": {"type": "integer"},
+                        "falhas_solicitacao": {"type": "integer"},
+                    },
+                },
+            },
+            "404": {"description": "Reservatório não configurado."},
+        },
+    }
+)
+def captcha_reservatorio_endpoint():
+    """Endpoint com as estatísticas do reservatório de tokens do reCAPTCHA."""
+    if not reservatorio_recaptcha:
+        return (
+            jsonify(
+                {
+                    "error": (
+                        "Reservatório desativado. Defina CAPTCHA_API_KEY e "
+                        "RECAPTCHA_SITE_KEY."
+                    )
+                }
+            ),
+            404,
+        )
+    return jsonify(reservatorio_recaptcha.estatisticas()), 200
+
+
+@app.route("/metrics", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Métricas no formato texto do Prometheus.",
+        "description": (
+            "Histograma `scraper_etapa_duracao_segundos` e contador "
+            "`scraper_etapa_total` (por `resultado`: sucesso, falha ou timeout) para "
+            "cada etapa do navegador, do login, da API de faturas e de cada rota, mais "
+            "medidores de navegadores, logins e jobs em andamento."
+        ),
+        "produces": ["text/plain"],
+        "responses": {"200": {"description": "Métricas em texto."}},
+    }
+)
+def metrics_endpoint():
+    """Endpoint de métricas para o Prometheus."""
+    return Response(
+        metricas.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.route("/captcha/solvers", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Desempenho de cada solver de reCAPTCHA.",
+        "description": (
+            "Por solver: amostras na janela recente, taxa de sucesso e custo esperado "
+            "por captcha resolvido (ponderados com decaimento), quantas vezes o "
+            "roteador o escolheu (e quantas por exploração) e percentis de latência. "
+            "`disputa`, `roteamento` e `manual` são a estratégia usada no login; com "
+            "`CAPTCHA_STRATEGY=route`, cada provedor aparece pelo host."
+        ),
+        "responses": {
+            "200": {
+                "description": "Estatísticas por solver.",
+                "schema": {
+                    "type": "object",
+                    "additionalProperties": {
+                        "type": "object",
+                        "properties": {
+                            "amostras": {"type": "integer"},
+                            "taxa_sucesso": {"type": ["number", "null"]},
+                            "custo_esperado_segundos": {"type": ["number", "null"]},
+                            "escolhas": {"type": "integer"},
+                            "exploracoes": {"type": "integer"},
+                            "latencia": {"type": ["object", "null"]},
+                        },
+                    },
+                },
+            }
+        },
+    }
+)
+def captcha_solvers_endpoint():
+    """Endpoint com o desempenho recente de cada solver de reCAPTCHA."""
+    return jsonify(desempenho_captcha.resumo()), 200
+
+
+@app.route("/debug/traces", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Traces recentes, do mais novo ao mais antigo.",
+        "description": (
+            "Resumo dos traces retidos no buffer (requisições e itens de job "
+            "amostrados, ou com o header `X-Trace: 1`). Use `min_ms` para ver só os "
+            "lentos e GET /debug/traces/<trace_id> para os spans."
+        ),
+        "parameters": [
+            {
+                "name": "limit",
+                "in": "query",
+                "type": "integer",
+                "required": False,
+                "description": "Máximo de traces retornados (padrão: 50).",
+            },
+            {
+                "name": "min_ms",
+                "in": "query",
+                "type": "number",
+                "required": False,
+                "description": "Duração mínima do trace, em milissegundos.",
+            },
+        ],
+        "responses": {
+            "200": {
+                "description": "Traces e estatísticas de amostragem.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "estatisticas": {"type": "object"},
+                        "traces": {"type": "array", "items": {"type": "object"}},
+                    },
+                },
+            },
+            "400": {"description": "Parâmetro inválido."},
+        },
+    }
+)
+def debug_traces_endpoint():
+    """Endpoint com os traces retidos."""
+    try:
+        limite = int(request.args.get("limit", 50))
+        duracao_minima = float(request.args.get("min_ms", 0))
+    except ValueError:
+        return jsonify({"error": "limit e min_ms devem ser numéricos."}), 400
+    return (
+        jsonify(
+            {
+                "estatisticas": rastreador.estatisticas(),
+                "traces": rastreador.listar(limite, duracao_minima),
+            }
+        ),
+        200,
+    )
+
+
+@app.route("/debug/traces/<trace_id>", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Infra"],
+        "summary": "Spans de um trace.",
+        "description": (
+            "Cada span traz o pai (`pai_id`), o início, a duração e atributos como a "
+            "URL, o seletor ou o script (truncado) da chamada ao navegador. Valores "
+            "preenchidos em campos nunca são registrados."
+        ),
+        "parameters": [
+            {
+                "name": "trace_id",
+                "in": "path",
+                "type": "string",
+                "required": True,
+            }
+        ],
+        "responses": {
+            "200": {"description": "Trace com seus spans."},
+            "404": {"description": "Trace não encontrado (ou já descartado)."},
+        },
+    }
+)
+def debug_trace_endpoint(trace_id):
+    """Endpoint com os spans de um trace."""
+    trace = rastreador.obter(trace_id)
+    if not trace:
+        return jsonify({"error": "Trace não encontrado."}), 404
+    return jsonify(trace.para_dict()), 200
+
+
 @app.route("/faturas_auto", methods=["POST"])
 @swag_from(
     {
@@ -551,6 +1276,12 @@ def status_endpoint():
                     "properties": {"error": {"type": "string"}},
                 },
             },
+            "504": {
+                "description": (
+                    "O login não terminou a tempo; mesmo formato de POST /login."
+                ),
+                "schema": {"type": "object"},
+            },
         },
         "definitions": {
             "FaturaDTO": {
@@ -573,21 +1304,35 @@ def faturas_auto_endpoint():
     if not data or not all(k in data for k in required):
         return jsonify({"error": "Parâmetros obrigatórios ausentes."}), 400
 
-    try:
-        session = create_scraper_session(headless=True)
-        if not session.autenticar(data["cpf_cnpj"], data["senha"]):
+    credenciais = Credenciais(cpf_cnpj=data["cpf_cnpj"], senha=data["senha"])
+    sessao_armazenada = token_store.obter_por_credenciais(credenciais)
+    if not sessao_armazenada:
+        # Mesmo caminho de POST /login: o login roda nas threads de login, com o
+        # prazo de `LOGIN_TIMEOUT_SECONDS`
+        operacao = iniciar_login(credenciais)
+        operacao.aguardar(config["LOGIN_SYNC_WAIT_SECONDS"])
+        corpo, status, headers = descrever_operacao_login(
+            operacao, espera_esgotada=True
+        )
+        if status == 401:
             return jsonify({"error": "Falha no login."}), 401
+        if status != 200:
+            return jsonify(corpo), status, headers
+        sessao_armazenada = operacao.resultado
+    else:
+        logger.info("🔑 Token reaproveitado do cache, sem abrir o navegador.")
 
-        token = session.token.valor if session.token else None
-        user_info = session.user_info.__dict__ if session.user_info else {}
-        faturas = session.obter_faturas(data["consumer_unit"], data["client_id"])
+    try:
+        user_info = sessao_armazenada.user_info.__dict__
+        faturas = consulta_faturas.executar(
+            sessao_armazenada.token, data["consumer_unit"], data["client_id"]
+        )
         faturas_list = [f.model_dump(by_alias=True) for f in faturas] if faturas else []
 
         return (
             jsonify(
                 {
                     "status": "success",
-                    # "token": token,
                     "user_info": user_info,
                     "faturas": faturas_list,
                 }
@@ -599,13 +1344,208 @@ def faturas_auto_endpoint():
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
 
 
+@app.route("/jobs", methods=["POST"])
+@swag_from(
+    {
+        "tags": ["Jobs"],
+        "summary": "Cria um job em lote de login + faturas.",
+        "description": (
+            "Recebe uma lista de contas (credenciais, UC e client_id) e processa todas "
+            "em segundo plano. Retorna imediatamente o id do job para acompanhamento."
+        ),
+        "parameters": [
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "itens": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "cpf_cnpj": {"type": "string"},
+                                    "senha": {"type": "string"},
+                                    "consumer_unit": {"type": "string"},
+                                    "client_id": {"type": "string"},
+                                },
+                            },
+                        },
+                        "paralelismo": {
+                            "type": "integer",
+                            "description": (
+                                "Itens processados ao mesmo tempo neste job (limitado "
+                                "pela configuração do servidor)."
+                            ),
+                        },
+                    },
+                    "example": {
+                        "itens": [
+                            {
+                                "cpf_cnpj": "12345678901",
+                                "senha": "sua_senha_aqui",
+                                "consumer_unit": "991643",
+                                "client_id": "18839258",
+                            }
+                        ],
+                        "paralelismo": 2,
+                    },
+                },
+            }
+        ],
+        "responses": {
+            "202": {
+                "description": "Job criado.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "job_id": {"type": "string"},
+                        "status": {"type": "string"},
+                        "total": {"type": "integer"},
+                        "paralelismo": {"type": "integer"},
+                    },
+                },
+            },
+            "400": {
+                "description": "Requisição inválida.",
+                "schema": {
+                    "type": "object",
+                    "properties": {"error": {"type": "string"}},
+                },
+            },
+        },
+    }
+)
+def criar_job_endpoint():
+    """Endpoint que cria um job em lote."""
+    data = request.get_json(silent=True) or {}
+    itens = data.get("itens")
+    required = ["cpf_cnpj", "senha", "consumer_unit", "client_id"]
+    if not isinstance(itens, list) or not itens:
+        return jsonify({"error": "A lista 'itens' é obrigatória."}), 400
+    if len(itens) > config["JOB_MAX_ITEMS"]:
+        return (
+            jsonify({"error": f"Máximo de {config['JOB_MAX_ITEMS']} itens por job."}),
+            400,
+        )
+    if not all(isinstance(i, dict) and all(k in i for k in required) for i in itens):
+        return (
+            jsonify({"error": f"Todos os itens precisam de {', '.join(required)}."}),
+            400,
+        )
+
+    paralelismo = data.get("paralelismo")
+    if paralelismo is not None and not isinstance(paralelismo, int):
+        return jsonify({"error": "'paralelismo' deve ser um inteiro."}), 400
+
+    job = gerenciador_jobs.criar(
+        [
+            ItemJob(
+                cpf_cnpj=str(i["cpf_cnpj"]),
+                senha=str(i["senha"]),
+                consumer_unit=str(i["consumer_unit"]),
+                client_id=str(i["client_id"]),
+            )
+            for i in itens
+        ],
+        paralelismo=paralelismo,
+    )
+    return jsonify(gerenciador_jobs.descrever(job, incluir_itens=False)), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+@swag_from(
+    {
+        "tags": ["Jobs"],
+        "summary": "Consulta o progresso e os resultados de um job.",
+        "description": (
+            "Retorna o status do job, o progresso e, por item, as faturas obtidas ou o "
+            "erro."
+        ),
+        "parameters": [
+            {
+                "name": "job_id",
+                "in": "path",
+                "type": "string",
+                "required": True,
+            },
+            {
+                "name": "itens",
+                "in": "query",
+                "type": "boolean",
+                "required": False,
+                "description": "Inclui os resultados por item (padrão: true).",
+            },
+        ],
+        "responses": {
+            "200": {
+                "description": "Estado atual do job.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "job_id": {"type": "string"},
+                        "status": {
+                            "type": "string",
+                            "enum": [
+                                "pending",
+                                "running",
+                                "success",
+                                "partial",
+                                "error",
+                            ],
+                        },
+                        "total": {"type": "integer"},
+                        "concluidos": {"type": "integer"},
+                        "progresso": {"type": "number"},
+                        "contagem": {"type": "object"},
+                        "itens": {"type": "array", "items": {"type": "object"}},
+                    },
+                },
+            },
+            "404": {
+                "description": "Job não encontrado.",
+                "schema": {
+                    "type": "object",
+                    "properties": {"error": {"type": "string"}},
+                },
+            },
+        },
+    }
+)
+def job_endpoint(job_id):
+    """Endpoint de acompanhamento de um job em lote."""
+    job = gerenciador_jobs.obter(job_id)
+    if not job:
+        return jsonify({"error": "Job não encontrado."}), 404
+    incluir_itens = request.args.get("itens", "true").lower() != "false"
+    return jsonify(gerenciador_jobs.descrever(job, incluir_itens=incluir_itens)), 200
+
+
 if __name__ == "__main__":
     print("🤖 Serviço Amazonas Energia API (Refatorado com SOLID)")
     print("📋 Endpoints disponíveis:")
-    print("   POST /login - Realizar login")
+    print("   POST /login - Realizar login (?async=true responde 202)")
+    print("   GET  /login/<operation_id> - Resultado de um login assíncrono")
+    print("   GET  /login/esperas - Tempo gasto nas esperas do login")
     print("   GET  /faturas - Obter faturas (requer autenticação)")
+    print("   GET  /faturas/todas - Obter faturas de todas as UCs da conta")
+    print("   GET  /faturas/metricas - Latência da consulta de faturas")
+    print("   GET  /faturas/cache - Estatísticas do cache de faturas")
     print("   POST /logout - Fazer logout")
     print("   GET  /status - Verificar status da sessão")
+    print("   GET  /pool - Estatísticas do pool de navegadores")
+    print("   GET  /http - Estatísticas do cliente HTTP compartilhado")
+    print("   GET  /tokens - Estatísticas do token store")
+    print("   GET  /captcha/reservatorio - Reservatório de tokens do reCAPTCHA")
+    print("   GET  /captcha/solvers - Desempenho de cada solver de reCAPTCHA")
+    print("   GET  /metrics - Métricas por etapa (formato Prometheus)")
+    print("   GET  /debug/traces - Traces recentes (spans por requisição)")
+    print("   GET  /debug/traces/<trace_id> - Spans de um trace")
+    print("   POST /jobs - Criar job em lote (login + faturas)")
+    print("   GET  /jobs/<job_id> - Progresso e resultados de um job")
     print("   /apidocs - Acessar a documentação Swagger UI")
     print("=" * 50)
+    iniciar_recursos()
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,324 @@
+# ASGI entry point: uvicorn scraper.presentation.asgi:app
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Match, Route
+
+from scraper.application.metrics import resultado_do_status_http
+from scraper.application.operacoes import Operacao
+from scraper.domain.models import Credenciais, SessaoAutenticada
+from scraper.presentation.dependencias import (
+    ROTAS_SEM_TRACE,
+    browser_pool,
+    captcha_client_assincrono,
+    cliente_http_assincrono,
+    config,
+    consulta_faturas_assincrona,
+    create_scraper_session,
+    descrever_operacao_login,
+    gerenciador_logins,
+    iniciar_login,
+    iniciar_recursos,
+    metricas,
+    rastreador,
+    reproduzindo,
+    reservatorio_recaptcha,
+    sessao_do_bearer,
+    token_store,
+)
+
+logger = logging.getLogger(__name__)
+
+# Intervalo com que as rotas verificam uma operação de login em andamento
+_INTERVALO_OPERACAO_SEGUNDOS = 0.1
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    # Só o navegador (login) usa threads; o reservatório de reCAPTCHA é
+    # abastecido por corrotinas neste event loop
+    iniciar_recursos(abastecer_reservatorio=False)
+    abastecimento = None
+    if reservatorio_recaptcha and captcha_client_assincrono and not reproduzindo:
+        abastecimento = asyncio.create_task(
+            reservatorio_recaptcha.manter_assincrono(
+                captcha_client_assincrono.solicitar_token
+            )
+        )
+    try:
+        yield
+    finally:
+        if reservatorio_recaptcha:
+            reservatorio_recaptcha.encerrar()
+        if abastecimento:
+            abastecimento.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await abastecimento
+        browser_pool.encerrar()
+        await cliente_http_assincrono.encerrar()
+
+
+async def rastrear_e_medir(
+    request: Request, call_next: RequestResponseEndpoint
+) -> Response:
+    """
+    Trace da requisição (se amostrada) e duração e resultado de cada rota
+    (componente "api"), como os hooks da API Flask.
+    """
+    rota = _rota_da_requisicao(request)
+    endpoint = rota.endpoint.__name__ if rota else "desconhecida"
+    if endpoint in ROTAS_SEM_TRACE:
+        contexto = contextlib.nullcontext()
+    else:
+        contexto = rastreador.trace(
+            f"{request.method} {rota.path if rota else request.url.path}",
+            forcar=request.headers.get("X-Trace") == "1",
+        )
+    inicio = time.perf_counter()
+    with contexto as trace:
+        response = await call_next(request)
+    if endpoint != "metrics_endpoint":
+        metricas.registrar(
+            "api",
+            endpoint,
+            time.perf_counter() - inicio,
+            resultado_do_status_http(response.status_code),
+        )
+    if trace is not None:
+        response.headers["X-Trace-Id"] = trace.id
+    return response
+
+
+def _rota_da_requisicao(request: Request) -> Optional[Route]:
+    for rota in request.app.routes:
+        correspondencia, _ = rota.matches(request.scope)
+        if correspondencia == Match.FULL:
+            return rota
+    return None
+
+
+def _sessao_do_bearer(request: Request) -> Optional[SessaoAutenticada]:
+    return sessao_do_bearer(request.headers.get("Authorization"))
+
+
+async def _aguardar_operacao(operacao: Operacao, timeout: Optional[float] = None):
+    """
+    Espera a operação sem ocupar uma thread: o login roda nas threads de login
+    (limitadas por `LOGIN_WORKERS`) e aqui só se consulta o estado dela.
+    """
+    limite = None if timeout is None else time.monotonic() + timeout
+    while True:
+        operacao.expirar_se_atrasada()
+        if operacao.finalizada or (limite is not None and time.monotonic() >= limite):
+            return
+        await asyncio.sleep(_INTERVALO_OPERACAO_SEGUNDOS)
+
+
+def _resposta_operacao(
+    operacao: Operacao, espera_esgotada: bool = False
+) -> JSONResponse:
+    corpo, status, headers = descrever_operacao_login(operacao, espera_esgotada)
+    return JSONResponse(corpo, status_code=status, headers=headers)
+
+
+async def _ler_json(request: Request) -> Optional[dict]:
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def login_endpoint(request: Request) -> JSONResponse:
+    data = await _ler_json(request)
+    if not data or "cpf_cnpj" not in data or "senha" not in data:
+        return JSONResponse(
+            {"error": "CPF/CNPJ e senha são obrigatórios"}, status_code=400
+        )
+
+    credenciais = Credenciais(cpf_cnpj=data["cpf_cnpj"], senha=data["senha"])
+    sessao_armazenada = token_store.obter_por_credenciais(credenciais)
+    if sessao_armazenada:
+        logger.info("🔑 Login realizado via cache, evitando reprocessamento.")
+        return JSONResponse(
+            {
+                "status": "success",
+                "message": "Login realizado via cache",
+                "token": sessao_armazenada.token.valor,
+                "user_info": sessao_armazenada.user_info.__dict__,
+            }
+        )
+
+    operacao = iniciar_login(credenciais)
+    assincrono = data.get("async") is True or (
+        request.query_params.get("async", "false").lower() == "true"
+    )
+    if assincrono:
+        return _resposta_operacao(operacao)
+    await _aguardar_operacao(operacao, config["LOGIN_SYNC_WAIT_SECONDS"])
+    return _resposta_operacao(operacao, espera_esgotada=True)
+
+
+async def login_operacao_endpoint(request: Request) -> JSONResponse:
+    operacao = gerenciador_logins.obter(request.path_params["operation_id"])
+    if not operacao:
+        return JSONResponse({"error": "Operação não encontrada."}, status_code=404)
+    try:
+        espera = float(request.query_params.get("wait", 0))
+    except ValueError:
+        espera = 0
+    if espera > 0:
+        await _aguardar_operacao(
+            operacao, min(espera, config["LOGIN_POLL_MAX_WAIT_SECONDS"])
+        )
+    return _resposta_operacao(operacao)
+
+
+async def faturas_endpoint(request: Request) -> JSONResponse:
+    sessao_armazenada = _sessao_do_bearer(request)
+    if not sessao_armazenada:
+        return JSONResponse(
+            {"error": "Token ausente ou inválido. Faça login novamente."},
+            status_code=401,
+        )
+
+    consumer_unit = request.headers.get("X-Consumer-Unit")
+    client_id = request.headers.get("X-Client-Id")
+    if not all([consumer_unit, client_id]):
+        return JSONResponse(
+            {
+                "error": "Headers necessários ausentes.",
+                "required_headers": ["X-Consumer-Unit", "X-Client-Id"],
+            },
+            status_code=400,
+        )
+
+    inicio = time.perf_counter()
+    resultado = await consulta_faturas_assincrona.executar(
+        sessao_armazenada.token, consumer_unit, client_id
+    )
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if resultado is None:
+        return JSONResponse(
+            {"status": "error", "message": "Não foi possível obter as faturas."},
+            status_code=500,
+        )
+    return JSONResponse(
+        [fatura.model_dump(by_alias=True) for fatura in resultado],
+        headers={"Server-Timing": f"upstream;dur={duracao_ms:.1f}"},
+    )
+
+
+async def faturas_auto_endpoint(request: Request) -> JSONResponse:
+    data = await _ler_json(request)
+    required = ["cpf_cnpj", "senha", "consumer_unit", "client_id"]
+    if not data or not all(k in data for k in required):
+        return JSONResponse(
+            {"error": "Parâmetros obrigatórios ausentes."}, status_code=400
+        )
+
+    credenciais = Credenciais(cpf_cnpj=data["cpf_cnpj"], senha=data["senha"])
+    sessao_armazenada = token_store.obter_por_credenciais(credenciais)
+    if not sessao_armazenada:
+        operacao = iniciar_login(credenciais)
+        await _aguardar_operacao(operacao, config["LOGIN_SYNC_WAIT_SECONDS"])
+        corpo, status, headers = descrever_operacao_login(
+            operacao, espera_esgotada=True
+        )
+        if status == 401:
+            return JSONResponse({"error": "Falha no login."}, status_code=401)
+        if status != 200:
+            return JSONResponse(corpo, status_code=status, headers=headers)
+        sessao_armazenada = operacao.resultado
+    else:
+        logger.info("🔑 Token reaproveitado do cache, sem abrir o navegador.")
+
+    try:
+        resultado = await consulta_faturas_assincrona.executar(
+            sessao_armazenada.token, data["consumer_unit"], data["client_id"]
+        )
+    except Exception as e:
+        logger.error(f"Erro no endpoint /faturas_auto: {e}")
+        return JSONResponse({"error": f"Erro interno: {str(e)}"}, status_code=500)
+    return JSONResponse(
+        {
+            "status": "success",
+            "user_info": sessao_armazenada.user_info.__dict__,
+            "faturas": (
+                [f.model_dump(by_alias=True) for f in resultado] if resultado else []
+            ),
+        }
+    )
+
+
+async def status_endpoint(request: Request) -> JSONResponse:
+    sessao_armazenada = _sessao_do_bearer(request)
+    if sessao_armazenada:
+        return JSONResponse(
+            {
+                "status": "authenticated",
+                "has_token": True,
+                "user_info": sessao_armazenada.user_info.__dict__,
+            }
+        )
+
+    # Sem token válido vale o estado de uma sessão do scraper, como na API Flask
+    try:
+        session = await run_in_threadpool(create_scraper_session)
+    except Exception as e:
+        logger.warning(
+            f"Endpoint /status chamado, mas sessão do scraper não foi inicializada: {e}"
+        )
+        return JSONResponse(
+            {
+                "status": "not_authenticated",
+                "has_token": False,
+                "user_info": {},
+                "message": "Sessão do scraper indisponível (falha na inicialização).",
+            },
+            status_code=500,
+        )
+    try:
+        is_authenticated = session.is_authenticated
+        user_info = (
+            session.user_info.__dict__ if is_authenticated and session.user_info else {}
+        )
+    finally:
+        await run_in_threadpool(session.finalizar)
+    return JSONResponse(
+        {
+            "status": "authenticated" if is_authenticated else "not_authenticated",
+            "has_token": is_authenticated,
+            "user_info": user_info,
+        }
+    )
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(
+        metricas.exportar(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+app = Starlette(
+    routes=[
+        Route("/login", login_endpoint, methods=["POST"]),
+        Route("/login/{operation_id}", login_operacao_endpoint, methods=["GET"]),
+        Route("/faturas", faturas_endpoint, methods=["GET"]),
+        Route("/faturas_auto", faturas_auto_endpoint, methods=["POST"]),
+        Route("/status", status_endpoint, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    middleware=[Middleware(BaseHTTPMiddleware, dispatch=rastrear_e_medir)],
+    lifespan=lifespan,
+)
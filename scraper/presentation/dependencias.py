@@ -0,0 +1,836 @@
+# Configuration and shared services for the Flask and ASGI apps
+import atexit
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from scraper.application.interfaces import (
+    IAsyncFaturaService,
+    IFaturaService,
+    IRecaptchaSolver,
+    ITokenStore,
+    IWebDriverManager,
+)
+from scraper.application.jobs import GerenciadorJobs, ItemJob
+from scraper.application.metrics import MetricasPrometheus
+from scraper.application.operacoes import (
+    EXECUTANDO,
+    PENDENTE,
+    SUCESSO,
+    TIMEOUT,
+    GerenciadorOperacoes,
+    Operacao,
+    operacao_atual,
+)
+from scraper.application.prazos import tempo_restante
+from scraper.application.recaptcha_routing import (
+    DesempenhoSolvers,
+    RecaptchaSolverMonitorado,
+    RecaptchaSolverRoteado,
+)
+from scraper.application.services import SessaoAplicacao
+from scraper.application.single_flight import SingleFlight
+from scraper.application.tracing import (
+    FaturaServiceAsyncRastreado,
+    FaturaServiceRastreado,
+    LoginServiceRastreado,
+    Rastreador,
+    RecaptchaSolverRastreado,
+    WebDriverManagerRastreado,
+)
+from scraper.application.use_cases import (
+    ObterFaturasAbertas,
+    ObterFaturasAbertasAsync,
+)
+from scraper.domain.exceptions import AuthenticationError, DataExtractionError
+from scraper.domain.models import (
+    Credenciais,
+    FaturaDTO,
+    InformacoesUsuario,
+    SessaoAutenticada,
+    TokenAcesso,
+)
+from scraper.infrastructure.cache.fatura_cache import (
+    CachedFaturaService,
+    CachedFaturaServiceAsync,
+)
+from scraper.infrastructure.cache.sqlite_token_store import SQLiteTokenStore
+from scraper.infrastructure.cache.token_store import (
+    InMemoryTokenStore,
+    normalizar_cpf_cnpj,
+)
+from scraper.infrastructure.http.async_client import ClienteHTTPAssincrono
+from scraper.infrastructure.http.pooled_client import ClienteHTTP
+from scraper.infrastructure.recaptcha_solvers.async_captcha_client import (
+    AsyncCaptchaAPIClient,
+)
+from scraper.infrastructure.recaptcha_solvers.captcha_api_client import (
+    CaptchaAPIClient,
+)
+from scraper.infrastructure.recaptcha_solvers.manual_solver import RecaptchaManualSolver
+from scraper.infrastructure.recaptcha_solvers.recaptcha_hybrid_solver import (
+    RecaptchaAPISolver,
+    RecaptchaHybridSolver,
+    RecaptchaReservatorioSolver,
+)
+from scraper.infrastructure.recaptcha_solvers.token_reservoir import (
+    ReservatorioTokensRecaptcha,
+)
+from scraper.infrastructure.replay.cassette import Cassete
+from scraper.infrastructure.replay.recording import (
+    FaturaServiceGravador,
+    RecaptchaSolverGravador,
+    WebDriverManagerGravador,
+)
+from scraper.infrastructure.replay.replay import (
+    FaturaServiceReproducao,
+    RecaptchaSolverReproducao,
+    WebDriverManagerReproducao,
+)
+from scraper.infrastructure.services.amazon_energy_fatura_service import (
+    CAMINHO_FATURAS_ABERTAS,
+    URL_API,
+    AmazonasEnergyFaturaService,
+)
+from scraper.infrastructure.services.amazon_energy_fatura_service_async import (
+    AsyncAmazonasEnergyFaturaService,
+    FaturaServiceEmThreads,
+)
+from scraper.infrastructure.services.amazon_energy_login_service import (
+    URL_PORTAL,
+    AmazonasEnergyLoginService,
+    padrao_url_autenticacao,
+)
+from scraper.infrastructure.web_drivers.chrome_driver_manager import (
+    ChromeWebDriverManager,
+)
+from scraper.infrastructure.web_drivers.chrome_driver_pool import ChromeWebDriverPool
+from scraper.infrastructure.web_drivers.lazy_driver_manager import (
+    LazyWebDriverManager,
+)
+from scraper.infrastructure.web_drivers.resource_filter import FiltroRecursos
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Configuração e serviços compartilhados pela API Flask (`api`) e pelo entry
+# point ASGI (`asgi`); cada app só adiciona suas rotas e hooks.
+config: Dict[str, Any] = {}
+# Endereços do portal e da API da Amazonas Energia. Os benchmarks (`benchmarks/`)
+# apontam para servidores locais que imitam os dois.
+config["PORTAL_URL"] = os.environ.get("PORTAL_URL", URL_PORTAL)
+config["API_URL"] = os.environ.get("API_URL", URL_API)
+# Prazo total de um login no navegador (fila + captcha + portal), repassado às
+# esperas do pool, do navegador e dos solvers; precisa ser maior que os timeouts
+# dos solvers. Logins rodam em `LOGIN_WORKERS` threads próprias, fora das
+# threads que atendem a API.
+config["LOGIN_TIMEOUT_SECONDS"] = 180
+config["LOGIN_WORKERS"] = 4
+# Quanto POST /login (sem `async`) e POST /faturas_auto esperam pelo login. Se
+# não bastar, respondem 504 com o id da operação, que continua rodando.
+config["LOGIN_SYNC_WAIT_SECONDS"] = 60
+# Espera máxima de uma chamada de long-poll em GET /login/<operation_id>
+config["LOGIN_POLL_MAX_WAIT_SECONDS"] = 30
+# Esperas máximas de cada condição do login no navegador (sem pausas fixas)
+config["BROWSER_PAGE_LOAD_TIMEOUT_SECONDS"] = 15
+config["LOGIN_FORM_TIMEOUT_SECONDS"] = 10
+config["LOGIN_TOKEN_TIMEOUT_SECONDS"] = 15
+# Bloqueio de imagens, fontes e rastreadores no navegador (opcional). Domínios do
+# reCAPTCHA nunca são bloqueados; `BROWSER_BLOCK_ALLOWLIST` protege outros.
+config["BROWSER_BLOCK_RESOURCES"] = False
+config["BROWSER_BLOCK_EXTRA_PATTERNS"] = []
+config["BROWSER_BLOCK_ALLOWLIST"] = []
+config["TOKEN_STORE_CAPACITY"] = 1000
+config["FATURAS_CACHE_TTL_SECONDS"] = 300
+config["FATURAS_CACHE_STALE_SECONDS"] = 900
+config["FATURAS_CACHE_CAPACITY"] = 5000
+# Limite de consultas simultâneas à API ao buscar todas as UCs de uma conta, e
+# threads compartilhadas por todas essas buscas
+config["FATURAS_MAX_CONCURRENCY"] = 4
+config["FATURAS_WORKERS"] = 16
+# No entry point ASGI, as consultas de faturas e o abastecimento do
+# reservatório de reCAPTCHA rodam no event loop, com um cliente HTTP assíncrono:
+# até ASGI_HTTP_MAX_CONNECTIONS_PER_HOST requisições simultâneas por host; os
+# timeouts e o tamanho máximo das respostas são os de HTTP_*
+config["ASGI_HTTP_MAX_CONNECTIONS_PER_HOST"] = 100
+# Cliente HTTP compartilhado pela API de faturas e pelos serviços de captcha:
+# conexões keep-alive por host, timeouts, cache de DNS, tamanho máximo das
+# respostas e requisições simultâneas por host (o excedente espera na fila até
+# HTTP_QUEUE_TIMEOUT_SECONDS)
+config["HTTP_MAX_CONNECTIONS_PER_HOST"] = 20
+config["HTTP_CONNECT_TIMEOUT_SECONDS"] = 5
+config["HTTP_READ_TIMEOUT_SECONDS"] = 15
+config["HTTP_QUEUE_TIMEOUT_SECONDS"] = 10
+config["HTTP_MAX_RESPONSE_BYTES"] = 5 * 1024 * 1024
+config["HTTP_DNS_TTL_SECONDS"] = 300
+# Para que os tokens sobrevivam a restarts, defina o caminho do arquivo SQLite e
+# uma chave Fernet (`Fernet.generate_key()`) usada para cifrá-los em disco.
+config["TOKEN_STORE_PATH"] = os.environ.get("TOKEN_STORE_PATH")
+config["TOKEN_STORE_KEY"] = os.environ.get("TOKEN_STORE_KEY")
+# Navegadores rodam em modo headless. Para vê-los (necessário para resolver o
+# captcha manualmente), defina a variável de ambiente BROWSER_HEADLESS=false
+config["BROWSER_HEADLESS"] = os.environ.get("BROWSER_HEADLESS") != "false"
+config["BROWSER_POOL_SIZE"] = 2
+config["BROWSER_POOL_MIN_IDLE"] = 1
+config["BROWSER_POOL_CHECKOUT_TIMEOUT_SECONDS"] = 30
+# Resolução do reCAPTCHA por API (2captcha). Sem `CAPTCHA_API_KEY`, o captcha é
+# resolvido manualmente no navegador. Com `RECAPTCHA_SITE_KEY` também definido,
+# tokens são resolvidos de antemão e guardados em um reservatório.
+config["CAPTCHA_API_KEY"] = os.environ.get("CAPTCHA_API_KEY")
+config["CAPTCHA_SERVICE_URL"] = os.environ.get(
+    "CAPTCHA_SERVICE_URL", "http://2captcha.com"
+)
+# Outros provedores no protocolo do 2captcha, disputados junto com o principal:
+# lista de {"service_url": ..., "api_key": ...}. Vale o primeiro token obtido.
+config["CAPTCHA_EXTRA_PROVIDERS"] = []
+# Em modo com janela, a resolução manual também pode entrar na disputa
+config["CAPTCHA_RACE_MANUAL"] = False
+# Prazo único da disputa; menor que `LOGIN_TIMEOUT_SECONDS`, que inclui o portal
+config["CAPTCHA_DEADLINE_SECONDS"] = 45
+# Esperas máximas da resolução manual e de cada provedor no modo `route`
+config["CAPTCHA_MANUAL_TIMEOUT_SECONDS"] = 120
+config["CAPTCHA_API_TIMEOUT_SECONDS"] = 120
+# "race" dispara todos os provedores a cada login; "route" escolhe um só, o de
+# menor custo recente (latência / taxa de sucesso), explorando os outros às vezes
+config["CAPTCHA_STRATEGY"] = "race"
+config["CAPTCHA_ROUTER_EXPLORATION"] = 0.05
+config["CAPTCHA_STATS_WINDOW"] = 100
+config["CAPTCHA_STATS_HALF_LIFE_SECONDS"] = 600
+config["RECAPTCHA_SITE_KEY"] = os.environ.get("RECAPTCHA_SITE_KEY")
+config["RECAPTCHA_PAGE_URL"] = config["PORTAL_URL"]
+config["RECAPTCHA_RESERVOIR_MIN"] = 1
+config["RECAPTCHA_RESERVOIR_CAPACITY"] = 5
+# Tokens do reCAPTCHA valem ~120s; descartá-los antes evita submeter um vencido
+config["RECAPTCHA_TOKEN_TTL_SECONDS"] = 100
+# Jobs em lote: `JOB_WORKERS` itens rodam ao mesmo tempo no total, e cada job
+# usa no máximo `JOB_MAX_PARALLELISM` deles. Logins disputam o pool de navegadores.
+config["JOB_WORKERS"] = 4
+config["JOB_MAX_PARALLELISM"] = 4
+config["JOB_MAX_ITEMS"] = 10000
+# Fração das requisições (e itens de job) rastreadas em spans; o header
+# `X-Trace: 1` força o rastreio. Traces concluídos ficam em GET /debug/traces
+# e, com TRACE_FILE, também são gravados em JSON lines.
+config["TRACE_SAMPLE_RATE"] = 0.05
+config["TRACE_BUFFER_SIZE"] = 200
+config["TRACE_FILE"] = os.environ.get("TRACE_FILE")
+# Com CASSETTE_RECORD_PATH, as chamadas ao navegador, ao solver de captcha e à
+# API de faturas são gravadas e salvas nesse arquivo a cada
+# CASSETTE_FLUSH_SECONDS (se houver novidades) e ao encerrar o processo. Com
+# CASSETTE_REPLAY_PATH, elas são servidas a partir da gravação, sem navegador nem
+# rede, e as esperas gravadas são divididas por CASSETTE_REPLAY_SPEED (0: nenhuma).
+# A cassete guarda tokens do portal: trate o arquivo como uma credencial.
+config["CASSETTE_RECORD_PATH"] = os.environ.get("CASSETTE_RECORD_PATH")
+config["CASSETTE_FLUSH_SECONDS"] = float(os.environ.get("CASSETTE_FLUSH_SECONDS", "30"))
+config["CASSETTE_REPLAY_PATH"] = os.environ.get("CASSETTE_REPLAY_PATH")
+config["CASSETTE_REPLAY_SPEED"] = float(os.environ.get("CASSETTE_REPLAY_SPEED", "1"))
+_executor = ThreadPoolExecutor(
+    max_workers=config["JOB_WORKERS"], thread_name_prefix="jobs"
+)
+_login_executor = ThreadPoolExecutor(
+    max_workers=config["LOGIN_WORKERS"], thread_name_prefix="login"
+)
+gerenciador_logins = GerenciadorOperacoes(
+    _login_executor, timeout_segundos=config["LOGIN_TIMEOUT_SECONDS"]
+)
+_timeout_solvers = max(
+    config["CAPTCHA_MANUAL_TIMEOUT_SECONDS"],
+    config["CAPTCHA_API_TIMEOUT_SECONDS"],
+    config["CAPTCHA_DEADLINE_SECONDS"],
+)
+if config["LOGIN_TIMEOUT_SECONDS"] <= _timeout_solvers:
+    logger.warning(
+        f"⚠️ LOGIN_TIMEOUT_SECONDS ({config['LOGIN_TIMEOUT_SECONDS']}s) não "
+        f"cobre o timeout dos solvers de captcha ({_timeout_solvers}s)"
+    )
+
+# Histogramas e contadores por etapa (navegador, login e suas esperas, captcha,
+# consulta e API de faturas, rotas), servidos em GET /metrics no formato do
+# Prometheus. Os relatórios em JSON saem deles (`metricas.resumo`)
+metricas = MetricasPrometheus()
+rastreador = Rastreador(
+    taxa_amostragem=config["TRACE_SAMPLE_RATE"],
+    capacidade=config["TRACE_BUFFER_SIZE"],
+    arquivo=config["TRACE_FILE"],
+)
+
+# Pool de navegadores pré-inicializados, compartilhado entre as requisições
+_filtro_recursos = (
+    FiltroRecursos(
+        # Imagens e fontes só deixam de ser baixadas no portal
+        hosts_filtrados=[urlparse(config["PORTAL_URL"]).netloc],
+        padroes_extras=config["BROWSER_BLOCK_EXTRA_PATTERNS"],
+        dominios_permitidos=config["BROWSER_BLOCK_ALLOWLIST"],
+    )
+    if config["BROWSER_BLOCK_RESOURCES"]
+    else None
+)
+browser_pool = ChromeWebDriverPool(
+    tamanho_maximo=config["BROWSER_POOL_SIZE"],
+    minimo_ocioso=config["BROWSER_POOL_MIN_IDLE"],
+    fabrica=lambda: ChromeWebDriverManager(
+        headless=config["BROWSER_HEADLESS"],
+        timeout_carregamento=config["BROWSER_PAGE_LOAD_TIMEOUT_SECONDS"],
+        filtro_recursos=_filtro_recursos,
+        metricas=metricas,
+        # Os navegadores do pool servem ao login, que espera pela resposta da
+        # API de autenticação
+        capturar_rede=True,
+    ),
+)
+
+
+# Todo HTTP de saída (fora o navegador) passa por este cliente
+cliente_http = ClienteHTTP(
+    max_conexoes_por_host=config["HTTP_MAX_CONNECTIONS_PER_HOST"],
+    timeout_conexao=config["HTTP_CONNECT_TIMEOUT_SECONDS"],
+    timeout_leitura=config["HTTP_READ_TIMEOUT_SECONDS"],
+    timeout_fila_segundos=config["HTTP_QUEUE_TIMEOUT_SECONDS"],
+    max_bytes_resposta=config["HTTP_MAX_RESPONSE_BYTES"],
+    ttl_dns_segundos=config["HTTP_DNS_TTL_SECONDS"],
+)
+# Cliente assíncrono do entry point ASGI; usado e fechado só no event loop dele
+cliente_http_assincrono = ClienteHTTPAssincrono(
+    max_conexoes_por_host=config["ASGI_HTTP_MAX_CONNECTIONS_PER_HOST"],
+    timeout_conexao=config["HTTP_CONNECT_TIMEOUT_SECONDS"],
+    timeout_leitura=config["HTTP_READ_TIMEOUT_SECONDS"],
+    timeout_fila_segundos=config["HTTP_QUEUE_TIMEOUT_SECONDS"],
+    max_bytes_resposta=config["HTTP_MAX_RESPONSE_BYTES"],
+)
+# Cliente do serviço de captcha: uma única consulta em lote para todas as
+# tarefas em andamento
+captcha_client = (
+    CaptchaAPIClient(
+        config["CAPTCHA_API_KEY"],
+        service_url=config["CAPTCHA_SERVICE_URL"],
+        http=cliente_http,
+    )
+    if config["CAPTCHA_API_KEY"]
+    else None
+)
+_captcha_clients_extras = [
+    CaptchaAPIClient(
+        provedor["api_key"],
+        service_url=provedor["service_url"],
+        http=cliente_http,
+    )
+    for provedor in config["CAPTCHA_EXTRA_PROVIDERS"]
+]
+# Abastece o reservatório no entry point ASGI, sem uma thread por token
+captcha_client_assincrono = (
+    AsyncCaptchaAPIClient(
+        config["CAPTCHA_API_KEY"],
+        http=cliente_http_assincrono,
+        service_url=config["CAPTCHA_SERVICE_URL"],
+    )
+    if config["CAPTCHA_API_KEY"]
+    else None
+)
+# Threads das estratégias em disputa: uma por provedor (mais a manual) por login
+_captcha_executor = ThreadPoolExecutor(
+    max_workers=config["LOGIN_WORKERS"] * (len(_captcha_clients_extras) + 2),
+    thread_name_prefix="captcha",
+)
+
+
+# Resultado e duração de cada resolução de captcha, por solver
+desempenho_captcha = DesempenhoSolvers(
+    janela=config["CAPTCHA_STATS_WINDOW"],
+    meia_vida_segundos=config["CAPTCHA_STATS_HALF_LIFE_SECONDS"],
+    metricas=metricas,
+)
+
+
+def create_reservatorio_recaptcha() -> Optional[ReservatorioTokensRecaptcha]:
+    """Reservatório de tokens, apenas quando a chave da API e o site key existem."""
+    if not (captcha_client and config["RECAPTCHA_SITE_KEY"]):
+        return None
+    return ReservatorioTokensRecaptcha(
+        captcha_client.solicitar_token,
+        site_key=config["RECAPTCHA_SITE_KEY"],
+        page_url=config["RECAPTCHA_PAGE_URL"],
+        minimo=config["RECAPTCHA_RESERVOIR_MIN"],
+        capacidade=config["RECAPTCHA_RESERVOIR_CAPACITY"],
+        validade_segundos=config["RECAPTCHA_TOKEN_TTL_SECONDS"],
+    )
+
+
+reservatorio_recaptcha = create_reservatorio_recaptcha()
+
+
+def create_cassete() -> Optional[Cassete]:
+    """Cassete a reproduzir ou a gravar, conforme `CASSETTE_*_PATH`."""
+    if config["CASSETTE_REPLAY_PATH"]:
+        return Cassete.carregar(config["CASSETTE_REPLAY_PATH"])
+    if not config["CASSETTE_RECORD_PATH"]:
+        return None
+    gravacao = Cassete()
+    gravacao.salvar_periodicamente(
+        config["CASSETTE_RECORD_PATH"], config["CASSETTE_FLUSH_SECONDS"]
+    )
+    atexit.register(gravacao.salvar, config["CASSETTE_RECORD_PATH"])
+    return gravacao
+
+
+cassete = create_cassete()
+reproduzindo = bool(config["CASSETTE_REPLAY_PATH"])
+
+
+def create_fatura_service_api() -> IFaturaService:
+    """Cliente HTTP da API de faturas (ou sua gravação/reprodução)."""
+    if reproduzindo:
+        return FaturaServiceReproducao(cassete, config["CASSETTE_REPLAY_SPEED"])
+    servico = AmazonasEnergyFaturaService(
+        metricas=metricas,
+        url=config["API_URL"] + CAMINHO_FATURAS_ABERTAS,
+        http=cliente_http,
+    )
+    if cassete:
+        return FaturaServiceGravador(servico, cassete)
+    return servico
+
+
+# Serviço de faturas compartilhado: consultas de faturas são HTTP puro e as
+# respostas ficam em cache por UC, client_id e titular do token
+_fatura_service_api = create_fatura_service_api()
+fatura_service = CachedFaturaService(
+    FaturaServiceRastreado(_fatura_service_api, rastreador, "faturas.api"),
+    ttl_segundos=config["FATURAS_CACHE_TTL_SECONDS"],
+    stale_segundos=config["FATURAS_CACHE_STALE_SECONDS"],
+    capacidade=config["FATURAS_CACHE_CAPACITY"],
+)
+# Spans de cada consulta: o externo inclui acertos do cache, o interno só a API
+fatura_service_rastreado = FaturaServiceRastreado(fatura_service, rastreador)
+consulta_faturas = ObterFaturasAbertas(
+    fatura_service_rastreado,
+    metricas=metricas,
+    max_trabalhadores=config["FATURAS_WORKERS"],
+)
+
+
+def create_fatura_service_api_assincrono() -> IAsyncFaturaService:
+    """
+    Cliente assíncrono da API de faturas. A gravação e a reprodução de cassetes
+    são síncronas: nesses modos, o serviço da API Flask roda em threads.
+    """
+    if cassete:
+        return FaturaServiceEmThreads(
+            _fatura_service_api, max_trabalhadores=config["FATURAS_WORKERS"]
+        )
+    return AsyncAmazonasEnergyFaturaService(
+        cliente_http_assincrono,
+        metricas=metricas,
+        url=config["API_URL"] + CAMINHO_FATURAS_ABERTAS,
+    )
+
+
+# Mesmas entradas do cache, spans e métricas das consultas da API Flask, no
+# event loop do entry point ASGI
+fatura_service_assincrono = CachedFaturaServiceAsync(
+    FaturaServiceAsyncRastreado(
+        create_fatura_service_api_assincrono(), rastreador, "faturas.api"
+    ),
+    fatura_service,
+)
+consulta_faturas_assincrona = ObterFaturasAbertasAsync(
+    FaturaServiceAsyncRastreado(fatura_service_assincrono, rastreador),
+    metricas=metricas,
+)
+
+# Rotas de observabilidade não abrem trace (só poluiriam o buffer)
+ROTAS_SEM_TRACE = {"metrics_endpoint", "debug_traces_endpoint", "debug_trace_endpoint"}
+
+
+def _invalidar_faturas_da_sessao(sessao: SessaoAutenticada) -> None:
+    """Sessão saiu do token store (logout, expiração, novo login): limpa o cache."""
+    fatura_service.invalidar_titular(sessao.token)
+
+
+def create_token_store() -> ITokenStore:
+    """Usa o token store persistente quando configurado, senão apenas memória."""
+    if not config["TOKEN_STORE_PATH"]:
+        return InMemoryTokenStore(
+            capacidade=config["TOKEN_STORE_CAPACITY"],
+            ao_remover_sessao=_invalidar_faturas_da_sessao,
+        )
+    if not config["TOKEN_STORE_KEY"]:
+        raise RuntimeError(
+            "TOKEN_STORE_KEY é obrigatória quando TOKEN_STORE_PATH está definido."
+        )
+    return SQLiteTokenStore(
+        caminho=config["TOKEN_STORE_PATH"],
+        chave_criptografia=config["TOKEN_STORE_KEY"],
+        capacidade=config["TOKEN_STORE_CAPACITY"],
+        ao_remover_sessao=_invalidar_faturas_da_sessao,
+    )
+
+
+# Tokens de todas as contas autenticadas, por CPF/CNPJ e por valor do token
+token_store = create_token_store()
+# Logins simultâneos das mesmas credenciais viram um só login no navegador
+logins_em_andamento = SingleFlight()
+
+
+def create_recaptcha_solver(web_driver_manager: IWebDriverManager) -> IRecaptchaSolver:
+    """
+    Solver do login conforme `CAPTCHA_STRATEGY`. Cada invocação tem resultado e
+    duração registrados em `desempenho_captcha`.
+    """
+    solver_manual = RecaptchaManualSolver(
+        web_driver_manager, timeout=config["CAPTCHA_MANUAL_TIMEOUT_SECONDS"]
+    )
+    if not captcha_client:
+        return RecaptchaSolverMonitorado("manual", solver_manual, desempenho_captcha)
+
+    clientes = [captcha_client, *_captcha_clients_extras]
+    if config["CAPTCHA_STRATEGY"] == "route":
+        candidatos: Dict[str, IRecaptchaSolver] = {
+            urlparse(cliente.service_url).netloc: RecaptchaAPISolver(
+                web_driver_manager,
+                cliente.api_key,
+                service_url=cliente.service_url,
+                cliente=cliente,
+                timeout=config["CAPTCHA_API_TIMEOUT_SECONDS"],
+            )
+            for cliente in clientes
+        }
+        if config["CAPTCHA_RACE_MANUAL"]:
+            candidatos["manual"] = solver_manual
+        candidatos = {
+            nome: RecaptchaSolverRastreado(solver, rastreador, f"captcha.{nome}")
+            for nome, solver in candidatos.items()
+        }
+        roteado: IRecaptchaSolver = RecaptchaSolverRoteado(
+            candidatos,
+            desempenho_captcha,
+            exploracao=config["CAPTCHA_ROUTER_EXPLORATION"],
+        )
+        if reservatorio_recaptcha:
+            # Abastecido pelo provedor principal, serve a qualquer candidato
+            roteado = RecaptchaReservatorioSolver(
+                web_driver_manager, roteado, reservatorio_recaptcha
+            )
+        return RecaptchaSolverMonitorado("roteamento", roteado, desempenho_captcha)
+
+    provedores = [
+        RecaptchaAPISolver(
+            web_driver_manager,
+            cliente.api_key,
+            service_url=cliente.service_url,
+            cliente=cliente,
+        )
+        for cliente in clientes
+    ]
+    return RecaptchaSolverMonitorado(
+        "disputa",
+        RecaptchaHybridSolver(
+            web_driver_manager,
+            provedores,
+            solver_manual=(solver_manual if config["CAPTCHA_RACE_MANUAL"] else None),
+            reservatorio=reservatorio_recaptcha,
+            prazo_segundos=config["CAPTCHA_DEADLINE_SECONDS"],
+            executor=_captcha_executor,
+        ),
+        desempenho_captcha,
+    )
+
+
+def create_scraper_session(esperar_navegador: bool = False) -> SessaoAplicacao:
+    """Factory para criar uma nova instância de SessaoAplicacao com suas dependências.
+
+    Nenhum navegador é iniciado aqui: ele só é emprestado do pool quando um passo
+    no navegador (como o login) é executado, e devolvido em `session.finalizar()`.
+    Com `esperar_navegador`, a sessão espera na fila do pool sem limite de tempo
+    em vez de usar `BROWSER_POOL_CHECKOUT_TIMEOUT_SECONDS`.
+    """
+    timeout_navegador = (
+        None if esperar_navegador else config["BROWSER_POOL_CHECKOUT_TIMEOUT_SECONDS"]
+    )
+    if reproduzindo:
+        web_driver_manager: IWebDriverManager = WebDriverManagerReproducao(
+            cassete, config["CASSETTE_REPLAY_SPEED"]
+        )
+    else:
+        web_driver_manager = LazyWebDriverManager(
+            # A fila do pool também respeita o prazo do login em curso
+            adquirir=lambda: browser_pool.adquirir(
+                timeout=tempo_restante(timeout_navegador)
+            ),
+            liberar=browser_pool.devolver,
+        )
+        if cassete:
+            web_driver_manager = WebDriverManagerGravador(web_driver_manager, cassete)
+    # Cada chamada ao navegador, ao solver, ao login e às faturas vira um span
+    # quando a requisição (ou o item de job) está sendo rastreada
+    web_driver_manager = WebDriverManagerRastreado(web_driver_manager, rastreador)
+    if reproduzindo:
+        recaptcha_solver: IRecaptchaSolver = RecaptchaSolverReproducao(
+            cassete, config["CASSETTE_REPLAY_SPEED"]
+        )
+    else:
+        recaptcha_solver = create_recaptcha_solver(web_driver_manager)
+        if cassete:
+            recaptcha_solver = RecaptchaSolverGravador(recaptcha_solver, cassete)
+    recaptcha_solver = RecaptchaSolverRastreado(recaptcha_solver, rastreador)
+    login_service = LoginServiceRastreado(
+        AmazonasEnergyLoginService(
+            web_driver_manager,
+            recaptcha_solver,
+            timeout_formulario=config["LOGIN_FORM_TIMEOUT_SECONDS"],
+            timeout_token=config["LOGIN_TOKEN_TIMEOUT_SECONDS"],
+            metricas=metricas,
+            padrao_url_autenticacao=padrao_url_autenticacao(config["API_URL"]),
+            url_portal=config["PORTAL_URL"],
+        ),
+        rastreador,
+    )
+    return SessaoAplicacao(
+        web_driver_manager,
+        login_service,
+        fatura_service_rastreado,
+        consulta_faturas=consulta_faturas,
+    )
+
+
+_lock_recursos = threading.Lock()
+recursos_iniciados = threading.Event()
+
+
+def iniciar_recursos(abastecer_reservatorio: bool = True) -> None:
+    """
+    Aquece o pool de navegadores e começa a abastecer o reservatório de tokens
+    do reCAPTCHA, uma vez por processo. Chamada na primeira requisição,
+    qualquer que seja o servidor (flask run, WSGI ou ASGI), e antes disso onde
+    se sabe que o servidor está subindo (`__main__`, lifespan ASGI). Sem
+    `abastecer_reservatorio`, quem chama abastece o reservatório (o lifespan
+    ASGI o faz no event loop).
+    """
+    with _lock_recursos:
+        if recursos_iniciados.is_set():
+            return
+        recursos_iniciados.set()
+    if not reproduzindo:
+        browser_pool.aquecer()
+        if reservatorio_recaptcha and abastecer_reservatorio:
+            reservatorio_recaptcha.iniciar()
+
+
+def _chave_login(credenciais: Credenciais) -> str:
+    """Chave do login em andamento; inclui a senha para não misturar tentativas."""
+    mensagem = f"{normalizar_cpf_cnpj(credenciais.cpf_cnpj)}\0{credenciais.senha}"
+    return hashlib.sha256(mensagem.encode()).hexdigest()
+
+
+def _autenticar(
+    credenciais: Credenciais, session: SessaoAplicacao
+) -> Optional[SessaoAutenticada]:
+    """
+    Faz o login no navegador e guarda o resultado no token store.
+
+    Se um login com as mesmas credenciais já estiver em andamento, espera por
+    ele e compartilha o resultado em vez de abrir outro navegador; nesse caso
+    `session` nem chega a emprestar um navegador do pool. A espera termina no
+    prazo da operação em curso (sem prazo, como nos jobs, espera o quanto for).
+    Os logins de `gerenciador_logins` já são compartilhados antes, por
+    `_chave_login`: aqui só se encontram um login de job e um de requisição.
+    """
+
+    def autenticar_no_navegador() -> Optional[SessaoAutenticada]:
+        # Um login que acabou de terminar pode já ter preenchido o store.
+        sessao_armazenada = token_store.obter_por_credenciais(credenciais)
+        if sessao_armazenada:
+            return sessao_armazenada
+        if not session.autenticar(credenciais.cpf_cnpj, credenciais.senha):
+            return None
+        return token_store.salvar(credenciais, session.token, session.user_info)
+
+    return logins_em_andamento.executar(
+        _chave_login(credenciais), autenticar_no_navegador, timeout=tempo_restante()
+    )
+
+
+def _processar_item_job(item: ItemJob) -> List[FaturaDTO]:
+    """Login (ou token em cache) + faturas de um item de job em lote."""
+    with rastreador.trace("job_item"):
+        return _executar_item_job(item)
+
+
+def _executar_item_job(item: ItemJob) -> List[FaturaDTO]:
+    credenciais = Credenciais(cpf_cnpj=item.cpf_cnpj, senha=item.senha)
+    sessao_armazenada = token_store.obter_por_credenciais(credenciais)
+    if not sessao_armazenada:
+        # Itens de job esperam na fila do pool em vez de falhar por timeout.
+        session = create_scraper_session(esperar_navegador=True)
+        try:
+            sessao_armazenada = _autenticar(credenciais, session)
+        finally:
+            session.finalizar()
+    item.esquecer_senha()
+    if not sessao_armazenada:
+        raise AuthenticationError("Falha no login.")
+
+    faturas = consulta_faturas.executar(
+        sessao_armazenada.token, item.consumer_unit, item.client_id
+    )
+    if faturas is None:
+        raise DataExtractionError("Não foi possível obter as faturas.")
+    return faturas
+
+
+def _login_em_segundo_plano(credenciais: Credenciais) -> SessaoAutenticada:
+    """
+    Login no navegador executado por `gerenciador_logins`, fora da requisição.
+    A operação é concluída assim que o serviço de login resolve
+    `session.autenticacao`: quem espera por ela não espera o navegador voltar
+    ao pool.
+    """
+    session = create_scraper_session()
+    operacao = operacao_atual()
+    if operacao is not None and session.autenticacao is not None:
+        session.autenticacao.add_done_callback(
+            lambda autenticacao: _antecipar_login(operacao, credenciais, autenticacao)
+        )
+    try:
+        sessao_autenticada = _autenticar(credenciais, session)
+    finally:
+        session.finalizar()
+    if not sessao_autenticada:
+        raise AuthenticationError("Falha no login.")
+    return sessao_autenticada
+
+
+def _antecipar_login(
+    operacao: Operacao,
+    credenciais: Credenciais,
+    autenticacao: "Future[Tuple[Optional[TokenAcesso], Optional[InformacoesUsuario]]]",
+) -> None:
+    token, user_info = autenticacao.result()
+    if token and user_info:
+        operacao.finalizar(
+            SUCESSO, resultado=token_store.salvar(credenciais, token, user_info)
+        )
+
+
+def iniciar_login(credenciais: Credenciais) -> Operacao:
+    """
+    Login em segundo plano. Credenciais iguais às de um login em andamento
+    recebem a mesma operação, sem ocupar outra thread de login.
+    """
+    return gerenciador_logins.iniciar(
+        _login_em_segundo_plano, credenciais, chave=_chave_login(credenciais)
+    )
+
+
+def descrever_operacao_login(
+    operacao: Operacao, espera_esgotada: bool = False
+) -> Tuple[Dict, int, Dict]:
+    """
+    Corpo, status HTTP e headers da resposta de uma operação de login. Com
+    `espera_esgotada` (quem chamou esperou `LOGIN_SYNC_WAIT_SECONDS`), um login
+    ainda em andamento vira 504, com o id para acompanhar o resultado.
+    """
+    if operacao.status in (PENDENTE, EXECUTANDO):
+        status_url = f"/login/{operacao.id}"
+        corpo = {
+            "status": operacao.status,
+            "operation_id": operacao.id,
+            "status_url": status_url,
+        }
+        if espera_esgotada:
+            corpo["message"] = "Login ainda em andamento; consulte `status_url`"
+        return corpo, 504 if espera_esgotada else 202, {"Location": status_url}
+    if operacao.status == SUCESSO:
+        sessao_autenticada = operacao.resultado
+        return (
+            {
+                "status": "success",
+                "message": "Login realizado com sucesso",
+                "operation_id": operacao.id,
+                "token": sessao_autenticada.token.valor,
+                "user_info": sessao_autenticada.user_info.__dict__,
+            },
+            200,
+            {},
+        )
+    if operacao.status == TIMEOUT:
+        return (
+            {
+                "status": "timeout",
+                "message": "Tempo limite do login excedido",
+                "operation_id": operacao.id,
+            },
+            504,
+            {},
+        )
+    if isinstance(operacao.excecao, AuthenticationError):
+        return (
+            {
+                "status": "error",
+                "message": "Falha no login",
+                "operation_id": operacao.id,
+            },
+            401,
+            {},
+        )
+    return (
+        {
+            "error": f"Erro interno do servidor: {operacao.erro}",
+            "operation_id": operacao.id,
+        },
+        500,
+        {},
+    )
+
+
+gerenciador_jobs = GerenciadorJobs(
+    _executor,
+    _processar_item_job,
+    max_paralelismo=config["JOB_MAX_PARALLELISM"],
+)
+
+metricas.medidor(
+    "navegadores_em_uso",
+    "Navegadores emprestados do pool.",
+    lambda: browser_pool.estatisticas()["em_uso"],
+)
+metricas.medidor(
+    "navegadores_ociosos",
+    "Navegadores prontos no pool.",
+    lambda: browser_pool.estatisticas()["ociosos"],
+)
+metricas.medidor(
+    "logins_em_andamento",
+    "Logins no navegador em andamento (após agrupar credenciais iguais).",
+    lambda: logins_em_andamento.estatisticas()["em_andamento"],
+)
+metricas.medidor(
+    "jobs_ativos",
+    "Jobs em lote ainda não finalizados.",
+    lambda: gerenciador_jobs.estatisticas()["jobs_ativos"],
+)
+metricas.medidor(
+    "itens_job_em_execucao",
+    "Itens de jobs em lote executando agora.",
+    lambda: gerenciador_jobs.estatisticas()["itens_em_execucao"],
+)
+if reservatorio_recaptcha:
+    metricas.medidor(
+        "captcha_tokens_prontos",
+        "Tokens de reCAPTCHA prontos no reservatório.",
+        lambda: reservatorio_recaptcha.estatisticas()["prontos"],
+    )
+
+
+def sessao_do_bearer(authorization: Optional[str]) -> Optional[SessaoAutenticada]:
+    """Sessão do token store para o valor do header `Authorization: Bearer`."""
+    token = authorization
+    if token and token.lower().startswith("bearer "):
+        token = token[7:]
+    return token_store.obter_por_token(token) if token else None
@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scraper.application.jobs import (
+    ERRO,
+    PARCIAL,
+    SUCESSO,
+    GerenciadorJobs,
+    ItemJob,
+)
+
+
+class _Processador:
+    """Registra o pico de itens simultâneos e segura cada um por `duracao`."""
+
+    def __init__(self, duracao=0.05, falhar=()):
+        self.duracao = duracao
+        self.falhar = set(falhar)
+        self.em_execucao = 0
+        self.pico = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, item):
+        with self._lock:
+            self.em_execucao += 1
+            self.pico = max(self.pico, self.em_execucao)
+        try:
+            time.sleep(self.duracao)
+            if item.consumer_unit in self.falhar:
+                raise RuntimeError(f"falha na UC {item.consumer_unit}")
+            return []
+        finally:
+            with self._lock:
+                self.em_execucao -= 1
+
+
+def _itens(quantidade):
+    return [
+        ItemJob(cpf_cnpj="123", senha="senha", consumer_unit=str(i), client_id="c")
+        for i in range(quantidade)
+    ]
+
+
+def _aguardar(gerenciador, job, timeout=5):
+    limite = time.monotonic() + timeout
+    while gerenciador.descrever(job)["finalizado_em"] is None:
+        assert time.monotonic() < limite, "job não terminou"
+        time.sleep(0.01)
+    return gerenciador.descrever(job)
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=8)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_job_respeita_o_paralelismo_pedido(executor):
+    processador = _Processador()
+    gerenciador = GerenciadorJobs(executor, processador, max_paralelismo=4)
+
+    job = gerenciador.criar(_itens(8), paralelismo=2)
+    descricao = _aguardar(gerenciador, job)
+
+    assert processador.pico == 2
+    assert descricao["status"] == SUCESSO
+    assert descricao["concluidos"] == 8
+
+
+def test_paralelismo_pedido_e_limitado_ao_maximo(executor):
+    processador = _Processador()
+    gerenciador = GerenciadorJobs(executor, processador, max_paralelismo=3)
+
+    job = gerenciador.criar(_itens(9), paralelismo=50)
+    _aguardar(gerenciador, job)
+
+    assert job.paralelismo == 3
+    assert processador.pico == 3
+
+
+def test_jobs_simultaneos_dividem_o_executor(executor):
+    processador = _Processador()
+    gerenciador = GerenciadorJobs(executor, processador, max_paralelismo=4)
+
+    jobs = [gerenciador.criar(_itens(4), paralelismo=4) for _ in range(3)]
+    for job in jobs:
+        _aguardar(gerenciador, job)
+
+    # 3 jobs x 4 itens, mas o executor só tem 8 threads
+    assert processador.pico == 8
+
+
+def test_falha_de_um_item_nao_derruba_o_job(executor):
+    processador = _Processador(duracao=0, falhar={"1"})
+    gerenciador = GerenciadorJobs(executor, processador)
+
+    descricao = _aguardar(gerenciador, gerenciador.criar(_itens(3)))
+
+    assert descricao["status"] == PARCIAL
+    assert descricao["contagem"] == {
+        "pending": 0,
+        "running": 0,
+        "success": 2,
+        "error": 1,
+    }
+    assert descricao["itens"][1]["error"] == "falha na UC 1"
+    assert "senha" not in descricao["itens"][0]
+
+
+def test_todos_os_itens_falhando(executor):
+    processador = _Processador(duracao=0, falhar={"0", "1"})
+    gerenciador = GerenciadorJobs(executor, processador)
+
+    job = gerenciador.criar(_itens(2))
+
+    assert _aguardar(gerenciador, job)["status"] == ERRO
+    # A senha é descartada mesmo quando o processamento falha
+    assert all(item.senha == "" for item in job.itens)
+
+
+def test_job_sem_itens(executor):
+    gerenciador = GerenciadorJobs(executor, _Processador())
+
+    with pytest.raises(ValueError):
+        gerenciador.criar([])
+
+
+def test_descarta_so_jobs_finalizados_alem_do_limite(executor):
+    gerenciador = GerenciadorJobs(executor, _Processador(duracao=0), max_jobs_retidos=1)
+    primeiro = gerenciador.criar(_itens(1))
+    _aguardar(gerenciador, primeiro)
+
+    segundo = gerenciador.criar(_itens(1))
+
+    assert gerenciador.obter(primeiro.id) is None
+    assert gerenciador.obter(segundo.id) is segundo
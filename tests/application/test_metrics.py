@@ -0,0 +1,106 @@
+import pytest
+
+from scraper.application.metrics import (
+    FALHA,
+    SUCESSO,
+    TIMEOUT,
+    MetricasPrometheus,
+    resultado_da_excecao,
+    resultado_do_status_http,
+)
+
+
+@pytest.fixture
+def metricas():
+    return MetricasPrometheus(buckets=(0.1, 1, 10))
+
+
+def test_exporta_histograma_cumulativo_e_contadores(metricas):
+    metricas.registrar("login", "captcha", 0.05)
+    metricas.registrar("login", "captcha", 5, FALHA)
+
+    texto = metricas.exportar()
+
+    rotulos = 'componente="login",etapa="captcha"'
+    assert f'scraper_etapa_duracao_segundos_bucket{{{rotulos},le="0.1"}} 1' in texto
+    assert f'scraper_etapa_duracao_segundos_bucket{{{rotulos},le="1"}} 1' in texto
+    assert f'scraper_etapa_duracao_segundos_bucket{{{rotulos},le="10"}} 2' in texto
+    assert f'scraper_etapa_duracao_segundos_bucket{{{rotulos},le="+Inf"}} 2' in texto
+    assert f"scraper_etapa_duracao_segundos_sum{{{rotulos}}} 5.050000" in texto
+    assert f'scraper_etapa_total{{{rotulos},resultado="sucesso"}} 1' in texto
+    assert f'scraper_etapa_total{{{rotulos},resultado="falha"}} 1' in texto
+
+
+def test_medidor_instantaneo_ignora_funcao_com_erro(metricas):
+    metricas.medidor("pool_ociosos", "Navegadores ociosos.", lambda: 3)
+    metricas.medidor("quebrado", "Sempre falha.", lambda: 1 / 0)
+
+    texto = metricas.exportar()
+
+    assert "# TYPE scraper_pool_ociosos gauge\nscraper_pool_ociosos 3" in texto
+    assert "scraper_quebrado" not in texto
+
+
+def test_rotulos_sao_escapados(metricas):
+    metricas.registrar("api", 'rota"com\\aspas', 0.1)
+
+    assert 'etapa="rota\\"com\\\\aspas"' in metricas.exportar()
+
+
+def test_medir_conta_excecoes_de_timeout_a_parte(metricas):
+    with pytest.raises(TimeoutError):
+        with metricas.medir("navegador", "navegar_para"):
+            raise TimeoutError()
+    with pytest.raises(ValueError):
+        with metricas.medir("navegador", "navegar_para"):
+            raise ValueError()
+    with metricas.medir("navegador", "navegar_para") as medicao:
+        medicao["resultado"] = FALHA
+
+    resumo = metricas.resumo("navegador")["navegar_para"]
+    assert resumo["total"] == 3
+    assert resumo["sucessos"] == 0
+    assert resumo["falhas"] == 3
+    assert resumo["timeouts"] == 1
+
+
+def test_resumo_interpola_os_percentis_nos_buckets(metricas):
+    for _ in range(50):
+        metricas.registrar("faturas", "consulta", 0.05)
+    for _ in range(50):
+        metricas.registrar("faturas", "consulta", 0.5)
+    metricas.registrar("outro", "consulta", 0.05)
+
+    resumo = metricas.resumo("faturas")
+
+    assert list(resumo) == ["consulta"]
+    consulta = resumo["consulta"]
+    assert consulta["total"] == 100 and consulta["sucessos"] == 100
+    assert consulta["media_ms"] == 275.0
+    # Metade das amostras no primeiro bucket: o p50 é o limite dele
+    assert consulta["p50_ms"] == 100.0
+    # p95 a 90% do caminho entre 0,1 s e 1 s
+    assert consulta["p95_ms"] == 910.0
+
+
+def test_resumo_acima_do_maior_bucket_usa_o_limite_dele(metricas):
+    metricas.registrar("captcha", "solver", 60)
+
+    assert metricas.resumo("captcha")["solver"]["p99_ms"] == 10000.0
+    assert metricas.resumo("sem_registros") == {}
+
+
+@pytest.mark.parametrize(
+    "status, resultado",
+    [(200, SUCESSO), (302, SUCESSO), (404, FALHA), (500, FALHA), (504, TIMEOUT)],
+)
+def test_resultado_do_status_http(status, resultado):
+    assert resultado_do_status_http(status) == resultado
+
+
+def test_resultado_da_excecao_reconhece_timeouts_por_nome():
+    class ReadTimeout(Exception):
+        pass
+
+    assert resultado_da_excecao(ReadTimeout()) == TIMEOUT
+    assert resultado_da_excecao(RuntimeError()) == FALHA
@@ -0,0 +1,202 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import pytest
+
+from scraper.application import operacoes
+from scraper.application.operacoes import (
+    ERRO,
+    SUCESSO,
+    TIMEOUT,
+    GerenciadorOperacoes,
+    operacao_atual,
+)
+from scraper.application.prazos import prazo, prazo_esgotado, tempo_restante
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_mesma_chave_recebe_a_operacao_em_andamento(executor):
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=5)
+    liberar = threading.Event()
+    execucoes = []
+
+    def login(credencial):
+        execucoes.append(credencial)
+        liberar.wait(5)
+        return credencial
+
+    primeira = gerenciador.iniciar(login, "a", chave="cpf")
+    segunda = gerenciador.iniciar(login, "a", chave="cpf")
+    outra = gerenciador.iniciar(login, "b", chave="outro-cpf")
+    liberar.set()
+
+    assert segunda is primeira
+    assert outra is not primeira
+    assert primeira.aguardar(5) and outra.aguardar(5)
+    assert sorted(execucoes) == ["a", "b"]
+    assert gerenciador.estatisticas() == {
+        "chaves_em_andamento": 0,
+        "iniciadas": 2,
+        "compartilhadas": 1,
+    }
+
+
+def test_chave_livre_depois_que_a_operacao_termina(executor):
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=5)
+
+    primeira = gerenciador.iniciar(lambda: 1, chave="cpf")
+    assert primeira.aguardar(5) and primeira.status == SUCESSO
+    segunda = gerenciador.iniciar(lambda: 2, chave="cpf")
+
+    assert segunda is not primeira
+    assert segunda.aguardar(5) and segunda.resultado == 2
+
+
+def test_seguidores_nao_ocupam_threads(executor):
+    # Um executor de uma thread só: se cada chamada ocupasse uma thread, a
+    # operação de outra chave ficaria na fila atrás delas
+    executor_unico = ThreadPoolExecutor(max_workers=1)
+    gerenciador = GerenciadorOperacoes(executor_unico, timeout_segundos=5)
+    liberar = threading.Event()
+    try:
+        lider = gerenciador.iniciar(lambda: liberar.wait(5), chave="cpf")
+        for _ in range(10):
+            assert gerenciador.iniciar(lambda: None, chave="cpf") is lider
+        liberar.set()
+        outra = gerenciador.iniciar(lambda: "outra", chave="outro-cpf")
+
+        assert outra.aguardar(5) and outra.resultado == "outra"
+    finally:
+        executor_unico.shutdown(wait=True)
+
+
+def test_sem_chave_nao_compartilha(executor):
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=5)
+
+    assert gerenciador.iniciar(lambda: 1) is not gerenciador.iniciar(lambda: 1)
+
+
+def test_trabalho_pode_concluir_a_operacao_antes_de_retornar(executor):
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=5)
+    limpeza = threading.Event()
+
+    def login():
+        operacao_atual().finalizar(SUCESSO, resultado="token")
+        # Limpeza depois do resultado (como devolver o navegador ao pool)
+        limpeza.wait(5)
+        raise RuntimeError("falha na limpeza")
+
+    operacao = gerenciador.iniciar(login)
+
+    assert operacao.aguardar(5)
+    assert operacao.resultado == "token"
+    limpeza.set()
+    executor.shutdown(wait=True)
+    # A falha depois do resultado não muda o desfecho
+    assert operacao.status == SUCESSO
+
+
+def test_operacao_que_expira_na_fila_nao_executa():
+    executor_unico = ThreadPoolExecutor(max_workers=1)
+    gerenciador = GerenciadorOperacoes(executor_unico, timeout_segundos=0.1)
+    liberar = threading.Event()
+    executadas = []
+    try:
+        ocupando = gerenciador.iniciar(lambda: liberar.wait(5))
+        na_fila = gerenciador.iniciar(lambda: executadas.append(1))
+        time.sleep(0.2)
+        liberar.set()
+        executor_unico.shutdown(wait=True)
+
+        assert ocupando.status == SUCESSO
+        assert na_fila.status == TIMEOUT
+        assert executadas == []
+    finally:
+        executor_unico.shutdown(wait=True)
+
+
+def test_falha_depois_do_prazo_vira_timeout(executor):
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=0.05)
+
+    def login():
+        time.sleep(0.1)
+        raise RuntimeError("navegador não respondeu")
+
+    operacao = gerenciador.iniciar(login)
+
+    assert operacao.aguardar(5)
+    assert operacao.status == TIMEOUT
+    assert isinstance(operacao.excecao, RuntimeError)
+
+
+def test_falha_dentro_do_prazo_vira_erro(executor):
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=5)
+
+    def login():
+        raise RuntimeError("senha inválida")
+
+    operacao = gerenciador.iniciar(login)
+
+    assert operacao.aguardar(5)
+    assert operacao.status == ERRO
+    assert operacao.erro == "senha inválida"
+
+
+def test_sucesso_tardio_substitui_o_timeout(executor, monkeypatch):
+    monkeypatch.setattr(operacoes, "TOLERANCIA_EXECUCAO_SEGUNDOS", 0.05)
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=0.05)
+    liberar = threading.Event()
+    operacao = gerenciador.iniciar(lambda: liberar.wait(5) and "token")
+
+    # Quem espera desiste no prazo mais a tolerância, com o trabalho em curso
+    assert operacao.aguardar(5)
+    assert operacao.status == TIMEOUT
+    liberar.set()
+    executor.shutdown(wait=True)
+
+    assert operacao.status == SUCESSO
+    assert operacao.resultado == "token"
+
+
+def test_trabalho_ve_o_prazo_da_operacao(executor):
+    gerenciador = GerenciadorOperacoes(executor, timeout_segundos=2)
+
+    operacao = gerenciador.iniciar(lambda: tempo_restante(30))
+
+    assert operacao.aguardar(5)
+    assert 0 < operacao.resultado <= 2
+
+
+def test_prazo_mais_curto_em_vigor_continua_valendo():
+    assert tempo_restante(10) == 10
+    with prazo(time.monotonic() + 1):
+        with prazo(time.monotonic() + 60):
+            assert tempo_restante(10) <= 1
+        with prazo(time.monotonic() + 0.5):
+            assert tempo_restante(10) <= 0.5
+        assert 0.5 < tempo_restante(None) <= 1
+    assert tempo_restante(None) is None
+
+
+def test_prazo_esgotado_e_tempo_restante_nunca_negativo():
+    with prazo(time.monotonic() - 1):
+        assert prazo_esgotado()
+        assert tempo_restante(10) == 0.0
+    assert not prazo_esgotado()
+
+
+def test_prazo_viaja_com_o_contexto_para_outras_threads(executor):
+    with prazo(time.monotonic() + 1):
+        futuro = executor.submit(copy_context().run, tempo_restante, 10)
+    sem_contexto = executor.submit(tempo_restante, 10)
+
+    assert futuro.result() <= 1
+    assert sem_contexto.result() == 10
@@ -0,0 +1,172 @@
+import pytest
+
+from scraper.application import recaptcha_routing
+from scraper.application.metrics import MetricasPrometheus
+from scraper.application.recaptcha_routing import (
+    DesempenhoSolvers,
+    RecaptchaSolverRoteado,
+)
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.agora
+
+    perf_counter = monotonic
+
+
+class _Aleatorio:
+    """`random()` devolve `sorteio`; `choice` pega sempre o último candidato."""
+
+    def __init__(self, sorteio):
+        self.sorteio = sorteio
+
+    def random(self):
+        return self.sorteio
+
+    def choice(self, candidatos):
+        return candidatos[-1]
+
+
+class _Solver:
+    """Leva `duracao` segundos do relógio falso e devolve `resultado`."""
+
+    def __init__(self, relogio, resultado=True, duracao=1.0):
+        self.relogio = relogio
+        self.resultado = resultado
+        self.duracao = duracao
+        self.chamadas = 0
+
+    def resolver(self):
+        self.chamadas += 1
+        self.relogio.agora += self.duracao
+        if isinstance(self.resultado, Exception):
+            raise self.resultado
+        return self.resultado
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(recaptcha_routing, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def desempenho(relogio):
+    return DesempenhoSolvers(janela_segundos=3600, meia_vida_segundos=600)
+
+
+def test_custo_esperado_considera_o_tempo_das_falhas(desempenho):
+    desempenho.registrar("api", True, 10)
+    desempenho.registrar("api", False, 4)
+
+    # Taxa de Laplace (1 + 1) / (2 + 2) = 0.5: (0.5 * 10 + 0.5 * 4) / 0.5
+    assert desempenho.custo_esperado("api") == 14
+    assert desempenho.custo_esperado("sem-amostras") is None
+
+
+def test_amostras_antigas_pesam_menos_e_saem_da_janela(relogio, desempenho):
+    desempenho.registrar("api", True, 100)
+    relogio.agora += 600
+    desempenho.registrar("api", True, 10)
+
+    # A amostra de 100 s já pesa metade: (0.5 * 100 + 10) / 1.5
+    assert desempenho.custo_esperado("api") == 40
+
+    relogio.agora += 3001
+    assert desempenho.custo_esperado("api") == 10
+    relogio.agora += 600
+    assert desempenho.custo_esperado("api") is None
+
+
+def test_solver_sem_amostras_e_tentado_primeiro(relogio, desempenho):
+    desempenho.registrar("rapido", True, 5)
+    desempenho.registrar("lento", True, 30)
+    roteador = RecaptchaSolverRoteado(
+        {nome: _Solver(relogio) for nome in ("lento", "rapido", "novo")},
+        desempenho,
+        exploracao=0,
+    )
+
+    assert roteador.ordem() == (["novo", "rapido", "lento"], False)
+
+
+def test_exploracao_leva_outro_candidato_a_frente(relogio, desempenho):
+    desempenho.registrar("rapido", True, 5)
+    desempenho.registrar("medio", True, 10)
+    desempenho.registrar("lento", True, 30)
+    solvers = {nome: _Solver(relogio) for nome in ("rapido", "medio", "lento")}
+    roteador = RecaptchaSolverRoteado(
+        solvers, desempenho, exploracao=0.05, aleatorio=_Aleatorio(0.01)
+    )
+
+    assert roteador.ordem() == (["lento", "rapido", "medio"], True)
+    assert roteador.resolver() is True
+
+    assert solvers["lento"].chamadas == 1
+    assert solvers["rapido"].chamadas == 0
+    resumo = desempenho.resumo()
+    assert resumo["lento"]["escolhas"] == 1
+    assert resumo["lento"]["exploracoes"] == 1
+    assert resumo["lento"]["amostras"] == 2
+
+
+def test_sem_exploracao_fica_o_menor_custo(relogio, desempenho):
+    desempenho.registrar("rapido", True, 5)
+    desempenho.registrar("lento", True, 30)
+    roteador = RecaptchaSolverRoteado(
+        {nome: _Solver(relogio) for nome in ("rapido", "lento")},
+        desempenho,
+        exploracao=0.05,
+        aleatorio=_Aleatorio(0.5),
+    )
+
+    assert roteador.ordem() == (["rapido", "lento"], False)
+
+
+def test_falha_do_escolhido_passa_ao_proximo_e_conta_no_custo(relogio, desempenho):
+    desempenho.registrar("rapido", True, 5)
+    desempenho.registrar("lento", True, 30)
+    solvers = {
+        "rapido": _Solver(relogio, RuntimeError("sem saldo"), duracao=2),
+        "lento": _Solver(relogio, duracao=30),
+    }
+    roteador = RecaptchaSolverRoteado(solvers, desempenho, exploracao=0)
+
+    assert roteador.resolver() is True
+
+    assert solvers["lento"].chamadas == 1
+    # Uma exceção conta como falha, com a duração até ela
+    resumo = desempenho.resumo()
+    assert resumo["rapido"]["amostras"] == 2
+    assert resumo["rapido"]["taxa_sucesso"] == pytest.approx(0.5, abs=0.001)
+    assert resumo["lento"]["escolhas"] == 0
+
+
+def test_todos_falhando(relogio, desempenho):
+    solvers = {"a": _Solver(relogio, False), "b": _Solver(relogio, False)}
+
+    assert RecaptchaSolverRoteado(solvers, desempenho).resolver() is False
+    assert all(solver.chamadas == 1 for solver in solvers.values())
+
+
+def test_latencias_do_resumo_vem_das_metricas(relogio):
+    metricas = MetricasPrometheus(buckets=(1, 10, 100))
+    desempenho = DesempenhoSolvers(metricas=metricas)
+    roteador = RecaptchaSolverRoteado({"api": _Solver(relogio, duracao=5)}, desempenho)
+
+    roteador.resolver()
+
+    latencia = desempenho.resumo()["api"]["latencia"]
+    assert latencia == metricas.resumo("recaptcha")["api"]
+    assert latencia["total"] == 1
+    assert latencia["sucessos"] == 1
+
+
+def test_sem_solvers():
+    with pytest.raises(ValueError):
+        RecaptchaSolverRoteado({}, DesempenhoSolvers())
@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scraper.application.single_flight import SingleFlight
+
+
+def test_chamadas_concorrentes_executam_uma_vez():
+    single_flight = SingleFlight()
+    liberar = threading.Event()
+    execucoes = []
+
+    def funcao():
+        execucoes.append(1)
+        liberar.wait(5)
+        return "resultado"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futuros = [
+            executor.submit(single_flight.executar, "chave", funcao) for _ in range(5)
+        ]
+        while single_flight.estatisticas()["seguidores"] < 4:
+            threading.Event().wait(0.01)
+        liberar.set()
+        resultados = [futuro.result(5) for futuro in futuros]
+
+    assert resultados == ["resultado"] * 5
+    assert len(execucoes) == 1
+    assert single_flight.estatisticas() == {
+        "em_andamento": 0,
+        "lideres": 1,
+        "seguidores": 4,
+        "desistencias": 0,
+    }
+
+
+def test_seguidores_recebem_a_excecao_da_lider():
+    single_flight = SingleFlight()
+    liberar = threading.Event()
+
+    def funcao():
+        liberar.wait(5)
+        raise ValueError("falhou")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futuros = [
+            executor.submit(single_flight.executar, "chave", funcao) for _ in range(3)
+        ]
+        while single_flight.estatisticas()["seguidores"] < 2:
+            threading.Event().wait(0.01)
+        liberar.set()
+        for futuro in futuros:
+            with pytest.raises(ValueError, match="falhou"):
+                futuro.result(5)
+
+
+def test_chave_fica_livre_depois_da_execucao():
+    single_flight = SingleFlight()
+    contador = iter(range(10))
+
+    assert single_flight.executar("chave", lambda: next(contador)) == 0
+    assert single_flight.executar("chave", lambda: next(contador)) == 1
+    assert single_flight.estatisticas()["lideres"] == 2
+
+
+def test_chaves_diferentes_nao_se_esperam():
+    single_flight = SingleFlight()
+
+    assert single_flight.executar("a", lambda: "a") == "a"
+    assert single_flight.executar("b", lambda: "b") == "b"
+    assert single_flight.estatisticas()["seguidores"] == 0
+
+
+def test_seguidor_desiste_no_timeout_sem_afetar_a_lider():
+    single_flight = SingleFlight()
+    liberar = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        lider = executor.submit(
+            single_flight.executar, "chave", lambda: liberar.wait(5) and "ok"
+        )
+        while single_flight.estatisticas()["em_andamento"] == 0:
+            threading.Event().wait(0.01)
+
+        with pytest.raises(TimeoutError):
+            single_flight.executar("chave", lambda: "outro", timeout=0.05)
+        liberar.set()
+        assert lider.result(5) == "ok"
+
+    assert single_flight.estatisticas()["desistencias"] == 1
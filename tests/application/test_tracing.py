@@ -0,0 +1,187 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import pytest
+
+from scraper.application.tracing import (
+    MAX_ATRIBUTO,
+    FaturaServiceAsyncRastreado,
+    Rastreador,
+    WebDriverManagerRastreado,
+)
+
+
+class _Aleatorio:
+    def __init__(self, sorteio):
+        self.sorteio = sorteio
+
+    def random(self):
+        return self.sorteio
+
+
+class _NavegadorFalso:
+    def preencher_campo(self, seletor, valor):
+        return True
+
+    def executar_script(self, script):
+        return None
+
+
+class _FaturasAsync:
+    async def obter_faturas_abertas(self, token, uc, client_id, localizacao):
+        await asyncio.sleep(0.01)
+        return [uc]
+
+
+@pytest.fixture
+def rastreador():
+    return Rastreador(taxa_amostragem=1, capacidade=3)
+
+
+def _nomes(trace):
+    return [span["nome"] for span in trace.para_dict()["spans"]]
+
+
+def test_fora_da_amostra_nada_e_registrado():
+    rastreador = Rastreador(taxa_amostragem=0.1, aleatorio=_Aleatorio(0.5))
+
+    with rastreador.trace("requisicao") as trace:
+        with rastreador.span("login") as span:
+            pass
+
+    assert trace is None
+    assert span is None
+    assert rastreador.listar() == []
+    with rastreador.trace("forcado", forcar=True) as trace:
+        pass
+    assert trace is not None
+    estatisticas = rastreador.estatisticas()
+    assert estatisticas["iniciados"] == 2
+    assert estatisticas["amostrados"] == 1
+    assert estatisticas["retidos"] == 1
+
+
+def test_spans_aninhados_pelo_contexto(rastreador):
+    with rastreador.trace("requisicao") as trace:
+        with rastreador.span("login", uc="123") as login:
+            with rastreador.span("captcha") as captcha:
+                pass
+        with rastreador.span("faturas") as faturas:
+            pass
+
+    assert login.pai_id is None
+    assert captcha.pai_id == login.id
+    assert faturas.pai_id is None
+    assert login.atributos == {"uc": "123"}
+    assert _nomes(trace) == ["login", "captcha", "faturas"]
+    assert trace.duracao_ms is not None
+    assert rastreador.obter(trace.id) is trace
+    assert rastreador.trace_atual() is None
+
+
+def test_trace_interno_reaproveita_o_externo(rastreador):
+    with rastreador.trace("requisicao") as externo:
+        with rastreador.trace("item") as interno:
+            with rastreador.span("login"):
+                pass
+
+    assert interno is externo
+    assert _nomes(externo) == ["login"]
+    assert len(rastreador.listar()) == 1
+
+
+def test_excecao_e_anotada_e_propagada(rastreador):
+    with pytest.raises(ValueError):
+        with rastreador.trace("requisicao") as trace:
+            with rastreador.span("faturas"):
+                raise ValueError("resposta inválida")
+
+    span = trace.para_dict()["spans"][0]
+    assert span["erro"] == "ValueError: resposta inválida"
+    assert span["duracao_ms"] is not None
+    assert rastreador.obter(trace.id) is trace
+
+
+def test_spans_de_outras_threads_com_copy_context(rastreador):
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    def captcha():
+        with rastreador.span("captcha"):
+            pass
+
+    with rastreador.trace("requisicao") as trace:
+        with rastreador.span("login") as login:
+            executor.submit(copy_context().run, captcha).result()
+            # Sem a cópia do contexto, a thread não vê o trace
+            executor.submit(captcha).result()
+    executor.shutdown()
+
+    spans = trace.para_dict()["spans"]
+    assert [span["nome"] for span in spans] == ["login", "captcha"]
+    assert spans[1]["pai_id"] == login.id
+
+
+def test_tarefas_simultaneas_no_event_loop(rastreador):
+    faturas = FaturaServiceAsyncRastreado(_FaturasAsync(), rastreador)
+
+    async def cenario():
+        with rastreador.trace("requisicao") as trace:
+            with rastreador.span("consulta") as consulta:
+                await asyncio.gather(
+                    *(
+                        faturas.obter_faturas_abertas("token", uc, "c", None)
+                        for uc in ("1", "2")
+                    )
+                )
+        return trace, consulta
+
+    trace, consulta = asyncio.run(cenario())
+
+    spans = [s for s in trace.para_dict()["spans"] if s["nome"] != "consulta"]
+    assert len(spans) == 2
+    assert all(span["pai_id"] == consulta.id for span in spans)
+    assert sorted(span["atributos"]["unidade_consumidora"] for span in spans) == [
+        "1",
+        "2",
+    ]
+    assert all(span["atributos"]["faturas"] == 1 for span in spans)
+
+
+def test_buffer_circular_e_filtros_de_listagem(rastreador):
+    for nome in ("a", "b", "c", "d"):
+        with rastreador.trace(nome):
+            pass
+
+    assert [t["nome"] for t in rastreador.listar()] == ["d", "c", "b"]
+    assert [t["nome"] for t in rastreador.listar(limite=1)] == ["d"]
+    assert rastreador.listar(duracao_minima_ms=60_000) == []
+    assert rastreador.estatisticas()["retidos"] == 3
+
+
+def test_traces_gravados_em_json_lines(tmp_path):
+    arquivo = tmp_path / "traces.jsonl"
+    rastreador = Rastreador(taxa_amostragem=1, arquivo=str(arquivo))
+
+    for nome in ("a", "b"):
+        with rastreador.trace(nome):
+            with rastreador.span("login"):
+                pass
+
+    linhas = [json.loads(linha) for linha in arquivo.read_text().splitlines()]
+    assert [linha["nome"] for linha in linhas] == ["a", "b"]
+    assert linhas[0]["spans"][0]["nome"] == "login"
+
+
+def test_navegador_nao_grava_valores_e_resume_scripts(rastreador):
+    navegador = WebDriverManagerRastreado(_NavegadorFalso(), rastreador)
+
+    with rastreador.trace("requisicao") as trace:
+        navegador.preencher_campo("#senha", "segredo")
+        navegador.executar_script("x" * 1000)
+
+    preencher, script = trace.para_dict()["spans"]
+    assert preencher["atributos"] == {"seletor": "#senha", "sucesso": True}
+    assert "segredo" not in json.dumps(trace.para_dict())
+    assert len(script["atributos"]["script"]) == MAX_ATRIBUTO + 1
@@ -0,0 +1,268 @@
+import asyncio
+from concurrent.futures import Executor, Future
+
+import pytest
+
+from scraper.application.interfaces import IAsyncFaturaService, IFaturaService
+from scraper.domain.models import (
+    LOCALIZACAO_PADRAO,
+    Credenciais,
+    FaturaDTO,
+    InformacoesUsuario,
+    TokenAcesso,
+)
+from scraper.infrastructure.cache import fatura_cache
+from scraper.infrastructure.cache.fatura_cache import (
+    CachedFaturaService,
+    CachedFaturaServiceAsync,
+)
+from scraper.infrastructure.cache.token_store import InMemoryTokenStore
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.agora
+
+
+class _ExecutorImediato(Executor):
+    """Roda a revalidação na hora, para o teste ver o resultado sem esperar."""
+
+    def submit(self, fn, *args, **kwargs):
+        futuro = Future()
+        futuro.set_result(fn(*args, **kwargs))
+        return futuro
+
+
+class _FaturaServiceFalso(IFaturaService):
+    def __init__(self):
+        self.chamadas = 0
+        self.falhar = False
+
+    def obter_faturas_abertas(self, token, unidade_consumidora, client_id, localizacao):
+        self.chamadas += 1
+        if self.falhar:
+            return None
+        return [
+            FaturaDTO(
+                uc=int(unidade_consumidora),
+                mes_ano_referencia=f"0{self.chamadas}/2024",
+                data_vencimento="10/01/2024",
+                valor_total=100.0,
+                codigo_barras=None,
+                pix=None,
+            )
+        ]
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(fatura_cache, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def servico():
+    return _FaturaServiceFalso()
+
+
+@pytest.fixture
+def cache(servico):
+    return CachedFaturaService(
+        servico,
+        ttl_segundos=60,
+        stale_segundos=120,
+        capacidade=2,
+        executor=_ExecutorImediato(),
+    )
+
+
+def _consultar(cache, unidade="123", token="token-a"):
+    return cache.obter_faturas_abertas(
+        TokenAcesso(valor=token), unidade, "client", LOCALIZACAO_PADRAO
+    )
+
+
+def _referencia(faturas):
+    return faturas[0].mes_ano_referencia
+
+
+def test_dentro_do_ttl_responde_do_cache(relogio, servico, cache):
+    assert _referencia(_consultar(cache)) == "01/2024"
+    relogio.agora += 59
+
+    assert _referencia(_consultar(cache)) == "01/2024"
+    assert servico.chamadas == 1
+    assert cache.estatisticas()["acertos"] == 1
+
+
+def test_obsoleto_entrega_o_antigo_e_revalida(relogio, servico, cache):
+    _consultar(cache)
+    relogio.agora += 61
+
+    assert _referencia(_consultar(cache)) == "01/2024"
+    assert servico.chamadas == 2
+    # A revalidação guardou a resposta nova, com idade zero
+    assert _referencia(_consultar(cache)) == "02/2024"
+    estatisticas = cache.estatisticas()
+    assert estatisticas["acertos_obsoletos"] == 1
+    assert estatisticas["revalidacoes"] == 1
+    assert estatisticas["acertos"] == 1
+
+
+def test_revalidacao_falha_mantem_a_entrada_antiga(relogio, servico, cache):
+    _consultar(cache)
+    relogio.agora += 61
+    servico.falhar = True
+
+    assert _referencia(_consultar(cache)) == "01/2024"
+    assert cache.estatisticas()["erros_revalidacao"] == 1
+
+
+def test_depois_do_prazo_obsoleto_espera_a_api(relogio, servico, cache):
+    _consultar(cache)
+    relogio.agora += 181
+
+    assert _referencia(_consultar(cache)) == "02/2024"
+    assert servico.chamadas == 2
+    assert cache.estatisticas()["falhas"] == 2
+
+
+def test_resposta_nula_nao_e_guardada(servico, cache):
+    servico.falhar = True
+    assert _consultar(cache) is None
+    servico.falhar = False
+
+    assert _consultar(cache) is not None
+    assert servico.chamadas == 2
+
+
+def test_titulares_diferentes_nao_compartilham_entrada(servico, cache):
+    _consultar(cache, token="token-a")
+    _consultar(cache, token="token-b")
+
+    assert servico.chamadas == 2
+
+
+def test_descarta_a_entrada_menos_usada(servico, cache):
+    _consultar(cache, unidade="1")
+    _consultar(cache, unidade="2")
+    _consultar(cache, unidade="1")
+    _consultar(cache, unidade="3")
+
+    _consultar(cache, unidade="1")
+    assert servico.chamadas == 3
+    _consultar(cache, unidade="2")
+    assert servico.chamadas == 4
+    assert cache.estatisticas()["evicoes"] == 2
+
+
+def test_invalidar_descarta_a_unidade(servico, cache):
+    _consultar(cache, unidade="1")
+    _consultar(cache, unidade="2")
+    cache.invalidar("1")
+
+    _consultar(cache, unidade="1")
+    _consultar(cache, unidade="2")
+    assert servico.chamadas == 3
+
+
+def test_invalidar_titular_descarta_todas_as_unidades_do_titular(servico, cache):
+    _consultar(cache, unidade="1", token="token-a")
+    _consultar(cache, unidade="2", token="token-b")
+    cache.invalidar_titular(TokenAcesso(valor="token-a"))
+
+    _consultar(cache, unidade="1", token="token-a")
+    _consultar(cache, unidade="2", token="token-b")
+    assert servico.chamadas == 3
+
+
+def _salvar(store, valor_token):
+    return store.salvar(
+        Credenciais(cpf_cnpj="123", senha="senha"),
+        TokenAcesso(valor=valor_token),
+        InformacoesUsuario(),
+    )
+
+
+@pytest.fixture
+def store(cache):
+    return InMemoryTokenStore(
+        ao_remover_sessao=lambda sessao: cache.invalidar_titular(sessao.token)
+    )
+
+
+def test_sessao_removida_do_token_store_invalida_o_cache(servico, cache, store):
+    sessao = _salvar(store, "token-a")
+    _consultar(cache, token="token-a")
+
+    assert store.remover_por_token(sessao.token.valor)
+    _consultar(cache, token="token-a")
+    assert servico.chamadas == 2
+
+
+def test_novo_login_com_outro_token_invalida_o_cache(servico, cache, store):
+    _salvar(store, "token-a")
+    _consultar(cache, token="token-a")
+    _salvar(store, "token-a")
+    _consultar(cache, token="token-a")
+    assert servico.chamadas == 1
+
+    _salvar(store, "token-b")
+    _consultar(cache, token="token-a")
+    assert servico.chamadas == 2
+
+
+class _FaturaServiceAsyncFalso(IAsyncFaturaService):
+    def __init__(self, servico):
+        self._servico = servico
+
+    async def obter_faturas_abertas(
+        self, token, unidade_consumidora, client_id, localizacao
+    ):
+        return self._servico.obter_faturas_abertas(
+            token, unidade_consumidora, client_id, localizacao
+        )
+
+
+@pytest.fixture
+def cache_async(servico, cache):
+    return CachedFaturaServiceAsync(_FaturaServiceAsyncFalso(servico), cache)
+
+
+async def _consultar_async(cache_async, unidade="123", token="token-a"):
+    return await cache_async.obter_faturas_abertas(
+        TokenAcesso(valor=token), unidade, "client", LOCALIZACAO_PADRAO
+    )
+
+
+def test_versao_async_compartilha_as_entradas(servico, cache, cache_async):
+    _consultar(cache)
+
+    faturas = asyncio.run(_consultar_async(cache_async))
+
+    assert _referencia(faturas) == "01/2024"
+    assert servico.chamadas == 1
+    assert cache.estatisticas()["acertos"] == 1
+
+
+def test_versao_async_obsoleto_entrega_o_antigo_e_revalida(
+    relogio, servico, cache, cache_async
+):
+    async def consultar():
+        await _consultar_async(cache_async)
+        relogio.agora += 61
+        antigo = await _consultar_async(cache_async)
+        # Deixa a revalidação, agendada no loop, terminar
+        await asyncio.gather(*cache_async._revalidacoes)
+        return antigo, await _consultar_async(cache_async)
+
+    antigo, novo = asyncio.run(consultar())
+
+    assert _referencia(antigo) == "01/2024"
+    assert _referencia(novo) == "02/2024"
+    assert servico.chamadas == 2
+    assert cache.estatisticas()["revalidacoes"] == 1
@@ -0,0 +1,99 @@
+import sqlite3
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from scraper.domain.models import Credenciais, InformacoesUsuario, TokenAcesso
+from scraper.infrastructure.cache.sqlite_token_store import SQLiteTokenStore
+
+CREDENCIAIS = Credenciais(cpf_cnpj="123.456.789-00", senha="senha")
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / "tokens.db")
+
+
+@pytest.fixture
+def chave():
+    return Fernet.generate_key()
+
+
+def _salvar(store, valor_token="token-secreto"):
+    return store.salvar(
+        CREDENCIAIS,
+        TokenAcesso(valor=valor_token, expiracao=int(time.time()) + 3600),
+        InformacoesUsuario(id="42", nome="Fulano", unidades_consumidoras=["1"]),
+    )
+
+
+def _linhas(caminho):
+    conexao = sqlite3.connect(caminho)
+    try:
+        return conexao.execute(
+            "SELECT cpf_cnpj, impressao, dados FROM sessoes"
+        ).fetchall()
+    finally:
+        conexao.close()
+
+
+def test_sessao_sobrevive_a_um_restart(caminho, chave):
+    store = SQLiteTokenStore(caminho, chave)
+    _salvar(store)
+    store.fechar()
+
+    restaurado = SQLiteTokenStore(caminho, chave)
+    sessao = restaurado.obter_por_credenciais(CREDENCIAIS)
+
+    assert sessao is not None
+    assert sessao.token.valor == "token-secreto"
+    assert sessao.user_info == InformacoesUsuario(
+        id="42", nome="Fulano", unidades_consumidoras=["1"]
+    )
+    assert restaurado.obter_por_token("token-secreto") == sessao
+    restaurado.fechar()
+
+
+def test_arquivo_nao_guarda_token_nem_senha_em_claro(caminho, chave):
+    store = SQLiteTokenStore(caminho, chave)
+    _salvar(store)
+    store.fechar()
+
+    ((cpf_cnpj, impressao, dados),) = _linhas(caminho)
+    assert cpf_cnpj == "12345678900"
+    assert b"token-secreto" not in dados
+    assert b"Fulano" not in dados
+    assert b"senha" not in impressao
+
+
+def test_senha_diferente_nao_recupera_a_sessao(caminho, chave):
+    store = SQLiteTokenStore(caminho, chave)
+    _salvar(store)
+    store.fechar()
+
+    restaurado = SQLiteTokenStore(caminho, chave)
+    outra_senha = Credenciais(cpf_cnpj=CREDENCIAIS.cpf_cnpj, senha="outra")
+    assert restaurado.obter_por_credenciais(outra_senha) is None
+    restaurado.fechar()
+
+
+def test_chave_diferente_descarta_as_sessoes(caminho, chave):
+    store = SQLiteTokenStore(caminho, chave)
+    _salvar(store)
+    store.fechar()
+
+    outro = SQLiteTokenStore(caminho, Fernet.generate_key())
+
+    assert outro.obter_por_credenciais(CREDENCIAIS) is None
+    assert _linhas(caminho) == []
+    outro.fechar()
+
+
+def test_remover_por_token_apaga_do_arquivo(caminho, chave):
+    store = SQLiteTokenStore(caminho, chave)
+    _salvar(store)
+
+    assert store.remover_por_token("token-secreto")
+    assert _linhas(caminho) == []
+    store.fechar()
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from scraper.domain.models import Credenciais, InformacoesUsuario, TokenAcesso
+from scraper.infrastructure.cache.token_store import InMemoryTokenStore
+
+
+def _credenciais(cpf_cnpj="123.456.789-00", senha="senha"):
+    return Credenciais(cpf_cnpj=cpf_cnpj, senha=senha)
+
+
+def _salvar(store, credenciais=None, valor_token="token", expira_em=3600):
+    expiracao = None if expira_em is None else int(time.time()) + expira_em
+    return store.salvar(
+        credenciais or _credenciais(),
+        TokenAcesso(valor=valor_token, expiracao=expiracao),
+        InformacoesUsuario(nome="Fulano"),
+    )
+
+
+@pytest.fixture
+def store():
+    return InMemoryTokenStore(capacidade=2, margem_expiracao_segundos=60)
+
+
+def test_cpf_com_e_sem_pontuacao_sao_a_mesma_conta(store):
+    _salvar(store)
+
+    sessao = store.obter_por_credenciais(_credenciais("12345678900"))
+
+    assert sessao.token.valor == "token"
+    assert sessao.cpf_cnpj == "12345678900"
+    assert store.obter_por_token("token") is sessao
+
+
+def test_senha_diferente_nao_reaproveita_o_token(store):
+    _salvar(store)
+
+    assert store.obter_por_credenciais(_credenciais(senha="outra")) is None
+    assert store.estatisticas()["falhas"] == 1
+
+
+def test_token_perto_de_expirar_e_descartado(store):
+    # Expira dentro da margem de 60 s: conta como expirado
+    _salvar(store, expira_em=30)
+
+    assert store.obter_por_credenciais(_credenciais()) is None
+    assert store.obter_por_token("token") is None
+    estatisticas = store.estatisticas()
+    assert estatisticas["expirados"] == 1
+    assert estatisticas["tamanho"] == 0
+
+
+def test_token_sem_exp_recebe_o_ttl_padrao():
+    store = InMemoryTokenStore(ttl_padrao_segundos=600)
+    antes = int(time.time())
+
+    sessao = _salvar(store, expira_em=None)
+
+    assert antes + 600 <= sessao.token.expiracao <= int(time.time()) + 600
+
+
+def test_capacidade_descarta_expirados_antes_dos_menos_usados(store):
+    _salvar(store, _credenciais("1"), "token-1")
+    _salvar(store, _credenciais("2"), "token-2", expira_em=30)
+    _salvar(store, _credenciais("3"), "token-3")
+
+    assert store.obter_por_token("token-1") is not None
+    assert store.obter_por_token("token-3") is not None
+    estatisticas = store.estatisticas()
+    assert estatisticas["expirados"] == 1
+    assert estatisticas["evicoes_lru"] == 0
+
+
+def test_capacidade_descarta_a_conta_menos_usada(store):
+    _salvar(store, _credenciais("1"), "token-1")
+    _salvar(store, _credenciais("2"), "token-2")
+    # A conta 1 foi usada depois da 2: a 2 é a menos usada
+    store.obter_por_credenciais(_credenciais("1"))
+    _salvar(store, _credenciais("3"), "token-3")
+
+    assert store.obter_por_token("token-2") is None
+    assert store.obter_por_token("token-1") is not None
+    assert store.estatisticas()["evicoes_lru"] == 1
+
+
+def test_novo_login_substitui_o_token_anterior(store):
+    _salvar(store, valor_token="antigo")
+    _salvar(store, valor_token="novo")
+
+    assert store.obter_por_token("antigo") is None
+    assert store.obter_por_credenciais(_credenciais()).token.valor == "novo"
+    assert store.estatisticas()["tamanho"] == 1
+
+
+def test_remover_por_token(store):
+    _salvar(store)
+
+    assert store.remover_por_token("token")
+    assert not store.remover_por_token("token")
+    assert store.obter_por_credenciais(_credenciais()) is None
+
+
+def test_capacidade_invalida():
+    with pytest.raises(ValueError):
+        InMemoryTokenStore(capacidade=0)
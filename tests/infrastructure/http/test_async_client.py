@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from scraper.infrastructure.http.async_client import (
+    ClienteHTTPAssincrono,
+    LimiteConcorrenciaExcedido,
+    RespostaGrandeDemais,
+)
+
+LIMITE = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/pequeno":
+            self._responder(json.dumps({"ok": True}).encode(), "application/json")
+        elif self.path == "/grande":
+            self._responder(b"x" * (LIMITE + 1), "text/plain")
+        elif self.path == "/grande-sem-tamanho":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"x" * (LIMITE * 4))
+            self.close_connection = True
+        elif self.path == "/lento":
+            time.sleep(0.5)
+            self._responder(b"{}", "application/json")
+        else:
+            self._responder(b"", "text/plain", status=404)
+
+    def _responder(self, corpo, tipo, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _com_cliente(funcao, **kwargs):
+    """Roda `funcao(cliente)` num event loop novo, fechando o cliente no fim."""
+
+    async def executar():
+        cliente = ClienteHTTPAssincrono(
+            max_bytes_resposta=LIMITE, timeout_leitura=5, **kwargs
+        )
+        try:
+            return await funcao(cliente)
+        finally:
+            await cliente.encerrar()
+
+    return asyncio.run(executar())
+
+
+def test_resposta_dentro_do_limite_e_lida_por_inteiro(servidor):
+    async def consultar(cliente):
+        return await cliente.get(f"{servidor}/pequeno")
+
+    resposta = _com_cliente(consultar)
+
+    assert resposta.status_code == 200
+    assert resposta.json() == {"ok": True}
+
+
+@pytest.mark.parametrize("caminho", ["/grande", "/grande-sem-tamanho"])
+def test_resposta_acima_do_limite_falha(servidor, caminho):
+    async def consultar(cliente):
+        with pytest.raises(RespostaGrandeDemais):
+            await cliente.get(f"{servidor}{caminho}")
+        return cliente.estatisticas()
+
+    host = next(iter(_com_cliente(consultar)["hosts"].values()))
+    assert host["falhas"] == 1
+    assert host["em_andamento"] == 0
+
+
+def test_sem_vaga_no_host_dentro_do_prazo_falha(servidor):
+    async def consultar(cliente):
+        return await asyncio.gather(
+            cliente.get(f"{servidor}/lento"),
+            cliente.get(f"{servidor}/lento"),
+            return_exceptions=True,
+        )
+
+    resultados = _com_cliente(
+        consultar, max_conexoes_por_host=1, timeout_fila_segundos=0.1
+    )
+
+    assert resultados[0].status_code == 200
+    assert isinstance(resultados[1], LimiteConcorrenciaExcedido)
+    # Os serviços tratam httpx.HTTPError; o limite não escapa disso
+    assert isinstance(resultados[1], httpx.HTTPError)
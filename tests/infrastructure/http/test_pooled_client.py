@@ -0,0 +1,89 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scraper.infrastructure.http.pooled_client import ClienteHTTP, RespostaGrandeDemais
+
+LIMITE = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/pequeno":
+            self._responder(json.dumps({"ok": True}).encode(), "application/json")
+        elif self.path == "/grande":
+            self._responder(b"x" * (LIMITE + 1), "text/plain")
+        elif self.path == "/grande-sem-tamanho":
+            # Sem Content-Length: o limite só aparece ao ler o corpo
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"x" * (LIMITE * 4))
+            self.close_connection = True
+        else:
+            self._responder(b"", "text/plain", status=404)
+
+    def _responder(self, corpo, tipo, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def cliente():
+    cliente = ClienteHTTP(max_bytes_resposta=LIMITE, timeout_leitura=5)
+    yield cliente
+    cliente.encerrar()
+
+
+def test_resposta_dentro_do_limite_e_lida_por_inteiro(servidor, cliente):
+    resposta = cliente.get(f"{servidor}/pequeno")
+
+    assert resposta.status_code == 200
+    assert resposta.json() == {"ok": True}
+
+
+@pytest.mark.parametrize("caminho", ["/grande", "/grande-sem-tamanho"])
+def test_resposta_acima_do_limite_falha(servidor, cliente, caminho):
+    with pytest.raises(RespostaGrandeDemais):
+        cliente.get(f"{servidor}{caminho}")
+
+    host = next(iter(cliente.estatisticas()["hosts"].values()))
+    assert host["falhas"] == 1
+    assert host["em_andamento"] == 0
+
+
+def test_limite_excedido_e_um_erro_do_requests(servidor, cliente):
+    # Os serviços tratam requests.RequestException; o limite não escapa disso
+    with pytest.raises(requests.RequestException):
+        cliente.get(f"{servidor}/grande")
+
+
+def test_conexao_e_reaproveitada(servidor, cliente):
+    for _ in range(3):
+        cliente.get(f"{servidor}/pequeno")
+
+    host = next(iter(cliente.estatisticas()["hosts"].values()))
+    assert host["requisicoes"] == 3
+    assert host["conexoes_abertas"] == 1
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+import requests
+
+from scraper.infrastructure.recaptcha_solvers import captcha_api_client
+from scraper.infrastructure.recaptcha_solvers.captcha_api_client import (
+    NAO_PRONTO,
+    CaptchaAPIClient,
+)
+
+
+class _Relogio:
+    """Parado até o teste avançar: tarefas inscritas juntas vencem juntas."""
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.agora
+
+
+class _Resposta:
+    def __init__(self, dados):
+        self._dados = dados
+
+    def json(self):
+        return self._dados
+
+
+class _HTTPFalso:
+    """Responde `res.php` com as respostas de `lotes`, em ordem."""
+
+    def __init__(self, *lotes):
+        self.lotes = list(lotes)
+        self.consultas = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self._lock:
+            self.consultas.append(params["ids"].split(","))
+            resposta = self.lotes.pop(0) if self.lotes else NAO_PRONTO
+        if isinstance(resposta, Exception):
+            raise resposta
+        return _Resposta({"status": 1, "request": resposta})
+
+    def post(self, url, data=None, timeout=None):
+        return _Resposta({"status": 1, "request": "1"})
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(captcha_api_client, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def clientes():
+    clientes = []
+
+    def criar(http, **kwargs):
+        opcoes = {
+            "http": http,
+            "espera_inicial_segundos": 0,
+            "intervalo_inicial_segundos": 5,
+            "intervalo_minimo_segundos": 2,
+        }
+        opcoes.update(kwargs)
+        cliente = CaptchaAPIClient("chave", **opcoes)
+        clientes.append(cliente)
+        return cliente
+
+    yield criar
+    for cliente in clientes:
+        cliente.encerrar()
+
+
+def _acompanhar_juntos(cliente, ids):
+    # Com a condição adquirida, a thread de consulta só vê as tarefas depois
+    # de todas inscritas
+    with cliente._condicao:
+        return [cliente.acompanhar(captcha_id) for captcha_id in ids]
+
+
+def test_uma_consulta_por_lote_com_resposta_por_id(relogio, clientes):
+    http = _HTTPFalso(f"token-1|{NAO_PRONTO}|ERROR_CAPTCHA_UNSOLVABLE", "token-2")
+    cliente = clientes(http)
+
+    pronto, nao_pronto, com_erro = _acompanhar_juntos(cliente, ("1", "2", "3"))
+
+    assert pronto.result(2) == "token-1"
+    assert com_erro.result(2) is None
+    assert not nao_pronto.done()
+
+    # Só o id ainda não pronto volta a ser consultado, após o intervalo
+    relogio.agora += 5
+    with cliente._condicao:
+        cliente._condicao.notify()
+    assert nao_pronto.result(2) == "token-2"
+    assert http.consultas == [["1", "2", "3"], ["2"]]
+    estatisticas = cliente.estatisticas()
+    assert estatisticas["consultas"] == 2
+    assert estatisticas["resolvidos"] == 2
+    assert estatisticas["falhas"] == 1
+    assert estatisticas["pendentes"] == 0
+
+
+def test_erro_geral_vale_para_todos_os_ids(relogio, clientes):
+    http = _HTTPFalso("ERROR_WRONG_USER_KEY")
+    cliente = clientes(http)
+
+    futuros = _acompanhar_juntos(cliente, ("1", "2"))
+
+    assert [futuro.result(2) for futuro in futuros] == [None, None]
+    assert http.consultas == [["1", "2"]]
+    assert cliente.estatisticas()["falhas"] == 2
+
+
+def test_falha_na_consulta_mantem_as_tarefas_pendentes(relogio, clientes):
+    http = _HTTPFalso(requests.ConnectionError("sem rede"), "token-1")
+    cliente = clientes(http, intervalo_inicial_segundos=0, intervalo_minimo_segundos=0)
+
+    assert cliente.acompanhar("1").result(2) == "token-1"
+    assert http.consultas == [["1"], ["1"]]
+    assert cliente.estatisticas()["falhas"] == 0
+
+
+def test_lote_limitado_a_max_ids_por_consulta(relogio, clientes):
+    http = _HTTPFalso("a|b", "c")
+    cliente = clientes(http, max_ids_por_consulta=2)
+
+    futuros = _acompanhar_juntos(cliente, ("1", "2", "3"))
+
+    assert [futuro.result(2) for futuro in futuros] == ["a", "b", "c"]
+    assert http.consultas == [["1", "2"], ["3"]]
+
+
+def test_timeout_cancela_e_tira_a_tarefa_da_consulta(relogio, clientes):
+    cliente = clientes(_HTTPFalso())
+
+    assert cliente.aguardar("1", timeout=0.1) is None
+    estatisticas = cliente.estatisticas()
+    assert estatisticas["cancelados"] == 1
+    assert estatisticas["pendentes"] == 0
@@ -0,0 +1,64 @@
+import threading
+
+from scraper.infrastructure.recaptcha_solvers.manual_solver import (
+    RecaptchaManualSolver,
+)
+
+PORTAL = "https://agencia.amazonasenergia.com/"
+
+
+class _NavegadorFalso:
+    """Página do portal: o script de espera devolve `motivos` em ordem."""
+
+    def __init__(self, motivos, urls=None, token=""):
+        self.motivos = list(motivos)
+        self.urls = list(urls or [PORTAL])
+        self.token = token
+        self.scripts_assincronos = []
+
+    def executar_script(self, script):
+        if "location.href" in script:
+            return self.urls.pop(0) if len(self.urls) > 1 else self.urls[0]
+        return self.token
+
+    def executar_script_assincrono(self, script, timeout=10):
+        self.scripts_assincronos.append(script)
+        return self.motivos.pop(0) if self.motivos else None
+
+
+def test_url_do_portal_sem_login_nao_conta_como_resolvido():
+    navegador = _NavegadorFalso([None, None])
+    solver = RecaptchaManualSolver(navegador, timeout=0.3)
+
+    assert solver.aguardar_resolucao() is False
+    # A página observada recebe a URL inicial para comparar, não a palavra "login"
+    assert f'const urlInicial = "{PORTAL}";' in navegador.scripts_assincronos[0]
+    assert "includes('login')" not in navegador.scripts_assincronos[0]
+
+
+def test_resolvido_quando_a_pagina_informa_o_token():
+    solver = RecaptchaManualSolver(_NavegadorFalso(["token"]), timeout=5)
+
+    assert solver.aguardar_resolucao() is True
+
+
+def test_resolvido_quando_a_url_muda_depois_do_inicio():
+    navegador = _NavegadorFalso([None], urls=[PORTAL, PORTAL + "home"])
+    solver = RecaptchaManualSolver(navegador, timeout=5)
+
+    assert solver.aguardar_resolucao() is True
+
+
+def test_resolvido_quando_o_token_aparece_apos_troca_de_pagina():
+    navegador = _NavegadorFalso([None], token="x" * 200)
+    solver = RecaptchaManualSolver(navegador, timeout=5)
+
+    assert solver.aguardar_resolucao() is True
+
+
+def test_cancelamento_encerra_a_espera():
+    cancelamento = threading.Event()
+    cancelamento.set()
+    solver = RecaptchaManualSolver(_NavegadorFalso([]), timeout=5)
+
+    assert solver.aguardar_resolucao(cancelamento) is False
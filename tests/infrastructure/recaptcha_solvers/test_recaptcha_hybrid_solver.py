@@ -0,0 +1,181 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from scraper.infrastructure.recaptcha_solvers.recaptcha_hybrid_solver import (
+    SCRIPT_SITE_KEY,
+    RecaptchaAPISolver,
+    RecaptchaHybridSolver,
+)
+
+SITE_KEY = "site-key"
+PAGE_URL = "https://agencia.amazonasenergia.com/"
+
+
+class _NavegadorFalso:
+    """Página com reCAPTCHA; guarda os scripts que inserem o token."""
+
+    def __init__(self, site_key=SITE_KEY):
+        self.site_key = site_key
+        self.scripts = []
+
+    def executar_script(self, script):
+        if script == SCRIPT_SITE_KEY:
+            return self.site_key
+        if "location.href" in script:
+            return PAGE_URL
+        self.scripts.append(script)
+        return None
+
+    def token_inserido(self):
+        return next(
+            (s.split("'")[1] for s in self.scripts if "var token" in s),
+            None,
+        )
+
+
+class _Provedor:
+    """Devolve `token` após `demora`, a menos que a disputa seja cancelada."""
+
+    def __init__(self, nome, token=None, demora=0.0, erro=None):
+        self.service_url = f"https://{nome}"
+        self.token = token
+        self.demora = demora
+        self.erro = erro
+        self.desistiu = threading.Event()
+
+    def solicitar_token_cancelavel(self, site_key, page_url, cancelamento, timeout):
+        assert (site_key, page_url) == (SITE_KEY, PAGE_URL)
+        # Como o provedor real, desiste no cancelamento ou no próprio timeout
+        if cancelamento.wait(min(self.demora, timeout)) or self.demora > timeout:
+            self.desistiu.set()
+            return None
+        if self.erro:
+            raise self.erro
+        return self.token
+
+
+class _ManualFalso:
+    def __init__(self, demora=0.0, resolvido=True):
+        self.demora = demora
+        self.resolvido = resolvido
+        self.desistiu = threading.Event()
+
+    def aguardar_resolucao(self, cancelamento, timeout):
+        if cancelamento.wait(min(self.demora, timeout)):
+            self.desistiu.set()
+            return False
+        return self.resolvido
+
+
+class _Reservatorio:
+    def __init__(self, token):
+        self.token = token
+
+    def atende(self, site_key, page_url):
+        return site_key == SITE_KEY
+
+    def retirar(self):
+        return self.token
+
+
+def test_vence_o_primeiro_token_e_os_demais_sao_cancelados():
+    navegador = _NavegadorFalso()
+    lento = _Provedor("lento", "token-lento", demora=10)
+    rapido = _Provedor("rapido", "token-rapido", demora=0.05)
+    manual = _ManualFalso(demora=10)
+    solver = RecaptchaHybridSolver(navegador, [lento, rapido], solver_manual=manual)
+
+    inicio = time.monotonic()
+    assert solver.resolver() is True
+
+    assert time.monotonic() - inicio < 2
+    assert navegador.token_inserido() == "token-rapido"
+    # Os perdedores param na próxima verificação do cancelamento
+    assert lento.desistiu.wait(1)
+    assert manual.desistiu.wait(1)
+
+
+def test_falha_ou_desistencia_nao_encerra_a_disputa():
+    navegador = _NavegadorFalso()
+    provedores = [
+        _Provedor("com-erro", erro=RuntimeError("ERROR_ZERO_BALANCE")),
+        _Provedor("sem-token", token=None),
+        _Provedor("valido", "token", demora=0.1),
+    ]
+    solver = RecaptchaHybridSolver(navegador, provedores)
+
+    assert solver.resolver() is True
+    assert navegador.token_inserido() == "token"
+
+
+def test_solver_manual_vencedor_nao_insere_token():
+    navegador = _NavegadorFalso()
+    provedor = _Provedor("lento", "token", demora=10)
+    solver = RecaptchaHybridSolver(
+        navegador, [provedor], solver_manual=_ManualFalso(demora=0.05)
+    )
+
+    assert solver.resolver() is True
+    assert navegador.token_inserido() is None
+    assert provedor.desistiu.wait(1)
+
+
+def test_prazo_unico_para_todas_as_estrategias():
+    navegador = _NavegadorFalso()
+    provedores = [
+        _Provedor("a", "token", demora=10),
+        _Provedor("b", "token", demora=10),
+    ]
+    solver = RecaptchaHybridSolver(navegador, provedores, prazo_segundos=0.2)
+
+    inicio = time.monotonic()
+    assert solver.resolver() is False
+
+    assert time.monotonic() - inicio < 1
+    assert navegador.token_inserido() is None
+    assert all(provedor.desistiu.wait(1) for provedor in provedores)
+
+
+def test_token_do_reservatorio_dispensa_a_disputa():
+    navegador = _NavegadorFalso()
+    provedor = _Provedor("a", "token-api")
+    solver = RecaptchaHybridSolver(
+        navegador, [provedor], reservatorio=_Reservatorio("token-reservado")
+    )
+
+    assert solver.resolver() is True
+    assert navegador.token_inserido() == "token-reservado"
+
+
+def test_sem_site_key_resta_o_solver_manual():
+    navegador = _NavegadorFalso(site_key=None)
+    provedor = _Provedor("a", "token-api")
+
+    assert RecaptchaHybridSolver(navegador, [provedor]).resolver() is False
+    solver = RecaptchaHybridSolver(navegador, [provedor], solver_manual=_ManualFalso())
+    assert solver.resolver() is True
+    assert navegador.token_inserido() is None
+
+
+class _ClienteFalso:
+    def __init__(self):
+        self.futuro = Future()
+
+    def enviar(self, site_key, page_url):
+        return "42"
+
+    def acompanhar(self, captcha_id):
+        return self.futuro
+
+
+def test_solicitacao_cancelada_sai_da_consulta_ao_servico():
+    cliente = _ClienteFalso()
+    solver = RecaptchaAPISolver(None, "chave", cliente=cliente)
+    cancelamento = threading.Event()
+    threading.Timer(0.05, cancelamento.set).start()
+
+    token = solver.solicitar_token_cancelavel(SITE_KEY, PAGE_URL, cancelamento, 5)
+
+    assert token is None
+    assert cliente.futuro.cancelled()
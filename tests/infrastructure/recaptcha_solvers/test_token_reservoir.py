@@ -0,0 +1,177 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future
+
+import pytest
+
+from scraper.infrastructure.recaptcha_solvers import token_reservoir
+from scraper.infrastructure.recaptcha_solvers.token_reservoir import (
+    ReservatorioTokensRecaptcha,
+)
+
+SITE_KEY = "site-key"
+PAGE_URL = "https://agencia.amazonasenergia.com/"
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.agora
+
+
+class _ExecutorImediato(Executor):
+    """Resolve o token na hora, para o teste ver o reservatório abastecido."""
+
+    def submit(self, fn, *args, **kwargs):
+        futuro = Future()
+        futuro.set_result(fn(*args, **kwargs))
+        return futuro
+
+
+class _ExecutorParado(Executor):
+    """Nenhuma solução termina: o tempo médio de solução fica o inicial."""
+
+    def submit(self, fn, *args, **kwargs):
+        return Future()
+
+
+class _Provedor:
+    def __init__(self):
+        self.solicitacoes = 0
+        self.falhar = False
+
+    def __call__(self, site_key, page_url):
+        self.solicitacoes += 1
+        return None if self.falhar else f"token-{self.solicitacoes}"
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(token_reservoir, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def provedor():
+    return _Provedor()
+
+
+def _reservatorio(provedor, **kwargs):
+    opcoes = {
+        "minimo": 1,
+        "capacidade": 5,
+        "validade_segundos": 100,
+        "janela_demanda_segundos": 300,
+        "tempo_solucao_inicial_segundos": 30,
+        "executor": _ExecutorImediato(),
+    }
+    opcoes.update(kwargs)
+    return ReservatorioTokensRecaptcha(provedor, SITE_KEY, PAGE_URL, **opcoes)
+
+
+def test_retirada_seca_abastece_e_a_seguinte_recebe_token(relogio, provedor):
+    reservatorio = _reservatorio(provedor)
+
+    assert reservatorio.retirar() is None
+    assert reservatorio.retirar() == "token-1"
+    estatisticas = reservatorio.estatisticas()
+    assert estatisticas["secos"] == 1
+    assert estatisticas["retiradas"] == 1
+    assert estatisticas["taxa_seco"] == 0.5
+
+
+def test_alvo_acompanha_a_demanda_entre_minimo_e_capacidade(relogio, provedor):
+    reservatorio = _reservatorio(
+        provedor, minimo=1, capacidade=3, executor=_ExecutorParado()
+    )
+    assert reservatorio.estatisticas()["alvo"] == 1
+
+    # 20 retiradas em 300 s com 30 s por solução: 2 tokens em circulação
+    for _ in range(20):
+        reservatorio.retirar()
+    assert reservatorio.estatisticas()["alvo"] == 2
+
+    for _ in range(40):
+        reservatorio.retirar()
+    assert reservatorio.estatisticas()["alvo"] == 3
+
+    assert reservatorio.estatisticas()["em_andamento"] == 3
+
+    # Sem retiradas na janela, volta ao mínimo
+    relogio.agora += 301
+    assert reservatorio.estatisticas()["alvo"] == 1
+
+
+def test_token_vencido_e_descartado(relogio, provedor):
+    reservatorio = _reservatorio(provedor)
+    reservatorio.retirar()
+    relogio.agora += 100
+
+    assert reservatorio.retirar() is None
+    estatisticas = reservatorio.estatisticas()
+    assert estatisticas["desperdicados"] == 1
+    # O vencido e o que o substituiu
+    assert estatisticas["resolvidos"] == 2
+    assert estatisticas["taxa_desperdicio"] == 0.5
+
+
+def test_falhas_do_provedor_pausam_o_abastecimento(relogio, provedor):
+    reservatorio = _reservatorio(provedor)
+    provedor.falhar = True
+
+    reservatorio.retirar()
+    assert provedor.solicitacoes == 1
+    # Pausa de 2 s após a primeira falha: nenhuma nova solicitação
+    reservatorio.retirar()
+    assert provedor.solicitacoes == 1
+
+    relogio.agora += 2
+    provedor.falhar = False
+    reservatorio.retirar()
+    assert provedor.solicitacoes == 2
+    assert reservatorio.estatisticas()["falhas_solicitacao"] == 1
+
+
+def test_atende_o_mesmo_site_key_e_dominio(provedor):
+    reservatorio = _reservatorio(provedor)
+
+    assert reservatorio.atende(SITE_KEY, PAGE_URL + "login")
+    assert not reservatorio.atende("outra", PAGE_URL)
+    assert not reservatorio.atende(SITE_KEY, "https://outro.com/")
+
+
+def test_capacidade_invalida(provedor):
+    with pytest.raises(ValueError):
+        _reservatorio(provedor, capacidade=0)
+
+
+def test_abastecimento_no_event_loop(provedor):
+    reservatorio = _reservatorio(provedor, minimo=2, intervalo_manutencao_segundos=5)
+    resolvidos = []
+
+    async def solicitar(site_key, page_url):
+        await asyncio.sleep(0)
+        resolvidos.append(site_key)
+        return f"assincrono-{len(resolvidos)}"
+
+    async def cenario():
+        manutencao = asyncio.create_task(reservatorio.manter_assincrono(solicitar))
+        while reservatorio.estatisticas()["prontos"] < 2:
+            await asyncio.sleep(0.01)
+        # Uma retirada de outra thread acorda o loop, sem esperar o intervalo
+        retirado = await asyncio.get_running_loop().run_in_executor(
+            None, reservatorio.retirar
+        )
+        while reservatorio.estatisticas()["prontos"] < 2:
+            await asyncio.sleep(0.01)
+        reservatorio.encerrar()
+        await asyncio.wait_for(manutencao, 1)
+        return retirado
+
+    assert asyncio.run(asyncio.wait_for(cenario(), 2)) == "assincrono-1"
+    assert len(resolvidos) == 3
+    # Nenhuma thread de abastecimento foi criada
+    assert not any(t.name.startswith("recaptcha-") for t in threading.enumerate())
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from scraper.infrastructure.replay.cassette import (
+    FATURAS,
+    NAVEGADOR,
+    Cassete,
+    Interacao,
+)
+
+
+def _interacao(metodo, chave, resultado, tipo=NAVEGADOR, no_captcha=False):
+    return Interacao(
+        tipo=tipo,
+        metodo=metodo,
+        chave=chave,
+        duracao=0.1,
+        resultado=resultado,
+        no_captcha=no_captcha,
+    )
+
+
+@pytest.fixture
+def interacoes():
+    return [
+        _interacao("navegar_para", "/login", 1),
+        _interacao("clicar_elemento", "#entrar", 2),
+        _interacao("navegar_para", "/login", 3),
+        _interacao("clicar_elemento", "#captcha", 4, no_captcha=True),
+        _interacao("obter_faturas_abertas", "123", [], tipo=FATURAS),
+    ]
+
+
+def _resultado(cassete, *args):
+    interacao = cassete.proxima(*args)
+    return interacao.resultado if interacao else None
+
+
+def test_cada_chamada_tem_sua_fila(interacoes):
+    cassete = Cassete(interacoes, ciclica=False)
+
+    # Ordem diferente da gravada: cada (tipo, método, chave) avança sozinho
+    assert _resultado(cassete, NAVEGADOR, "clicar_elemento", "#entrar") == 2
+    assert _resultado(cassete, NAVEGADOR, "navegar_para", "/login") == 1
+    assert _resultado(cassete, NAVEGADOR, "navegar_para", "/login") == 3
+    assert _resultado(cassete, NAVEGADOR, "navegar_para", "/login") is None
+    assert _resultado(cassete, NAVEGADOR, "navegar_para", "/outra") is None
+
+
+def test_fila_ciclica_recomeca(interacoes):
+    cassete = Cassete(interacoes)
+
+    resultados = [
+        _resultado(cassete, NAVEGADOR, "navegar_para", "/login") for _ in range(3)
+    ]
+    assert resultados == [1, 3, 1]
+
+
+def test_chave_nula_aceita_qualquer_chave(interacoes):
+    cassete = Cassete(interacoes, ciclica=False)
+
+    resultados = [
+        _resultado(cassete, NAVEGADOR, "clicar_elemento", None) for _ in range(2)
+    ]
+    assert resultados == [2, 4]
+
+
+def test_pode_pular_as_chamadas_do_captcha(interacoes):
+    cassete = Cassete(interacoes, ciclica=False)
+
+    assert _resultado(cassete, NAVEGADOR, "clicar_elemento", None, False) == 2
+    assert _resultado(cassete, NAVEGADOR, "clicar_elemento", None, False) is None
+
+
+def test_salvar_e_carregar(tmp_path, interacoes):
+    caminho = str(tmp_path / "cassetes" / "gravacao.json.gz")
+    Cassete(interacoes).salvar(caminho)
+
+    carregada = Cassete.carregar(caminho)
+
+    assert carregada.interacoes == interacoes
+    assert not (tmp_path / "cassetes" / "gravacao.json.gz.tmp").exists()
+
+
+def test_salva_periodicamente_so_com_novidades(tmp_path):
+    caminho = tmp_path / "gravacao.json.gz"
+    cassete = Cassete()
+    cassete.salvar_periodicamente(str(caminho), 0.05)
+
+    time.sleep(0.2)
+    assert not caminho.exists()
+
+    cassete.registrar(_interacao("navegar_para", "/login", 1))
+    prazo = time.monotonic() + 5
+    while not caminho.exists() and time.monotonic() < prazo:
+        time.sleep(0.05)
+    assert len(Cassete.carregar(str(caminho)).interacoes) == 1
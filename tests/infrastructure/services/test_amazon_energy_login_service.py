@@ -0,0 +1,117 @@
+import base64
+import json
+import re
+
+import pytest
+
+from scraper.domain.models import Credenciais
+from scraper.infrastructure.services.amazon_energy_login_service import (
+    PADRAO_URL_AUTENTICACAO,
+    AmazonasEnergyLoginService,
+    padrao_url_autenticacao,
+)
+
+URL_LOGIN = "https://api-agencia.amazonasenergia.com/api/auth/login"
+
+
+def _jwt(claims):
+    def parte(dados):
+        return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode()
+
+    return f"{parte({'alg': 'none'})}.{parte(claims)}.assinatura"
+
+
+class _NavegadorFalso:
+    """Só o que o login usa; `resposta` é o que o log de rede devolve."""
+
+    def __init__(self, resposta):
+        self.resposta = resposta
+
+    def navegar_para(self, url):
+        return True
+
+    def aguardar_elemento(self, seletor, timeout=10):
+        return True
+
+    def preencher_campo(self, seletor, valor):
+        return True
+
+    def clicar_elemento(self, seletor):
+        return True
+
+    def aguardar_resposta_rede(self, padrao_url, timeout=10):
+        return self.resposta
+
+    def aguardar_condicao(self, script, timeout=10):
+        return None
+
+    def executar_script(self, script):
+        return {}
+
+
+class _SolverFalso:
+    def resolver(self):
+        return True
+
+
+def _servico(resposta):
+    return AmazonasEnergyLoginService(_NavegadorFalso(resposta), _SolverFalso())
+
+
+CREDENCIAIS = Credenciais(cpf_cnpj="123", senha="senha")
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        URL_LOGIN,
+        "https://api-agencia.amazonasenergia.com/api/auth/token?x=1",
+        "https://api-agencia.amazonasenergia.com/login/",
+    ],
+)
+def test_padrao_casa_com_a_chamada_de_autenticacao(url):
+    assert re.search(PADRAO_URL_AUTENTICACAO, url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://api-agencia.amazonasenergia.com/api/tokens/renovar",
+        "https://api-agencia.amazonasenergia.com/api/authors",
+        "https://api-agencia.amazonasenergia.com/api/faturas?origem=login",
+        "https://outra-api.com/api/auth/login",
+    ],
+)
+def test_padrao_nao_casa_com_outras_chamadas(url):
+    assert not re.search(PADRAO_URL_AUTENTICACAO, url)
+
+
+def test_padrao_para_outra_api():
+    padrao = padrao_url_autenticacao("http://127.0.0.1:8080")
+
+    assert re.search(padrao, "http://127.0.0.1:8080/api/auth/login")
+    assert not re.search(padrao, "http://127.0.0.1:8080/api/faturas/abertas")
+
+
+def test_autenticacao_e_resolvida_com_a_resposta_de_login():
+    token = _jwt({"sub": "123"})
+    corpo = json.dumps({"token": token, "usuario": {"NOME": "Fulano"}})
+    servico = _servico({"url": URL_LOGIN, "status": 200, "corpo": corpo})
+    # O Future existe antes do login: quem acompanha pode se registrar antes
+    autenticacao = servico.autenticacao
+    resolvidos = []
+    autenticacao.add_done_callback(lambda futuro: resolvidos.append(futuro.result()))
+
+    resultado = servico.autenticar(CREDENCIAIS)
+
+    assert resultado[0].valor == token
+    assert resolvidos == [resultado]
+    assert resolvidos[0][1].nome == "Fulano"
+
+
+def test_login_recusado_resolve_a_autenticacao_sem_token():
+    servico = _servico({"url": URL_LOGIN, "status": 401, "corpo": "{}"})
+    autenticacao = servico.autenticacao
+
+    assert servico.autenticar(CREDENCIAIS) == (None, None)
+    assert autenticacao.result(timeout=0) == (None, None)
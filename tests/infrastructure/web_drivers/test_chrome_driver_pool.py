@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+from scraper.domain.exceptions import WebDriverError
+from scraper.infrastructure.web_drivers.chrome_driver_pool import ChromeWebDriverPool
+
+
+class _NavegadorFalso:
+    def __init__(self, inicializa=True, reseta=True):
+        self.inicializa = inicializa
+        self.reseta = reseta
+        self.ativo = True
+        self.resets = 0
+        self.finalizado = False
+
+    def inicializar(self):
+        return self.inicializa
+
+    def finalizar(self):
+        self.finalizado = True
+        return True
+
+    def esta_ativo(self):
+        return self.ativo
+
+    def resetar_estado(self):
+        self.resets += 1
+        return self.reseta
+
+
+class _Fabrica:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.criados = []
+
+    def __call__(self):
+        navegador = _NavegadorFalso(**self.kwargs)
+        self.criados.append(navegador)
+        return navegador
+
+
+def _fabrica_que_falha():
+    raise RuntimeError("Chrome não encontrado")
+
+
+def _aguardar(condicao, timeout=5):
+    prazo = time.monotonic() + timeout
+    while not condicao():
+        assert time.monotonic() < prazo, "condição não atingida a tempo"
+        time.sleep(0.01)
+
+
+def test_devolucao_limpa_e_reaproveita_o_navegador():
+    fabrica = _Fabrica()
+    pool = ChromeWebDriverPool(tamanho_maximo=1, minimo_ocioso=0, fabrica=fabrica)
+
+    navegador = pool.adquirir()
+    pool.devolver(navegador)
+
+    assert navegador.resets == 1
+    assert pool.adquirir() is navegador
+    estatisticas = pool.estatisticas()
+    assert estatisticas["checkouts"] == 2
+    assert estatisticas["checkins"] == 1
+    assert estatisticas["reaproveitados"] == 1
+    assert estatisticas["inicializacoes"] == 1
+    assert estatisticas["em_uso"] == 1
+
+
+def test_reset_que_falha_descarta_o_navegador():
+    fabrica = _Fabrica(reseta=False)
+    pool = ChromeWebDriverPool(tamanho_maximo=1, minimo_ocioso=0, fabrica=fabrica)
+
+    navegador = pool.adquirir()
+    pool.devolver(navegador)
+
+    assert navegador.finalizado
+    assert pool.adquirir() is not navegador
+    assert pool.estatisticas()["descartados"] == 1
+
+
+def test_pool_cheio_espera_ate_o_timeout():
+    pool = ChromeWebDriverPool(tamanho_maximo=1, minimo_ocioso=0, fabrica=_Fabrica())
+    pool.adquirir()
+
+    with pytest.raises(WebDriverError):
+        pool.adquirir(timeout=0.05)
+    assert pool.estatisticas()["timeouts"] == 1
+
+
+def test_espera_recebe_o_navegador_devolvido():
+    pool = ChromeWebDriverPool(tamanho_maximo=1, minimo_ocioso=0, fabrica=_Fabrica())
+    navegador = pool.adquirir()
+    threading.Timer(0.05, pool.devolver, args=(navegador,)).start()
+
+    assert pool.adquirir(timeout=5) is navegador
+    assert pool.estatisticas()["esperas"] >= 1
+
+
+def test_navegador_ocioso_inativo_e_substituido():
+    fabrica = _Fabrica()
+    pool = ChromeWebDriverPool(tamanho_maximo=1, minimo_ocioso=0, fabrica=fabrica)
+    navegador = pool.adquirir()
+    pool.devolver(navegador)
+    navegador.ativo = False
+
+    assert pool.adquirir() is not navegador
+    assert len(fabrica.criados) == 2
+
+
+def test_aquecimento_mantem_o_minimo_ocioso():
+    fabrica = _Fabrica()
+    pool = ChromeWebDriverPool(tamanho_maximo=3, minimo_ocioso=2, fabrica=fabrica)
+
+    pool.aquecer()
+    _aguardar(lambda: pool.estatisticas()["ociosos"] == 2)
+    pool.adquirir()
+    _aguardar(lambda: pool.estatisticas()["ociosos"] == 2)
+
+    estatisticas = pool.estatisticas()
+    assert estatisticas["total"] == 3
+    assert estatisticas["em_uso"] == 1
+    assert len(fabrica.criados) == 3
+
+
+@pytest.mark.parametrize("fabrica", [_Fabrica(inicializa=False), _fabrica_que_falha])
+def test_falha_ao_iniciar_devolve_a_vaga(fabrica):
+    pool = ChromeWebDriverPool(tamanho_maximo=1, minimo_ocioso=0, fabrica=fabrica)
+
+    for _ in range(2):
+        with pytest.raises(WebDriverError):
+            pool.adquirir(timeout=0.05)
+    estatisticas = pool.estatisticas()
+    assert estatisticas["total"] == 0
+    assert estatisticas["falhas_inicializacao"] == 2
+
+
+def test_encerrar_finaliza_ociosos_e_os_devolvidos_depois():
+    fabrica = _Fabrica()
+    pool = ChromeWebDriverPool(tamanho_maximo=2, minimo_ocioso=0, fabrica=fabrica)
+    em_uso = pool.adquirir()
+    ocioso = pool.adquirir()
+    pool.devolver(ocioso)
+
+    pool.encerrar()
+    assert ocioso.finalizado and not em_uso.finalizado
+    pool.devolver(em_uso)
+
+    assert em_uso.finalizado
+    assert pool.estatisticas()["total"] == 0
+    with pytest.raises(WebDriverError):
+        pool.adquirir()
@@ -0,0 +1,51 @@
+from unittest import mock
+
+import pytest
+
+from scraper.domain.exceptions import WebDriverError
+from scraper.infrastructure.web_drivers.lazy_driver_manager import (
+    LazyWebDriverManager,
+)
+
+
+def test_so_adquire_no_primeiro_comando_e_uma_vez():
+    navegador = mock.Mock()
+    adquirir = mock.Mock(return_value=navegador)
+    liberar = mock.Mock()
+    manager = LazyWebDriverManager(adquirir, liberar)
+
+    assert not manager.provisionado
+    adquirir.assert_not_called()
+    manager.navegar_para("https://exemplo.com")
+    manager.clicar_elemento("#entrar")
+
+    adquirir.assert_called_once_with()
+    navegador.navegar_para.assert_called_once_with("https://exemplo.com")
+    assert manager.provisionado
+
+
+def test_finalizar_devolve_o_navegador_uma_vez():
+    navegador = mock.Mock()
+    liberar = mock.Mock()
+    manager = LazyWebDriverManager(lambda: navegador, liberar)
+    manager.inicializar()
+
+    assert manager.finalizar()
+    assert manager.finalizar()
+    liberar.assert_called_once_with(navegador)
+    assert not manager.provisionado
+
+
+def test_finalizar_sem_navegador_nao_libera_nada():
+    liberar = mock.Mock()
+
+    assert LazyWebDriverManager(mock.Mock(), liberar).finalizar()
+    liberar.assert_not_called()
+
+
+def test_falha_ao_adquirir():
+    manager = LazyWebDriverManager(mock.Mock(side_effect=WebDriverError("cheio")), None)
+
+    assert manager.inicializar() is False
+    with pytest.raises(WebDriverError):
+        manager.executar_script("return 1")
@@ -0,0 +1,65 @@
+import pytest
+
+from scraper.infrastructure.web_drivers.resource_filter import (
+    DOMINIOS_RASTREADORES,
+    FiltroRecursos,
+)
+
+PORTAL = "agencia.amazonasenergia.com"
+
+
+def test_bloqueia_midia_so_no_portal_e_rastreadores_em_qualquer_pagina():
+    padroes = FiltroRecursos(hosts_filtrados=[PORTAL]).padroes()
+
+    assert f"*://{PORTAL}/*.png*" in padroes
+    assert f"*://{PORTAL}/*.woff2*" in padroes
+    assert "*://*google-analytics.com/*" in padroes
+    assert not any(padrao.startswith("*://*/") for padrao in padroes)
+
+
+def test_sem_hosts_filtrados_nao_bloqueia_midia():
+    padroes = FiltroRecursos().padroes()
+
+    assert padroes == [f"*://*{dominio}/*" for dominio in DOMINIOS_RASTREADORES]
+
+
+@pytest.mark.parametrize(
+    "padrao",
+    [
+        # Host que casa com qualquer domínio
+        "*://*/*.js",
+        "*",
+        # Hosts de que o reCAPTCHA depende
+        "*://*google.com/*",
+        "*://www.gstatic.com/*.png",
+        "*://*.gstatic.com:443/*",
+        "https://recaptcha.net/*",
+        # Curinga no esquema pode engolir o host
+        "*tps://anything/*",
+        # Atinge um caminho do reCAPTCHA
+        "*/recaptcha/*",
+    ],
+)
+def test_descarta_padroes_que_atingem_o_recaptcha(padrao):
+    filtro = FiltroRecursos(dominios_rastreadores=[], padroes_extras=[padrao])
+
+    assert filtro.padroes() == []
+
+
+def test_descarta_padroes_que_atingem_dominios_permitidos():
+    filtro = FiltroRecursos(
+        dominios_rastreadores=[],
+        padroes_extras=["*://cdn.exemplo.com/*", "*://*exemplo.com/*"],
+        dominios_permitidos=["cdn.exemplo.com"],
+    )
+
+    assert filtro.padroes() == []
+
+
+def test_mantem_padroes_extras_seguros_sem_repeticao():
+    filtro = FiltroRecursos(
+        dominios_rastreadores=["hotjar.com"],
+        padroes_extras=["*://ads.exemplo.com/*", "*://*hotjar.com/*"],
+    )
+
+    assert filtro.padroes() == ["*://*hotjar.com/*", "*://ads.exemplo.com/*"]